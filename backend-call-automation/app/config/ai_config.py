@@ -37,6 +37,30 @@ class AISettings(BaseSettings):
     CACHE_ENABLED: bool = True
     CACHE_TTL: int = 3600  # 1 hora
 
+    # Control de concurrencia del gateway de LLM (AIMD)
+    LLM_INITIAL_CONCURRENCY: int = 5
+    LLM_MIN_CONCURRENCY: int = 1
+    LLM_MAX_CONCURRENCY: int = 50
+    LLM_TARGET_LATENCY: float = 3.0  # segundos
+    LLM_DECREASE_FACTOR: float = 0.5
+    LLM_DECREASE_COOLDOWN: float = 2.0  # segundos
+
+    # Enrutamiento entre proveedores de LLM
+    LLM_PROVIDERS: str = ""  # Lista separada por comas; vacío usa solo LLM_PROVIDER
+    LLM_HEDGE_ENABLED: bool = True
+    LLM_HEDGE_PERCENTILE: float = 95.0
+    LLM_HEDGE_DEFAULT_DELAY: float = 1.5  # segundos, hasta tener muestras suficientes
+    LLM_HEDGE_MIN_DELAY: float = 0.2  # segundos
+    LLM_STATS_WINDOW: int = 200
+
+    # Análisis posterior a la llamada
+    LIVE_SENTIMENT_ENABLED: bool = False  # El sentimiento se calcula después de la llamada
+    POST_CALL_ANALYTICS_INTERVAL: int = 60  # segundos
+    POST_CALL_BATCH_SIZE: int = 20  # llamadas por prompt
+    POST_CALL_MAX_CALLS_PER_RUN: int = 200
+    POST_CALL_MAX_TRANSCRIPT_CHARS: int = 4000
+    POST_CALL_MAX_ATTEMPTS: int = 3  # intentos fallidos antes de dejar de analizar una llamada
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
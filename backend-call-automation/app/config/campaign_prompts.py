@@ -225,3 +225,22 @@ DEFAULT_VALUES = {
     "customer_tenure": "cliente actual",
     "cancellation_reason": "razón no especificada"
 }
+
+# Marcador que separa la parte estática del prompt (instrucciones, datos de la
+# campaña y del contacto) de la parte que cambia en cada turno de la conversación
+CONVERSATION_SECTION_MARKER = "Historial de la conversación:"
+
+# Variables que cambian en cada turno de la conversación
+TURN_VARIABLES = ["history", "input"]
+
+# Variables propias del contacto: estables durante una llamada, distintas entre llamadas
+CONTACT_VARIABLES = [
+    "contact_name",
+    "contact_history",
+    "support_history",
+    "knowledge_level",
+    "customer_tenure",
+    "current_services",
+    "cancellation_reason",
+    "previous_interaction"
+]
@@ -1,5 +1,5 @@
 from functools import lru_cache
-from typing import AsyncGenerator
+from typing import Optional
 from fastapi import Depends
 from supabase import create_client, Client
 from app.config.settings import get_settings
@@ -7,6 +7,8 @@ from app.services.campaign_service import CampaignService
 from app.services.call_service import CallService
 from app.services.contact_service import ContactService
 from app.services.campaign_scheduler import CampaignScheduler
+from app.services.dial_queue import DialQueue
+from app.services.scheduler_coordinator import SchedulerCoordinator
 from app.services.twilio_service import TwilioService # Importar TwilioService
 
 settings = get_settings()
@@ -56,23 +58,52 @@ async def get_contact_service(
     """
     return ContactService(supabase)
 
+# Planificador del proceso; se inicia con la aplicación (ver app.main.lifespan)
+_campaign_scheduler: Optional[CampaignScheduler] = None
+
+async def start_campaign_scheduler(
+    campaign_service: Optional[CampaignService] = None,
+    call_service: Optional[CallService] = None,
+    contact_service: Optional[ContactService] = None
+) -> CampaignScheduler:
+    """
+    Starts the process-wide CampaignScheduler if it is not running yet.
+
+    Services not given are built on the global Supabase client. With
+    SCHEDULER_COORDINATION_ENABLED, instances share campaigns through Redis
+    so several workers or replicas never process the same campaign.
+    """
+    global _campaign_scheduler
+    if _campaign_scheduler is None:
+        from app.config.supabase import supabase_client
+
+        scheduler = CampaignScheduler(
+            campaign_service=campaign_service or CampaignService(supabase_client),
+            call_service=call_service or CallService(supabase_client),
+            contact_service=contact_service or ContactService(supabase_client),
+            check_interval=settings.SCHEDULER_CHECK_INTERVAL,
+            queue=DialQueue() if settings.DIAL_QUEUE_ENABLED else None,
+            coordinator=SchedulerCoordinator() if settings.SCHEDULER_COORDINATION_ENABLED else None
+        )
+        await scheduler.start()
+        _campaign_scheduler = scheduler
+    return _campaign_scheduler
+
 async def get_campaign_scheduler(
     campaign_service: CampaignService = Depends(get_campaign_service),
     call_service: CallService = Depends(get_call_service),
     contact_service: ContactService = Depends(get_contact_service)
-) -> AsyncGenerator[CampaignScheduler, None]:
+) -> CampaignScheduler:
     """
-    Returns a CampaignScheduler instance and manages its lifecycle
+    Returns the process-wide CampaignScheduler, starting it if needed.
     """
-    scheduler = CampaignScheduler(
-        campaign_service=campaign_service,
-        call_service=call_service,
-        contact_service=contact_service,
-        check_interval=settings.SCHEDULER_CHECK_INTERVAL
-    )
-    
-    await scheduler.start()
-    try:
-        yield scheduler
-    finally:
-        await scheduler.stop()
+    return await start_campaign_scheduler(campaign_service, call_service, contact_service)
+
+async def stop_campaign_scheduler() -> None:
+    """
+    Stops the process-wide CampaignScheduler, releasing its campaigns.
+    """
+    global _campaign_scheduler
+    if _campaign_scheduler is not None:
+        await _campaign_scheduler.stop()
+        _campaign_scheduler = None
@@ -41,6 +41,15 @@ class MetricsSettings(BaseSettings):
         "ai_tokens_used"
     ]
 
+    # Escritura de métricas por lotes
+    sink_max_queue_size: int = 10000
+    sink_batch_size: int = 500
+    sink_flush_interval: float = 2.0  # segundos
+
+    # Cachés de métricas en memoria
+    cache_ttl_seconds: int = 3600
+    cache_max_entries: int = 10000
+
     class Config:
         env_prefix = "METRICS_"
         case_sensitive = False
@@ -75,3 +84,20 @@ class MetricNames:
     AI_ERRORS_TOTAL = "ai_errors_total"
     AI_SENTIMENT_SCORE = "ai_sentiment_score"
     AI_TOKENS_USED = "ai_tokens_used"
+
+    # Métricas del gateway de LLM
+    LLM_QUEUE_DEPTH = "llm_gateway_queue_depth"
+    LLM_QUEUE_WAIT_TIME = "llm_gateway_queue_wait_seconds"
+    LLM_CONCURRENCY_LIMIT = "llm_gateway_concurrency_limit"
+    LLM_IN_FLIGHT = "llm_gateway_in_flight"
+    LLM_RATE_LIMITED_TOTAL = "llm_gateway_rate_limited_total"
+
+    # Métricas del escritor de métricas por lotes
+    METRICS_SINK_QUEUE_SIZE = "metrics_sink_queue_size"
+    METRICS_SINK_DROPPED_TOTAL = "metrics_sink_dropped_total"
+    METRICS_SINK_WRITTEN_TOTAL = "metrics_sink_written_total"
+    METRICS_SINK_FLUSH_TIME = "metrics_sink_flush_seconds"
+
+    # Métricas del motor de marcado
+    DIALING_ACTIVE_CALLS = "dialing_engine_active_calls"
+    DIALING_QUEUED_CALLS = "dialing_engine_queued_calls"
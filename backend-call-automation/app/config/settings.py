@@ -17,6 +17,11 @@ class Settings(BaseSettings):
     TWILIO_ACCOUNT_SID: str
     TWILIO_AUTH_TOKEN: str
     TWILIO_PHONE_NUMBER: str
+    TWILIO_CALLS_PER_SECOND: float = 1.0  # Llamadas por segundo permitidas por la cuenta de Twilio (CPS)
+    TWILIO_CALLS_BURST: int = 1  # Llamadas que pueden iniciarse seguidas sin esperar al ritmo
+    TWILIO_MAX_CONCURRENT_REQUESTS: int = 20  # Peticiones simultáneas máximas a la API de Twilio
+    TWILIO_RATE_LIMIT_RETRIES: int = 3  # Reintentos tras un error 429 de Twilio
+    TWILIO_RATE_LIMIT_BACKOFF: float = 1.0  # Segundos de espera tras el primer 429 (se duplica en cada reintento)
 
     # Application Configuration
     APP_NAME: str
@@ -36,16 +41,55 @@ class Settings(BaseSettings):
     ENVIRONMENT: str
 
     # Scheduler Configuration
+    SCHEDULER_ENABLED: bool = True  # Iniciar el planificador de campañas con la aplicación
     SCHEDULER_CHECK_INTERVAL: int = 60  # Intervalo en segundos para revisar campañas
     SCHEDULER_MAX_CONCURRENT_CALLS: int = 10  # Máximo de llamadas simultáneas
+    SCHEDULER_MAX_CALLS_PER_CAMPAIGN: int = 10  # Máximo de llamadas simultáneas por campaña
+    SCHEDULER_CALL_SLOT_TIMEOUT: int = 1800  # Segundos tras los que se libera la plaza de una llamada sin estado final
+    SCHEDULER_PACING_MODE: str = "fixed"  # Ritmo de marcado: fixed (todas las plazas) o predictive
+    PACING_AI_CAPACITY: int = 10  # Conversaciones de IA simultáneas que puede atender el sistema
+    PACING_ABANDON_RATE: float = 0.03  # Fracción máxima de llamadas contestadas sin conversación libre
+    PACING_MAX_RATIO: float = 3.0  # Llamadas sonando como máximo por conversación libre
+    PACING_WINDOW: int = 200  # Resultados recientes por campaña para estimar la tasa de respuesta
+    PACING_MIN_SAMPLES: int = 20  # Resultados necesarios antes de sobremarcar
+    PACING_RING_SECONDS: int = 25  # Tiempo medio que suena una llamada antes de contestarse
+
+    # Dial Queue Configuration
+    REDIS_URL: str = "redis://redis:6379/0"  # URL de Redis para la cola de marcado
+    DIAL_QUEUE_ENABLED: bool = False  # Usar la cola de marcado persistente en Redis
+    DIAL_QUEUE_LEASE_SECONDS: int = 120  # Segundos que un planificador reserva una llamada reclamada
+    DIAL_QUEUE_REFILL_SIZE: int = 200  # Contactos que se añaden a la cola de una campaña en cada recarga
+    DIAL_QUEUE_PRIORITY_STEP: int = 300  # Segundos que adelanta cada punto de prioridad del contacto
+    SCHEDULER_COORDINATION_ENABLED: bool = False  # Repartir las campañas entre varias instancias del planificador (Redis)
+    SCHEDULER_HEARTBEAT_INTERVAL: float = 2.0  # Segundos entre latidos de cada instancia del planificador
+    SCHEDULER_INSTANCE_TTL: float = 6.0  # Segundos sin latido tras los que una instancia se da por caída
+    SCHEDULER_CAMPAIGN_LEASE_SECONDS: float = 10.0  # Segundos que dura la concesión de una campaña sin renovar
     SCHEDULER_RETRY_DELAY: int = 15  # Tiempo en minutos entre reintentos por defecto
+    SCHEDULER_RETRY_BATCH_SIZE: int = 200  # Reintentos vencidos que se leen por ciclo
+    SCHEDULER_WINDOW_REFRESH_INTERVAL: int = 300  # Segundos entre recálculos de ventanas de llamada por campaña
+    SCHEDULER_DEFAULT_TIMEZONE: str = "UTC"  # Zona horaria de los contactos sin zona ni prefijo conocido
     SCHEDULER_DEFAULT_MAX_RETRIES: int = 3  # Número máximo de reintentos por defecto
+    SCHEDULER_COUNTER_RECONCILE_INTERVAL: int = 900  # Segundos entre reconciliaciones de contadores de campaña
 
     # Call Configuration
     CALL_TIMEOUT: int = 30  # Tiempo máximo de espera para una llamada en segundos
     CALL_DEFAULT_WEBHOOK_BASE_URL: str = ""  # URL base para webhooks de llamadas
     CALL_DEFAULT_FROM_NUMBER: str = ""  # Número de teléfono por defecto para realizar llamadas
 
+    # Contact Configuration
+    CONTACT_COUNT_MODE: str = "estimated"  # Conteo del listado de contactos: exact, planned o estimated
+    CONTACT_COUNT_CACHE_TTL: int = 30  # Segundos que se reutiliza el total por combinación de filtros
+    CONTACT_COUNT_CACHE_SIZE: int = 1000  # Combinaciones de filtros en caché
+    CONTACT_IMPORT_BATCH_SIZE: int = 1000  # Contactos por escritura
+    CONTACT_IMPORT_CONCURRENCY: int = 4  # Escrituras simultáneas por importación
+    CONTACT_IMPORT_PARSE_ROWS: int = 5000  # Filas validadas por bloque
+    CONTACT_IMPORT_JOB_TTL: int = 86400  # Segundos que se conserva el estado de una importación
+    CALL_BULK_BATCH_SIZE: int = 1000  # Llamadas por inserción en la creación masiva
+    CALL_BULK_CONCURRENCY: int = 4  # Inserciones simultáneas en la creación masiva
+    CALL_BULK_MAX_ROWS: int = 50000  # Llamadas máximas por petición de creación masiva
+    CALL_BULK_RETRIES: int = 2  # Reintentos de un lote de la creación masiva ante errores de conexión o del servidor
+    CALL_BULK_RETRY_BACKOFF: float = 0.5  # Segundos de espera antes del primer reintento (se duplica en cada uno)
+
     # ElevenLabs Configuration
     ELEVENLABS_API_KEY: str = Field(...)
     ELEVENLABS_DEFAULT_VOICE: str = "Bella"
@@ -77,6 +121,9 @@ class Settings(BaseSettings):
     AUDIO_CACHE_DIR: str = "cache/audio"
     AUDIO_CACHE_TTL: int = 86400  # 24 horas en segundos
     AUDIO_CACHE_MAX_SIZE: int = 1073741824  # 1 GB en bytes
+    AUDIO_FILE_URL_TTL: int = 900  # Segundos de validez de las URLs firmadas de los audios del caché
+    AUDIO_RENDER_MAX_CONCURRENT: int = 4  # Síntesis de scripts simultáneas antes de marcar
+    AUDIO_RENDER_CALL_TIMEOUT: float = 3.0  # Segundos que el webhook de la llamada espera el audio del script antes de usar la voz de Twilio
 
     # Supabase Authentication Configuration
     SUPABASE_URL: str = os.getenv("SUPABASE_URL", "")
@@ -7,7 +7,16 @@ import logging
 from app.routers import campaign_router, call_router, cache_router, twilio_webhook_router, contact_router, report_router, audio_cache_router, auth_router
 from app.api.endpoints import calls as calls_ws_router
 from app.config.settings import get_settings
+from app.config.dependencies import start_campaign_scheduler, stop_campaign_scheduler
 from app.services.cache_service import cache_service
+from app.services.post_call_analytics import post_call_analytics
+from app.services.metrics_sink import metrics_sink
+from app.services.campaign_counters import campaign_counters
+from app.services.contact_import import contact_importer
+from app.services.audio_render import audio_render_stage
+from app.services.dialing_engine import dialing_engine
+from app.services.call_events import call_events
+from app.services.twilio_service import close_async_client as close_twilio_client
 from app.utils.logging import setup_logging, setup_app_logging
 from app.middleware import setup_error_handling, setup_auth_middleware
 
@@ -31,10 +40,36 @@ async def lifespan(app: FastAPI):
     # Iniciar tarea de sincronización de caché al iniciar la aplicación
     logger.info("Starting cache sync task")
     await cache_service.start_sync_task()
+    # Iniciar la escritura de métricas por lotes
+    await metrics_sink.start()
+    # Iniciar el análisis por lotes de llamadas completadas
+    await post_call_analytics.start()
+    # Iniciar la reconciliación periódica de contadores de campaña
+    await campaign_counters.start()
+    # Iniciar el motor de marcado de campañas
+    await dialing_engine.start()
+    # Recibir los eventos de las llamadas marcadas por esta instancia
+    await call_events.start()
+    # Iniciar el planificador de campañas
+    if settings.SCHEDULER_ENABLED:
+        await start_campaign_scheduler()
     yield
     # Detener tarea de sincronización de caché al cerrar la aplicación
     logger.info("Stopping cache sync task")
     await cache_service.stop_sync_task()
+    await post_call_analytics.stop()
+    await campaign_counters.stop()
+    await contact_importer.stop()
+    # Detener el planificador de campañas y soltar sus campañas
+    await stop_campaign_scheduler()
+    await call_events.stop()
+    await dialing_engine.stop()
+    # Cancelar la síntesis pendiente de scripts
+    await audio_render_stage.stop()
+    # Cerrar las conexiones con Twilio
+    await close_twilio_client()
+    # Escribir las métricas pendientes antes de cerrar
+    await metrics_sink.stop()
 
 app = FastAPI(
     title="Call Automation API",
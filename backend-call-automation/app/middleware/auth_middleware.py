@@ -13,6 +13,7 @@ from fastapi.responses import JSONResponse
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.types import ASGIApp
 from app.config.settings import get_settings
+from app.services.audio_cache_service import AUDIO_FILES_PATH
 from app.utils.logging import app_logger as logger
 
 settings = get_settings()
@@ -178,6 +179,7 @@ def setup_auth_middleware(
         "/api/auth",
         "/api/v1/auth",
         "/api/webhook",
+        AUDIO_FILES_PATH + "/",  # URLs firmadas de los audios del caché
     ]
 
     # Combinar con rutas proporcionadas
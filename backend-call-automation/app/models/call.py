@@ -62,6 +62,7 @@ class Call(CallBase):
     created_at: datetime = Field(..., description="Fecha de creación")
     updated_at: datetime = Field(..., description="Fecha de actualización")
     campaign_id: str = Field(..., description="ID de la campaña")
+    next_retry_at: Optional[datetime] = Field(None, description="Fecha del próximo reintento")
     interaction_history: Optional[List[Dict[str, Any]]] = Field(
         None,
         description="Historial de interacciones"
@@ -110,3 +111,18 @@ class CallDetail(BaseModel):
     tags: List[str] = Field(default_factory=list, description="Etiquetas de la llamada")
 
     model_config = ConfigDict(from_attributes=True)
+
+class CallBulkError(BaseModel):
+    """Error de una fila en la creación masiva de llamadas."""
+    index: int = Field(..., description="Posición de la fila en la petición")
+    error: str = Field(..., description="Motivo del error")
+
+class CallBulkResult(BaseModel):
+    """Resultado de la creación masiva de llamadas."""
+    total: int = Field(0, description="Filas recibidas")
+    created: int = Field(0, description="Llamadas creadas")
+    ids: List[Optional[str]] = Field(
+        default_factory=list,
+        description="ID de la llamada creada por cada fila (None si la fila falló)"
+    )
+    errors: List[CallBulkError] = Field(default_factory=list, description="Errores por fila")
@@ -1,8 +1,22 @@
 """
 Modelo para las métricas de llamadas.
 """
+from typing import Dict, List, Optional
+from datetime import datetime
 from pydantic import BaseModel, Field, ConfigDict
 
+class CallMetricsBucket(BaseModel):
+    """
+    Métricas de llamadas de un intervalo de tiempo.
+    """
+    date: datetime = Field(..., description="Inicio del intervalo")
+    total_calls: int = Field(default=0, description="Total de llamadas del intervalo")
+    by_status: Dict[str, int] = Field(default_factory=dict, description="Llamadas por estado")
+    avg_duration: float = Field(default=0.0, description="Duración promedio en segundos")
+    avg_sentiment: Optional[float] = Field(default=None, description="Sentimiento promedio (0-1) de las llamadas analizadas")
+
+    model_config = ConfigDict(from_attributes=True)
+
 class CallMetrics(BaseModel):
     """
     Modelo que representa las métricas de llamadas.
@@ -13,5 +27,8 @@ class CallMetrics(BaseModel):
     no_answer_calls: int = Field(default=0, description="Llamadas sin respuesta")
     busy_calls: int = Field(default=0, description="Llamadas ocupadas")
     avg_duration: float = Field(default=0.0, description="Duración promedio de las llamadas en segundos")
+    by_status: Dict[str, int] = Field(default_factory=dict, description="Llamadas por estado")
+    timeline: List[CallMetricsBucket] = Field(default_factory=list, description="Serie temporal agrupada")
+    group_by: Optional[str] = Field(default=None, description="Intervalo de la serie temporal")
     
     model_config = ConfigDict(from_attributes=True)
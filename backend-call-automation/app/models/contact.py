@@ -1,5 +1,8 @@
+from datetime import datetime
+from enum import Enum
 from typing import Optional, List, Annotated
-from pydantic import BaseModel, EmailStr, Field
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from pydantic import BaseModel, EmailStr, Field, field_validator
 from .base import BaseDBModel
 
 class ContactBase(BaseModel):
@@ -8,6 +11,17 @@ class ContactBase(BaseModel):
     email: Optional[EmailStr] = None
     notes: Optional[str] = None
     tags: List[str] = []
+    priority: int = 0  # Los contactos con mayor prioridad se llaman antes
+    timezone: Optional[str] = None  # Zona horaria IANA; si falta se deduce del prefijo telefónico
+
+    @field_validator("timezone")
+    def validate_timezone(cls, v: Optional[str]) -> Optional[str]:
+        if v is not None:
+            try:
+                ZoneInfo(v)
+            except (ZoneInfoNotFoundError, ValueError):
+                raise ValueError(f"Zona horaria no válida: {v}")
+        return v
 
 class ContactCreate(ContactBase):
     pass
@@ -15,6 +29,7 @@ class ContactCreate(ContactBase):
 class ContactUpdate(ContactBase):
     name: Optional[str] = None
     phone_number: Optional[str] = None
+    priority: Optional[int] = None
 
 class Contact(BaseDBModel, ContactBase):
     pass
@@ -28,3 +43,21 @@ class ContactListCreate(ContactListBase):
 
 class ContactList(BaseDBModel, ContactListBase):
     contacts: List[Contact] = []
+
+class ContactImportStatus(str, Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+class ContactImportJob(BaseModel):
+    id: str
+    status: ContactImportStatus = ContactImportStatus.PENDING
+    total: int = 0  # Filas leídas
+    imported: int = 0  # Contactos nuevos
+    updated: int = 0  # Contactos existentes actualizados
+    duplicates: int = 0  # Filas con un teléfono repetido dentro del mismo lote
+    errors: int = 0  # Filas no válidas o que no se pudieron escribir
+    error_message: Optional[str] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
@@ -5,8 +5,11 @@ Este módulo define los endpoints para gestionar el caché de audio,
 incluyendo estadísticas y operaciones de limpieza.
 """
 
+import os
+import re
 from typing import Dict, Any
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import FileResponse
 from app.services.audio_cache_service import audio_cache_service
 from app.config.dependencies import get_supabase_client
 from app.utils.logging import app_logger as logger
@@ -14,6 +17,9 @@ from supabase import Client as SupabaseClient
 
 router = APIRouter(prefix="/api/audio-cache", tags=["audio-cache"])
 
+# Nombre de los archivos del caché: clave MD5 y extensión
+CACHED_AUDIO_NAME = re.compile(r"[0-9a-f]{32}\.mp3")
+
 @router.get("/stats", response_model=Dict[str, Any])
 async def get_cache_stats(
     supabase_client: SupabaseClient = Depends(get_supabase_client)
@@ -34,6 +40,35 @@ async def get_cache_stats(
             detail=f"Error al obtener estadísticas del caché: {str(e)}"
         )
 
+@router.get("/files/{file_name}")
+async def get_cached_audio(file_name: str, expires: int = 0, signature: str = "") -> FileResponse:
+    """
+    Sirve un audio del caché (p. ej. el script de una llamada para Twilio).
+
+    Es una ruta pública: solo responde a URLs firmadas y vigentes generadas
+    con ``audio_cache_service.file_url``.
+
+    Args:
+        file_name: Nombre del archivo en el caché
+        expires: Instante de vencimiento de la URL
+        signature: Firma de la URL
+
+    Returns:
+        FileResponse con el audio
+    """
+    if not audio_cache_service.verify_file_url(file_name, expires, signature):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="URL de audio no válida o vencida"
+        )
+    path = os.path.join(audio_cache_service.cache_dir, file_name)
+    if not CACHED_AUDIO_NAME.fullmatch(file_name) or not os.path.exists(path):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Audio no encontrado"
+        )
+    return FileResponse(path, media_type="audio/mpeg")
+
 @router.post("/clear", response_model=Dict[str, bool])
 async def clear_cache(
     supabase_client: SupabaseClient = Depends(get_supabase_client)
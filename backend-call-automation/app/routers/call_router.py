@@ -2,9 +2,11 @@ from typing import List, Optional, Dict, Any
 from datetime import datetime, timedelta
 from fastapi import APIRouter, Depends, status, HTTPException, Query, Path
 from fastapi.responses import JSONResponse
-from app.models.call import Call, CallCreate, CallUpdate, CallStatus, CallDetail
+from app.models.call import Call, CallBulkResult, CallCreate, CallUpdate, CallStatus, CallDetail
 from app.services.call_service import CallService
 from app.services.twilio_service import TwilioService
+from app.utils.pagination import next_cursor
+from app.config.settings import settings
 from app.config.dependencies import get_call_service, get_supabase_client, get_twilio_service
 from supabase import Client as SupabaseClient
 
@@ -19,28 +21,40 @@ async def create_call(
     """
     Crea una nueva llamada y la inicia con Twilio.
     """
-    # twilio_response = await twilio_client.calls.create(
-    #     to=call.phone_number,
-    #     from_=call.from_number,
-    #     url=call.webhook_url,
-    #     status_callback=call.status_callback_url
-    # )
-
-    # call.twilio_sid = twilio_response.sid
-
-    # Usar twilio_service.client en lugar de twilio_client directamente
-    twilio_response = await twilio_service.client.calls.create(
+    twilio_response = await twilio_service.make_call(
         to=call.phone_number,
         from_=call.from_number,
         url=call.webhook_url,
         status_callback=call.status_callback_url
     )
 
-    call.twilio_sid = twilio_response.sid
+    call.twilio_sid = twilio_response['sid']
 
     call_service = CallService(supabase_client, twilio_service) # Pasar twilio_service a CallService si es necesario (verificar constructor)
     return await call_service.create_call(call)
 
+@router.post("/bulk", response_model=CallBulkResult)
+async def create_calls_bulk(
+    calls: List[Dict[str, Any]],
+    call_service: CallService = Depends(get_call_service)
+) -> CallBulkResult:
+    """
+    Crea varias llamadas en una sola petición.
+
+    Cada elemento tiene los campos de una llamada (``CallCreate``). Las filas no
+    válidas o que no se pudieron insertar se devuelven en ``errors`` con su
+    posición, sin impedir la creación del resto.
+
+    Returns:
+        Número de llamadas creadas, sus IDs y los errores por fila
+    """
+    if len(calls) > settings.CALL_BULK_MAX_ROWS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Se admiten como máximo {settings.CALL_BULK_MAX_ROWS} llamadas por petición"
+        )
+    return await call_service.create_calls_bulk(calls)
+
 @router.get("/{call_id}", response_model=CallDetail)
 async def get_call(
     call_id: str = Path(..., description="ID de la llamada"),
@@ -75,11 +89,16 @@ async def list_calls(
     page_size: int = Query(10, ge=1, le=100, description="Tamaño de página"),
     sort_by: str = Query("created_at", description="Campo para ordenar"),
     sort_order: str = Query("desc", description="Orden (asc/desc)"),
+    cursor: Optional[str] = Query(None, description="Token de la página siguiente (paginación por cursor)"),
     call_service: CallService = Depends(get_call_service)
 ) -> Dict[str, Any]:
     """
     Lista las llamadas con filtros avanzados y paginación.
 
+    Admite paginación por desplazamiento (``page``) o por cursor: cada respuesta
+    ordenada por created_at incluye ``next_cursor``, que se envía como ``cursor``
+    para obtener la página siguiente sin que el coste crezca con la profundidad.
+
     - **campaign_id**: Filtrar por ID de campaña
     - **status**: Filtrar por estado de llamada
     - **contact_id**: Filtrar por ID de contacto
@@ -89,28 +108,37 @@ async def list_calls(
     - **page_size**: Tamaño de página (entre 1 y 100)
     - **sort_by**: Campo para ordenar (created_at, status, duration, etc.)
     - **sort_order**: Orden (asc/desc)
+    - **cursor**: Token de la página siguiente; si se indica, se ignora ``page``
 
     Returns:
         Dict con datos de llamadas y metadatos de paginación
     """
-    calls, total = await call_service.list_calls(
-        campaign_id=campaign_id,
-        status=status,
-        contact_id=contact_id,
-        start_date=start_date,
-        end_date=end_date,
-        page=page,
-        page_size=page_size,
+    filters = {
+        "campaign_id": campaign_id,
+        "status": status,
+        "contact_id": contact_id,
+        "start_date": start_date,
+        "end_date": end_date
+    }
+    calls = await call_service.list_calls(
+        **filters,
+        skip=(page - 1) * page_size,
+        limit=page_size,
+        cursor=cursor,
         sort_by=sort_by,
         sort_order=sort_order
     )
 
+    # En modo cursor no se cuenta el total para no recorrer toda la tabla
+    total = None if cursor else await call_service.count_calls(**filters)
+
     return {
         "data": calls,
         "total": total,
-        "page": page,
+        "page": None if cursor else page,
         "page_size": page_size,
-        "total_pages": (total + page_size - 1) // page_size if page_size > 0 else 1
+        "total_pages": (total + page_size - 1) // page_size if total is not None else None,
+        "next_cursor": next_cursor(calls, page_size) if sort_by == "created_at" else None
     }
 
 @router.patch("/{call_id}/status", response_model=Call)
@@ -227,12 +255,13 @@ async def get_call_metrics(
     if not start_date:
         start_date = end_date - timedelta(days=30)
 
-    return await call_service.get_call_metrics(
+    metrics = await call_service.get_call_metrics(
         campaign_id=campaign_id,
         start_date=start_date,
         end_date=end_date,
         group_by=group_by
     )
+    return metrics.model_dump()
 
 @router.post("/twilio_callback", status_code=status.HTTP_200_OK)
 async def twilio_callback(
@@ -1,9 +1,10 @@
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Response, status
 from datetime import datetime
 from typing import Optional, List
 from uuid import UUID
 from app.models.campaign import Campaign, CampaignCreate, CampaignUpdate, CampaignStatus
 from app.services.campaign_service import CampaignService
+from app.utils.pagination import next_cursor
 from app.config.database import get_supabase_client
 
 router = APIRouter(prefix="/api/campaigns", tags=["campaigns"])
@@ -45,11 +46,13 @@ async def get_campaign(
 
 @router.get("/", response_model=List[Campaign])
 async def list_campaigns(
+    response: Response,
     page: int = 1,
     page_size: int = 10,
     status: Optional[CampaignStatus] = None,
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
+    cursor: Optional[str] = None,
     supabase_client = Depends(get_supabase_client)
 ) -> List[Campaign]:
     """
@@ -61,15 +64,23 @@ async def list_campaigns(
     - **status**: Filtrar por estado
     - **start_date**: Filtrar por fecha de inicio
     - **end_date**: Filtrar por fecha de fin
+    - **cursor**: Token de la página siguiente; si se indica, se ignora ``page``
+
+    El token de la página siguiente se devuelve en la cabecera ``X-Next-Cursor``.
     """
     campaign_service = CampaignService(supabase_client)
-    return await campaign_service.list_campaigns(
+    campaigns = await campaign_service.list_campaigns(
         page=page,
         page_size=page_size,
         status=status,
         start_date=start_date,
-        end_date=end_date
+        end_date=end_date,
+        cursor=cursor
     )
+    token = next_cursor(campaigns, page_size)
+    if token:
+        response.headers["X-Next-Cursor"] = token
+    return campaigns
 
 @router.patch("/{campaign_id}", response_model=Campaign)
 async def update_campaign(
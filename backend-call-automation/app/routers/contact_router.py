@@ -7,9 +7,11 @@ operaciones CRUD, importación y exportación de contactos.
 
 from typing import List, Optional, Dict
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
-from fastapi.responses import PlainTextResponse
-from app.models.contact import Contact, ContactCreate, ContactUpdate, ContactList, ContactListCreate
+from fastapi.responses import StreamingResponse
+from app.models.contact import Contact, ContactCreate, ContactUpdate, ContactList, ContactListCreate, ContactImportJob
+from app.services.contact_import import contact_importer
 from app.services.contact_service import ContactService
+from app.utils.pagination import next_cursor
 from app.config.dependencies import get_supabase_client
 from supabase import Client as SupabaseClient
 
@@ -22,6 +24,8 @@ async def list_contacts(
     limit: int = 10,
     search: Optional[str] = None,
     tags: Optional[List[str]] = None,
+    cursor: Optional[str] = None,
+    exact_count: bool = False,
     supabase_client: SupabaseClient = Depends(get_supabase_client)
 ):
     """
@@ -32,19 +36,24 @@ async def list_contacts(
         limit: Número máximo de registros a devolver
         search: Texto para buscar en nombre, email o teléfono
         tags: Lista de etiquetas para filtrar
+        cursor: Token de la página siguiente (``nextCursor`` de la respuesta anterior);
+            si se indica, se ignora ``skip`` y no se calcula el total
+        exact_count: Calcula el total exacto (por defecto es estimado en tablas grandes)
         
     Returns:
         Dict con datos de contactos y metadatos de paginación
     """
     contact_service = ContactService(supabase_client)
-    contacts, total = await contact_service.list_contacts(skip, limit, search, tags)
+    contacts, total = await contact_service.list_contacts(skip, limit, search, tags, cursor, exact_count)
     
     return {
         "data": contacts,
         "total": total,
-        "page": skip // limit + 1 if limit > 0 else 1,
+        "page": None if cursor else (skip // limit + 1 if limit > 0 else 1),
         "limit": limit,
-        "totalPages": (total + limit - 1) // limit if limit > 0 else 1
+        "totalPages": None if total is None else ((total + limit - 1) // limit if limit > 0 else 1),
+        # Los resultados de búsqueda se ordenan por relevancia y no admiten cursor
+        "nextCursor": None if search else next_cursor(contacts, limit)
     }
 
 @router.get("/search", response_model=List[Contact])
@@ -170,19 +179,21 @@ async def delete_contact(
     return {"success": True}
 
 # Endpoints para importación y exportación
-@router.post("/import", response_model=Dict[str, int])
+@router.post("/import", response_model=ContactImportJob, status_code=status.HTTP_202_ACCEPTED)
 async def import_contacts(
-    file: UploadFile = File(...),
-    supabase_client: SupabaseClient = Depends(get_supabase_client)
+    file: UploadFile = File(...)
 ):
     """
-    Importa contactos desde un archivo CSV.
+    Inicia la importación de contactos desde un archivo CSV.
+    
+    El archivo se procesa en segundo plano; el progreso se consulta en
+    ``GET /api/contacts/import/{job_id}``.
     
     Args:
         file: Archivo CSV con los contactos a importar
         
     Returns:
-        Estadísticas de importación (contactos importados, errores)
+        Estado inicial de la importación
     """
     if not file.filename.endswith('.csv'):
         raise HTTPException(
@@ -190,31 +201,48 @@ async def import_contacts(
             detail="El archivo debe ser CSV"
         )
         
-    contact_service = ContactService(supabase_client)
-    result = await contact_service.import_contacts_from_csv(file)
-    return result
+    return await contact_importer.start_import(file)
 
-@router.get("/export", response_class=PlainTextResponse)
+@router.get("/import/{job_id}", response_model=ContactImportJob)
+async def get_import_status(job_id: str):
+    """
+    Obtiene el progreso de una importación de contactos.
+    
+    Args:
+        job_id: ID de la importación
+        
+    Returns:
+        Estado de la importación (filas leídas, nuevos, actualizados, duplicados, errores)
+    """
+    return contact_importer.get_job(job_id)
+
+@router.get("/export", response_class=StreamingResponse)
 async def export_contacts(
     list_id: Optional[str] = None,
+    gzip: bool = False,
     supabase_client: SupabaseClient = Depends(get_supabase_client)
 ):
     """
     Exporta contactos a formato CSV.
     
+    El archivo se genera en streaming a partir de páginas de contactos; la
+    primera se lee antes de empezar la respuesta.
+    
     Args:
         list_id: ID de la lista de contactos (opcional)
+        gzip: Comprime el archivo con gzip
         
     Returns:
-        Archivo CSV con los contactos
+        Archivo CSV (o CSV comprimido) con los contactos
     """
     contact_service = ContactService(supabase_client)
-    csv_content = await contact_service.export_contacts_to_csv(list_id)
+    content = await contact_service.export_contacts_to_csv(list_id, compress=gzip)
     
-    return PlainTextResponse(
-        content=csv_content,
+    return StreamingResponse(
+        content,
+        media_type="application/gzip" if gzip else "text/csv",
         headers={
-            "Content-Disposition": "attachment; filename=contacts.csv"
+            "Content-Disposition": f"attachment; filename=contacts.csv{'.gz' if gzip else ''}"
         }
     )
 
@@ -9,9 +9,7 @@ from typing import Dict, Any, Optional, List
 from datetime import datetime, timedelta
 from fastapi import APIRouter, Depends, Query, Path, HTTPException, status
 from fastapi.responses import JSONResponse, StreamingResponse
-import io
-import csv
-import pandas as pd
+from app.services.call_export import EXPORT_FORMATS
 from app.services.call_service import CallService
 from app.services.campaign_service import CampaignService
 from app.services.contact_service import ContactService
@@ -42,12 +40,12 @@ async def get_campaign_summary(
         )
     
     # Obtener métricas de llamadas para la campaña
-    call_metrics = await call_service.get_call_metrics(campaign_id=campaign_id)
+    call_metrics = await call_service.get_call_metrics(campaign_id=campaign_id, group_by="day")
     
     # Calcular tasas
-    total_calls = sum(call_metrics.get("by_status", {}).values())
-    success_rate = (call_metrics.get("by_status", {}).get("completed", 0) / total_calls) * 100 if total_calls > 0 else 0
-    failure_rate = (call_metrics.get("by_status", {}).get("failed", 0) / total_calls) * 100 if total_calls > 0 else 0
+    total_calls = call_metrics.total_calls
+    success_rate = (call_metrics.completed_calls / total_calls) * 100 if total_calls > 0 else 0
+    failure_rate = (call_metrics.failed_calls / total_calls) * 100 if total_calls > 0 else 0
     
     # Construir resumen
     return {
@@ -61,16 +59,16 @@ async def get_campaign_summary(
         },
         "metrics": {
             "total_calls": total_calls,
-            "completed_calls": call_metrics.get("by_status", {}).get("completed", 0),
-            "failed_calls": call_metrics.get("by_status", {}).get("failed", 0),
-            "in_progress_calls": call_metrics.get("by_status", {}).get("in_progress", 0),
-            "queued_calls": call_metrics.get("by_status", {}).get("queued", 0),
-            "cancelled_calls": call_metrics.get("by_status", {}).get("cancelled", 0),
+            "completed_calls": call_metrics.completed_calls,
+            "failed_calls": call_metrics.failed_calls,
+            "in_progress_calls": call_metrics.by_status.get("in_progress", 0),
+            "queued_calls": call_metrics.by_status.get("pending", 0) + call_metrics.by_status.get("scheduled", 0),
+            "cancelled_calls": call_metrics.by_status.get("cancelled", 0),
             "success_rate": round(success_rate, 2),
             "failure_rate": round(failure_rate, 2),
-            "avg_duration": call_metrics.get("avg_duration", 0)
+            "avg_duration": call_metrics.avg_duration
         },
-        "timeline": call_metrics.get("timeline", [])
+        "timeline": [bucket.model_dump() for bucket in call_metrics.timeline]
     }
 
 @router.get("/campaigns/performance", response_model=List[Dict[str, Any]])
@@ -105,19 +103,20 @@ async def get_campaigns_performance(
         limit=limit
     )
     
-    # Obtener métricas para cada campaña
+    # Obtener métricas de todas las campañas en una sola consulta
+    metrics_by_campaign = await call_service.get_call_metrics_bulk(
+        [campaign.id for campaign in campaigns],
+        start_date=start_date,
+        end_date=end_date
+    )
+    
     result = []
     for campaign in campaigns:
-        # Obtener métricas de llamadas para la campaña
-        call_metrics = await call_service.get_call_metrics(
-            campaign_id=campaign.id,
-            start_date=start_date,
-            end_date=end_date
-        )
+        call_metrics = metrics_by_campaign[str(campaign.id)]
         
         # Calcular tasas
-        total_calls = sum(call_metrics.get("by_status", {}).values())
-        success_rate = (call_metrics.get("by_status", {}).get("completed", 0) / total_calls) * 100 if total_calls > 0 else 0
+        total_calls = call_metrics.total_calls
+        success_rate = (call_metrics.completed_calls / total_calls) * 100 if total_calls > 0 else 0
         
         # Añadir a resultados
         result.append({
@@ -126,7 +125,7 @@ async def get_campaigns_performance(
             "status": campaign.status,
             "total_calls": total_calls,
             "success_rate": round(success_rate, 2),
-            "avg_duration": call_metrics.get("avg_duration", 0)
+            "avg_duration": call_metrics.avg_duration
         })
     
     # Ordenar por tasa de éxito descendente
@@ -190,21 +189,24 @@ async def export_call_history(
     campaign_id: Optional[str] = Query(None, description="Filtrar por ID de campaña"),
     start_date: Optional[datetime] = Query(None, description="Filtrar desde fecha (formato ISO)"),
     end_date: Optional[datetime] = Query(None, description="Filtrar hasta fecha (formato ISO)"),
-    format: str = Query("csv", description="Formato de exportación (csv, excel)"),
+    format: str = Query("csv", description="Formato de exportación (csv, excel, parquet)"),
     call_service: CallService = Depends(get_call_service),
     campaign_service: CampaignService = Depends(get_campaign_service),
     contact_service: ContactService = Depends(get_contact_service)
 ) -> StreamingResponse:
     """
-    Exporta el historial de llamadas a CSV o Excel.
+    Exporta el historial de llamadas a CSV, Excel o Parquet.
+    
+    El fichero se genera en streaming a partir de páginas de llamadas, sin
+    límite de filas.
     
     - **campaign_id**: Filtrar por ID de campaña (opcional)
     - **start_date**: Filtrar desde fecha (formato ISO)
     - **end_date**: Filtrar hasta fecha (formato ISO)
-    - **format**: Formato de exportación (csv, excel)
+    - **format**: Formato de exportación (csv, excel, parquet)
     
     Returns:
-        Archivo CSV o Excel con el historial de llamadas
+        Archivo CSV, Excel o Parquet con el historial de llamadas
     """
     # Si no se especifica end_date, usar fecha actual
     if not end_date:
@@ -214,55 +216,29 @@ async def export_call_history(
     if not start_date:
         start_date = end_date - timedelta(days=30)
     
-    # Obtener todas las llamadas (sin paginación)
-    calls, _ = await call_service.list_calls(
+    # Añadir información de campaña si existe
+    campaign_name = None
+    if campaign_id:
+        campaign = await campaign_service.get_campaign(campaign_id)
+        if campaign:
+            campaign_name = campaign.name
+    
+    format = format.lower()
+    content = call_service.exporter.stream(
+        format,
         campaign_id=campaign_id,
         start_date=start_date,
         end_date=end_date,
-        page=1,
-        page_size=10000,  # Valor alto para obtener todas
-        sort_by="created_at",
-        sort_order="desc"
+        campaign_name=campaign_name
     )
+    media_type, extension = EXPORT_FORMATS[format]
+    filename = f"call_history_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
     
-    # Convertir a DataFrame
-    calls_data = [call.dict() for call in calls]
-    df = pd.DataFrame(calls_data)
-    
-    # Añadir información de campaña si existe
-    if campaign_id:
-        campaign = await campaign_service.get_campaign(campaign_id)
-        if campaign:
-            df["campaign_name"] = campaign.name
-    
-    # Preparar respuesta según formato
-    if format.lower() == "excel":
-        # Exportar a Excel
-        output = io.BytesIO()
-        df.to_excel(output, index=False, engine="openpyxl")
-        output.seek(0)
-        
-        filename = f"call_history_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-        media_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-        
-        return StreamingResponse(
-            output,
-            media_type=media_type,
-            headers={"Content-Disposition": f"attachment; filename={filename}"}
-        )
-    else:
-        # Exportar a CSV (por defecto)
-        output = io.StringIO()
-        df.to_csv(output, index=False)
-        output.seek(0)
-        
-        filename = f"call_history_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-        
-        return StreamingResponse(
-            io.BytesIO(output.getvalue().encode("utf-8")),
-            media_type="text/csv",
-            headers={"Content-Disposition": f"attachment; filename={filename}"}
-        )
+    return StreamingResponse(
+        content,
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
 
 @router.get("/performance_metrics", response_model=Dict[str, Any])
 async def get_performance_metrics(
@@ -298,9 +274,9 @@ async def get_performance_metrics(
     )
     
     # Calcular métricas adicionales
-    total_calls = sum(metrics.get("by_status", {}).values())
-    completed_calls = metrics.get("by_status", {}).get("completed", 0)
-    failed_calls = metrics.get("by_status", {}).get("failed", 0)
+    total_calls = metrics.total_calls
+    completed_calls = metrics.completed_calls
+    failed_calls = metrics.failed_calls
     
     success_rate = (completed_calls / total_calls) * 100 if total_calls > 0 else 0
     failure_rate = (failed_calls / total_calls) * 100 if total_calls > 0 else 0
@@ -318,9 +294,9 @@ async def get_performance_metrics(
             "failed_calls": failed_calls,
             "success_rate": round(success_rate, 2),
             "failure_rate": round(failure_rate, 2),
-            "avg_duration": metrics.get("avg_duration", 0),
+            "avg_duration": metrics.avg_duration,
             "calls_per_day": round(total_calls / (end_date - start_date).days, 2) if (end_date - start_date).days > 0 else 0
         },
-        "by_status": metrics.get("by_status", {}),
-        "timeline": metrics.get("timeline", [])
+        "by_status": metrics.by_status,
+        "timeline": [bucket.model_dump() for bucket in metrics.timeline]
     }
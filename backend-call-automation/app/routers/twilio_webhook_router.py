@@ -10,14 +10,26 @@ from typing import Dict, Any, Optional
 import json
 
 from app.config.settings import settings
+from app.services.audio_cache_service import audio_cache_service
+from app.services.audio_render import AudioRenderStage, audio_render_stage
 from app.services.twilio_service import TwilioService
 from app.services.call_service import CallService
+from app.services.call_events import call_events
 from app.models.call import CallStatus
 from app.dependencies.service_dependencies import get_call_service, get_twilio_service
 
 # Configurar logger
 logger = logging.getLogger(__name__)
 
+# Estados con los que una llamada deja de ocupar su plaza en el motor de marcado
+FINAL_CALL_STATUSES = {
+    CallStatus.COMPLETED,
+    CallStatus.BUSY,
+    CallStatus.FAILED,
+    CallStatus.NO_ANSWER,
+    CallStatus.CANCELLED
+}
+
 # Crear router
 router = APIRouter(
     prefix="/webhooks/twilio",
@@ -101,12 +113,22 @@ async def twilio_webhook(
         language="es-ES"
     )
     
-    # Reproducir el script de la llamada
-    response.say(
+    # Reproducir el script de la llamada con el audio preparado por el planificador
+    variables = {"name": contact.name, "phone_number": contact.phone_number}
+    audio_path = await audio_render_stage.render(
         call.script_template,
-        voice="woman",
-        language="es-ES"
+        voice_id=await call_service.get_voice_for_call(call.id),
+        variables=variables,
+        timeout=settings.AUDIO_RENDER_CALL_TIMEOUT
     )
+    if audio_path:
+        response.play(audio_cache_service.file_url(audio_path))
+    else:
+        response.say(
+            AudioRenderStage.render_text(call.script_template, variables),
+            voice="woman",
+            language="es-ES"
+        )
     
     # Recopilar entrada del usuario
     gather = Gather(
@@ -268,11 +290,19 @@ async def call_status_webhook(
     if error_message:
         update_data["error_message"] = error_message
     
-    # Actualizar la llamada
+    # Actualizar la llamada; los contadores de la campaña se actualizan de
+    # forma incremental en la base de datos al cambiar el estado
     await call_service.update_call(call.id, update_data)
-    
-    # Si la llamada ha terminado, actualizar las estadísticas de la campaña
-    if call_status in ["completed", "busy", "failed", "no-answer", "canceled"]:
-        await call_service.update_campaign_stats(call.campaign_id)
+
+    # El ritmo de marcado se ajusta con las llamadas contestadas y sus resultados;
+    # los eventos llegan a la instancia que marcó la llamada
+    if call_status == "in-progress":
+        await call_events.answered(call.id)
+
+    # Al terminar la llamada se libera su plaza para marcar la siguiente
+    if new_status in FINAL_CALL_STATUSES:
+        await call_events.finished(
+            call.campaign_id, call.id, new_status, int(call_duration) if call_duration else None
+        )
     
     return Response(content="", status_code=200)
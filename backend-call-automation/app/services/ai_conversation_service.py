@@ -3,7 +3,6 @@ from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.chains import ConversationChain
 from langchain.memory import ConversationBufferMemory
 from langchain.prompts import PromptTemplate
-from langchain_core.output_parsers import JsonOutputParser
 from fastapi import HTTPException
 import asyncio
 import logging
@@ -14,10 +13,15 @@ from typing import Any, Dict, Optional, List
 from app.config.ai_config import AISettings
 from app.config.supabase import supabase_client
 from app.config.redis_client import generate_conversation_cache_key
+from app.services.prompt_registry import prompt_registry
+from app.services.llm_gateway import LLMPriority, llm_gateway
+from app.services.metrics_sink import metrics_sink
 
 logger = logging.getLogger(__name__)
 settings = AISettings()
 
+NEUTRAL_SENTIMENT = {"primary_emotion": "neutral", "score": 0.5}
+
 class AIConversationService:
     def __init__(self, model_name: str = "gpt-4"):
         self.llm = ChatGoogleGenerativeAI(
@@ -25,7 +29,7 @@ class AIConversationService:
             google_api_key=settings.GOOGLE_API_KEY,
             convert_system_message_to_human=True
         )
-        self._rate_limit_semaphore = asyncio.Semaphore(5)
+        self.llm_gateway = llm_gateway
 
         self.prompt = PromptTemplate(
             input_variables=["history", "input"],
@@ -45,76 +49,79 @@ class AIConversationService:
         context: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
         """Procesa un mensaje y genera una respuesta."""
-        async with self._rate_limit_semaphore:
-            try:
-                # 1. Recuperar historial de caché
-                cached_history = await self.get_from_cache(
-                    generate_conversation_cache_key(conversation_id)
-                ) if conversation_id else None
-
-                # Crear instancias temporales de memoria
-                memory = ConversationBufferMemory()
-
-                # Cargar historial de caché en la memoria temporal
-                if cached_history:
-                    memory.chat_memory.messages = cached_history
-
-                # Crear instancia temporal de ConversationChain
-                conversation = ConversationChain(
-                    llm=self.llm,
-                    memory=memory,
-                    prompt=self.prompt,
-                    verbose=True  # Para debug
+        try:
+            # 1. Recuperar historial de caché
+            cached_history = await self.get_from_cache(
+                generate_conversation_cache_key(conversation_id)
+            ) if conversation_id else None
+
+            # Crear instancias temporales de memoria
+            memory = ConversationBufferMemory()
+
+            # Cargar historial de caché en la memoria temporal
+            if cached_history:
+                memory.chat_memory.messages = cached_history
+
+            # Crear instancia temporal de ConversationChain
+            conversation = ConversationChain(
+                llm=self.llm,
+                memory=memory,
+                prompt=self.prompt,
+                verbose=True  # Para debug
+            )
+
+            # 2. Procesar respuesta con LangChain
+            response = await self.llm_gateway.run(
+                conversation.apredict,
+                input=message,
+                priority=LLMPriority.LIVE_CALL
+            )
+
+            # Guardar el estado actualizado de la memoria en la caché
+            await self.set_in_cache(
+                generate_conversation_cache_key(conversation_id),
+                memory.chat_memory.messages
+            )
+
+            # 3. Analizar el sentimiento del mensaje y de la respuesta (por defecto
+            # se analiza tras la llamada); en vivo el turno lo espera, así que no
+            # puede ir con prioridad de fondo
+            input_sentiment = dict(NEUTRAL_SENTIMENT)
+            response_sentiment = dict(NEUTRAL_SENTIMENT)
+            if settings.LIVE_SENTIMENT_ENABLED:
+                input_sentiment, response_sentiment = await asyncio.gather(
+                    self.analyze_sentiment(message, priority=LLMPriority.INTERACTIVE),
+                    self.analyze_sentiment(response, priority=LLMPriority.INTERACTIVE)
                 )
 
-                # 2. Analizar sentimiento del mensaje
-                input_sentiment = await self.analyze_sentiment(message)
-
-                # 3. Procesar respuesta con LangChain
-                response = await conversation.apredict(input=message)
-
-                # Guardar el estado actualizado de la memoria en la caché
-                await self.set_in_cache(
-                    generate_conversation_cache_key(conversation_id),
-                    memory.chat_memory.messages
+            # 4. Guardar métricas
+            if conversation_id:
+                await self.save_conversation_metrics(
+                    conversation_id,
+                    message,
+                    response,
+                    input_sentiment,
+                    response_sentiment
                 )
 
-                # 4. Analizar sentimiento de la respuesta
-                response_sentiment = await self.analyze_sentiment(response)
-
-                # 5. Guardar métricas
-                if conversation_id:
-                    await self.save_conversation_metrics(
-                        conversation_id,
-                        message,
-                        response,
-                        input_sentiment,
-                        response_sentiment
-                    )
-
-                return {
-                    "response": response,
-                    "input_sentiment": input_sentiment,
-                    "response_sentiment": response_sentiment,
-                    "conversation_id": conversation_id
-                }
-            except Exception as e:
-                logger.error(f"Error procesando mensaje: {str(e)}")
-                raise HTTPException(status_code=500, detail="Error procesando mensaje")
-
-    async def analyze_sentiment(self, text: str) -> Dict[str, Any]:
-        """Analiza el sentimiento del texto."""
-        output_parser = JsonOutputParser()
-        prompt = PromptTemplate(
-            input_variables=["text"],
-            partial_variables={"format_instructions": output_parser.get_format_instructions()},
-            template="""Analiza el sentimiento del siguiente texto y clasifícalo.
-            Texto: {text}
-            Devuelve un objeto JSON con la emoción primaria (primary_emotion) y su puntuación (score). \n{format_instructions}"""
-        )
+            return {
+                "response": response,
+                "input_sentiment": input_sentiment,
+                "response_sentiment": response_sentiment,
+                "conversation_id": conversation_id
+            }
+        except Exception as e:
+            logger.error(f"Error procesando mensaje: {str(e)}")
+            raise HTTPException(status_code=500, detail="Error procesando mensaje")
 
+    async def analyze_sentiment(self, text: str, priority: LLMPriority = LLMPriority.BACKGROUND) -> Dict[str, Any]:
+        """Analiza el sentimiento del texto."""
         try:
-            response = await self.llm.ainvoke(prompt.format(text=text))
+            response = await self.llm_gateway.invoke(
+                self.llm,
+                prompt_registry.format_sentiment(text),
+                priority=priority
+            )
             return json.loads(response)
         except Exception as e:
             logger.error(f"Error al analizar el sentimiento: {e}")
@@ -153,17 +160,8 @@ class AIConversationService:
         await self.save_metrics_to_db(interaction_data)
 
     async def save_metrics_to_db(self, interaction_data: Dict[str, Any]) -> None:
-        """Guarda las métricas en la base de datos."""
-        logger.info(f"Guardando métricas en la base de datos: {interaction_data}")
-        # Implementación del guardado de métricas en la base de datos
-        # Ejemplo:
-        # try:
-        #     data, error = await supabase_client.table("conversation_metrics").insert(interaction_data).execute()
-        #     if error:
-        #         logger.error(f"Error al guardar métricas en la base de datos: {error}")
-        # except Exception as e:
-        #     logger.error(f"Error al guardar métricas en la base de datos: {e}")
-        pass
+        """Encola las métricas para su escritura por lotes en la base de datos."""
+        metrics_sink.submit("conversation_metrics", interaction_data)
 
     def extract_conversation_context(
         self,
@@ -7,11 +7,14 @@ las llamadas a servicios externos de generación de voz.
 """
 
 import hashlib
+import hmac
 import json
 import logging
 import os
+import time
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple, Any
+from urllib.parse import urlencode
 
 from fastapi import UploadFile
 from app.config.redis_client import get_from_cache, set_in_cache, delete_from_cache
@@ -27,6 +30,9 @@ AUDIO_CACHE_TTL = settings.AUDIO_CACHE_TTL
 AUDIO_CACHE_MAX_SIZE = settings.AUDIO_CACHE_MAX_SIZE
 AUDIO_CACHE_ENABLED = settings.AUDIO_CACHE_ENABLED
 
+# Ruta pública de los audios del caché (URLs firmadas con ``file_url``)
+AUDIO_FILES_PATH = "/api/audio-cache/files"
+
 # Crear directorio de caché si no existe
 os.makedirs(AUDIO_CACHE_DIR, exist_ok=True)
 
@@ -124,7 +130,46 @@ class AudioCacheService:
             Ruta completa al archivo de audio
         """
         return os.path.join(self.cache_dir, f"{cache_key}.mp3")
-    
+
+    def _file_signature(self, file_name: str, expires: int) -> str:
+        message = f"{file_name}:{expires}".encode()
+        return hmac.new(settings.SECRET_KEY.encode(), message, hashlib.sha256).hexdigest()
+
+    def file_url(self, file_path: str, ttl: int = settings.AUDIO_FILE_URL_TTL) -> str:
+        """
+        URL pública, firmada y con vencimiento de un audio del caché.
+
+        Permite que servicios externos sin token (p. ej. Twilio) descarguen el
+        audio sin exponer el resto de endpoints del caché.
+
+        Args:
+            file_path: Ruta del audio en el caché
+            ttl: Segundos durante los que la URL es válida
+
+        Returns:
+            URL absoluta del audio
+        """
+        file_name = os.path.basename(file_path)
+        expires = int(time.time()) + ttl
+        query = urlencode({"expires": expires, "signature": self._file_signature(file_name, expires)})
+        return f"{settings.APP_URL}{AUDIO_FILES_PATH}/{file_name}?{query}"
+
+    def verify_file_url(self, file_name: str, expires: int, signature: str) -> bool:
+        """
+        Comprueba la firma y el vencimiento de una URL de ``file_url``.
+
+        Args:
+            file_name: Nombre del archivo en el caché
+            expires: Instante de vencimiento (segundos desde epoch)
+            signature: Firma de la URL
+
+        Returns:
+            bool: True si la URL es válida y no ha vencido
+        """
+        if expires < time.time():
+            return False
+        return hmac.compare_digest(self._file_signature(file_name, expires), signature)
+
     async def get_from_cache(self, text: str, voice_id: str, language: str = "es") -> Optional[str]:
         """
         Busca un archivo de audio en el caché.
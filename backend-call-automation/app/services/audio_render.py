@@ -0,0 +1,240 @@
+"""
+Preparación del audio de los scripts de llamada.
+
+La síntesis de voz ya no forma parte de la creación de llamadas: el planificador
+pide el audio del script de cada lote de contactos antes de encolarlos en el
+motor de marcado (``prefetch``) y la síntesis se hace en segundo plano. Cuando
+la llamada se contesta, el webhook de Twilio obtiene el mismo audio (``render``)
+y lo reproduce.
+
+Cada audio se identifica por plantilla, voz y las variables que la plantilla usa
+(``{name}``, ``{phone_number}``…), de modo que todos los contactos de una
+campaña cuyo script no tiene variables comparten un único audio. Las peticiones
+simultáneas de un mismo audio esperan a la misma síntesis, y los audios se
+guardan en el caché de audio (``audio_cache_service``), del que se sirven
+mientras no expiren.
+"""
+import asyncio
+import hashlib
+import inspect
+import json
+import logging
+import string
+from typing import Any, Dict, Iterable, Optional
+
+from app.config.settings import settings
+from app.services.audio_cache_service import audio_cache_service
+from app.utils.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class _KeepPlaceholders(dict):
+    """Deja intactas las variables de la plantilla que no tienen valor."""
+
+    def __missing__(self, key: str) -> str:
+        return "{" + key + "}"
+
+
+class AudioRenderStage:
+    """
+    Sintetiza y guarda en caché el audio de los scripts antes de marcar.
+
+    Attributes:
+        cache: Caché de audio en disco
+        voice_id: Voz usada si no se indica otra
+        language: Idioma de la síntesis
+    """
+
+    def __init__(
+        self,
+        tts=None,
+        cache=audio_cache_service,
+        voice_id: str = settings.ELEVENLABS_DEFAULT_VOICE,
+        language: str = "es",
+        max_concurrent: int = settings.AUDIO_RENDER_MAX_CONCURRENT,
+        ttl: int = settings.AUDIO_CACHE_TTL
+    ):
+        """
+        Inicializa la etapa de preparación de audio.
+
+        Args:
+            tts: Servicio de síntesis con ``generate_stream`` (por defecto ElevenLabsService)
+            cache: Caché de audio en disco
+            voice_id: Voz usada si no se indica otra
+            language: Idioma de la síntesis
+            max_concurrent: Síntesis simultáneas máximas
+            ttl: Segundos durante los que un audio preparado se da por disponible
+        """
+        self._tts = tts
+        self.cache = cache
+        self.voice_id = voice_id
+        self.language = language
+        self._semaphore = asyncio.Semaphore(max(1, max_concurrent))
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._rendered: TTLCache[str, str] = TTLCache(ttl=ttl)
+
+    @property
+    def tts(self):
+        """Servicio de síntesis de voz, creado al usarse por primera vez."""
+        if self._tts is None:
+            from app.services.elevenlabs_service import ElevenLabsService
+            self._tts = ElevenLabsService()
+        return self._tts
+
+    @staticmethod
+    def used_variables(template: str, variables: Optional[Dict[str, Any]]) -> Dict[str, str]:
+        """
+        Variables que aparecen en la plantilla, con su valor como texto.
+
+        Args:
+            template: Plantilla del script
+            variables: Valores disponibles
+
+        Returns:
+            Dict[str, str]: Variables usadas por la plantilla
+        """
+        if not variables:
+            return {}
+        try:
+            names = {field for _, field, _, _ in string.Formatter().parse(template) if field}
+        except ValueError:
+            return {}
+        return {name: str(variables[name]) for name in sorted(names) if variables.get(name) is not None}
+
+    @classmethod
+    def render_text(cls, template: str, variables: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Sustituye las variables de la plantilla.
+
+        Args:
+            template: Plantilla del script
+            variables: Valores de las variables
+
+        Returns:
+            str: Texto a sintetizar
+        """
+        values = cls.used_variables(template, variables)
+        if not values:
+            return template
+        try:
+            return template.format_map(_KeepPlaceholders(values))
+        except (ValueError, IndexError):
+            return template
+
+    def render_key(self, template: str, voice_id: Optional[str] = None, variables: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Clave de un audio: plantilla, voz y variables usadas.
+
+        Args:
+            template: Plantilla del script
+            voice_id: ID de la voz
+            variables: Valores de las variables
+
+        Returns:
+            str: Clave del audio
+        """
+        payload = json.dumps(
+            [template, voice_id or self.voice_id, self.language, self.used_variables(template, variables)],
+            ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    async def render(
+        self,
+        template: str,
+        voice_id: Optional[str] = None,
+        variables: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None
+    ) -> Optional[str]:
+        """
+        Obtiene el audio de un script, sintetizándolo si no está en caché.
+
+        Si se agota ``timeout`` la síntesis sigue en segundo plano y el audio
+        quedará disponible para las siguientes peticiones.
+
+        Args:
+            template: Plantilla del script
+            voice_id: ID de la voz
+            variables: Valores de las variables
+            timeout: Segundos máximos de espera (opcional)
+
+        Returns:
+            Optional[str]: Ruta del audio en el caché, o None si no pudo prepararse a tiempo
+        """
+        key = self.render_key(template, voice_id, variables)
+        path = self._rendered.get(key)
+        if path:
+            return path
+
+        task = self._inflight.get(key) or self._schedule(key, template, voice_id, variables)
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"El audio del script ({key[:12]}) no estuvo listo en {timeout}s")
+            return None
+
+    def prefetch(
+        self,
+        template: str,
+        variables: Iterable[Optional[Dict[str, Any]]] = (None,),
+        voice_id: Optional[str] = None
+    ) -> int:
+        """
+        Prepara en segundo plano el audio de un script para varios contactos.
+
+        Args:
+            template: Plantilla del script
+            variables: Variables de cada contacto
+            voice_id: ID de la voz
+
+        Returns:
+            int: Síntesis nuevas iniciadas
+        """
+        started = 0
+        for values in variables:
+            key = self.render_key(template, voice_id, values)
+            if key in self._rendered or key in self._inflight:
+                continue
+            self._schedule(key, template, voice_id, values)
+            started += 1
+        return started
+
+    def _schedule(self, key: str, template: str, voice_id: Optional[str], variables: Optional[Dict[str, Any]]) -> asyncio.Task:
+        task = asyncio.create_task(self._render(key, template, voice_id or self.voice_id, variables))
+        self._inflight[key] = task
+        task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return task
+
+    async def _render(self, key: str, template: str, voice_id: str, variables: Optional[Dict[str, Any]]) -> Optional[str]:
+        text = self.render_text(template, variables)
+        try:
+            path = await self.cache.get_from_cache(text, voice_id, self.language)
+            if not path:
+                async with self._semaphore:
+                    # generate_stream guarda el audio completo en el caché
+                    stream = self.tts.generate_stream(text, voice_id, self.language)
+                    if inspect.isawaitable(stream):
+                        stream = await stream
+                    async for _ in stream:
+                        pass
+                path = await self.cache.get_from_cache(text, voice_id, self.language)
+            if path:
+                self._rendered[key] = path
+            return path or None
+
+        except Exception as e:
+            logger.error(f"Error al preparar el audio del script ({key[:12]}): {str(e)}")
+            return None
+
+    async def stop(self) -> None:
+        """Cancela las síntesis pendientes."""
+        tasks = list(self._inflight.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._inflight.clear()
+
+
+# Instancia global de la etapa de preparación de audio
+audio_render_stage = AudioRenderStage()
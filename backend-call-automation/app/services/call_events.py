@@ -0,0 +1,200 @@
+"""
+Eventos de llamada compartidos entre instancias.
+
+Los webhooks de Twilio y el cierre de las conversaciones llegan a cualquier
+réplica, pero la plaza de una llamada en el motor de marcado y su seguimiento en
+el control del ritmo de marcado viven en la instancia que la marcó. Con
+``SCHEDULER_COORDINATION_ENABLED`` estos eventos (contestada, terminada, plaza
+liberada) se publican en un canal de Redis al que se suscriben todas las
+instancias, y cada una aplica solo los de las llamadas que sigue. Sin
+coordinación se aplican directamente en el proceso.
+
+Si una instancia pierde un evento (p. ej. durante una reconexión a Redis), la
+plaza de la llamada se libera igualmente al vencer ``SCHEDULER_CALL_SLOT_TIMEOUT``.
+"""
+import asyncio
+import json
+import logging
+from typing import Any, Dict, Optional
+
+from app.config.settings import settings
+from app.models.call import CallStatus
+from app.services.dialing_engine import DialingEngine, dialing_engine
+from app.services.pacing_controller import PacingController, pacing_controller
+
+logger = logging.getLogger(__name__)
+
+
+class CallEventBus:
+    """
+    Reparte los eventos de llamada a la instancia que marcó cada llamada.
+
+    Attributes:
+        engine: Motor de marcado de esta instancia
+        pacing: Control del ritmo de marcado de esta instancia
+        shared: Si los eventos se publican en Redis
+        channel: Canal de Redis de los eventos
+    """
+
+    def __init__(
+        self,
+        redis=None,
+        engine: Optional[DialingEngine] = None,
+        pacing: Optional[PacingController] = None,
+        shared: bool = settings.SCHEDULER_COORDINATION_ENABLED,
+        channel: str = "sched:call-events"
+    ):
+        """
+        Inicializa el bus de eventos.
+
+        Args:
+            redis: Cliente asíncrono de Redis (por defecto, uno conectado a ``settings.REDIS_URL``)
+            engine: Motor de marcado (por defecto, el global)
+            pacing: Control del ritmo de marcado (por defecto, el global)
+            shared: Si los eventos se publican en Redis
+            channel: Canal de Redis de los eventos
+        """
+        self._redis = redis
+        self.engine = engine or dialing_engine
+        self.pacing = pacing or pacing_controller
+        self.shared = shared
+        self.channel = channel
+        self._task: Optional[asyncio.Task] = None
+        self._subscribed: Optional[asyncio.Event] = None
+
+    @property
+    def redis(self):
+        """Cliente de Redis, creado al usarse por primera vez."""
+        if self._redis is None:
+            from redis.asyncio import Redis
+
+            self._redis = Redis.from_url(settings.REDIS_URL)
+        return self._redis
+
+    async def start(self) -> None:
+        """Se suscribe al canal de eventos (solo con eventos compartidos)."""
+        if not self.shared or (self._task and not self._task.done()):
+            return
+        self._subscribed = asyncio.Event()
+        self._task = asyncio.create_task(self._listen())
+        try:
+            await asyncio.wait_for(self._subscribed.wait(), timeout=5)
+        except asyncio.TimeoutError:
+            logger.warning("No se pudo confirmar la suscripción a los eventos de llamada")
+
+    async def stop(self) -> None:
+        """Cancela la suscripción al canal de eventos."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def answered(self, call_id: str) -> None:
+        """
+        Publica que una llamada se contestó.
+
+        Args:
+            call_id: ID de la llamada
+        """
+        await self._publish({"type": "answered", "call_id": str(call_id)})
+
+    async def finished(
+        self,
+        campaign_id: str,
+        call_id: str,
+        status: CallStatus,
+        duration: Optional[int] = None
+    ) -> None:
+        """
+        Publica que una llamada terminó: registra su resultado y libera su plaza.
+
+        Args:
+            campaign_id: ID de la campaña
+            call_id: ID de la llamada
+            status: Estado final
+            duration: Duración de la llamada en segundos (opcional)
+        """
+        await self._publish({
+            "type": "finished",
+            "campaign_id": str(campaign_id),
+            "call_id": str(call_id),
+            "status": CallStatus(status).value,
+            "duration": duration
+        })
+
+    async def released(self, call_id: str) -> None:
+        """
+        Publica que la plaza de una llamada puede liberarse.
+
+        Args:
+            call_id: ID de la llamada
+        """
+        await self._publish({"type": "released", "call_id": str(call_id)})
+
+    async def _publish(self, event: Dict[str, Any]) -> None:
+        if self.shared:
+            try:
+                await self.redis.publish(self.channel, json.dumps(event))
+                return
+            except Exception as e:
+                logger.error(f"Error al publicar el evento de la llamada {event['call_id']}: {str(e)}")
+        self.apply(event, local=True)
+
+    def apply(self, event: Dict[str, Any], local: bool = False) -> None:
+        """
+        Aplica un evento al motor de marcado y al control del ritmo de esta instancia.
+
+        Los eventos recibidos de Redis solo se aplican si esta instancia sigue la llamada.
+
+        Args:
+            event: Evento de la llamada
+            local: Si el evento se originó en esta instancia
+        """
+        call_id = event["call_id"]
+        tracked_by_pacing = local or self.pacing.tracks(call_id)
+        tracked_by_engine = local or self.engine.tracks(call_id)
+
+        if event["type"] == "answered":
+            if tracked_by_pacing:
+                self.pacing.record_answer(call_id)
+        elif event["type"] == "finished":
+            if tracked_by_pacing:
+                self.pacing.record_outcome(
+                    event["campaign_id"], call_id, CallStatus(event["status"]), event.get("duration")
+                )
+            if tracked_by_engine:
+                self.engine.release(call_id)
+        elif event["type"] == "released":
+            if tracked_by_engine:
+                self.engine.release(call_id)
+
+    async def _listen(self) -> None:
+        while True:
+            pubsub = self.redis.pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                self._subscribed.set()
+                async for message in pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    try:
+                        self.apply(json.loads(message["data"]))
+                    except Exception as e:
+                        logger.error(f"Evento de llamada no válido: {str(e)}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error en la suscripción a los eventos de llamada: {str(e)}")
+                await asyncio.sleep(1)
+            finally:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+
+
+# Instancia global del bus de eventos de llamada
+call_events = CallEventBus()
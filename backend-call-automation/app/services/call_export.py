@@ -0,0 +1,273 @@
+"""
+Exportación del historial de llamadas en streaming.
+
+Las llamadas se leen de Supabase con paginación por clave y cada página se
+escribe en la salida en cuanto llega, sin cargar el historial completo en
+memoria ni limitar el número de filas exportadas.
+
+- CSV: las filas se envían al cliente a medida que se leen las páginas.
+- Excel: se escribe con el modo de solo escritura de openpyxl (memoria
+  constante) en un fichero temporal que después se envía por bloques.
+- Parquet: se escribe por grupos de filas con pyarrow en un fichero temporal
+  que después se envía por bloques.
+"""
+import asyncio
+import csv
+import io
+import logging
+import os
+import tempfile
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from fastapi import HTTPException
+
+from app.utils.pagination import iter_keyset_pages
+
+logger = logging.getLogger(__name__)
+
+EXPORT_COLUMNS = [
+    "id",
+    "campaign_id",
+    "contact_id",
+    "phone_number",
+    "from_number",
+    "status",
+    "scheduled_time",
+    "duration",
+    "retry_attempts",
+    "max_retries",
+    "twilio_sid",
+    "recording_url",
+    "error_message",
+    "notes",
+    "created_at",
+    "updated_at"
+]
+
+INTEGER_COLUMNS = {"duration", "retry_attempts", "max_retries"}
+TIMESTAMP_COLUMNS = {"scheduled_time", "created_at", "updated_at"}
+
+# Tipo de contenido y extensión de cada formato
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "excel": ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "xlsx"),
+    "parquet": ("application/vnd.apache.parquet", "parquet")
+}
+
+# Filas por consulta; no debe superar el máximo de filas configurado en PostgREST
+EXPORT_PAGE_SIZE = 1000
+# Filas por grupo en los ficheros Parquet
+PARQUET_ROW_GROUP_SIZE = 50000
+FILE_CHUNK_SIZE = 64 * 1024
+
+
+class CallExportService:
+    """
+    Servicio de exportación del historial de llamadas.
+
+    Attributes:
+        supabase: Cliente de Supabase
+        page_size: Filas por consulta
+    """
+
+    def __init__(self, supabase_client=None, page_size: int = EXPORT_PAGE_SIZE):
+        """
+        Inicializa el servicio.
+
+        Args:
+            supabase_client: Cliente de Supabase
+            page_size: Filas por consulta
+        """
+        self.supabase = supabase_client
+        self.page_size = page_size
+
+    async def iter_pages(
+        self,
+        campaign_id: Optional[str] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Recorre las llamadas del periodo, de la más reciente a la más antigua.
+
+        Args:
+            campaign_id: ID de la campaña (opcional)
+            start_date: Fecha de inicio (opcional)
+            end_date: Fecha de fin (opcional)
+
+        Yields:
+            List[Dict[str, Any]]: Filas de cada página con las columnas exportadas
+        """
+        def build_query():
+            query = self.supabase.table("calls").select(",".join(EXPORT_COLUMNS))
+            if campaign_id:
+                query = query.eq("campaign_id", str(campaign_id))
+            if start_date:
+                query = query.gte("created_at", start_date.isoformat())
+            if end_date:
+                query = query.lte("created_at", end_date.isoformat())
+            return query
+
+        async for rows in iter_keyset_pages(build_query, page_size=self.page_size, in_thread=True):
+            yield rows
+
+    def stream(
+        self,
+        format: str,
+        campaign_id: Optional[str] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        campaign_name: Optional[str] = None
+    ) -> AsyncIterator[bytes]:
+        """
+        Devuelve el contenido del fichero exportado por bloques.
+
+        Args:
+            format: Formato de exportación (csv, excel, parquet)
+            campaign_id: ID de la campaña (opcional)
+            start_date: Fecha de inicio (opcional)
+            end_date: Fecha de fin (opcional)
+            campaign_name: Nombre de la campaña, añadido como columna (opcional)
+
+        Returns:
+            AsyncIterator[bytes]: Bloques del fichero
+
+        Raises:
+            HTTPException: Si el formato no es válido
+        """
+        writers = {
+            "csv": self._stream_csv,
+            "excel": self._stream_excel,
+            "parquet": self._stream_parquet
+        }
+        if format not in writers:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Formato no válido: {format}. Valores permitidos: {', '.join(EXPORT_FORMATS)}"
+            )
+        columns = EXPORT_COLUMNS + (["campaign_name"] if campaign_name else [])
+        pages = self.iter_pages(campaign_id, start_date, end_date)
+        if campaign_name:
+            pages = self._with_campaign_name(pages, campaign_name)
+        return writers[format](pages, columns)
+
+    @staticmethod
+    async def _with_campaign_name(
+        pages: AsyncIterator[List[Dict[str, Any]]],
+        campaign_name: str
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        async for rows in pages:
+            for row in rows:
+                row["campaign_name"] = campaign_name
+            yield rows
+
+    async def _stream_csv(
+        self,
+        pages: AsyncIterator[List[Dict[str, Any]]],
+        columns: List[str]
+    ) -> AsyncIterator[bytes]:
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction="ignore")
+        writer.writeheader()
+        yield buffer.getvalue().encode("utf-8")
+
+        async for rows in pages:
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows(rows)
+            yield buffer.getvalue().encode("utf-8")
+
+    async def _stream_excel(
+        self,
+        pages: AsyncIterator[List[Dict[str, Any]]],
+        columns: List[str]
+    ) -> AsyncIterator[bytes]:
+        from openpyxl import Workbook
+
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet("Llamadas")
+        sheet.append(columns)
+        async for rows in pages:
+            for row in rows:
+                sheet.append([row.get(column) for column in columns])
+
+        path = self._temp_path(".xlsx")
+        try:
+            await asyncio.to_thread(workbook.save, path)
+        except BaseException:
+            os.unlink(path)
+            raise
+
+        async for chunk in self._stream_file(path):
+            yield chunk
+
+    async def _stream_parquet(
+        self,
+        pages: AsyncIterator[List[Dict[str, Any]]],
+        columns: List[str]
+    ) -> AsyncIterator[bytes]:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        schema = pa.schema([
+            (
+                column,
+                pa.int64() if column in INTEGER_COLUMNS
+                else pa.timestamp("us", tz="UTC") if column in TIMESTAMP_COLUMNS
+                else pa.string()
+            )
+            for column in columns
+        ])
+
+        def write_group(writer, rows: List[Dict[str, Any]]) -> None:
+            table = pa.Table.from_pylist([self._parquet_row(row, columns) for row in rows], schema=schema)
+            writer.write_table(table)
+
+        path = self._temp_path(".parquet")
+        try:
+            with pq.ParquetWriter(path, schema) as writer:
+                group: List[Dict[str, Any]] = []
+                async for rows in pages:
+                    group.extend(rows)
+                    if len(group) >= PARQUET_ROW_GROUP_SIZE:
+                        await asyncio.to_thread(write_group, writer, group)
+                        group = []
+                if group:
+                    await asyncio.to_thread(write_group, writer, group)
+        except BaseException:
+            os.unlink(path)
+            raise
+
+        async for chunk in self._stream_file(path):
+            yield chunk
+
+    @staticmethod
+    def _parquet_row(row: Dict[str, Any], columns: List[str]) -> Dict[str, Any]:
+        values = {}
+        for column in columns:
+            value = row.get(column)
+            if value is not None and column in TIMESTAMP_COLUMNS and isinstance(value, str):
+                value = datetime.fromisoformat(value)
+            elif value is not None and column not in INTEGER_COLUMNS and column not in TIMESTAMP_COLUMNS:
+                value = str(value)
+            values[column] = value
+        return values
+
+    @staticmethod
+    def _temp_path(suffix: str) -> str:
+        fd, path = tempfile.mkstemp(prefix="call_export_", suffix=suffix)
+        os.close(fd)
+        return path
+
+    @staticmethod
+    async def _stream_file(path: str) -> AsyncIterator[bytes]:
+        try:
+            with open(path, "rb") as file:
+                while True:
+                    chunk = await asyncio.to_thread(file.read, FILE_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    yield chunk
+        finally:
+            os.unlink(path)
@@ -0,0 +1,179 @@
+"""
+Agregación de métricas de llamadas en la base de datos.
+
+Los conteos por estado y la duración promedio se calculan en Postgres mediante
+la función RPC ``call_metrics_summary`` y las series temporales se leen de los
+rollups precalculados, de modo que el servicio solo recibe filas ya agregadas
+en lugar de todas las llamadas.
+"""
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from app.models.call import CallStatus
+from app.models.call_metrics import CallMetrics, CallMetricsBucket
+from app.services.call_rollups import CallRollupService
+from app.utils.supabase_helpers import execute_query
+
+logger = logging.getLogger(__name__)
+
+FAILED_STATUSES = {CallStatus.FAILED.value, CallStatus.ERROR.value}
+
+
+class CallMetricsAggregator:
+    """
+    Obtiene métricas agregadas de llamadas desde Postgres.
+
+    Attributes:
+        supabase: Cliente de Supabase
+    """
+
+    def __init__(self, supabase_client=None):
+        """
+        Inicializa el agregador.
+
+        Args:
+            supabase_client: Cliente de Supabase
+        """
+        self.supabase = supabase_client
+        self.rollups = CallRollupService(supabase_client)
+
+    @staticmethod
+    def _params(
+        campaign_id: Optional[str],
+        start_date: Optional[datetime],
+        end_date: Optional[datetime]
+    ) -> Dict[str, Any]:
+        return {
+            "p_campaign_id": str(campaign_id) if campaign_id else None,
+            "p_start": start_date.isoformat() if start_date else None,
+            "p_end": end_date.isoformat() if end_date else None
+        }
+
+    @staticmethod
+    def _avg(total_duration: int, duration_count: int) -> float:
+        return round(total_duration / duration_count, 2) if duration_count else 0.0
+
+    async def get_summary(
+        self,
+        campaign_id: Optional[str] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None
+    ) -> CallMetrics:
+        """
+        Obtiene los conteos por estado y la duración promedio.
+
+        Args:
+            campaign_id: ID de la campaña (opcional)
+            start_date: Fecha de inicio (opcional)
+            end_date: Fecha de fin (opcional)
+
+        Returns:
+            CallMetrics: Métricas agregadas
+        """
+        result = await execute_query(
+            self.supabase.rpc("call_metrics_summary", self._params(campaign_id, start_date, end_date))
+        )
+        return self._build_summary(result.data or [])
+
+    async def get_summaries(
+        self,
+        campaign_ids: List[str],
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None
+    ) -> Dict[str, CallMetrics]:
+        """
+        Obtiene el resumen de varias campañas en una sola consulta.
+
+        Args:
+            campaign_ids: IDs de las campañas
+            start_date: Fecha de inicio (opcional)
+            end_date: Fecha de fin (opcional)
+
+        Returns:
+            Dict[str, CallMetrics]: Métricas por ID de campaña; las campañas sin
+            llamadas en el periodo tienen métricas vacías
+        """
+        campaign_ids = [str(campaign_id) for campaign_id in campaign_ids]
+        if not campaign_ids:
+            return {}
+
+        params = self._params(None, start_date, end_date)
+        params.pop("p_campaign_id")
+        result = await execute_query(
+            self.supabase.rpc("call_metrics_summary_by_campaign", {"p_campaign_ids": campaign_ids, **params})
+        )
+
+        rows_by_campaign: Dict[str, List[Dict[str, Any]]] = {campaign_id: [] for campaign_id in campaign_ids}
+        for row in result.data or []:
+            rows_by_campaign.setdefault(str(row["campaign_id"]), []).append(row)
+
+        return {
+            campaign_id: self._build_summary(rows)
+            for campaign_id, rows in rows_by_campaign.items()
+        }
+
+    def _build_summary(self, rows: List[Dict[str, Any]]) -> CallMetrics:
+        by_status: Dict[str, int] = {}
+        duration_count = 0
+        total_duration = 0
+        for row in rows:
+            by_status[row["status"]] = by_status.get(row["status"], 0) + int(row["call_count"])
+            duration_count += int(row.get("duration_count") or 0)
+            total_duration += int(row.get("total_duration") or 0)
+
+        return CallMetrics(
+            total_calls=sum(by_status.values()),
+            completed_calls=by_status.get(CallStatus.COMPLETED.value, 0),
+            failed_calls=sum(count for status, count in by_status.items() if status in FAILED_STATUSES),
+            no_answer_calls=by_status.get(CallStatus.NO_ANSWER.value, 0),
+            busy_calls=by_status.get(CallStatus.BUSY.value, 0),
+            avg_duration=self._avg(total_duration, duration_count),
+            by_status=by_status
+        )
+
+    async def get_timeline(
+        self,
+        campaign_id: Optional[str] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        group_by: str = "day"
+    ) -> List[CallMetricsBucket]:
+        """
+        Obtiene la serie temporal de llamadas desde los rollups precalculados.
+
+        Args:
+            campaign_id: ID de la campaña (opcional)
+            start_date: Fecha de inicio (opcional)
+            end_date: Fecha de fin (opcional)
+            group_by: Intervalo de agrupación (hour, day, week, month)
+
+        Returns:
+            List[CallMetricsBucket]: Métricas por intervalo, ordenadas por fecha
+        """
+        return await self.rollups.get_timeline(campaign_id, start_date, end_date, group_by)
+
+    async def get_metrics(
+        self,
+        campaign_id: Optional[str] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        group_by: Optional[str] = None
+    ) -> CallMetrics:
+        """
+        Obtiene el resumen y, si se indica ``group_by``, la serie temporal.
+
+        Args:
+            campaign_id: ID de la campaña (opcional)
+            start_date: Fecha de inicio (opcional)
+            end_date: Fecha de fin (opcional)
+            group_by: Intervalo de la serie temporal (opcional)
+
+        Returns:
+            CallMetrics: Métricas agregadas
+        """
+        metrics = await self.get_summary(campaign_id, start_date, end_date)
+        if group_by:
+            metrics.timeline = await self.get_timeline(campaign_id, start_date, end_date, group_by)
+            metrics.group_by = group_by
+        return metrics
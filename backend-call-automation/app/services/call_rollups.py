@@ -0,0 +1,131 @@
+"""
+Consultas sobre los rollups de llamadas.
+
+La tabla ``call_rollups`` mantiene, por campaña, buckets horarios y diarios de
+resultados, duración y sentimiento de las llamadas terminadas. Se actualiza
+mediante triggers al terminar cada llamada y al guardar su análisis posterior,
+por lo que las series temporales de los reportes se leen de los buckets sin
+recorrer las llamadas: el coste depende del rango consultado, no del tamaño de
+la campaña.
+
+Los rangos se resuelven con buckets completos: una serie diaria incluye el día
+entero de ``start_date`` y de ``end_date``.
+"""
+import logging
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from fastapi import HTTPException
+
+from app.models.call_metrics import CallMetricsBucket
+from app.utils.supabase_helpers import execute_query
+
+logger = logging.getLogger(__name__)
+
+TIMELINE_BUCKETS = {"hour", "day", "week", "month"}
+
+
+class CallRollupService:
+    """
+    Servicio de lectura y reconstrucción de los rollups de llamadas.
+
+    Attributes:
+        supabase: Cliente de Supabase
+    """
+
+    def __init__(self, supabase_client=None):
+        """
+        Inicializa el servicio.
+
+        Args:
+            supabase_client: Cliente de Supabase
+        """
+        self.supabase = supabase_client
+
+    async def get_timeline(
+        self,
+        campaign_id: Optional[str] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        group_by: str = "day"
+    ) -> List[CallMetricsBucket]:
+        """
+        Obtiene la serie temporal de una campaña (o de todas) desde los rollups.
+
+        Args:
+            campaign_id: ID de la campaña (opcional)
+            start_date: Fecha de inicio (opcional)
+            end_date: Fecha de fin (opcional)
+            group_by: Intervalo de agrupación (hour, day, week, month)
+
+        Returns:
+            List[CallMetricsBucket]: Métricas por intervalo, ordenadas por fecha
+
+        Raises:
+            HTTPException: Si el intervalo no es válido
+        """
+        if group_by not in TIMELINE_BUCKETS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Intervalo no válido: {group_by}. Valores permitidos: {', '.join(sorted(TIMELINE_BUCKETS))}"
+            )
+
+        result = await execute_query(
+            self.supabase.rpc("call_rollup_timeline", {
+                "p_campaign_id": str(campaign_id) if campaign_id else None,
+                "p_start": start_date.isoformat() if start_date else None,
+                "p_end": end_date.isoformat() if end_date else None,
+                "p_bucket": group_by
+            })
+        )
+        return self.build_buckets(result.data or [])
+
+    @staticmethod
+    def build_buckets(rows: List[Dict[str, Any]]) -> List[CallMetricsBucket]:
+        """
+        Agrupa las filas por intervalo combinando los estados.
+
+        Args:
+            rows: Filas con bucket, status y acumulados
+
+        Returns:
+            List[CallMetricsBucket]: Métricas por intervalo, ordenadas por fecha
+        """
+        buckets: Dict[str, Dict[str, Any]] = defaultdict(lambda: {
+            "by_status": {},
+            "duration_count": 0,
+            "total_duration": 0,
+            "sentiment_count": 0,
+            "sentiment_sum": 0.0
+        })
+        for row in rows:
+            bucket = buckets[row["bucket"]]
+            bucket["by_status"][row["status"]] = bucket["by_status"].get(row["status"], 0) + int(row["call_count"])
+            bucket["duration_count"] += int(row.get("duration_count") or 0)
+            bucket["total_duration"] += int(row.get("total_duration") or 0)
+            bucket["sentiment_count"] += int(row.get("sentiment_count") or 0)
+            bucket["sentiment_sum"] += float(row.get("sentiment_sum") or 0)
+
+        return [
+            CallMetricsBucket(
+                date=date,
+                total_calls=sum(bucket["by_status"].values()),
+                by_status=bucket["by_status"],
+                avg_duration=round(bucket["total_duration"] / bucket["duration_count"], 2) if bucket["duration_count"] else 0.0,
+                avg_sentiment=round(bucket["sentiment_sum"] / bucket["sentiment_count"], 3) if bucket["sentiment_count"] else None
+            )
+            for date, bucket in sorted(buckets.items())
+        ]
+
+    async def rebuild(self, campaign_id: Optional[str] = None) -> None:
+        """
+        Reconstruye los rollups desde las llamadas.
+
+        Args:
+            campaign_id: ID de la campaña (todas si es None)
+        """
+        await execute_query(
+            self.supabase.rpc("rebuild_call_rollups", {"p_campaign_id": str(campaign_id) if campaign_id else None})
+        )
+        logger.info(f"Rollups reconstruidos para {'la campaña ' + str(campaign_id) if campaign_id else 'todas las campañas'}")
@@ -1,15 +1,25 @@
 """
 Servicio para la gestión de llamadas.
 """
-from datetime import datetime
+import asyncio
+from datetime import datetime, timezone
 import uuid
 import logging
-from typing import Any, AsyncGenerator
+from typing import Any, AsyncGenerator, Dict, List, Union
 from fastapi import HTTPException
-from app.models.call import Call, CallCreate, CallUpdate, CallStatus
+from pydantic import ValidationError
+from postgrest.exceptions import APIError
+from postgrest.types import ReturnMethod
+from app.models.call import Call, CallBulkError, CallBulkResult, CallCreate, CallUpdate, CallStatus
 from app.services.twilio_service import TwilioService
 from app.models.call_metrics import CallMetrics
 from .ai_conversation_service import AIConversationService
+from app.utils.pagination import apply_keyset, decode_cursor
+from .call_export import CallExportService
+from .call_metrics_aggregator import CallMetricsAggregator
+from .campaign_counters import CampaignCountersService
+from .post_call_analytics import post_call_analytics
+from .call_events import call_events
 from .elevenlabs_service import ElevenLabsService
 from .monitoring_service import MonitoringService
 from .fallback_service import FallbackService
@@ -44,6 +54,9 @@ class CallService:
         self.fallback_service = FallbackService()
         self.campaign_service = CampaignService(supabase_client=self.supabase)
         self.contact_service = ContactService(supabase_client=self.supabase)
+        self.metrics_aggregator = CallMetricsAggregator(self.supabase)
+        self.exporter = CallExportService(self.supabase)
+        self.campaign_counters = CampaignCountersService(self.supabase)
 
     async def initiate_outbound_call(self, call_id: str) -> None:
         """
@@ -125,6 +138,11 @@ class CallService:
                     'end_time': datetime.now().isoformat()
                 }).eq('id', call_id).execute()
 
+            # Sentimiento, resumen y resultado se calculan por lotes fuera de la llamada
+            post_call_analytics.enqueue(call_id)
+            # Liberar la plaza de la llamada en el motor de marcado que la marcó
+            await call_events.released(call_id)
+
             logger.info(f"Llamada {call_id} finalizada correctamente")
         except Exception as e:
             logger.error(f"Error al finalizar llamada {call_id}: {str(e)}")
@@ -161,10 +179,10 @@ class CallService:
                     return response.data[0]['voice_id']
 
             # Si no hay configuración específica, usar la voz por defecto
-            return settings.ELEVENLABS_DEFAULT_VOICE_ID
+            return settings.ELEVENLABS_DEFAULT_VOICE
         except Exception as e:
             logger.warning(f"Error al obtener voz para llamada {call_id}: {str(e)}")
-            return settings.ELEVENLABS_DEFAULT_VOICE_ID
+            return settings.ELEVENLABS_DEFAULT_VOICE
 
     async def handle_audio_stream(self, call_id: str, audio_chunk: bytes) -> bytes:
         """
@@ -420,51 +438,65 @@ class CallService:
 
         return updated_call
 
-    async def get_call_metrics(self, campaign_id: str | None = None) -> CallMetrics:
+    async def get_call_metrics(
+        self,
+        campaign_id: str | None = None,
+        start_date: datetime | None = None,
+        end_date: datetime | None = None,
+        group_by: str | None = None
+    ) -> CallMetrics:
         """
         Obtiene las métricas de las llamadas.
 
+        Los conteos y promedios se calculan en la base de datos; solo se
+        transfieren las filas agregadas.
+
         Args:
             campaign_id: ID de la campaña para filtrar las métricas
+            start_date: Fecha de inicio del periodo (opcional)
+            end_date: Fecha de fin del periodo (opcional)
+            group_by: Intervalo de la serie temporal (hour, day, week, month) (opcional)
 
         Returns:
             CallMetrics: Las métricas de las llamadas
         """
-        # Construir la consulta base
-        query = self.supabase.table('calls').select('*')
+        return await self.metrics_aggregator.get_metrics(
+            campaign_id=campaign_id,
+            start_date=start_date,
+            end_date=end_date,
+            group_by=group_by
+        )
 
-        # Aplicar filtro por campaña si se especifica
-        if campaign_id:
-            query = query.eq('campaign_id', campaign_id)
+    async def get_call_metrics_bulk(
+        self,
+        campaign_ids: list[str],
+        start_date: datetime | None = None,
+        end_date: datetime | None = None
+    ) -> dict[str, CallMetrics]:
+        """
+        Obtiene las métricas de varias campañas con una sola consulta agregada.
 
-        # Ejecutar la consulta
-        result = await query.execute()
-        calls = result.data
-
-        # Calcular métricas
-        total_calls = len(calls)
-        completed_calls = sum(1 for call in calls if call['status'] == CallStatus.COMPLETED.value)
-        failed_calls = sum(1 for call in calls if call['status'] in [CallStatus.FAILED.value, CallStatus.ERROR.value])
-        no_answer_calls = sum(1 for call in calls if call['status'] == CallStatus.NO_ANSWER.value)
-        busy_calls = sum(1 for call in calls if call['status'] == CallStatus.BUSY.value)
-
-        # Calcular duración promedio
-        durations = [call['duration'] for call in calls if call['duration'] is not None]
-        avg_duration = sum(durations) / len(durations) if durations else 0
-
-        return CallMetrics(
-            total_calls=total_calls,
-            completed_calls=completed_calls,
-            failed_calls=failed_calls,
-            no_answer_calls=no_answer_calls,
-            busy_calls=busy_calls,
-            avg_duration=avg_duration
+        Args:
+            campaign_ids: IDs de las campañas
+            start_date: Fecha de inicio del periodo (opcional)
+            end_date: Fecha de fin del periodo (opcional)
+
+        Returns:
+            dict[str, CallMetrics]: Métricas por ID de campaña
+        """
+        return await self.metrics_aggregator.get_summaries(
+            campaign_ids,
+            start_date=start_date,
+            end_date=end_date
         )
 
     async def create_call(self, call_data: CallCreate) -> Call:
         """
         Crea una nueva llamada.
 
+        Solo inserta la fila de la llamada; la síntesis del script la hace
+        ``audio_render_stage`` antes de marcar.
+
         Args:
             call_data: Datos de la llamada a crear
 
@@ -473,20 +505,13 @@ class CallService:
         """
         logger.debug(f"Creando llamada: {call_data}")
 
-        # Generar audio con ElevenLabs
-        audio = await self.elevenlabs_service.generate_audio(call_data.script_template)
-
-        # Subir audio a un bucket público (opcional, dependiendo de tu configuración)
-        # url_audio = await self.supabase.storage().from_("audios").upload(f"{call_data.id}.mp3", audio)
-
-        # Preparar datos
+        # Preparar datos (el audio del script se prepara antes de marcar)
         call_dict = {
             'id': str(uuid.uuid4()),
             'status': CallStatus.PENDING.value,
             'created_at': datetime.now().isoformat(),
             'updated_at': datetime.now().isoformat(),
             'twilio_sid': call_data.twilio_sid,
-            # 'webhook_url': url_audio,  # Usar la URL del audio generado
             **call_data.model_dump(exclude={"twilio_sid", "script_template"})
         }
 
@@ -495,6 +520,108 @@ class CallService:
         logger.debug(f"Llamada creada: {result.data[0]}")
         return Call(**result.data[0])
 
+    async def create_calls_bulk(self, calls: List[Union[CallCreate, Dict[str, Any]]]) -> CallBulkResult:
+        """
+        Crea varias llamadas con inserciones por lotes.
+
+        Cada fila se valida como ``CallCreate`` y recibe su ID aquí, de modo que
+        las inserciones no necesitan devolver las filas creadas. Las filas se
+        insertan en lotes de ``CALL_BULK_BATCH_SIZE``, con hasta
+        ``CALL_BULK_CONCURRENCY`` lotes a la vez. Si un lote falla por los datos
+        de alguna fila (errores de Postgres 22xxx/23xxx) se divide en mitades
+        hasta aislar las filas con error, que se devuelven sin afectar al resto.
+        Ante otros errores (conexión, tiempo de espera, servidor) el lote entero
+        se reintenta hasta ``CALL_BULK_RETRIES`` veces y, si sigue fallando, todas
+        sus filas se devuelven con el error.
+
+        Args:
+            calls: Llamadas a crear (``CallCreate`` o diccionarios con sus campos)
+
+        Returns:
+            CallBulkResult: IDs creados y errores por fila
+        """
+        result = CallBulkResult(total=len(calls), ids=[None] * len(calls))
+        now = datetime.now().isoformat()
+        rows: List[tuple] = []
+
+        for index, item in enumerate(calls):
+            try:
+                call_data = item if isinstance(item, CallCreate) else CallCreate.model_validate(item)
+            except ValidationError as e:
+                result.errors.append(CallBulkError(index=index, error=self._validation_message(e)))
+                continue
+            rows.append((index, {
+                **call_data.model_dump(mode="json", exclude={"script_template"}),
+                'id': str(uuid.uuid4()),
+                'status': CallStatus.PENDING.value,
+                'created_at': now,
+                'updated_at': now
+            }))
+
+        batch_size = max(1, settings.CALL_BULK_BATCH_SIZE)
+        semaphore = asyncio.Semaphore(max(1, settings.CALL_BULK_CONCURRENCY))
+
+        async def insert_batch(batch: List[tuple]) -> None:
+            async with semaphore:
+                await self._insert_call_rows(batch, result)
+
+        await asyncio.gather(*(
+            insert_batch(rows[start:start + batch_size])
+            for start in range(0, len(rows), batch_size)
+        ))
+
+        result.errors.sort(key=lambda error: error.index)
+        result.created = sum(1 for call_id in result.ids if call_id)
+        logger.info(f"Creación masiva de llamadas: {result.created} de {result.total} creadas, {len(result.errors)} errores")
+        return result
+
+    async def _insert_call_rows(self, batch: List[tuple], result: CallBulkResult) -> None:
+        """Inserta un lote de filas; si falla por los datos, lo divide para aislar las filas con error."""
+        attempt = 0
+        while True:
+            try:
+                # Los IDs se generan aquí: ignorar duplicados hace idempotentes los reintentos
+                await self.supabase.table('calls').upsert(
+                    [row for _, row in batch],
+                    on_conflict='id',
+                    ignore_duplicates=True,
+                    returning=ReturnMethod.minimal
+                ).execute()
+                break
+            except Exception as e:
+                if self._is_row_error(e):
+                    if len(batch) == 1:
+                        result.errors.append(CallBulkError(index=batch[0][0], error=str(e)))
+                        return
+                    middle = len(batch) // 2
+                    await self._insert_call_rows(batch[:middle], result)
+                    await self._insert_call_rows(batch[middle:], result)
+                    return
+                if attempt < settings.CALL_BULK_RETRIES:
+                    attempt += 1
+                    delay = settings.CALL_BULK_RETRY_BACKOFF * 2 ** (attempt - 1)
+                    logger.warning(f"Error al insertar lote de {len(batch)} llamadas; reintento {attempt} en {delay}s: {str(e)}")
+                    await asyncio.sleep(delay)
+                    continue
+                logger.error(f"Error al insertar lote de {len(batch)} llamadas: {str(e)}")
+                result.errors.extend(CallBulkError(index=index, error=str(e)) for index, _ in batch)
+                return
+
+        for index, row in batch:
+            result.ids[index] = row['id']
+
+    @staticmethod
+    def _is_row_error(error: Exception) -> bool:
+        """Indica si el error se debe a los datos de alguna fila (excepción de datos o restricción)."""
+        return isinstance(error, APIError) and str(error.code or '').startswith(('22', '23'))
+
+    @staticmethod
+    def _validation_message(error: ValidationError) -> str:
+        return "; ".join(
+            f"{'.'.join(str(part) for part in item['loc'])}: {item['msg']}"
+            for item in error.errors()
+        )
+
     async def get_call_by_twilio_sid(self, twilio_sid: str) -> Call | None:
         """
         Obtiene una llamada por su SID de Twilio.
@@ -590,21 +717,16 @@ class CallService:
 
     async def update_campaign_stats(self, campaign_id: str):
         """
-        Actualiza las estadísticas de una campaña.
+        Recalcula las estadísticas de una campaña.
+
+        Los contadores se mantienen de forma incremental en la base de datos al
+        cambiar el estado de cada llamada; este método solo fuerza su
+        reconciliación, que se resuelve en Postgres sin descargar las llamadas.
 
         Args:
             campaign_id: ID de la campaña
         """
-        result = await self.supabase.table('calls').select('*').eq('campaign_id', campaign_id).execute()
-        calls = result.data
-        total_calls = len(calls)
-        completed_calls = len([call for call in calls if call['status'] == CallStatus.COMPLETED.value])
-
-        await self.supabase.table('campaigns').update({
-            'total_calls': total_calls,
-            'completed_calls': completed_calls,
-            'updated_at': datetime.now().isoformat()
-        }).eq('id', campaign_id).execute()
+        await self.campaign_counters.reconcile(campaign_id)
 
     async def get_call(self, call_id: uuid.UUID) -> Call:
         """
@@ -628,24 +750,136 @@ class CallService:
 
         return Call(**result.data)
 
-    async def list_calls(self, campaign_id: str | None = None, status: CallStatus | None = None, skip: int = 0, limit: int = 100) -> list[Call]:
-        """
-        Lista llamadas, con opción de filtrar por campaña y estado.
-        """
-        logger.debug(f"Listando llamadas con campaign_id: {campaign_id}, status: {status}, skip: {skip}, limit: {limit}")
-        query = self.supabase.table('calls').select('*')
-
+    def _filter_calls(
+        self,
+        query: Any,
+        campaign_id: str | None = None,
+        status: CallStatus | None = None,
+        contact_id: str | None = None,
+        start_date: datetime | None = None,
+        end_date: datetime | None = None
+    ) -> Any:
         if campaign_id:
             query = query.eq('campaign_id', campaign_id)
-
         if status:
             query = query.eq('status', status.value)
+        if contact_id:
+            query = query.eq('contact_id', contact_id)
+        if start_date:
+            query = query.gte('created_at', start_date.isoformat())
+        if end_date:
+            query = query.lte('created_at', end_date.isoformat())
+        return query
+
+    async def list_calls(
+        self,
+        campaign_id: str | None = None,
+        status: CallStatus | None = None,
+        skip: int = 0,
+        limit: int = 100,
+        cursor: str | None = None,
+        contact_id: str | None = None,
+        start_date: datetime | None = None,
+        end_date: datetime | None = None,
+        sort_by: str = "created_at",
+        sort_order: str = "desc"
+    ) -> list[Call]:
+        """
+        Lista llamadas, con opción de filtrar por campaña y estado.
+
+        Si se indica ``cursor`` se pagina por clave ``(created_at, id)`` y se
+        ignora ``skip``; en otro caso se pagina por desplazamiento.
+
+        Args:
+            campaign_id: ID de la campaña (opcional)
+            status: Estado de la llamada (opcional)
+            skip: Número de registros a saltar (paginación por desplazamiento)
+            limit: Número máximo de registros a devolver
+            cursor: Token de la página siguiente (opcional)
+            contact_id: ID del contacto (opcional)
+            start_date: Fecha de creación mínima (opcional)
+            end_date: Fecha de creación máxima (opcional)
+            sort_by: Campo para ordenar
+            sort_order: Orden (asc/desc)
+
+        Returns:
+            list[Call]: Llamadas de la página
+
+        Raises:
+            HTTPException: Si el cursor no es válido o se combina con otro orden que no sea created_at
+        """
+        logger.debug(f"Listando llamadas con campaign_id: {campaign_id}, status: {status}, skip: {skip}, limit: {limit}, cursor: {cursor}")
+        query = self._filter_calls(
+            self.supabase.table('calls').select('*'),
+            campaign_id, status, contact_id, start_date, end_date
+        )
+        descending = sort_order != "asc"
+
+        if cursor:
+            if sort_by != "created_at":
+                raise HTTPException(status_code=400, detail="La paginación por cursor solo admite ordenar por created_at")
+            query = apply_keyset(query, decode_cursor(cursor), limit, descending)
+        else:
+            query = query.order(sort_by, desc=descending).order('id', desc=descending).range(skip, skip + limit - 1)
 
-        query = query.range(skip, skip + limit)
         result = await query.execute()
 
         return [Call(**call) for call in result.data]
 
+    async def list_due_retries(self, campaign_ids: list[str], limit: int = 200) -> list[Call]:
+        """
+        Lista las llamadas fallidas cuyo reintento ya venció.
+
+        ``next_retry_at`` se calcula en la base de datos al fallar la llamada
+        (ver ``set_call_next_retry_at``) y está indexado, por lo que la consulta
+        solo lee las llamadas vencidas.
+
+        Args:
+            campaign_ids: IDs de las campañas a considerar
+            limit: Número máximo de llamadas
+
+        Returns:
+            list[Call]: Llamadas a reintentar, de la que más tiempo lleva vencida a la que menos
+        """
+        if not campaign_ids:
+            return []
+        result = await self.supabase.table('calls')\
+            .select('*')\
+            .lte('next_retry_at', datetime.now(timezone.utc).isoformat())\
+            .in_('campaign_id', [str(campaign_id) for campaign_id in campaign_ids])\
+            .order('next_retry_at')\
+            .limit(limit)\
+            .execute()
+        return [Call(**call) for call in result.data or []]
+
+    async def count_calls(
+        self,
+        campaign_id: str | None = None,
+        status: CallStatus | None = None,
+        contact_id: str | None = None,
+        start_date: datetime | None = None,
+        end_date: datetime | None = None
+    ) -> int:
+        """
+        Cuenta las llamadas que cumplen los filtros.
+
+        Args:
+            campaign_id: ID de la campaña (opcional)
+            status: Estado de la llamada (opcional)
+            contact_id: ID del contacto (opcional)
+            start_date: Fecha de creación mínima (opcional)
+            end_date: Fecha de creación máxima (opcional)
+
+        Returns:
+            int: Número de llamadas
+        """
+        query = self._filter_calls(
+            self.supabase.table('calls').select('id', count='exact', head=True),
+            campaign_id, status, contact_id, start_date, end_date
+        )
+        result = await query.execute()
+        return result.count or 0
+
     async def update_call(self, call_id: uuid.UUID, call_data: CallUpdate) -> Call:
         """
         Actualiza una llamada.
@@ -710,21 +944,7 @@ class CallService:
             call: La llamada que disparó la actualización
         """
         logger.debug(f"Actualizando estadísticas de campaña para llamada {call.id}")
-
-        # Obtener todas las llamadas de la campaña
-        result = await self.supabase.table('calls').select('*').eq('campaign_id', call.campaign_id).execute()
-        calls = result.data
-
-        # Calcular estadísticas
-        total_calls = len(calls)
-        completed_calls = len([c for c in calls if c['status'] == CallStatus.COMPLETED.value])
-
-        # Actualizar campaña
-        await self.supabase.table('campaigns').update({
-            'total_calls': total_calls,
-            'completed_calls': completed_calls,
-            'updated_at': datetime.now().isoformat()
-        }).eq('id', call.campaign_id).execute()
+        await self.campaign_counters.reconcile(call.campaign_id)
 
     async def get_call_by_twilio_sid(self, twilio_sid: str) -> Call | None:
         """
@@ -782,11 +1002,20 @@ class CallService:
         Actualiza el historial de interacciones de una llamada.
         """
         call = await self.get_call(call_id)
+        timestamp = datetime.now(timezone.utc).isoformat()
+
+        # Guardar el turno para el análisis posterior a la llamada
+        await self.supabase.table('call_history').insert({
+            'call_id': str(call_id),
+            'user_message': user_message,
+            'ai_response': ai_response,
+            'timestamp': timestamp
+        }).execute()
 
         # Crear o actualizar el historial de interacciones
         history = call.interaction_history or []
         history.append({
-            "timestamp": datetime.now(datetime.timezone.utc).isoformat(),
+            "timestamp": timestamp,
             "user_message": user_message,
             "ai_response": ai_response
         })
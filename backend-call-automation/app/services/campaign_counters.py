@@ -0,0 +1,95 @@
+"""
+Reconciliación de los contadores de campaña.
+
+Los contadores ``total_calls``, ``successful_calls``, ``failed_calls`` y
+``pending_calls`` se mantienen de forma incremental mediante triggers sobre la
+tabla ``calls``. Este servicio ejecuta periódicamente la función
+``reconcile_campaign_counters``, que los recalcula en la base de datos y corrige
+cualquier desviación (por ejemplo, tras cargas manuales o restauraciones).
+"""
+import asyncio
+import logging
+from typing import Optional
+
+from app.config.settings import settings
+from app.config.supabase import supabase_client
+from app.utils.supabase_helpers import execute_query
+
+logger = logging.getLogger(__name__)
+
+
+class CampaignCountersService:
+    """
+    Servicio de reconciliación de los contadores de campaña.
+
+    Attributes:
+        supabase: Cliente de Supabase
+        interval: Segundos entre reconciliaciones
+    """
+
+    def __init__(self, supabase=None, interval: int = settings.SCHEDULER_COUNTER_RECONCILE_INTERVAL):
+        """
+        Inicializa el servicio.
+
+        Args:
+            supabase: Cliente de Supabase (por defecto, el cliente global)
+            interval: Segundos entre reconciliaciones
+        """
+        self.supabase = supabase or supabase_client
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+        self._running = False
+
+    async def reconcile(self, campaign_id: Optional[str] = None) -> int:
+        """
+        Recalcula los contadores en la base de datos y corrige desviaciones.
+
+        Args:
+            campaign_id: ID de la campaña (todas si es None)
+
+        Returns:
+            int: Número de campañas corregidas
+        """
+        result = await execute_query(
+            self.supabase.rpc(
+                "reconcile_campaign_counters",
+                {"p_campaign_id": str(campaign_id) if campaign_id else None}
+            ),
+            in_thread=True
+        )
+        fixed = result.data if isinstance(result.data, int) else 0
+        if fixed:
+            logger.warning(f"Contadores corregidos en {fixed} campañas")
+        return fixed
+
+    async def start(self) -> None:
+        """Inicia la reconciliación periódica."""
+        if self._task is None or self._task.done():
+            self._running = True
+            self._task = asyncio.create_task(self._loop())
+            logger.info(f"Reconciliación de contadores iniciada con intervalo de {self.interval} segundos")
+
+    async def stop(self) -> None:
+        """Detiene la reconciliación periódica."""
+        if self._task and not self._task.done():
+            self._running = False
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            logger.info("Reconciliación de contadores detenida")
+
+    async def _loop(self) -> None:
+        while self._running:
+            try:
+                await asyncio.sleep(self.interval)
+                await self.reconcile()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error al reconciliar contadores de campaña: {str(e)}")
+
+
+# Instancia global del servicio de reconciliación
+campaign_counters = CampaignCountersService()
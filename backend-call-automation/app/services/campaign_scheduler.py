@@ -1,13 +1,21 @@
-from datetime import datetime, timedelta
-from typing import List, Optional
+from datetime import datetime
+from typing import Any, Dict, List, Optional
 import logging
 import asyncio
+import time
 from fastapi import HTTPException
 from app.models.campaign import Campaign, CampaignStatus
 from app.models.call import Call, CallStatus, CallCreate
 from app.services.campaign_service import CampaignService
 from app.services.call_service import CallService
-# from app.services.contact_service import ContactService
+from app.config.settings import settings
+from app.services.contact_service import ContactService
+from app.services.audio_render import AudioRenderStage, audio_render_stage
+from app.services.dial_planner import DialPlanner
+from app.services.dial_queue import DialQueue
+from app.services.dialing_engine import DialingEngine, dialing_engine
+from app.services.pacing_controller import PacingController, pacing_controller
+from app.services.scheduler_coordinator import SchedulerCoordinator
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -25,6 +33,10 @@ class CampaignScheduler:
         max_concurrent_calls (int): Número máximo de llamadas simultáneas permitidas.
         retry_delay (int): Tiempo en minutos entre reintentos de llamadas.
         max_retries (int): Número máximo de reintentos permitidos por llamada.
+        engine (DialingEngine): Motor que marca las llamadas con concurrencia acotada.
+        planner (DialPlanner): Selecciona por lotes los contactos a llamar.
+        queue (DialQueue): Cola de marcado persistente compartida entre planificadores (opcional).
+        pacing (PacingController): Ajusta el número de llamadas a la tasa de respuesta observada.
 
     Dependencies:
         - Supabase: Para la persistencia de datos
@@ -35,11 +47,16 @@ class CampaignScheduler:
         self,
         campaign_service: CampaignService,
         call_service: CallService,
-        # contact_service: ContactService,
+        contact_service: ContactService,
         check_interval: int = 60,
         max_concurrent_calls: int = 10,
         retry_delay: int = 15,
-        max_retries: int = 3
+        max_retries: int = 3,
+        engine: Optional[DialingEngine] = None,
+        queue: Optional[DialQueue] = None,
+        pacing: Optional[PacingController] = None,
+        renderer: Optional[AudioRenderStage] = None,
+        coordinator: Optional[SchedulerCoordinator] = None
     ):
         """
         Inicializa el planificador de campañas.
@@ -52,6 +69,13 @@ class CampaignScheduler:
             max_concurrent_calls (int): Máximo de llamadas simultáneas.
             retry_delay (int): Minutos entre reintentos.
             max_retries (int): Máximo de reintentos por llamada.
+            engine (DialingEngine): Motor de marcado (por defecto, el motor global).
+            queue (DialQueue): Cola de marcado en Redis; sin ella los contactos se
+                leen directamente de la base de datos en cada ciclo.
+            pacing (PacingController): Controlador del ritmo de marcado (por defecto, el global).
+            renderer (AudioRenderStage): Preparación del audio de los scripts (por defecto, la global).
+            coordinator (SchedulerCoordinator): Reparto de campañas entre instancias; sin él
+                esta instancia procesa todas las campañas activas.
         """
         self.campaign_service = campaign_service
         self.call_service = call_service
@@ -60,6 +84,14 @@ class CampaignScheduler:
         self.max_concurrent_calls = max_concurrent_calls
         self.retry_delay = retry_delay
         self.max_retries = max_retries
+        self.engine = engine or dialing_engine
+        self.planner = DialPlanner(getattr(call_service, "supabase", None))
+        self.queue = queue
+        self.pacing = pacing or pacing_controller
+        self.renderer = renderer or audio_render_stage
+        self.coordinator = coordinator
+        self._active_campaigns: Dict[str, Campaign] = {}
+        self._windows_refreshed_at: Dict[str, float] = {}
         self.is_running = False
         self._task: Optional[asyncio.Task] = None
 
@@ -80,6 +112,9 @@ class CampaignScheduler:
             raise RuntimeError("El planificador ya está en ejecución")
         
         self.is_running = True
+        await self.engine.start()
+        if self.coordinator:
+            await self.coordinator.start()
         self._task = asyncio.create_task(self._run())
         logger.info("Planificador de campañas iniciado")
 
@@ -100,26 +135,58 @@ class CampaignScheduler:
                 await self._task
             except asyncio.CancelledError:
                 pass
+        if self.coordinator:
+            await self.coordinator.stop()
         logger.info("Planificador de campañas detenido")
 
     async def _run(self) -> None:
         """
         Ejecuta el bucle principal del planificador.
 
-        Procesa campañas activas y reintenta llamadas fallidas en intervalos regulares.
+        Procesa campañas activas y reintenta llamadas fallidas. Entre ciclos espera
+        a que termine alguna llamada, a que venza la siguiente llamada de la cola
+        de marcado o, como mucho, ``check_interval`` segundos, para volver a
+        llenar las plazas libres del motor de marcado.
 
         Returns:
             None
         """
         while self.is_running:
             try:
+                if self.queue:
+                    await self.queue.requeue_expired()
+                self.pacing.begin_tick(self.engine.queued() + self.engine.dialing())
                 await self._process_active_campaigns()
                 await self._retry_failed_calls()
-                await asyncio.sleep(self.check_interval)
+                await self._wait_next_tick(await self._next_wait())
             except Exception as e:
                 logger.error(f"Error en el planificador: {str(e)}")
                 await asyncio.sleep(self.check_interval)
 
+    async def _wait_next_tick(self, timeout: float) -> None:
+        """Espera a que se libere una plaza o, con coordinador, a que cambie el reparto de campañas."""
+        if not self.coordinator:
+            await self.engine.wait_for_capacity(timeout)
+            return
+        waits = [
+            asyncio.create_task(self.engine.wait_for_capacity(timeout)),
+            asyncio.create_task(self.coordinator.wait_for_change(timeout))
+        ]
+        try:
+            await asyncio.wait(waits, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for wait in waits:
+                wait.cancel()
+
+    async def _next_wait(self) -> float:
+        """Segundos hasta el siguiente ciclo."""
+        if not self.queue:
+            return self.check_interval
+        next_due = await self.queue.next_due()
+        if next_due is None:
+            return self.check_interval
+        return min(self.check_interval, max(1.0, next_due - datetime.now().timestamp()))
+
     async def _process_active_campaigns(self) -> None:
         """
         Procesa todas las campañas activas.
@@ -135,6 +202,7 @@ class CampaignScheduler:
         Raises:
             Exception: Si hay un error al procesar las campañas
         """
+        self._active_campaigns = {}
         try:
             # Obtener campañas activas dentro del horario programado
             now = datetime.now()
@@ -144,6 +212,14 @@ class CampaignScheduler:
                 end_date=now
             )
 
+            # Con varias instancias, solo las campañas asignadas a esta
+            if self.coordinator:
+                assigned = await self.coordinator.assign([str(campaign.id) for campaign in campaigns])
+                campaigns = [campaign for campaign in campaigns if str(campaign.id) in assigned]
+
+            # Las campañas activas del ciclo se reutilizan para los reintentos
+            self._active_campaigns = {str(campaign.id): campaign for campaign in campaigns}
+
             for campaign in campaigns:
                 await self._process_campaign(campaign)
 
@@ -154,6 +230,10 @@ class CampaignScheduler:
         """
         Procesa una campaña individual.
 
+        Encola en el motor de marcado tantas llamadas como plazas libres tenga la
+        campaña (o las que permita el ritmo de marcado predictivo); el resto de
+        contactos se atiende en ciclos posteriores.
+
         Args:
             campaign (Campaign): Campaña a procesar
 
@@ -164,73 +244,182 @@ class CampaignScheduler:
             Exception: Si hay un error al procesar la campaña
         """
         try:
-            # Verificar si hay contactos pendientes
-            if campaign.pending_calls <= 0:
-                logger.info(f"Campaña {campaign.id} no tiene llamadas pendientes")
-                # Marcar como completada si no hay más llamadas pendientes
-                await self.campaign_service.update_campaign(
-                    campaign.id,
-                    {"status": CampaignStatus.COMPLETED}
-                )
+            capacity = self.pacing.allowance(campaign.id, self.engine.capacity(campaign.id))
+            if capacity <= 0:
+                return
+
+            if self.queue:
+                await self._dispatch_from_queue(campaign, capacity)
                 return
 
-            # Obtener contactos de la campaña que no han sido llamados o necesitan reintento
-            contacts = await self.contact_service.get_campaign_contacts(campaign.id)
+            # Siguientes contactos a llamar, en una sola consulta
+            await self._refresh_windows(campaign)
+            contacts = await self.planner.next_contacts(campaign.id, campaign.max_retries, capacity)
+            contacts = [
+                contact for contact in contacts
+                if not self.engine.is_pending(f"{campaign.id}:{contact['contact_id']}")
+            ]
+            self.pacing.return_unused(capacity - len(contacts))
+            if not contacts:
+                await self._complete_if_finished(campaign)
+                return
 
-            # Filtrar contactos que no han sido llamados o necesitan reintento
+            # Registrar el intento de todo el lote y preparar su audio antes de encolarlo
+            await self.planner.reserve(campaign.id, contacts)
+            self._prefetch_audio(campaign, contacts)
             for contact in contacts:
-                try:
-                    # Verificar si el contacto ya fue llamado
-                    result = await self.supabase.from_("campaign_contacts")\
-                        .select("*")\
-                        .eq("campaign_id", campaign.id)\
-                        .eq("contact_id", contact.id)\
-                        .single()\
-                        .execute()
-
-                    if result and result["data"]:
-                        contact_status = result["data"]
-                        # Saltar si ya fue llamado exitosamente o alcanzó el máximo de reintentos
-                        if (contact_status["call_status"] == "completed" or
-                            contact_status["retry_count"] >= campaign.max_retries):
-                            continue
-
-                    call_data = CallCreate(
-                        campaign_id=campaign.id,
-                        phone_number=contact.phone_number,
-                        from_number="+15005550006",  # Número de Twilio (debería venir de la configuración)
-                        webhook_url=f"https://api.example.com/webhook/{campaign.id}/{contact.id}",
-                        status_callback_url=f"https://api.example.com/callback/{campaign.id}/{contact.id}",
-                        max_retries=campaign.max_retries,
-                        retry_attempts=result["data"]["retry_count"] if result and result["data"] else 0
-                    )
-
-                    # Crear la llamada
-                    call = await self.call_service.create_call(call_data)
-
-                    # Actualizar el estado en campaign_contacts
-                    await self.supabase.from_("campaign_contacts")\
-                        .upsert({
-                            "campaign_id": campaign.id,
-                            "contact_id": contact.id,
-                            "called_at": datetime.now().isoformat(),
-                            "call_status": call.status.value,
-                            "retry_count": call_data.retry_attempts + 1
-                        })\
-                        .execute()
-
-                except Exception as e:
-                    logger.error(f"Error al crear llamada para contacto {contact.id}: {str(e)}")
-                    continue
+                self.engine.submit(
+                    campaign.id,
+                    self._dial_factory(campaign, contact),
+                    key=f"{campaign.id}:{contact['contact_id']}"
+                )
 
         except Exception as e:
             logger.error(f"Error al procesar campaña {campaign.id}: {str(e)}")
 
+    async def _complete_if_finished(self, campaign: Campaign) -> None:
+        """
+        Marca una campaña como completada si no le quedan llamadas en curso ni
+        contactos por llamar, ahora o más adelante.
+
+        Args:
+            campaign (Campaign): Campaña sin contactos que llamar en este ciclo
+        """
+        if self.engine.active(campaign.id) or self.engine.queued(campaign.id):
+            return
+        if await self.planner.has_remaining(campaign.id, campaign.max_retries):
+            return
+        logger.info(f"Campaña {campaign.id} no tiene contactos pendientes")
+        await self.campaign_service.update_campaign(
+            campaign.id,
+            {"status": CampaignStatus.COMPLETED}
+        )
+
+    def _prefetch_audio(self, campaign: Campaign, contacts: List[Dict[str, Any]]) -> None:
+        """Inicia en segundo plano la síntesis del script para un lote de contactos."""
+        try:
+            self.renderer.prefetch(
+                campaign.script_template,
+                [{"name": contact.get("name"), "phone_number": contact.get("phone_number")} for contact in contacts]
+            )
+        except Exception as e:
+            logger.error(f"Error al preparar el audio de la campaña {campaign.id}: {str(e)}")
+
+    async def _refresh_windows(self, campaign: Campaign) -> None:
+        """Recalcula las ventanas de llamada vencidas de una campaña, como mucho una vez por intervalo."""
+        campaign_id = str(campaign.id)
+        now = time.monotonic()
+        last = self._windows_refreshed_at.get(campaign_id)
+        if last is not None and now - last < settings.SCHEDULER_WINDOW_REFRESH_INTERVAL:
+            return
+        updated = await self.planner.refresh_windows(campaign_id)
+        self._windows_refreshed_at[campaign_id] = now
+        if updated:
+            logger.info(f"Ventanas de llamada actualizadas para {updated} contactos de la campaña {campaign_id}")
+
+    async def _dispatch_from_queue(self, campaign: Campaign, capacity: int) -> None:
+        """
+        Reclama llamadas de la cola de marcado de una campaña y las encola en el motor.
+
+        Si la cola de la campaña tiene menos contactos que plazas libres, antes se
+        recarga desde la base de datos con un lote del planificador de marcado.
+
+        Args:
+            campaign (Campaign): Campaña
+            capacity (int): Plazas libres de la campaña en el motor de marcado
+        """
+        if await self.queue.size(campaign.id) < capacity and await self.queue.acquire_refill_lock(campaign.id):
+            try:
+                await self._refresh_windows(campaign)
+                contacts = await self.planner.next_contacts(
+                    campaign.id, campaign.max_retries, settings.DIAL_QUEUE_REFILL_SIZE
+                )
+                if contacts:
+                    await self.planner.reserve(campaign.id, contacts)
+                    await self.queue.enqueue(campaign.id, contacts)
+                    self._prefetch_audio(campaign, contacts)
+                elif not await self.queue.size(campaign.id):
+                    await self._complete_if_finished(campaign)
+            finally:
+                await self.queue.release_refill_lock(campaign.id)
+
+        contacts, expired = await self.queue.claim(campaign.id, capacity)
+        self.pacing.return_unused(capacity - len(contacts))
+        if expired:
+            # Su ventana de llamada cerró mientras esperaban en la cola
+            logger.info(f"{len(expired)} contactos de la campaña {campaign.id} retirados de la cola fuera de su ventana")
+            await self.planner.release(campaign.id, expired)
+        for contact in contacts:
+            self.engine.submit(
+                campaign.id,
+                self._dial_factory(campaign, contact, ack=True),
+                key=f"{campaign.id}:{contact['contact_id']}"
+            )
+
+    def _dial_factory(self, campaign: Campaign, contact: Dict[str, Any], ack: bool = False):
+        async def dial() -> Optional[str]:
+            try:
+                call_id = await self._dial_contact(campaign, contact)
+                if call_id:
+                    self.pacing.record_dial(campaign.id, call_id)
+                return call_id
+            finally:
+                if ack:
+                    # La llamada ya se creó (o se marcó como fallida): se retira de la cola
+                    await self.queue.ack(campaign.id, contact["contact_id"])
+        return dial
+
+    async def _dial_contact(self, campaign: Campaign, contact: Dict[str, Any]) -> Optional[str]:
+        """
+        Crea e inicia la llamada a un contacto de una campaña.
+
+        Se ejecuta dentro del motor de marcado, que limita cuántas llamadas se
+        marcan a la vez. El intento ya está registrado por ``DialPlanner.reserve``.
+
+        Args:
+            campaign (Campaign): Campaña
+            contact (Dict[str, Any]): Contacto devuelto por el planificador de marcado
+
+        Returns:
+            Optional[str]: ID de la llamada iniciada, o None si no pudo iniciarse
+        """
+        contact_id = contact["contact_id"]
+        try:
+            call_data = CallCreate(
+                campaign_id=str(campaign.id),
+                contact_id=contact_id,
+                status=CallStatus.PENDING,
+                script_template=campaign.script_template,
+                phone_number=contact["phone_number"],
+                from_number="+15005550006",  # Número de Twilio (debería venir de la configuración)
+                webhook_url=f"https://api.example.com/webhook/{campaign.id}/{contact_id}",
+                status_callback_url=f"https://api.example.com/callback/{campaign.id}/{contact_id}",
+                max_retries=campaign.max_retries,
+                retry_attempts=int(contact.get("retry_count") or 0)
+            )
+
+            # Crear e iniciar la llamada
+            call = await self.call_service.create_call(call_data)
+            await self.call_service.initiate_outbound_call(str(call.id))
+            return str(call.id)
+
+        except Exception as e:
+            logger.error(f"Error al crear llamada para contacto {contact_id}: {str(e)}")
+            try:
+                await self.planner.mark_failed(campaign.id, contact_id)
+            except Exception as mark_error:
+                logger.error(f"Error al registrar el fallo del contacto {contact_id}: {str(mark_error)}")
+            return None
+
     async def _retry_failed_calls(self) -> None:
         """
-        Reintenta las llamadas fallidas que cumplen con los criterios de reintento.
+        Reintenta las llamadas fallidas cuyo reintento ya venció.
 
-        Verifica el tiempo de espera entre reintentos y reintenta las llamadas fallidas.
+        La fecha del próximo reintento (``next_retry_at``) se calcula en la base de
+        datos con retroceso exponencial al fallar la llamada, de modo que basta una
+        consulta indexada para obtener los reintentos vencidos. Solo se consideran
+        las campañas activas leídas en este mismo ciclo, y los reintentos se marcan
+        a través del motor de marcado respetando las plazas libres de cada campaña.
 
         Returns:
             None
@@ -239,62 +428,58 @@ class CampaignScheduler:
             Exception: Si hay un error al procesar reintentos
         """
         try:
-            # Obtener llamadas fallidas
-            failed_calls = await self.call_service.list_calls(
-                status=CallStatus.FAILED
+            if not self._active_campaigns:
+                return
+
+            due_calls = await self.call_service.list_due_retries(
+                list(self._active_campaigns), limit=settings.SCHEDULER_RETRY_BATCH_SIZE
             )
 
-            now = datetime.now()
-            for call in failed_calls:
-                # Verificar si se puede reintentar
-                if not await self.call_service.is_retry_allowed(call):
+            capacity: Dict[str, int] = {}
+            for call in due_calls:
+                campaign_id = str(call.campaign_id)
+                if campaign_id not in capacity:
+                    capacity[campaign_id] = self.pacing.allowance(campaign_id, self.engine.capacity(campaign_id))
+                if capacity[campaign_id] <= 0:
                     continue
 
-                # Verificar el tiempo de espera entre reintentos
-                campaign = await self.campaign_service.get_campaign(call.campaign_id)
-                last_attempt = datetime.fromisoformat(str(call.updated_at))
-                retry_delay = timedelta(minutes=campaign.retry_delay_minutes)
+                # La clave evita volver a encolar el reintento mientras se marca
+                if self.engine.submit(campaign_id, self._retry_factory(call), key=f"retry:{call.id}"):
+                    capacity[campaign_id] -= 1
 
-                if now - last_attempt < retry_delay:
-                    continue
-
-                # Reintentar la llamada
-                try:
-                    await self.call_service.retry_call(call.id)
-                except Exception as e:
-                    logger.error(f"Error al reintentar llamada {call.id}: {str(e)}")
+            for unused in capacity.values():
+                self.pacing.return_unused(unused)
 
         except Exception as e:
             logger.error(f"Error al procesar reintentos: {str(e)}")
 
+    def _retry_factory(self, call: Call):
+        async def retry() -> Optional[str]:
+            try:
+                retried = await self.call_service.retry_call(str(call.id))
+            except Exception as e:
+                logger.error(f"Error al reintentar llamada {call.id}: {str(e)}")
+                return None
+            if retried.status == CallStatus.FAILED:
+                return None
+            self.pacing.record_dial(call.campaign_id, str(call.id))
+            return str(call.id)
+        return retry
+
     async def update_campaign_stats(self, campaign_id: int) -> None:
         """
         Actualiza las estadísticas de una campaña.
 
-        Obtiene las métricas de llamadas y actualiza las estadísticas de la campaña en la base de datos.
+        Los contadores se mantienen en la base de datos a partir de las llamadas;
+        aquí solo se fuerza su reconciliación.
 
         Args:
             campaign_id (int): ID de la campaña
 
         Returns:
             None
-
-        Raises:
-            Exception: Si hay un error al actualizar estadísticas de campaña
         """
         try:
-            # Obtener métricas de llamadas
-            metrics = await self.call_service.get_call_metrics(campaign_id)
-
-            # Actualizar estadísticas de la campaña
-            await self.campaign_service.update_campaign_stats(
-                campaign_id,
-                {
-                    "total_calls": metrics.total_calls,
-                    "successful_calls": metrics.completed_calls,
-                    "failed_calls": metrics.failed_calls,
-                    "pending_calls": metrics.total_calls - (metrics.completed_calls + metrics.failed_calls)
-                }
-            )
+            await self.call_service.update_campaign_stats(campaign_id)
         except Exception as e:
             logger.error(f"Error al actualizar estadísticas de campaña {campaign_id}: {str(e)}")
@@ -5,6 +5,7 @@ from uuid import UUID
 from fastapi import HTTPException, status
 from app.models.campaign import Campaign, CampaignCreate, CampaignUpdate, CampaignStatus
 from typing import Optional
+from app.utils.pagination import apply_keyset, decode_cursor
 
 class CampaignService:
     """Servicio para gestionar campañas de llamadas automatizadas.
@@ -84,16 +85,21 @@ class CampaignService:
         page_size: int = 10,
         status: Optional[CampaignStatus] = None,
         start_date: Optional[datetime] = None,
-        end_date: Optional[datetime] = None
+        end_date: Optional[datetime] = None,
+        cursor: Optional[str] = None
     ) -> list[Campaign]:
         """Lista campañas con filtros y paginación.
         
+        Si se indica ``cursor`` se pagina por clave ``(created_at, id)`` y se
+        ignora ``page``.
+        
         Args:
             page: Número de página actual (default: 1)
             page_size: Tamaño de página (default: 10)
             status: Filtro por estado de la campaña
             start_date: Filtro por fecha de inicio mínima
             end_date: Filtro por fecha de fin máxima
+            cursor: Token de la página siguiente
             
         Returns:
             list[Campaign]: Lista de campañas que cumplen los criterios
@@ -101,6 +107,7 @@ class CampaignService:
         Raises:
             HTTPException: Si hay un error al listar las campañas
         """
+        keyset = decode_cursor(cursor) if cursor else None
         try:
             query = self.supabase.from_table(self.table_name).select("*")
 
@@ -111,8 +118,11 @@ class CampaignService:
             if end_date:
                 query = query.lte("schedule_end", end_date.isoformat())
 
-            offset = (page - 1) * page_size
-            query = query.range(offset, offset + page_size - 1)
+            if keyset:
+                query = apply_keyset(query, keyset, page_size)
+            else:
+                offset = (page - 1) * page_size
+                query = apply_keyset(query, None, page_size).range(offset, offset + page_size - 1)
 
             result = query.execute()
             if result and result["data"]:
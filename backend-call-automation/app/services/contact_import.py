@@ -0,0 +1,269 @@
+"""
+Importación masiva de contactos desde CSV.
+
+El fichero se procesa en streaming: se lee y valida por bloques en un hilo,
+sin cargarlo entero en memoria, y los contactos válidos se escriben por lotes
+con un número acotado de escrituras simultáneas.
+
+Los contactos se identifican por su teléfono normalizado (E.164). Cada fila se
+asigna a un escritor según su teléfono, de modo que un mismo número siempre lo
+escribe el mismo escritor y en orden: los números repetidos dentro de un lote se
+descartan (gana la última fila) y los que ya existen se actualizan en lugar de
+duplicarse. Las escrituras usan ``on conflict (phone_digits)`` sobre un índice
+único, por lo que tampoco se duplican con importaciones o altas simultáneas.
+
+El estado de cada importación se conserva en memoria del proceso durante
+``settings.CONTACT_IMPORT_JOB_TTL`` segundos.
+"""
+import asyncio
+import csv
+import logging
+import os
+import shutil
+import tempfile
+import uuid
+import zlib
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from fastapi import HTTPException, UploadFile, status
+from pydantic import ValidationError
+
+from app.config.settings import settings
+from app.config.supabase import supabase_client
+from app.models.contact import ContactCreate, ContactImportJob, ContactImportStatus
+from app.utils.phone import normalize_phone, phone_digits
+from app.utils.supabase_helpers import execute_query
+from app.utils.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class ContactImportService:
+    """
+    Servicio de importación masiva de contactos.
+
+    Attributes:
+        supabase: Cliente de Supabase
+        batch_size: Contactos por escritura
+        concurrency: Escrituras simultáneas por importación
+        parse_rows: Filas validadas por bloque
+    """
+
+    def __init__(
+        self,
+        supabase=None,
+        batch_size: int = settings.CONTACT_IMPORT_BATCH_SIZE,
+        concurrency: int = settings.CONTACT_IMPORT_CONCURRENCY,
+        parse_rows: int = settings.CONTACT_IMPORT_PARSE_ROWS
+    ):
+        """
+        Inicializa el servicio.
+
+        Args:
+            supabase: Cliente de Supabase (por defecto, el cliente global)
+            batch_size: Contactos por escritura
+            concurrency: Escrituras simultáneas por importación
+            parse_rows: Filas validadas por bloque
+        """
+        self.supabase = supabase or supabase_client
+        self.batch_size = max(1, batch_size)
+        self.concurrency = max(1, concurrency)
+        self.parse_rows = max(1, parse_rows)
+        self.jobs: TTLCache[str, ContactImportJob] = TTLCache(ttl=settings.CONTACT_IMPORT_JOB_TTL)
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def start_import(self, file: UploadFile) -> ContactImportJob:
+        """
+        Inicia la importación de un fichero en segundo plano.
+
+        Args:
+            file: Fichero CSV subido
+
+        Returns:
+            ContactImportJob: Estado inicial de la importación
+        """
+        job, path = await self._prepare(file)
+        task = asyncio.create_task(self.run(job, path))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    async def import_file(self, file: UploadFile) -> ContactImportJob:
+        """
+        Importa un fichero y espera a que termine.
+
+        Args:
+            file: Fichero CSV subido
+
+        Returns:
+            ContactImportJob: Estado final de la importación
+        """
+        job, path = await self._prepare(file)
+        await self.run(job, path)
+        return job
+
+    def get_job(self, job_id: str) -> ContactImportJob:
+        """
+        Obtiene el estado de una importación.
+
+        Args:
+            job_id: ID de la importación
+
+        Returns:
+            ContactImportJob: Estado de la importación
+
+        Raises:
+            HTTPException: Si la importación no existe o ya expiró
+        """
+        job = self.jobs.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Importación no encontrada")
+        return job
+
+    async def stop(self) -> None:
+        """Cancela las importaciones en curso."""
+        for task in list(self._tasks):
+            task.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        logger.info("Importaciones de contactos detenidas")
+
+    async def _prepare(self, file: UploadFile) -> Tuple[ContactImportJob, str]:
+        # La subida se copia a un fichero propio porque se cierra al terminar la petición
+        fd, path = tempfile.mkstemp(prefix="contact_import_", suffix=".csv")
+        with os.fdopen(fd, "wb") as target:
+            await asyncio.to_thread(shutil.copyfileobj, file.file, target)
+
+        job = ContactImportJob(id=str(uuid.uuid4()), created_at=datetime.now(timezone.utc))
+        self.jobs[job.id] = job
+        return job, path
+
+    async def run(self, job: ContactImportJob, path: str) -> None:
+        """
+        Procesa un fichero CSV y actualiza el estado de la importación.
+
+        Args:
+            job: Estado de la importación
+            path: Ruta del fichero CSV (se elimina al terminar)
+        """
+        job.status = ContactImportStatus.RUNNING
+        logger.info(f"Importación de contactos {job.id} iniciada")
+        try:
+            await self._process(job, path)
+            job.status = ContactImportStatus.COMPLETED
+            logger.info(
+                f"Importación de contactos {job.id} completada: {job.imported} nuevos, "
+                f"{job.updated} actualizados, {job.duplicates} duplicados, {job.errors} errores"
+            )
+        except asyncio.CancelledError:
+            job.status = ContactImportStatus.FAILED
+            job.error_message = "Importación cancelada"
+            raise
+        except Exception as e:
+            job.status = ContactImportStatus.FAILED
+            job.error_message = str(e)
+            logger.error(f"Error en la importación de contactos {job.id}: {str(e)}")
+        finally:
+            job.finished_at = datetime.now(timezone.utc)
+            os.unlink(path)
+            if job.imported:
+                # Importación diferida para evitar el ciclo con contact_service
+                from app.services.contact_service import contact_count_cache
+
+                contact_count_cache.clear()
+
+    async def _process(self, job: ContactImportJob, path: str) -> None:
+        queues: List[asyncio.Queue] = [asyncio.Queue(maxsize=2) for _ in range(self.concurrency)]
+        writers = [asyncio.create_task(self._writer(job, queue)) for queue in queues]
+        buffers: List[Dict[str, Dict[str, Any]]] = [{} for _ in queues]
+
+        try:
+            with open(path, newline="", encoding="utf-8-sig") as file:
+                reader = csv.DictReader(file)
+                while True:
+                    rows, read, errors = await asyncio.to_thread(self._parse_block, reader)
+                    if not read:
+                        break
+                    job.total += read
+                    job.errors += errors
+
+                    for digits, row in rows:
+                        index = zlib.crc32(digits.encode()) % len(queues)
+                        buffer = buffers[index]
+                        if digits in buffer:
+                            job.duplicates += 1
+                        buffer[digits] = row
+                        if len(buffer) >= self.batch_size:
+                            await queues[index].put(buffer)
+                            buffers[index] = {}
+
+            for index, buffer in enumerate(buffers):
+                if buffer:
+                    await queues[index].put(buffer)
+        finally:
+            for queue in queues:
+                await queue.put(None)
+            await asyncio.gather(*writers)
+
+    def _parse_block(self, reader: csv.DictReader) -> Tuple[List[Tuple[str, Dict[str, Any]]], int, int]:
+        """Lee y valida un bloque de filas (se ejecuta en un hilo)."""
+        rows: List[Tuple[str, Dict[str, Any]]] = []
+        read = 0
+        errors = 0
+        for row in reader:
+            read += 1
+            try:
+                if not row.get('name') or not row.get('phone_number'):
+                    raise ValueError("Faltan campos obligatorios")
+                contact = ContactCreate(
+                    name=row['name'],
+                    phone_number=normalize_phone(row['phone_number']),
+                    email=row.get('email') or None,
+                    notes=row.get('notes') or None,
+                    timezone=row.get('timezone') or None,
+                    tags=[tag.strip() for tag in row['tags'].split(',') if tag.strip()] if row.get('tags') else []
+                )
+                rows.append((phone_digits(contact.phone_number), contact.model_dump()))
+            except (ValueError, ValidationError):
+                errors += 1
+            if read >= self.parse_rows:
+                break
+        return rows, read, errors
+
+    async def _writer(self, job: ContactImportJob, queue: asyncio.Queue) -> None:
+        while True:
+            batch: Optional[Dict[str, Dict[str, Any]]] = await queue.get()
+            if batch is None:
+                return
+            try:
+                await self._write_batch(job, batch)
+            except Exception as e:
+                job.errors += len(batch)
+                logger.error(f"Error al escribir {len(batch)} contactos de la importación {job.id}: {str(e)}")
+
+    async def _write_batch(self, job: ContactImportJob, batch: Dict[str, Dict[str, Any]]) -> None:
+        # Alta de los teléfonos nuevos; los existentes se ignoran gracias al índice único
+        inserted = await execute_query(
+            self.supabase.table('contacts').upsert(
+                list(batch.values()), on_conflict='phone_digits', ignore_duplicates=True
+            ),
+            in_thread=True
+        )
+        new_digits = {
+            row.get('phone_digits') or phone_digits(row['phone_number'])
+            for row in inserted.data or []
+        }
+        job.imported += len(new_digits)
+
+        existing_rows = [row for digits, row in batch.items() if digits not in new_digits]
+        if existing_rows:
+            await execute_query(
+                self.supabase.table('contacts').upsert(existing_rows, on_conflict='phone_digits'),
+                in_thread=True
+            )
+            job.updated += len(existing_rows)
+
+
+# Instancia global del servicio de importación
+contact_importer = ContactImportService()
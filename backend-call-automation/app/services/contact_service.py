@@ -15,11 +15,30 @@ Dependencies:
 
 import csv
 import io
-from typing import List, Optional, Tuple, Dict, Any
+import logging
+import zlib
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 from fastapi import HTTPException, UploadFile, status
-from app.models.contact import Contact, ContactCreate, ContactUpdate, ContactList, ContactListCreate
+from app.models.contact import Contact, ContactCreate, ContactUpdate, ContactList, ContactListCreate, ContactImportStatus
+from app.services.contact_import import ContactImportService
+from app.config.settings import settings
+from app.utils.pagination import apply_keyset, decode_cursor, iter_keyset_pages
+from app.utils.phone import normalize_phone
+from app.utils.ttl_cache import TTLCache
 from supabase import Client as SupabaseClient
 
+logger = logging.getLogger(__name__)
+
+CONTACT_EXPORT_FIELDS = ['id', 'name', 'phone_number', 'email', 'notes', 'tags', 'created_at', 'updated_at']
+# Filas por consulta; no debe superar el máximo de filas configurado en PostgREST
+CONTACT_EXPORT_PAGE_SIZE = 1000
+
+# Totales del listado por modo de conteo y combinación de filtros
+contact_count_cache: TTLCache = TTLCache(
+    ttl=settings.CONTACT_COUNT_CACHE_TTL,
+    maxsize=settings.CONTACT_COUNT_CACHE_SIZE
+)
+
 class ContactService:
     """
     Servicio para gestionar operaciones relacionadas con contactos.
@@ -56,10 +75,23 @@ class ContactService:
         Raises:
             HTTPException: Si hay un error al crear el contacto
         """
+        data = contact_data.model_dump()
         try:
-            result = self.supabase.table('contacts').insert(contact_data.model_dump()).execute()
+            data['phone_number'] = normalize_phone(data['phone_number'])
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+        try:
+            result = self.supabase.table('contacts').insert(data).execute()
+            contact_count_cache.clear()
             return Contact(**result.data[0])
         except Exception as e:
+            if getattr(e, 'code', None) == '23505':
+                # Índice único de phone_digits
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="Ya existe un contacto con ese teléfono"
+                )
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Error al crear el contacto: {str(e)}"
@@ -99,46 +131,76 @@ class ContactService:
         skip: int = 0,
         limit: int = 10,
         search: Optional[str] = None,
-        tags: Optional[List[str]] = None
-    ) -> Tuple[List[Contact], int]:
+        tags: Optional[List[str]] = None,
+        cursor: Optional[str] = None,
+        exact_count: bool = False
+    ) -> Tuple[List[Contact], Optional[int]]:
         """
         Lista los contactos con opciones de filtrado y paginación.
 
+        La página y el total se obtienen en una sola consulta. Por defecto el
+        total es estimado (``settings.CONTACT_COUNT_MODE``), lo que evita
+        recorrer la tabla en listados grandes, y se reutiliza durante unos
+        segundos para la misma combinación de filtros. Si se indica ``cursor``
+        se pagina por clave ``(created_at, id)``, se ignora ``skip`` y no se
+        calcula el total.
+
         Args:
             skip (int): Número de registros a saltar (paginación)
             limit (int): Número máximo de registros a devolver
             search (Optional[str]): Texto para buscar en nombre, email o teléfono
             tags (Optional[List[str]]): Lista de etiquetas para filtrar
+            cursor (Optional[str]): Token de la página siguiente
+            exact_count (bool): Calcula el total exacto en lugar del estimado
 
         Returns:
-            Tuple[List[Contact], int]: Lista de contactos y total de registros
+            Tuple[List[Contact], Optional[int]]: Lista de contactos y total de registros
+            (None en modo cursor)
 
         Raises:
             HTTPException: Si hay un error al listar los contactos
         """
+        if cursor and search:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="La paginación por cursor no admite búsqueda; los resultados se ordenan por relevancia"
+            )
+        keyset = decode_cursor(cursor) if cursor else None
+        count_mode = "exact" if exact_count else settings.CONTACT_COUNT_MODE
+        cache_key = (count_mode, search or "", tuple(sorted(tags or [])))
+        cached_total = None if keyset else contact_count_cache.get(cache_key)
         try:
-            # Iniciar la consulta
-            query = self.supabase.table('contacts').select('*', count='exact')
+            # Iniciar la consulta; el total solo se pide si no está en caché
+            count = None if keyset or cached_total is not None else count_mode
 
-            # Aplicar filtros
             if search:
-                query = query.or_(
-                    f"name.ilike.%{search}%,email.ilike.%{search}%,phone_number.ilike.%{search}%"
+                # Búsqueda indexada, ya ordenada por relevancia
+                query = self.supabase.rpc(
+                    'search_contacts',
+                    {'p_query': search, 'p_tags': tags or None},
+                    count=count
                 )
+                result = query.range(skip, skip + limit - 1).execute()
+            else:
+                query = self.supabase.table('contacts').select('*', count=count)
 
-            if tags and len(tags) > 0:
-                # Filtrar por tags (esto depende de cómo estén almacenados los tags)
-                for tag in tags:
-                    query = query.contains('tags', [tag])
-
-            # Obtener el total de registros
-            count_result = query.execute()
-            total = count_result.count if hasattr(count_result, 'count') else 0
+                if tags and len(tags) > 0:
+                    query = query.contains('tags', tags)
 
-            # Aplicar paginación
-            result = query.range(skip, skip + limit - 1).execute()
+                # Aplicar paginación
+                if keyset:
+                    result = apply_keyset(query, keyset, limit).execute()
+                else:
+                    result = apply_keyset(query, None, limit).range(skip, skip + limit - 1).execute()
 
             contacts = [Contact(**contact) for contact in result.data]
+            if keyset:
+                total = None
+            elif cached_total is not None:
+                total = cached_total
+            else:
+                total = getattr(result, 'count', None) or 0
+                contact_count_cache[cache_key] = total
             return contacts, total
         except Exception as e:
             raise HTTPException(
@@ -150,6 +212,10 @@ class ContactService:
         """
         Busca contactos por nombre, email o número de teléfono.
 
+        Usa la función ``search_contacts`` de la base de datos, que combina
+        texto completo, trigramas y prefijo del teléfono normalizado, y
+        devuelve los resultados ordenados por relevancia.
+
         Args:
             query (str): Texto a buscar
             limit (int): Número máximo de resultados
@@ -158,9 +224,7 @@ class ContactService:
             List[Contact]: Lista de contactos que coinciden con la búsqueda
         """
         try:
-            result = self.supabase.table('contacts').select('*').or_(
-                f"name.ilike.%{query}%,email.ilike.%{query}%,phone_number.ilike.%{query}%"
-            ).limit(limit).execute()
+            result = self.supabase.rpc('search_contacts', {'p_query': query}).limit(limit).execute()
 
             return [Contact(**contact) for contact in result.data]
         except Exception as e:
@@ -186,6 +250,11 @@ class ContactService:
         try:
             # Filtrar campos None para no sobrescribir con valores nulos
             update_data = {k: v for k, v in contact_data.model_dump().items() if v is not None}
+            if 'phone_number' in update_data:
+                try:
+                    update_data['phone_number'] = normalize_phone(update_data['phone_number'])
+                except ValueError as e:
+                    raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
             result = self.supabase.table('contacts').update(update_data).eq('id', contact_id).execute()
 
@@ -195,6 +264,8 @@ class ContactService:
                     detail="Contacto no encontrado"
                 )
 
+            # Los totales en caché dependen de los campos buscables y de las etiquetas
+            contact_count_cache.clear()
             return Contact(**result.data[0])
         except HTTPException:
             raise
@@ -223,6 +294,7 @@ class ContactService:
             if not result.data:
                 return False
 
+            contact_count_cache.clear()
             return True
         except Exception as e:
             raise HTTPException(
@@ -232,121 +304,126 @@ class ContactService:
 
     async def import_contacts_from_csv(self, file: UploadFile) -> Dict[str, int]:
         """
-        Importa contactos desde un archivo CSV.
+        Importa contactos desde un archivo CSV y espera a que termine.
+
+        El fichero se procesa en streaming con ``ContactImportService``; para
+        ficheros grandes conviene iniciar la importación en segundo plano con
+        ``contact_importer.start_import`` y consultar su estado.
 
         Args:
             file (UploadFile): Archivo CSV con los contactos a importar
 
         Returns:
-            Dict[str, int]: Estadísticas de importación (contactos importados, errores)
+            Dict[str, int]: Estadísticas de importación (filas, nuevos, actualizados, duplicados, errores)
 
         Raises:
             HTTPException: Si hay un error en la importación
         """
-        try:
-            # Leer el archivo CSV
-            contents = await file.read()
-            csv_file = io.StringIO(contents.decode('utf-8'))
-            csv_reader = csv.DictReader(csv_file)
-
-            # Estadísticas de importación
-            stats = {
-                "total": 0,
-                "imported": 0,
-                "errors": 0
-            }
-
-            # Procesar cada fila
-            contacts_to_import = []
-            for row in csv_reader:
-                stats["total"] += 1
-
-                try:
-                    # Validar datos mínimos
-                    if not row.get('name') or not row.get('phone_number'):
-                        stats["errors"] += 1
-                        continue
-
-                    # Crear objeto de contacto
-                    contact_data = {
-                        "name": row.get('name'),
-                        "phone_number": row.get('phone_number'),
-                        "email": row.get('email', None),
-                        "notes": row.get('notes', None),
-                        "tags": row.get('tags', '').split(',') if row.get('tags') else []
-                    }
-
-                    # Validar con Pydantic
-                    contact = ContactCreate(**contact_data)
-                    contacts_to_import.append(contact.model_dump())
-
-                except Exception:
-                    stats["errors"] += 1
-
-            # Importar contactos en lotes de 100
-            batch_size = 100
-            for i in range(0, len(contacts_to_import), batch_size):
-                batch = contacts_to_import[i:i+batch_size]
-                result = self.supabase.table('contacts').insert(batch).execute()
-                stats["imported"] += len(result.data)
-
-            return stats
-
-        except Exception as e:
+        job = await ContactImportService(self.supabase).import_file(file)
+        if job.status == ContactImportStatus.FAILED:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Error al importar contactos: {str(e)}"
+                detail=f"Error al importar contactos: {job.error_message}"
             )
 
-    async def export_contacts_to_csv(self, list_id: Optional[str] = None) -> str:
+        return {
+            "total": job.total,
+            "imported": job.imported,
+            "updated": job.updated,
+            "duplicates": job.duplicates,
+            "errors": job.errors
+        }
+
+    async def export_contacts_to_csv(
+        self,
+        list_id: Optional[str] = None,
+        compress: bool = False
+    ) -> AsyncIterator[bytes]:
         """
-        Exporta contactos a formato CSV.
+        Exporta contactos a formato CSV en streaming.
+
+        Los contactos se leen por páginas (paginación por clave) y cada página
+        se escribe en cuanto llega, por lo que la memoria no depende del número
+        de contactos. El filtro por lista se resuelve en la base de datos con un
+        join sobre ``contact_list_contacts``.
+
+        La primera página se lee antes de devolver el iterador, de modo que un
+        error en ella todavía puede devolverse como respuesta de error. Un error
+        en una página posterior, con la respuesta ya empezada, interrumpe la
+        descarga.
 
         Args:
             list_id (Optional[str]): ID de la lista de contactos (opcional)
+            compress (bool): Comprime la salida con gzip
 
         Returns:
-            str: Contenido del archivo CSV
+            AsyncIterator[bytes]: Bloques del archivo CSV
 
         Raises:
-            HTTPException: Si hay un error en la exportación
+            HTTPException: Si hay un error al leer la primera página
         """
+        chunks = self._iter_contacts_csv(list_id, compress)
         try:
-            # Obtener contactos
+            first = await chunks.__anext__()
+        except StopAsyncIteration:
+            first = b''
+        except Exception as e:
+            logger.error(f"Error al exportar contactos: {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error al exportar contactos: {str(e)}"
+            )
+
+        async def stream() -> AsyncIterator[bytes]:
+            if first:
+                yield first
+            try:
+                async for chunk in chunks:
+                    yield chunk
+            except Exception as e:
+                logger.error(f"Exportación de contactos interrumpida: {str(e)}")
+                raise
+
+        return stream()
+
+    async def _iter_contacts_csv(self, list_id: Optional[str], compress: bool) -> AsyncIterator[bytes]:
+        columns = ','.join(CONTACT_EXPORT_FIELDS)
+
+        def build_query():
             if list_id:
-                # Obtener contactos de una lista específica
-                result = self.supabase.table('contact_list_contacts')\
-                    .select('contacts(*)')\
-                    .eq('list_id', list_id)\
-                    .execute()
-                contacts = [contact['contacts'] for contact in result.data]
-            else:
-                # Obtener todos los contactos
-                result = self.supabase.table('contacts').select('*').execute()
-                contacts = result.data
+                return self.supabase.table('contacts')\
+                    .select(f'{columns},contact_list_contacts!inner(contact_list_id)')\
+                    .eq('contact_list_contacts.contact_list_id', list_id)
+            return self.supabase.table('contacts').select(columns)
+
+        output = io.StringIO()
+        writer = csv.DictWriter(output, fieldnames=CONTACT_EXPORT_FIELDS, extrasaction='ignore')
+        compressor = zlib.compressobj(wbits=31) if compress else None
 
-            # Crear archivo CSV en memoria
-            output = io.StringIO()
-            fieldnames = ['id', 'name', 'phone_number', 'email', 'notes', 'tags', 'created_at', 'updated_at']
-            writer = csv.DictWriter(output, fieldnames=fieldnames)
+        def flush() -> bytes:
+            data = output.getvalue().encode('utf-8')
+            output.seek(0)
+            output.truncate()
+            return compressor.compress(data) if compressor else data
 
-            # Escribir encabezado
-            writer.writeheader()
+        # El encabezado se envía con la primera página
+        writer.writeheader()
 
-            # Escribir filas
+        async for contacts in iter_keyset_pages(build_query, page_size=CONTACT_EXPORT_PAGE_SIZE, in_thread=True):
             for contact in contacts:
                 # Convertir tags a string si es una lista
-                if 'tags' in contact and isinstance(contact['tags'], list):
+                if isinstance(contact.get('tags'), list):
                     contact['tags'] = ','.join(contact['tags'])
                 writer.writerow(contact)
-
-            return output.getvalue()
-
-        except Exception as e:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Error al exportar contactos: {str(e)}"
-            )
+            chunk = flush()
+            if chunk:
+                yield chunk
+
+        chunk = flush()
+        if compressor:
+            chunk += compressor.flush()
+        if chunk:
+            yield chunk
 
     async def list_contact_lists(self) -> List[ContactList]:
         """
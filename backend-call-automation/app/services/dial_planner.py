@@ -0,0 +1,187 @@
+"""
+Planificación por lotes de las llamadas de una campaña.
+
+En cada ciclo del planificador se obtienen los siguientes contactos a llamar de
+una campaña con una sola consulta (la función RPC ``next_dialable_contacts``,
+que cruza los contactos de sus listas con ``campaign_contacts`` y descarta los
+completados, los que tienen una llamada en curso y los que agotaron sus
+intentos) y se registra el intento de todos ellos con un único upsert. El
+trabajo de cada ciclo depende del tamaño del lote y no del número de contactos
+de la campaña.
+
+Solo se devuelven contactos dentro de su ventana de llamada: el horario de la
+campaña (``calling_hours_start``/``calling_hours_end``) en la zona horaria del
+contacto, deducida de sus datos o de su prefijo telefónico. Las ventanas se
+precalculan en ``campaign_contacts`` (``eligible_from``/``eligible_until``, con
+índice) mediante ``refresh_windows``, que solo recalcula las ya vencidas.
+"""
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+from app.config.settings import settings
+from app.models.call import CallStatus
+from app.utils.supabase_helpers import execute_query
+
+logger = logging.getLogger(__name__)
+
+
+class DialPlanner:
+    """
+    Selecciona y reserva los contactos a llamar de cada campaña.
+
+    Attributes:
+        supabase: Cliente de Supabase
+    """
+
+    def __init__(self, supabase_client=None):
+        """
+        Inicializa el planificador de marcado.
+
+        Args:
+            supabase_client: Cliente de Supabase
+        """
+        self.supabase = supabase_client
+
+    async def refresh_windows(self, campaign_id: str) -> int:
+        """
+        Calcula la siguiente ventana de llamada de los contactos de una campaña
+        que no tienen una vigente.
+
+        Args:
+            campaign_id: ID de la campaña
+
+        Returns:
+            int: Contactos cuya ventana se actualizó
+        """
+        result = await execute_query(
+            self.supabase.rpc("refresh_calling_windows", {
+                "p_campaign_id": str(campaign_id),
+                "p_default_timezone": settings.SCHEDULER_DEFAULT_TIMEZONE
+            }),
+            in_thread=True
+        )
+        return int(result.data or 0)
+
+    async def next_contacts(self, campaign_id: str, max_retries: int, limit: int) -> List[Dict[str, Any]]:
+        """
+        Obtiene los siguientes contactos a llamar de una campaña que están ahora
+        dentro de su ventana de llamada.
+
+        Args:
+            campaign_id: ID de la campaña
+            max_retries: Máximo de intentos por contacto
+            limit: Número máximo de contactos
+
+        Returns:
+            List[Dict[str, Any]]: Filas con ``contact_id``, ``name``, ``phone_number``,
+            ``retry_count``, ``priority`` y ``eligible_until``
+        """
+        if limit <= 0:
+            return []
+        result = await execute_query(
+            self.supabase.rpc("next_dialable_contacts", {
+                "p_campaign_id": str(campaign_id),
+                "p_max_retries": max_retries,
+                "p_limit": limit
+            }),
+            in_thread=True
+        )
+        return result.data or []
+
+    async def has_remaining(self, campaign_id: str, max_retries: int) -> bool:
+        """
+        Indica si a una campaña le quedan contactos por llamar, ahora o más
+        adelante (fuera de su ventana, en curso o pendientes de reintento).
+
+        Args:
+            campaign_id: ID de la campaña
+            max_retries: Máximo de intentos por contacto
+
+        Returns:
+            bool: True si quedan contactos por llamar
+        """
+        result = await execute_query(
+            self.supabase.rpc("campaign_has_remaining_contacts", {
+                "p_campaign_id": str(campaign_id),
+                "p_max_retries": max_retries
+            }),
+            in_thread=True
+        )
+        return bool(result.data)
+
+    async def reserve(self, campaign_id: str, contacts: List[Dict[str, Any]]) -> None:
+        """
+        Registra el intento de llamada de varios contactos en un único upsert.
+
+        Los contactos quedan en estado ``pending`` y con un intento más, de modo
+        que ``next_contacts`` no vuelve a devolverlos mientras se llaman.
+
+        Args:
+            campaign_id: ID de la campaña
+            contacts: Filas devueltas por ``next_contacts``
+        """
+        if not contacts:
+            return
+        called_at = datetime.now(timezone.utc).isoformat()
+        rows = [
+            {
+                "campaign_id": str(campaign_id),
+                "contact_id": str(contact["contact_id"]),
+                "called_at": called_at,
+                "call_status": CallStatus.PENDING.value,
+                "retry_count": int(contact.get("retry_count") or 0) + 1
+            }
+            for contact in contacts
+        ]
+        await execute_query(
+            self.supabase.table("campaign_contacts").upsert(rows, on_conflict="campaign_id,contact_id"),
+            in_thread=True
+        )
+
+    async def release(self, campaign_id: str, contacts: List[Dict[str, Any]]) -> None:
+        """
+        Deshace la reserva de contactos que no llegaron a llamarse.
+
+        Se usa con los contactos de la cola de marcado cuya ventana de llamada
+        cerró antes de reclamarlos: recuperan su número de intentos y quedan sin
+        estado, de modo que se vuelven a planificar en su siguiente ventana.
+
+        Args:
+            campaign_id: ID de la campaña
+            contacts: Filas devueltas por ``next_contacts`` (con el ``retry_count`` previo a la reserva)
+        """
+        if not contacts:
+            return
+        rows = [
+            {
+                "campaign_id": str(campaign_id),
+                "contact_id": str(contact["contact_id"]),
+                "call_status": None,
+                "retry_count": int(contact.get("retry_count") or 0)
+            }
+            for contact in contacts
+        ]
+        await execute_query(
+            self.supabase.table("campaign_contacts").upsert(rows, on_conflict="campaign_id,contact_id"),
+            in_thread=True
+        )
+
+    async def mark_failed(self, campaign_id: str, contact_id: str) -> None:
+        """
+        Libera el intento de un contacto cuya llamada no llegó a iniciarse.
+
+        El intento sigue contando en ``retry_count``, pero el contacto vuelve a
+        ofrecerse: sin llamada creada no hay ``next_retry_at`` que lo reintente.
+
+        Args:
+            campaign_id: ID de la campaña
+            contact_id: ID del contacto
+        """
+        await execute_query(
+            self.supabase.table("campaign_contacts")
+            .update({"call_status": None})
+            .eq("campaign_id", str(campaign_id))
+            .eq("contact_id", str(contact_id)),
+            in_thread=True
+        )
@@ -0,0 +1,349 @@
+"""
+Cola de marcado persistente en Redis.
+
+Cada campaña tiene un conjunto ordenado con los contactos pendientes de llamar,
+puntuados por el instante a partir del cual pueden llamarse; cada punto de
+prioridad del contacto adelanta ese instante ``DIAL_QUEUE_PRIORITY_STEP``
+segundos, de modo que los contactos prioritarios salen antes. Un segundo
+conjunto ordenado (``ready``) guarda, por campaña, la puntuación de su primer
+contacto, lo que permite saber sin recorrer las colas qué campañas tienen
+llamadas disponibles y cuándo vence la siguiente.
+
+Junto a cada contacto se guarda su puntuación y el fin de su ventana de llamada
+(``eligible_until`` del planificador, que ya tiene en cuenta el fin de la
+campaña). Al reclamar, los contactos cuya ventana ya cerró no se marcan: se
+retiran de la cola y se devuelven aparte para que el planificador los libere y
+los vuelva a planificar en su siguiente ventana.
+
+Varios planificadores pueden compartir la cola: las llamadas se reclaman con
+scripts Lua atómicos que las mueven a un conjunto de reservas (``leases``) con
+vencimiento. Una reserva se confirma (``ack``) cuando la llamada ya se creó; si
+el planificador que la reclamó se cae, la reserva vence y la llamada vuelve a
+la cola de su campaña. Ningún contacto puede estar a la vez en la cola y
+reservado, por lo que no se marca dos veces. Una reserva vencida vuelve a la
+cola con su puntuación original.
+"""
+import json
+import logging
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Añade contactos a la cola de una campaña salvo que ya estén en ella o reservados;
+# en KEYS[5] se guarda "puntuación|fin de la ventana" de cada contacto
+_ENQUEUE = """
+local added = 0
+for i = 1, #ARGV - 1, 4 do
+    local contact = ARGV[i + 1]
+    if not redis.call('ZSCORE', KEYS[4], ARGV[1] .. '|' .. contact) then
+        if redis.call('ZADD', KEYS[1], 'NX', ARGV[i + 2], contact) == 1 then
+            redis.call('HSET', KEYS[2], contact, ARGV[i + 3])
+            redis.call('HSET', KEYS[5], contact, ARGV[i + 2] .. '|' .. ARGV[i + 4])
+            added = added + 1
+        end
+    end
+end
+local first = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+if first[2] then
+    redis.call('ZADD', KEYS[3], first[2], ARGV[1])
+end
+return added
+"""
+
+# Reclama hasta N contactos vencidos de una campaña y los reserva; retira los
+# contactos cuya ventana de llamada ya cerró y los devuelve aparte
+_CLAIM = """
+local limit = tonumber(ARGV[3])
+local now = tonumber(ARGV[2])
+local claimed = {}
+local expired = {}
+local count = 0
+while count < limit do
+    local contacts = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[2], 'LIMIT', 0, limit - count)
+    if #contacts == 0 then
+        break
+    end
+    for _, contact in ipairs(contacts) do
+        local payload = redis.call('HGET', KEYS[2], contact) or '{}'
+        local meta = redis.call('HGET', KEYS[6], contact) or ''
+        local until_at = tonumber(string.sub(meta, (string.find(meta, '|', 1, true) or #meta) + 1))
+        redis.call('ZREM', KEYS[1], contact)
+        if until_at and until_at <= now then
+            redis.call('HDEL', KEYS[2], contact)
+            redis.call('HDEL', KEYS[6], contact)
+            table.insert(expired, payload)
+        else
+            local member = ARGV[1] .. '|' .. contact
+            redis.call('ZADD', KEYS[4], ARGV[4], member)
+            redis.call('HSET', KEYS[5], member, ARGV[5])
+            table.insert(claimed, contact)
+            table.insert(claimed, payload)
+            count = count + 1
+        end
+    end
+end
+local first = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+if first[2] then
+    redis.call('ZADD', KEYS[3], first[2], ARGV[1])
+else
+    redis.call('ZREM', KEYS[3], ARGV[1])
+end
+return {claimed, expired}
+"""
+
+# Confirma una reserva si sigue perteneciendo a este planificador
+_ACK = """
+local member = ARGV[1] .. '|' .. ARGV[2]
+if redis.call('HGET', KEYS[2], member) ~= ARGV[3] then
+    return 0
+end
+redis.call('ZREM', KEYS[1], member)
+redis.call('HDEL', KEYS[2], member)
+redis.call('HDEL', KEYS[3], ARGV[2])
+redis.call('HDEL', KEYS[4], ARGV[2])
+return 1
+"""
+
+# Devuelve a la cola las reservas vencidas, con su puntuación original
+_REQUEUE = """
+local expired = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, tonumber(ARGV[3]))
+for _, member in ipairs(expired) do
+    local sep = string.find(member, '|', 1, true)
+    local campaign = string.sub(member, 1, sep - 1)
+    local contact = string.sub(member, sep + 1)
+    local queue = ARGV[2] .. ':q:' .. campaign
+    redis.call('ZREM', KEYS[1], member)
+    redis.call('HDEL', KEYS[2], member)
+    if redis.call('HEXISTS', ARGV[2] .. ':d:' .. campaign, contact) == 1 then
+        local meta = redis.call('HGET', ARGV[2] .. ':m:' .. campaign, contact) or ''
+        local score = tonumber(string.sub(meta, 1, (string.find(meta, '|', 1, true) or #meta + 1) - 1)) or tonumber(ARGV[1])
+        redis.call('ZADD', queue, score, contact)
+        local first = redis.call('ZRANGE', queue, 0, 0, 'WITHSCORES')
+        redis.call('ZADD', KEYS[3], first[2], campaign)
+    end
+end
+return #expired
+"""
+
+
+def _epoch(value: Any) -> Optional[float]:
+    """Convierte un instante (epoch, ``datetime`` o fecha ISO) a segundos desde epoch."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return datetime.fromisoformat(str(value)).timestamp()
+
+
+class DialQueue:
+    """
+    Cola de marcado compartida entre planificadores.
+
+    Attributes:
+        redis: Cliente asíncrono de Redis
+        prefix: Prefijo de las claves de la cola
+        lease_seconds: Segundos que dura la reserva de una llamada reclamada
+        worker_id: Identificador de este planificador en las reservas
+    """
+
+    def __init__(
+        self,
+        redis=None,
+        prefix: str = "dialq",
+        lease_seconds: int = settings.DIAL_QUEUE_LEASE_SECONDS,
+        priority_step: int = settings.DIAL_QUEUE_PRIORITY_STEP,
+        worker_id: Optional[str] = None
+    ):
+        """
+        Inicializa la cola.
+
+        Args:
+            redis: Cliente asíncrono de Redis (por defecto, uno conectado a ``settings.REDIS_URL``)
+            prefix: Prefijo de las claves de la cola
+            lease_seconds: Segundos que dura la reserva de una llamada reclamada
+            priority_step: Segundos que adelanta cada punto de prioridad
+            worker_id: Identificador de este planificador (por defecto, uno aleatorio)
+        """
+        if redis is None:
+            from redis.asyncio import Redis
+
+            redis = Redis.from_url(settings.REDIS_URL)
+        self.redis = redis
+        self.prefix = prefix
+        self.lease_seconds = lease_seconds
+        self.priority_step = priority_step
+        self.worker_id = worker_id or uuid.uuid4().hex
+
+    def _queue_key(self, campaign_id: str) -> str:
+        return f"{self.prefix}:q:{campaign_id}"
+
+    def _payload_key(self, campaign_id: str) -> str:
+        return f"{self.prefix}:d:{campaign_id}"
+
+    def _meta_key(self, campaign_id: str) -> str:
+        return f"{self.prefix}:m:{campaign_id}"
+
+    @property
+    def _ready_key(self) -> str:
+        return f"{self.prefix}:ready"
+
+    @property
+    def _leases_key(self) -> str:
+        return f"{self.prefix}:leases"
+
+    @property
+    def _owners_key(self) -> str:
+        return f"{self.prefix}:owners"
+
+    def score(self, eligible_at: float, priority: int = 0) -> float:
+        """
+        Puntuación de un contacto en la cola.
+
+        Args:
+            eligible_at: Instante (epoch) a partir del cual puede llamarse
+            priority: Prioridad del contacto
+
+        Returns:
+            float: Puntuación; los contactos con menor puntuación salen antes
+        """
+        return eligible_at - priority * self.priority_step
+
+    async def enqueue(self, campaign_id: str, contacts: List[Dict[str, Any]]) -> int:
+        """
+        Añade contactos a la cola de una campaña.
+
+        Args:
+            campaign_id: ID de la campaña
+            contacts: Contactos con ``contact_id`` y, opcionalmente, ``priority``,
+                ``eligible_at`` (epoch; por defecto, ahora) y ``eligible_until``
+                (epoch o fecha ISO; fin de su ventana de llamada)
+
+        Returns:
+            int: Contactos añadidos (se omiten los que ya estaban en cola o reservados)
+        """
+        if not contacts:
+            return 0
+        campaign_id = str(campaign_id)
+        now = time.time()
+        args: List[Any] = [campaign_id]
+        for contact in contacts:
+            score = self.score(contact.get("eligible_at") or now, int(contact.get("priority") or 0))
+            eligible_until = _epoch(contact.get("eligible_until"))
+            args.extend([
+                str(contact["contact_id"]), score, json.dumps(contact, default=str),
+                "" if eligible_until is None else eligible_until
+            ])
+
+        return int(await self.redis.eval(
+            _ENQUEUE, 5,
+            self._queue_key(campaign_id), self._payload_key(campaign_id), self._ready_key, self._leases_key,
+            self._meta_key(campaign_id),
+            *args
+        ))
+
+    async def claim(self, campaign_id: str, limit: int) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Reclama contactos de una campaña que ya pueden llamarse.
+
+        Los contactos cuya ventana de llamada ya cerró se retiran de la cola sin
+        reclamarse y se devuelven aparte.
+
+        Args:
+            campaign_id: ID de la campaña
+            limit: Número máximo de contactos
+
+        Returns:
+            Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]: Contactos reclamados,
+            por orden de puntuación, y contactos retirados por ventana vencida
+        """
+        if limit <= 0:
+            return [], []
+        campaign_id = str(campaign_id)
+        now = time.time()
+        claimed, expired = await self.redis.eval(
+            _CLAIM, 6,
+            self._queue_key(campaign_id), self._payload_key(campaign_id), self._ready_key,
+            self._leases_key, self._owners_key, self._meta_key(campaign_id),
+            campaign_id, now, limit, now + self.lease_seconds, self.worker_id
+        )
+        return [json.loads(payload) for payload in claimed[1::2]], [json.loads(payload) for payload in expired]
+
+    async def ack(self, campaign_id: str, contact_id: str) -> bool:
+        """
+        Confirma una llamada reclamada y la elimina de la cola.
+
+        Args:
+            campaign_id: ID de la campaña
+            contact_id: ID del contacto
+
+        Returns:
+            bool: False si la reserva ya había vencido o la tenía otro planificador
+        """
+        campaign_id = str(campaign_id)
+        return bool(await self.redis.eval(
+            _ACK, 4,
+            self._leases_key, self._owners_key, self._payload_key(campaign_id), self._meta_key(campaign_id),
+            campaign_id, str(contact_id), self.worker_id
+        ))
+
+    async def requeue_expired(self, limit: int = 500) -> int:
+        """
+        Devuelve a la cola las llamadas reclamadas cuya reserva venció.
+
+        Args:
+            limit: Número máximo de reservas a revisar
+
+        Returns:
+            int: Llamadas devueltas a la cola
+        """
+        requeued = int(await self.redis.eval(
+            _REQUEUE, 3,
+            self._leases_key, self._owners_key, self._ready_key,
+            time.time(), self.prefix, limit
+        ))
+        if requeued:
+            logger.warning(f"{requeued} llamadas reclamadas devueltas a la cola de marcado por reserva vencida")
+        return requeued
+
+    async def size(self, campaign_id: str) -> int:
+        """Número de contactos en la cola de una campaña (sin contar los reservados)."""
+        return int(await self.redis.zcard(self._queue_key(str(campaign_id))))
+
+    async def next_due(self) -> Optional[float]:
+        """
+        Instante (epoch) en que vence el siguiente contacto de cualquier campaña.
+
+        Returns:
+            Optional[float]: None si la cola está vacía
+        """
+        first = await self.redis.zrange(self._ready_key, 0, 0, withscores=True)
+        return float(first[0][1]) if first else None
+
+    async def acquire_refill_lock(self, campaign_id: str, ttl: int = 30) -> bool:
+        """
+        Reserva la recarga de la cola de una campaña para este planificador.
+
+        Evita que dos planificadores lean a la vez los mismos contactos de la base
+        de datos. El bloqueo se libera con ``release_refill_lock`` o al vencer ``ttl``.
+
+        Args:
+            campaign_id: ID de la campaña
+            ttl: Segundos que dura el bloqueo
+
+        Returns:
+            bool: True si se obtuvo el bloqueo
+        """
+        return bool(await self.redis.set(
+            f"{self.prefix}:refill:{campaign_id}", self.worker_id, nx=True, ex=ttl
+        ))
+
+    async def release_refill_lock(self, campaign_id: str) -> None:
+        """Libera el bloqueo de recarga de una campaña."""
+        await self.redis.delete(f"{self.prefix}:refill:{campaign_id}")
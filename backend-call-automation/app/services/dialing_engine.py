@@ -0,0 +1,309 @@
+"""
+Motor de marcado con concurrencia acotada.
+
+Las llamadas a realizar se encolan por campaña y un despachador las lanza como
+tareas asíncronas mientras haya capacidad, respetando un límite global de
+llamadas simultáneas y otro por campaña. Las campañas con llamadas en cola se
+atienden por turnos para que una campaña grande no acapare la capacidad.
+
+Una llamada ocupa su plaza desde que empieza a marcarse hasta que termina
+(``release`` al recibir su estado final) o hasta que vence ``slot_timeout``, lo
+que evita perder plazas si el estado final no llega a este proceso. Cada vez
+que se libera una plaza se despierta a quien espera en ``wait_for_capacity``,
+de modo que el planificador puede rellenar la cola en cuanto terminan llamadas
+en lugar de esperar al siguiente ciclo.
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Set
+
+from prometheus_client import Gauge
+
+from app.config.metrics_config import MetricNames
+from app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+DIALING_ACTIVE_CALLS = Gauge(
+    MetricNames.DIALING_ACTIVE_CALLS,
+    "Llamadas que ocupan una plaza del motor de marcado"
+)
+DIALING_QUEUED_CALLS = Gauge(
+    MetricNames.DIALING_QUEUED_CALLS,
+    "Llamadas en cola en el motor de marcado"
+)
+
+# Función que marca una llamada y devuelve su ID (None si no llegó a crearse)
+DialFunction = Callable[[], Awaitable[Optional[str]]]
+
+
+class _Slot:
+    """Plaza ocupada por una llamada."""
+
+    def __init__(self, campaign_id: str, key: Optional[str]):
+        self.campaign_id = campaign_id
+        self.key = key
+        self.call_id: Optional[str] = None
+        self.started_at = time.monotonic()
+
+
+class DialingEngine:
+    """
+    Pool acotado de tareas de marcado con límites global y por campaña.
+
+    Attributes:
+        max_concurrent_calls: Llamadas simultáneas como máximo
+        max_calls_per_campaign: Llamadas simultáneas como máximo por campaña
+        slot_timeout: Segundos tras los que se libera una plaza sin estado final
+    """
+
+    def __init__(
+        self,
+        max_concurrent_calls: int = settings.SCHEDULER_MAX_CONCURRENT_CALLS,
+        max_calls_per_campaign: int = settings.SCHEDULER_MAX_CALLS_PER_CAMPAIGN,
+        slot_timeout: float = settings.SCHEDULER_CALL_SLOT_TIMEOUT
+    ):
+        """
+        Inicializa el motor de marcado.
+
+        Args:
+            max_concurrent_calls: Llamadas simultáneas como máximo
+            max_calls_per_campaign: Llamadas simultáneas como máximo por campaña
+            slot_timeout: Segundos tras los que se libera una plaza sin estado final
+        """
+        self.max_concurrent_calls = max(1, max_concurrent_calls)
+        self.max_calls_per_campaign = max(1, max_calls_per_campaign)
+        self.slot_timeout = slot_timeout
+
+        self._queues: Dict[str, Deque[tuple]] = {}
+        self._turns: Deque[str] = deque()
+        self._slots: Set[_Slot] = set()
+        self._by_call: Dict[str, _Slot] = {}
+        self._active_by_campaign: Dict[str, int] = {}
+        self._keys: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._capacity: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._running = False
+
+    def active(self, campaign_id: Optional[str] = None) -> int:
+        """Número de plazas ocupadas (en total o de una campaña)."""
+        if campaign_id is None:
+            return len(self._slots)
+        return self._active_by_campaign.get(str(campaign_id), 0)
+
+    def queued(self, campaign_id: Optional[str] = None) -> int:
+        """Número de llamadas en cola (en total o de una campaña)."""
+        if campaign_id is None:
+            return sum(len(queue) for queue in self._queues.values())
+        return len(self._queues.get(str(campaign_id), ()))
+
+    def dialing(self) -> int:
+        """Número de plazas cuya llamada aún se está iniciando (sin ID de llamada)."""
+        return sum(1 for slot in self._slots if slot.call_id is None)
+
+    def capacity(self, campaign_id: str) -> int:
+        """
+        Número de llamadas que conviene encolar para una campaña.
+
+        Args:
+            campaign_id: ID de la campaña
+
+        Returns:
+            int: Plazas libres de la campaña que no cubren ya las llamadas en cola
+        """
+        campaign_id = str(campaign_id)
+        campaign_free = self.max_calls_per_campaign - self.active(campaign_id)
+        global_free = self.max_concurrent_calls - self.active() - self.queued()
+        return max(0, min(campaign_free - self.queued(campaign_id), global_free))
+
+    def is_pending(self, key: str) -> bool:
+        """Indica si una llamada con esa clave está en cola o en curso."""
+        return key in self._keys
+
+    def tracks(self, call_id: str) -> bool:
+        """Indica si una llamada ocupa una plaza de este motor."""
+        return str(call_id) in self._by_call
+
+    def submit(self, campaign_id: str, dial: DialFunction, key: Optional[str] = None) -> bool:
+        """
+        Encola una llamada.
+
+        Args:
+            campaign_id: ID de la campaña
+            dial: Función que marca la llamada y devuelve su ID
+            key: Clave para no encolar dos veces la misma llamada (p. ej. campaña y contacto)
+
+        Returns:
+            bool: False si ya había una llamada con la misma clave en cola o en curso
+        """
+        if key is not None:
+            if key in self._keys:
+                return False
+            self._keys.add(key)
+
+        campaign_id = str(campaign_id)
+        if campaign_id not in self._queues:
+            self._queues[campaign_id] = deque()
+            self._turns.append(campaign_id)
+        self._queues[campaign_id].append((dial, key))
+        DIALING_QUEUED_CALLS.set(self.queued())
+        if self._wakeup:
+            self._wakeup.set()
+        return True
+
+    def release(self, call_id: str) -> None:
+        """
+        Libera la plaza de una llamada que terminó.
+
+        Args:
+            call_id: ID de la llamada
+        """
+        slot = self._by_call.pop(str(call_id), None)
+        if slot:
+            self._free(slot)
+
+    async def wait_for_capacity(self, timeout: float) -> None:
+        """
+        Espera a que se libere alguna plaza o a que venza el tiempo.
+
+        Args:
+            timeout: Segundos máximos de espera
+        """
+        if self._capacity is None:
+            await asyncio.sleep(timeout)
+            return
+        self._capacity.clear()
+        try:
+            await asyncio.wait_for(self._capacity.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def start(self) -> None:
+        """Inicia el despachador de llamadas."""
+        if self._task is None or self._task.done():
+            self._running = True
+            self._wakeup = asyncio.Event()
+            self._capacity = asyncio.Event()
+            self._task = asyncio.create_task(self._dispatch_loop())
+            logger.info(
+                f"Motor de marcado iniciado: {self.max_concurrent_calls} llamadas simultáneas, "
+                f"{self.max_calls_per_campaign} por campaña"
+            )
+
+    async def stop(self) -> None:
+        """Detiene el despachador y cancela las llamadas que se están marcando."""
+        if self._task and not self._task.done():
+            self._running = False
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        for task in list(self._tasks):
+            task.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._wakeup = None
+        self._capacity = None
+        logger.info("Motor de marcado detenido")
+
+    async def _dispatch_loop(self) -> None:
+        while self._running:
+            try:
+                self._expire_slots()
+                while self._dispatch_next():
+                    pass
+                self._wakeup.clear()
+                timeout = self.slot_timeout if self._slots else None
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error en el motor de marcado: {str(e)}")
+                await asyncio.sleep(1)
+
+    def _dispatch_next(self) -> bool:
+        if len(self._slots) >= self.max_concurrent_calls:
+            return False
+
+        # Turno rotatorio entre campañas con llamadas en cola y plazas libres
+        for _ in range(len(self._turns)):
+            campaign_id = self._turns[0]
+            self._turns.rotate(-1)
+            queue = self._queues[campaign_id]
+            if not queue:
+                del self._queues[campaign_id]
+                self._turns.remove(campaign_id)
+                continue
+            if self.active(campaign_id) >= self.max_calls_per_campaign:
+                continue
+
+            dial, key = queue.popleft()
+            slot = _Slot(campaign_id, key)
+            self._slots.add(slot)
+            self._active_by_campaign[campaign_id] = self.active(campaign_id) + 1
+            self._update_gauges()
+
+            task = asyncio.create_task(self._dial(slot, dial))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+            return True
+        return False
+
+    async def _dial(self, slot: _Slot, dial: DialFunction) -> None:
+        try:
+            call_id = await dial()
+        except asyncio.CancelledError:
+            self._free(slot)
+            raise
+        except Exception as e:
+            logger.error(f"Error al marcar llamada de la campaña {slot.campaign_id}: {str(e)}")
+            call_id = None
+
+        if call_id is None or slot not in self._slots:
+            # La llamada no llegó a iniciarse (o la plaza ya expiró)
+            self._free(slot)
+        else:
+            slot.call_id = str(call_id)
+            self._by_call[slot.call_id] = slot
+
+    def _expire_slots(self) -> None:
+        now = time.monotonic()
+        expired: List[_Slot] = [slot for slot in self._slots if now - slot.started_at >= self.slot_timeout]
+        for slot in expired:
+            logger.warning(f"Plaza de la llamada {slot.call_id} liberada sin estado final")
+            if slot.call_id:
+                self._by_call.pop(slot.call_id, None)
+            self._free(slot)
+
+    def _free(self, slot: _Slot) -> None:
+        if slot not in self._slots:
+            return
+        self._slots.discard(slot)
+        remaining = self._active_by_campaign.get(slot.campaign_id, 1) - 1
+        if remaining > 0:
+            self._active_by_campaign[slot.campaign_id] = remaining
+        else:
+            self._active_by_campaign.pop(slot.campaign_id, None)
+        if slot.key is not None:
+            self._keys.discard(slot.key)
+        self._update_gauges()
+        if self._wakeup:
+            self._wakeup.set()
+        if self._capacity:
+            self._capacity.set()
+
+    def _update_gauges(self) -> None:
+        DIALING_ACTIVE_CALLS.set(len(self._slots))
+        DIALING_QUEUED_CALLS.set(self.queued())
+
+
+# Instancia global del motor de marcado
+dialing_engine = DialingEngine()
@@ -6,9 +6,6 @@ personalizadas según el tipo de campaña y el contexto de la conversación.
 from langchain.chains import ConversationChain
 from langchain.memory import ConversationBufferMemory
 from langchain.prompts import PromptTemplate
-from langchain_core.output_parsers import JsonOutputParser
-from langchain_openai import ChatOpenAI
-from langchain_google_genai import ChatGoogleGenerativeAI
 from fastapi import HTTPException
 import asyncio
 import logging
@@ -19,10 +16,16 @@ from typing import Any, Dict, List, Optional, Tuple
 from app.config.ai_config import AISettings
 from app.config.supabase import supabase_client
 from app.config.redis_client import generate_conversation_cache_key
+from app.services.prompt_registry import prompt_registry
+from app.services.llm_gateway import LLMPriority
+from app.services.llm_router import LLMRouter
+from app.services.metrics_sink import metrics_sink
 
 logger = logging.getLogger(__name__)
 settings = AISettings()
 
+NEUTRAL_SENTIMENT = {"primary_emotion": "neutral", "score": 0.5}
+
 class EnhancedAIConversationService:
     """
     Servicio mejorado para manejar conversaciones con IA.
@@ -34,51 +37,19 @@ class EnhancedAIConversationService:
     def __init__(self):
         """Inicializa el servicio de conversación con IA."""
         self.settings = settings
-        self.llm = self._initialize_llm()
-        self._rate_limit_semaphore = asyncio.Semaphore(5)
+        self.llm_router = LLMRouter.from_settings(self.settings)
+        self.llm = self.llm_router.providers[self.llm_router.primary]
+        self.prompt_registry = prompt_registry
         self.prompt_templates = self._load_prompt_templates()
         
-    def _initialize_llm(self) -> Any:
-        """
-        Inicializa el modelo de lenguaje según la configuración.
-        
-        Returns:
-            Instancia del modelo de lenguaje (OpenAI o Google)
-        """
-        if self.settings.LLM_PROVIDER == "openai":
-            return ChatOpenAI(
-                model_name=self.settings.DEFAULT_MODEL,
-                temperature=self.settings.TEMPERATURE,
-                max_tokens=self.settings.MAX_TOKENS,
-                api_key=self.settings.OPENAI_API_KEY
-            )
-        elif self.settings.LLM_PROVIDER == "google":
-            return ChatGoogleGenerativeAI(
-                model=self.settings.GOOGLE_MODEL,
-                temperature=self.settings.TEMPERATURE,
-                max_output_tokens=self.settings.MAX_TOKENS,
-                google_api_key=self.settings.GOOGLE_API_KEY,
-                convert_system_message_to_human=True
-            )
-        else:
-            raise ValueError(f"Proveedor de LLM no soportado: {self.settings.LLM_PROVIDER}")
-    
     def _load_prompt_templates(self) -> Dict[str, PromptTemplate]:
         """
-        Carga las plantillas de prompts para diferentes tipos de campaña.
+        Obtiene las plantillas de prompts precompiladas para cada tipo de campaña.
         
         Returns:
             Dict[str, PromptTemplate]: Diccionario de plantillas de prompts
         """
-        prompt_templates = {}
-        
-        for campaign_type, template_str in self.settings.CAMPAIGN_PROMPTS.items():
-            prompt_templates[campaign_type] = PromptTemplate(
-                input_variables=self.settings.REQUIRED_VARIABLES[campaign_type],
-                template=template_str
-            )
-            
-        return prompt_templates
+        return self.prompt_registry.campaign_templates
     
     async def process_message(
         self,
@@ -99,61 +70,73 @@ class EnhancedAIConversationService:
         Returns:
             Dict con la respuesta y metadatos
         """
-        async with self._rate_limit_semaphore:
-            try:
-                # Validar tipo de campaña
-                if campaign_type not in self.prompt_templates:
-                    logger.warning(f"Tipo de campaña no soportado: {campaign_type}, usando 'sales' por defecto")
-                    campaign_type = "sales"
-                
-                # Inicializar contexto si es None
-                context = context or {}
-                
-                # 1. Recuperar historial de caché
-                history = await self._get_conversation_history(conversation_id)
-                
-                # 2. Preparar variables para el prompt
-                prompt_variables = self._prepare_prompt_variables(campaign_type, message, history, context)
-                
-                # 3. Generar respuesta
-                response = await self._generate_response(campaign_type, prompt_variables)
-                
-                # 4. Actualizar historial de conversación
-                await self._update_conversation_history(conversation_id, message, response)
-                
-                # 5. Analizar sentimiento
-                input_sentiment = await self.analyze_sentiment(message)
-                response_sentiment = await self.analyze_sentiment(response)
-                
-                # 6. Sugerir acciones
-                suggested_actions = await self.suggest_actions(message, response, input_sentiment, context)
-                
-                # 7. Guardar métricas
-                if conversation_id:
-                    await self._save_conversation_metrics(
-                        conversation_id,
-                        message,
-                        response,
-                        input_sentiment,
-                        response_sentiment,
-                        campaign_type
-                    )
-                
-                return {
-                    "response": response,
-                    "input_sentiment": input_sentiment,
-                    "response_sentiment": response_sentiment,
-                    "suggested_actions": suggested_actions,
-                    "conversation_id": conversation_id,
-                    "campaign_type": campaign_type
-                }
-                
-            except Exception as e:
-                logger.error(f"Error al procesar mensaje: {str(e)}")
-                raise HTTPException(
-                    status_code=500,
-                    detail=f"Error al procesar mensaje: {str(e)}"
+        try:
+            # Validar tipo de campaña
+            if campaign_type not in self.prompt_templates:
+                logger.warning(f"Tipo de campaña no soportado: {campaign_type}, usando 'sales' por defecto")
+                campaign_type = "sales"
+            
+            # Inicializar contexto si es None
+            context = context or {}
+            
+            # 1. Recuperar historial de caché
+            history = await self._get_conversation_history(conversation_id)
+            
+            # 2. Preparar variables para el prompt
+            prompt_variables = self._prepare_prompt_variables(campaign_type, message, history, context)
+            
+            # 3. Generar respuesta
+            response = await self._generate_response(
+                campaign_type,
+                prompt_variables,
+                campaign_id=context.get("campaign_id")
+            )
+            
+            # 4. Actualizar historial de conversación
+            await self._update_conversation_history(conversation_id, message, response)
+            
+            # 5 y 6. Analizar sentimiento y sugerir acciones; por defecto se hace
+            # por lotes tras la llamada para no añadir peticiones al turno. En
+            # vivo el turno las espera, así que no pueden ir con prioridad de fondo
+            if self.settings.LIVE_SENTIMENT_ENABLED:
+                input_sentiment, response_sentiment = await asyncio.gather(
+                    self.analyze_sentiment(message, priority=LLMPriority.INTERACTIVE),
+                    self.analyze_sentiment(response, priority=LLMPriority.INTERACTIVE)
+                )
+                suggested_actions = await self.suggest_actions(
+                    message, response, input_sentiment, context, priority=LLMPriority.INTERACTIVE
                 )
+            else:
+                input_sentiment = dict(NEUTRAL_SENTIMENT)
+                response_sentiment = dict(NEUTRAL_SENTIMENT)
+                suggested_actions = []
+            
+            # 7. Guardar métricas
+            if conversation_id:
+                await self._save_conversation_metrics(
+                    conversation_id,
+                    message,
+                    response,
+                    input_sentiment,
+                    response_sentiment,
+                    campaign_type
+                )
+            
+            return {
+                "response": response,
+                "input_sentiment": input_sentiment,
+                "response_sentiment": response_sentiment,
+                "suggested_actions": suggested_actions,
+                "conversation_id": conversation_id,
+                "campaign_type": campaign_type
+            }
+            
+        except Exception as e:
+            logger.error(f"Error al procesar mensaje: {str(e)}")
+            raise HTTPException(
+                status_code=500,
+                detail=f"Error al procesar mensaje: {str(e)}"
+            )
     
     async def _get_conversation_history(self, conversation_id: Optional[str]) -> str:
         """
@@ -220,24 +203,36 @@ class EnhancedAIConversationService:
     async def _generate_response(
         self,
         campaign_type: str,
-        variables: Dict[str, str]
+        variables: Dict[str, str],
+        campaign_id: Optional[str] = None
     ) -> str:
         """
         Genera una respuesta utilizando el modelo de lenguaje.
         
+        El prefijo estático del prompt (campaña y contacto) se envía como mensaje
+        de sistema independiente para que el proveedor pueda cachearlo entre turnos.
+        
         Args:
             campaign_type: Tipo de campaña
             variables: Variables para el prompt
+            campaign_id: ID de la campaña para reutilizar su prefijo pre-renderizado (opcional)
             
         Returns:
             Respuesta generada
         """
         try:
-            prompt_template = self.prompt_templates[campaign_type]
-            prompt = prompt_template.format(**variables)
+            prompt = self.prompt_registry.render_campaign_prompt(
+                campaign_type,
+                variables,
+                campaign_id=campaign_id
+            )
             
-            # Generar respuesta
-            response = await self.llm.ainvoke(prompt)
+            # Generar respuesta; el enrutador duplica la petición si el proveedor tarda
+            response = await self.llm_router.invoke(
+                lambda provider: (prompt.to_messages(provider), prompt.invoke_kwargs(provider)),
+                priority=LLMPriority.LIVE_CALL,
+                hedge=True
+            )
             
             return response
         except Exception as e:
@@ -267,27 +262,27 @@ class EnhancedAIConversationService:
         except Exception as e:
             logger.error(f"Error al actualizar historial de conversación: {str(e)}")
     
-    async def analyze_sentiment(self, text: str) -> Dict[str, Any]:
+    async def analyze_sentiment(
+        self,
+        text: str,
+        priority: LLMPriority = LLMPriority.BACKGROUND
+    ) -> Dict[str, Any]:
         """
         Analiza el sentimiento del texto.
         
         Args:
             text: Texto a analizar
+            priority: Prioridad de la petición en el gateway
             
         Returns:
             Dict con análisis de sentimiento
         """
-        output_parser = JsonOutputParser()
-        prompt = PromptTemplate(
-            input_variables=["text"],
-            partial_variables={"format_instructions": output_parser.get_format_instructions()},
-            template="""Analiza el sentimiento del siguiente texto y clasifícalo.
-            Texto: {text}
-            Devuelve un objeto JSON con la emoción primaria (primary_emotion) y su puntuación (score). \n{format_instructions}"""
-        )
-
         try:
-            response = await self.llm.ainvoke(prompt.format(text=text))
+            prompt = self.prompt_registry.format_sentiment(text)
+            response = await self.llm_router.invoke(
+                lambda provider: (prompt, {}),
+                priority=priority
+            )
             return json.loads(response)
         except Exception as e:
             logger.error(f"Error al analizar el sentimiento: {e}")
@@ -301,7 +296,8 @@ class EnhancedAIConversationService:
         message: str,
         response: str,
         sentiment: Dict[str, Any],
-        context: Optional[Dict[str, Any]] = None
+        context: Optional[Dict[str, Any]] = None,
+        priority: LLMPriority = LLMPriority.BACKGROUND
     ) -> List[Dict[str, str]]:
         """
         Sugiere acciones basadas en el mensaje, la respuesta y el sentimiento.
@@ -311,46 +307,21 @@ class EnhancedAIConversationService:
             response: Respuesta generada
             sentiment: Análisis de sentimiento
             context: Contexto adicional
+            priority: Prioridad de la petición en el gateway
             
         Returns:
             Lista de acciones sugeridas
         """
         try:
-            output_parser = JsonOutputParser()
-            prompt = PromptTemplate(
-                input_variables=["message", "response", "sentiment", "context"],
-                partial_variables={"format_instructions": output_parser.get_format_instructions()},
-                template="""
-                Basándote en la siguiente interacción, sugiere hasta 3 acciones a tomar:
-                
-                Mensaje del usuario: {message}
-                
-                Respuesta del sistema: {response}
-                
-                Análisis de sentimiento: {sentiment}
-                
-                Contexto adicional: {context}
-                
-                Proporciona hasta 3 acciones recomendadas en formato JSON:
-                [
-                    {{
-                        "action_type": "continue_conversation/offer_callback/escalate/end_conversation/send_information",
-                        "priority": "high/medium/low",
-                        "description": "descripción de la acción",
-                        "reason": "razón para esta acción"
-                    }}
-                ]
-                \n{format_instructions}
-                """
+            prompt = self.prompt_registry.format_suggest_actions(
+                message=message,
+                response=response,
+                sentiment=json.dumps(sentiment),
+                context=json.dumps(context or {})
             )
-            
-            response = await self.llm.ainvoke(
-                prompt.format(
-                    message=message,
-                    response=response,
-                    sentiment=json.dumps(sentiment),
-                    context=json.dumps(context or {})
-                )
+            response = await self.llm_router.invoke(
+                lambda provider: (prompt, {}),
+                priority=priority
             )
             
             return json.loads(response)
@@ -384,7 +355,17 @@ class EnhancedAIConversationService:
             campaign_type: Tipo de campaña
         """
         try:
-            # Implementar lógica para guardar métricas en base de datos
-            pass
+            # Se encolan sin esperar a la base de datos para no retrasar el turno
+            metrics_sink.submit("conversation_metrics", {
+                "conversation_id": conversation_id,
+                "timestamp": datetime.now().isoformat(),
+                "message_length": len(message),
+                "response_length": len(response),
+                "input_sentiment": input_sentiment.get("primary_emotion", "neutral"),
+                "input_sentiment_score": input_sentiment.get("score", 0.5),
+                "response_sentiment": response_sentiment.get("primary_emotion", "neutral"),
+                "response_sentiment_score": response_sentiment.get("score", 0.5),
+                "campaign_type": campaign_type
+            })
         except Exception as e:
             logger.error(f"Error al guardar métricas de conversación: {str(e)}")
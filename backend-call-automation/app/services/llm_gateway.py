@@ -0,0 +1,337 @@
+"""
+Gateway de concurrencia para las llamadas a modelos de lenguaje.
+
+Todas las peticiones al LLM del proceso pasan por una única instancia del
+gateway, que limita la concurrencia total y atiende primero las peticiones de
+mayor prioridad (turnos de llamadas en vivo antes que análisis en segundo plano).
+
+El límite de concurrencia se ajusta con AIMD: crece de forma aditiva mientras
+la latencia del proveedor se mantiene bajo el objetivo y se reduce de forma
+multiplicativa ante respuestas 429 o latencias por encima del objetivo.
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from contextlib import asynccontextmanager
+from enum import IntEnum
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, TypeVar
+
+from prometheus_client import Counter, Gauge, Histogram
+
+from app.config.ai_config import AISettings
+from app.config.metrics_config import MetricNames
+
+logger = logging.getLogger(__name__)
+settings = AISettings()
+
+T = TypeVar("T")
+
+LLM_QUEUE_DEPTH = Gauge(
+    MetricNames.LLM_QUEUE_DEPTH,
+    "Peticiones al LLM en espera por prioridad",
+    ["priority"]
+)
+LLM_QUEUE_WAIT_TIME = Histogram(
+    MetricNames.LLM_QUEUE_WAIT_TIME,
+    "Tiempo de espera en la cola del gateway de LLM",
+    ["priority"],
+    buckets=(0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+)
+LLM_CONCURRENCY_LIMIT = Gauge(
+    MetricNames.LLM_CONCURRENCY_LIMIT,
+    "Límite actual de peticiones concurrentes al LLM"
+)
+LLM_IN_FLIGHT = Gauge(
+    MetricNames.LLM_IN_FLIGHT,
+    "Peticiones al LLM en curso"
+)
+LLM_RATE_LIMITED_TOTAL = Counter(
+    MetricNames.LLM_RATE_LIMITED_TOTAL,
+    "Total de respuestas 429 recibidas del proveedor de LLM"
+)
+
+
+class LLMPriority(IntEnum):
+    """Prioridad de una petición al LLM (menor valor, mayor prioridad)."""
+
+    LIVE_CALL = 0
+    INTERACTIVE = 1
+    BACKGROUND = 2
+
+
+# Módulos de los clientes de LLM y HTTP cuyas excepciones describen la respuesta del proveedor
+PROVIDER_ERROR_MODULES = {"openai", "anthropic", "google", "langchain_google_genai", "httpx", "aiohttp"}
+
+# Textos con los que los proveedores describen un límite de tasa
+RATE_LIMIT_MESSAGES = ("rate limit", "rate_limit", "too many requests", "resource exhausted", "resource has been exhausted")
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    """
+    Determina si una excepción corresponde a un límite de tasa del proveedor.
+
+    Se basa en el código de estado HTTP o en el tipo de excepción del cliente
+    (``RateLimitError``, ``ResourceExhausted``). El texto del mensaje solo se
+    tiene en cuenta en excepciones de los clientes de los proveedores que no
+    exponen el código, y nunca el número 429 suelto, que puede aparecer en IDs,
+    recuentos de tokens o URLs.
+
+    Args:
+        error: Excepción lanzada por el cliente del LLM
+
+    Returns:
+        bool: True si el proveedor respondió con 429 o equivalente
+    """
+    status = getattr(error, "status_code", None) or getattr(error, "code", None)
+    if status == 429:
+        return True
+
+    response = getattr(error, "response", None)
+    if getattr(response, "status_code", None) == 429:
+        return True
+
+    name = type(error).__name__.lower()
+    if "ratelimit" in name or "resourceexhausted" in name:
+        return True
+
+    module = type(error).__module__.split(".")[0]
+    if module not in PROVIDER_ERROR_MODULES:
+        return False
+    message = str(error).lower()
+    return any(text in message for text in RATE_LIMIT_MESSAGES)
+
+
+class LLMGateway:
+    """
+    Limitador de concurrencia adaptativo con colas de prioridad.
+
+    Attributes:
+        min_limit: Límite mínimo de concurrencia
+        max_limit: Límite máximo de concurrencia
+        target_latency: Latencia objetivo del proveedor en segundos
+        decrease_factor: Factor multiplicativo aplicado al reducir el límite
+        decrease_cooldown: Tiempo mínimo entre dos reducciones consecutivas
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = settings.LLM_INITIAL_CONCURRENCY,
+        min_limit: int = settings.LLM_MIN_CONCURRENCY,
+        max_limit: int = settings.LLM_MAX_CONCURRENCY,
+        target_latency: float = settings.LLM_TARGET_LATENCY,
+        decrease_factor: float = settings.LLM_DECREASE_FACTOR,
+        decrease_cooldown: float = settings.LLM_DECREASE_COOLDOWN
+    ):
+        """
+        Inicializa el gateway.
+
+        Args:
+            initial_limit: Límite de concurrencia inicial
+            min_limit: Límite mínimo de concurrencia
+            max_limit: Límite máximo de concurrencia
+            target_latency: Latencia objetivo en segundos
+            decrease_factor: Factor de reducción ante congestión (0-1)
+            decrease_cooldown: Segundos mínimos entre reducciones
+        """
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.target_latency = target_latency
+        self.decrease_factor = decrease_factor
+        self.decrease_cooldown = decrease_cooldown
+
+        self._limit = float(min(max(initial_limit, self.min_limit), self.max_limit))
+        self._in_flight = 0
+        self._waiters: List[List[Any]] = []
+        self._counter = itertools.count()
+        self._queue_depth: Dict[LLMPriority, int] = {priority: 0 for priority in LLMPriority}
+        self._last_decrease = 0.0
+
+        LLM_CONCURRENCY_LIMIT.set(self.limit)
+
+    @property
+    def limit(self) -> int:
+        """Límite de concurrencia efectivo."""
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        """Número de peticiones en curso."""
+        return self._in_flight
+
+    def queue_depth(self, priority: Optional[LLMPriority] = None) -> int:
+        """
+        Número de peticiones en espera.
+
+        Args:
+            priority: Prioridad a consultar (todas si es None)
+
+        Returns:
+            int: Peticiones en cola
+        """
+        if priority is None:
+            return sum(self._queue_depth.values())
+        return self._queue_depth[priority]
+
+    def _set_depth(self, priority: LLMPriority, delta: int) -> None:
+        self._queue_depth[priority] += delta
+        LLM_QUEUE_DEPTH.labels(priority=priority.name.lower()).set(self._queue_depth[priority])
+
+    async def acquire(self, priority: LLMPriority = LLMPriority.INTERACTIVE) -> None:
+        """
+        Espera hasta obtener un hueco de concurrencia.
+
+        Args:
+            priority: Prioridad de la petición
+        """
+        start = time.monotonic()
+        label = priority.name.lower()
+
+        if not self._waiters and self._in_flight < self.limit:
+            self._in_flight += 1
+            LLM_IN_FLIGHT.set(self._in_flight)
+            LLM_QUEUE_WAIT_TIME.labels(priority=label).observe(0.0)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        entry = [int(priority), next(self._counter), future, priority]
+        heapq.heappush(self._waiters, entry)
+        self._set_depth(priority, 1)
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # El hueco se concedió justo antes de la cancelación
+                self.release()
+            else:
+                future.cancel()
+                self._set_depth(priority, -1)
+            raise
+
+        LLM_QUEUE_WAIT_TIME.labels(priority=label).observe(time.monotonic() - start)
+
+    def release(self) -> None:
+        """Libera un hueco de concurrencia y despierta a las peticiones en espera."""
+        self._in_flight = max(0, self._in_flight - 1)
+        LLM_IN_FLIGHT.set(self._in_flight)
+        self._wake_waiters()
+
+    def _wake_waiters(self) -> None:
+        while self._waiters and self._in_flight < self.limit:
+            _, _, future, priority = heapq.heappop(self._waiters)
+            if future.done():
+                # Petición cancelada mientras esperaba
+                continue
+            self._set_depth(priority, -1)
+            self._in_flight += 1
+            future.set_result(None)
+        LLM_IN_FLIGHT.set(self._in_flight)
+
+    def record_success(self, latency: float) -> None:
+        """
+        Ajusta el límite tras una respuesta correcta del proveedor.
+
+        Args:
+            latency: Latencia de la petición en segundos
+        """
+        if latency > self.target_latency:
+            self._decrease(f"latencia {latency:.2f}s por encima del objetivo")
+            return
+
+        # Incremento aditivo: +1 por cada ventana completa de peticiones
+        self._limit = min(float(self.max_limit), self._limit + 1.0 / max(self._limit, 1.0))
+        LLM_CONCURRENCY_LIMIT.set(self.limit)
+        self._wake_waiters()
+
+    def record_rate_limit(self) -> None:
+        """Reduce el límite tras una respuesta 429 del proveedor."""
+        LLM_RATE_LIMITED_TOTAL.inc()
+        self._decrease("límite de tasa del proveedor")
+
+    def _decrease(self, reason: str) -> None:
+        now = time.monotonic()
+        if now - self._last_decrease < self.decrease_cooldown:
+            return
+        self._last_decrease = now
+
+        previous = self.limit
+        self._limit = max(float(self.min_limit), self._limit * self.decrease_factor)
+        LLM_CONCURRENCY_LIMIT.set(self.limit)
+        if self.limit != previous:
+            logger.warning(f"Límite de concurrencia del LLM reducido de {previous} a {self.limit}: {reason}")
+
+    @asynccontextmanager
+    async def slot(self, priority: LLMPriority = LLMPriority.INTERACTIVE) -> AsyncIterator[None]:
+        """
+        Contexto que reserva un hueco de concurrencia sin medir latencia.
+
+        Args:
+            priority: Prioridad de la petición
+        """
+        await self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def run(
+        self,
+        func: Callable[..., Awaitable[T]],
+        *args: Any,
+        priority: LLMPriority = LLMPriority.INTERACTIVE,
+        **kwargs: Any
+    ) -> T:
+        """
+        Ejecuta una llamada al LLM respetando el límite y la prioridad.
+
+        Args:
+            func: Función asíncrona que realiza la petición
+            *args: Argumentos posicionales de la función
+            priority: Prioridad de la petición
+            **kwargs: Argumentos con nombre de la función
+
+        Returns:
+            T: Resultado de la función
+        """
+        await self.acquire(priority)
+        start = time.monotonic()
+        try:
+            result = await func(*args, **kwargs)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if is_rate_limit_error(e):
+                self.record_rate_limit()
+            raise
+        else:
+            self.record_success(time.monotonic() - start)
+            return result
+        finally:
+            self.release()
+
+    async def invoke(
+        self,
+        llm: Any,
+        prompt: Any,
+        priority: LLMPriority = LLMPriority.INTERACTIVE,
+        **kwargs: Any
+    ) -> Any:
+        """
+        Invoca ``llm.ainvoke`` a través del gateway.
+
+        Args:
+            llm: Modelo de lenguaje de LangChain
+            prompt: Prompt o mensajes a enviar
+            priority: Prioridad de la petición
+            **kwargs: Argumentos adicionales para ``ainvoke``
+
+        Returns:
+            Any: Respuesta del modelo
+        """
+        return await self.run(llm.ainvoke, prompt, priority=priority, **kwargs)
+
+
+# Instancia global compartida por todos los servicios de IA del proceso
+llm_gateway = LLMGateway()
@@ -0,0 +1,357 @@
+"""
+Enrutador de peticiones entre varios proveedores de modelos de lenguaje.
+
+Mantiene estadísticas móviles de latencia (p50/p95) y tasa de error por
+proveedor y elige el más saludable para cada petición. En los turnos de
+llamadas en vivo puede enviar una petición duplicada (hedging) a un segundo
+proveedor cuando el primero supera el percentil de latencia configurado,
+quedándose con la primera respuesta y cancelando la otra.
+"""
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from app.config.ai_config import AISettings
+from app.services.llm_gateway import LLMGateway, LLMPriority, llm_gateway
+
+logger = logging.getLogger(__name__)
+
+# Función que construye la entrada y los argumentos de ``ainvoke`` para un proveedor
+RequestBuilder = Callable[[str], Tuple[Any, Dict[str, Any]]]
+
+MIN_SAMPLES_FOR_PERCENTILE = 20
+
+
+@dataclass
+class ProviderStats:
+    """Estadísticas móviles de un proveedor de LLM."""
+
+    window: int = 200
+    latencies: Deque[float] = field(default_factory=deque)
+    outcomes: Deque[bool] = field(default_factory=deque)
+
+    def record(self, latency: Optional[float], success: bool) -> None:
+        """
+        Registra el resultado de una petición.
+
+        Args:
+            latency: Latencia en segundos (None si la petición falló)
+            success: Indica si la petición fue correcta
+        """
+        if success and latency is not None:
+            self.latencies.append(latency)
+            if len(self.latencies) > self.window:
+                self.latencies.popleft()
+        self.outcomes.append(success)
+        if len(self.outcomes) > self.window:
+            self.outcomes.popleft()
+
+    def percentile(self, percentile: float) -> Optional[float]:
+        """
+        Calcula un percentil de latencia.
+
+        Args:
+            percentile: Percentil a calcular (0-100)
+
+        Returns:
+            Optional[float]: Latencia en segundos, o None sin muestras suficientes
+        """
+        if len(self.latencies) < MIN_SAMPLES_FOR_PERCENTILE:
+            return None
+        ordered = sorted(self.latencies)
+        index = max(0, math.ceil(percentile / 100 * len(ordered)) - 1)
+        return ordered[index]
+
+    @property
+    def p50(self) -> Optional[float]:
+        return self.percentile(50)
+
+    @property
+    def p95(self) -> Optional[float]:
+        return self.percentile(95)
+
+    @property
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+
+def build_llm(provider: str, settings: AISettings) -> Any:
+    """
+    Construye el modelo de lenguaje de un proveedor.
+
+    Los paquetes de cada proveedor se importan solo si el proveedor está configurado.
+
+    Args:
+        provider: Nombre del proveedor (openai o google)
+        settings: Configuración de IA
+
+    Returns:
+        Instancia del modelo de lenguaje
+
+    Raises:
+        ValueError: Si el proveedor no está soportado
+    """
+    if provider == "openai":
+        from langchain_openai import ChatOpenAI
+
+        return ChatOpenAI(
+            model_name=settings.DEFAULT_MODEL,
+            temperature=settings.TEMPERATURE,
+            max_tokens=settings.MAX_TOKENS,
+            api_key=settings.OPENAI_API_KEY
+        )
+    elif provider == "google":
+        from langchain_google_genai import ChatGoogleGenerativeAI
+
+        return ChatGoogleGenerativeAI(
+            model=settings.GOOGLE_MODEL,
+            temperature=settings.TEMPERATURE,
+            max_output_tokens=settings.MAX_TOKENS,
+            google_api_key=settings.GOOGLE_API_KEY,
+            convert_system_message_to_human=True
+        )
+    else:
+        raise ValueError(f"Proveedor de LLM no soportado: {provider}")
+
+
+class LLMRouter:
+    """
+    Enrutador entre proveedores de LLM con hedging por latencia.
+
+    Attributes:
+        providers: Modelos de lenguaje por nombre de proveedor, en orden de preferencia
+        stats: Estadísticas móviles por proveedor
+    """
+
+    def __init__(
+        self,
+        providers: Dict[str, Any],
+        gateway: LLMGateway = llm_gateway,
+        hedge_enabled: bool = True,
+        hedge_percentile: float = 95.0,
+        hedge_default_delay: float = 1.5,
+        hedge_min_delay: float = 0.2,
+        stats_window: int = 200
+    ):
+        """
+        Inicializa el enrutador.
+
+        Args:
+            providers: Modelos de lenguaje por proveedor, en orden de preferencia
+            gateway: Gateway de concurrencia por el que pasan las peticiones
+            hedge_enabled: Habilita las peticiones duplicadas
+            hedge_percentile: Percentil de latencia a partir del cual se duplica la petición
+            hedge_default_delay: Espera antes de duplicar mientras no hay muestras suficientes
+            hedge_min_delay: Espera mínima antes de duplicar
+            stats_window: Número de peticiones consideradas en las estadísticas
+
+        Raises:
+            ValueError: Si no se configura ningún proveedor
+        """
+        if not providers:
+            raise ValueError("Se requiere al menos un proveedor de LLM")
+
+        self.providers = dict(providers)
+        self.gateway = gateway
+        self.hedge_enabled = hedge_enabled
+        self.hedge_percentile = hedge_percentile
+        self.hedge_default_delay = hedge_default_delay
+        self.hedge_min_delay = hedge_min_delay
+        self.stats: Dict[str, ProviderStats] = {
+            name: ProviderStats(window=stats_window) for name in self.providers
+        }
+
+    @classmethod
+    def from_settings(cls, settings: AISettings) -> "LLMRouter":
+        """
+        Crea el enrutador a partir de la configuración de IA.
+
+        Args:
+            settings: Configuración de IA
+
+        Returns:
+            LLMRouter: Enrutador con los proveedores configurados
+        """
+        names = [name.strip() for name in settings.LLM_PROVIDERS.split(",") if name.strip()]
+        if not names:
+            names = [settings.LLM_PROVIDER]
+        elif settings.LLM_PROVIDER in names:
+            # El proveedor principal siempre va primero
+            names.remove(settings.LLM_PROVIDER)
+            names.insert(0, settings.LLM_PROVIDER)
+
+        providers = {name: build_llm(name, settings) for name in names}
+        return cls(
+            providers,
+            hedge_enabled=settings.LLM_HEDGE_ENABLED,
+            hedge_percentile=settings.LLM_HEDGE_PERCENTILE,
+            hedge_default_delay=settings.LLM_HEDGE_DEFAULT_DELAY,
+            hedge_min_delay=settings.LLM_HEDGE_MIN_DELAY,
+            stats_window=settings.LLM_STATS_WINDOW
+        )
+
+    @property
+    def primary(self) -> str:
+        """Proveedor preferido en la configuración."""
+        return next(iter(self.providers))
+
+    def ranked_providers(self) -> List[str]:
+        """
+        Ordena los proveedores por salud: tasa de error y después p95.
+
+        A los proveedores sin muestras suficientes se les supone un p95 igual a
+        ``hedge_default_delay``, de modo que no pasan por delante de uno medido y
+        más rápido; entre ellos se conserva el orden configurado.
+
+        Returns:
+            List[str]: Proveedores del más al menos saludable
+        """
+        order = {name: index for index, name in enumerate(self.providers)}
+
+        def score(name: str) -> Tuple[float, float, int]:
+            stats = self.stats[name]
+            p95 = stats.p95
+            return (round(stats.error_rate, 2), p95 if p95 is not None else self.hedge_default_delay, order[name])
+
+        return sorted(self.providers, key=score)
+
+    def hedge_delay(self, provider: str) -> float:
+        """
+        Tiempo de espera antes de duplicar una petición enviada a un proveedor.
+
+        Args:
+            provider: Proveedor de la petición principal
+
+        Returns:
+            float: Espera en segundos
+        """
+        latency = self.stats[provider].percentile(self.hedge_percentile)
+        if latency is None:
+            return self.hedge_default_delay
+        return max(self.hedge_min_delay, latency)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Devuelve las estadísticas actuales de cada proveedor."""
+        return {
+            name: {
+                "p50": stats.p50,
+                "p95": stats.p95,
+                "error_rate": stats.error_rate,
+                "samples": len(stats.outcomes)
+            }
+            for name, stats in self.stats.items()
+        }
+
+    async def _call(
+        self,
+        provider: str,
+        build_request: RequestBuilder,
+        priority: LLMPriority,
+        started: Optional[Dict[str, float]] = None
+    ) -> Any:
+        prompt, kwargs = build_request(provider)
+        llm = self.providers[provider]
+        started = {} if started is None else started
+
+        async def request() -> Any:
+            # La latencia se mide desde que el gateway da paso a la petición
+            started[provider] = time.monotonic()
+            return await llm.ainvoke(prompt, **kwargs)
+
+        try:
+            result = await self.gateway.run(request, priority=priority)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self.stats[provider].record(None, success=False)
+            raise
+        self.stats[provider].record(time.monotonic() - started[provider], success=True)
+        return result
+
+    async def invoke(
+        self,
+        build_request: RequestBuilder,
+        priority: LLMPriority = LLMPriority.INTERACTIVE,
+        hedge: bool = False
+    ) -> Any:
+        """
+        Envía una petición al proveedor más saludable.
+
+        Args:
+            build_request: Función que devuelve ``(prompt, kwargs)`` para un proveedor
+            priority: Prioridad de la petición en el gateway
+            hedge: Duplica la petición en un segundo proveedor si la primera tarda
+
+        Returns:
+            Any: Respuesta del modelo
+
+        Raises:
+            Exception: La última excepción si todos los proveedores fallan
+        """
+        ranked = self.ranked_providers()
+        if hedge and self.hedge_enabled and len(ranked) > 1:
+            return await self._invoke_hedged(ranked[0], ranked[1], build_request, priority)
+
+        last_error: Optional[Exception] = None
+        for provider in ranked:
+            try:
+                return await self._call(provider, build_request, priority)
+            except Exception as e:
+                logger.warning(f"Error en el proveedor de LLM {provider}: {str(e)}")
+                last_error = e
+        raise last_error
+
+    async def _invoke_hedged(
+        self,
+        primary: str,
+        secondary: str,
+        build_request: RequestBuilder,
+        priority: LLMPriority
+    ) -> Any:
+        started: Dict[str, float] = {}
+        tasks: Dict[asyncio.Task, str] = {
+            asyncio.create_task(self._call(primary, build_request, priority, started)): primary
+        }
+        hedged = False
+        winner_latency: Optional[float] = None
+        last_error: Optional[Exception] = None
+
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.hedge_delay(primary))
+            if not done:
+                logger.info(f"Duplicando petición en {secondary}: {primary} supera p{self.hedge_percentile:g}")
+                tasks[asyncio.create_task(self._call(secondary, build_request, priority, started))] = secondary
+                hedged = True
+
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        winner_latency = time.monotonic() - started[tasks[task]]
+                        return task.result()
+                    last_error = task.exception()
+                    logger.warning(f"Error en el proveedor de LLM {tasks[task]}: {str(last_error)}")
+
+                if not pending and not hedged:
+                    # El principal falló antes de duplicar: reintentar en el secundario
+                    hedged = True
+                    pending = {asyncio.create_task(self._call(secondary, build_request, priority, started))}
+                    tasks[next(iter(pending))] = secondary
+        finally:
+            now = time.monotonic()
+            for task, provider in tasks.items():
+                if task.done():
+                    continue
+                task.cancel()
+                if winner_latency is not None and provider in started:
+                    # El perdedor habría tardado al menos lo que lleva y lo que tardó el ganador
+                    self.stats[provider].record(max(winner_latency, now - started[provider]), success=True)
+
+        raise last_error
@@ -4,7 +4,8 @@ import logging
 from typing import Any, Dict, Optional
 from datetime import datetime
 from app.config.metrics_config import get_metrics_settings, MetricNames
-from app.config.supabase import supabase_client
+from app.services.metrics_sink import metrics_sink
+from app.utils.ttl_cache import TTLCache
 
 logger = logging.getLogger(__name__)
 
@@ -18,8 +19,11 @@ AI_ERRORS_TOTAL = Counter(MetricNames.AI_ERRORS_TOTAL, 'Total de errores en proc
 AI_SENTIMENT_SCORE = Gauge(MetricNames.AI_SENTIMENT_SCORE, 'Puntuación de sentimiento detectado por IA')
 AI_TOKENS_USED = Summary(MetricNames.AI_TOKENS_USED, 'Número de tokens utilizados en solicitudes de IA')
 
-# Caché para métricas de IA
-AI_METRICS_CACHE: Dict[str, Dict[str, Any]] = {}
+# Caché para métricas de IA, con expiración para no crecer sin límite
+AI_METRICS_CACHE: TTLCache[str, Dict[str, Any]] = TTLCache(
+    ttl=metrics_settings.cache_ttl_seconds,
+    maxsize=metrics_settings.cache_max_entries
+)
 
 class AIMetricsService:
     """
@@ -95,15 +99,15 @@ class AIMetricsService:
     ) -> None:
         """Registra métricas de conversación."""
         try:
-            # Guardar en Supabase
-            await supabase_client.table('conversation_metrics').insert({
+            # Encolar para escritura por lotes en Supabase
+            metrics_sink.submit('conversation_metrics', {
                 'conversation_id': conversation_id,
                 'timestamp': datetime.now().isoformat(),
                 'input_sentiment': metrics['input_sentiment'],
                 'response_sentiment': metrics['response_sentiment'],
                 'response_time': metrics.get('response_time', 0),
                 'tokens_used': metrics.get('tokens_used', 0)
-            }).execute()
+            })
 
             # Actualizar métricas en tiempo real
             await AIMetricsService.record_metrics(
@@ -0,0 +1,214 @@
+"""
+Escritor asíncrono de métricas por lotes.
+
+Las métricas de conversación y de IA se encolan en memoria sin esperar a la
+base de datos y una tarea en segundo plano las inserta en bloque en Supabase,
+cuando se alcanza el tamaño de lote o cuando vence el intervalo de vaciado.
+
+La cola está acotada: ``submit`` nunca bloquea y descarta la métrica si la cola
+está llena, de modo que un turno de llamada en vivo no espera nunca a la base
+de datos. Los productores en segundo plano pueden usar ``put`` para esperar a
+que haya espacio (backpressure).
+"""
+import asyncio
+import logging
+import time
+from collections import defaultdict, deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from prometheus_client import Counter, Gauge, Histogram
+
+from app.config.metrics_config import MetricNames, get_metrics_settings
+from app.config.supabase import supabase_client
+from app.utils.supabase_helpers import execute_query
+
+logger = logging.getLogger(__name__)
+metrics_settings = get_metrics_settings()
+
+METRICS_SINK_QUEUE_SIZE = Gauge(
+    MetricNames.METRICS_SINK_QUEUE_SIZE,
+    "Métricas en cola pendientes de escritura"
+)
+METRICS_SINK_DROPPED_TOTAL = Counter(
+    MetricNames.METRICS_SINK_DROPPED_TOTAL,
+    "Métricas descartadas por cola llena o error de escritura",
+    ["table"]
+)
+METRICS_SINK_WRITTEN_TOTAL = Counter(
+    MetricNames.METRICS_SINK_WRITTEN_TOTAL,
+    "Métricas escritas en la base de datos",
+    ["table"]
+)
+METRICS_SINK_FLUSH_TIME = Histogram(
+    MetricNames.METRICS_SINK_FLUSH_TIME,
+    "Tiempo de escritura de cada lote de métricas"
+)
+
+
+class MetricsSink:
+    """
+    Cola acotada de métricas con escritura por lotes.
+
+    Attributes:
+        supabase: Cliente de Supabase
+        max_queue_size: Número máximo de métricas en cola
+        batch_size: Métricas escritas como máximo en cada inserción
+        flush_interval: Segundos máximos que una métrica espera en cola
+    """
+
+    def __init__(
+        self,
+        supabase=None,
+        max_queue_size: int = metrics_settings.sink_max_queue_size,
+        batch_size: int = metrics_settings.sink_batch_size,
+        flush_interval: float = metrics_settings.sink_flush_interval
+    ):
+        """
+        Inicializa el escritor de métricas.
+
+        Args:
+            supabase: Cliente de Supabase (por defecto, el cliente global)
+            max_queue_size: Número máximo de métricas en cola
+            batch_size: Métricas por inserción
+            flush_interval: Intervalo de vaciado en segundos
+        """
+        self.supabase = supabase or supabase_client
+        self.max_queue_size = max_queue_size
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+
+        self._buffer: Deque[Tuple[str, Dict[str, Any]]] = deque()
+        self._batch_ready: Optional[asyncio.Event] = None
+        self._space_available: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+        self._running = False
+
+    @property
+    def queue_size(self) -> int:
+        """Número de métricas pendientes de escritura."""
+        return len(self._buffer)
+
+    def submit(self, table: str, row: Dict[str, Any]) -> bool:
+        """
+        Encola una métrica sin bloquear.
+
+        Args:
+            table: Tabla de destino
+            row: Fila a insertar
+
+        Returns:
+            bool: False si la cola estaba llena y la métrica se descartó
+        """
+        if len(self._buffer) >= self.max_queue_size:
+            METRICS_SINK_DROPPED_TOTAL.labels(table=table).inc()
+            logger.warning(f"Cola de métricas llena, métrica de {table} descartada")
+            return False
+
+        self._buffer.append((table, row))
+        METRICS_SINK_QUEUE_SIZE.set(len(self._buffer))
+        if self._batch_ready and len(self._buffer) >= self.batch_size:
+            self._batch_ready.set()
+        return True
+
+    async def put(self, table: str, row: Dict[str, Any]) -> None:
+        """
+        Encola una métrica esperando a que haya espacio en la cola.
+
+        Pensado para productores en segundo plano; los turnos en vivo deben usar ``submit``.
+
+        Args:
+            table: Tabla de destino
+            row: Fila a insertar
+        """
+        while len(self._buffer) >= self.max_queue_size:
+            if self._space_available is None:
+                # Sin tarea de vaciado, se escribe directamente para liberar espacio
+                await self.flush()
+                continue
+            self._space_available.clear()
+            await self._space_available.wait()
+        self.submit(table, row)
+
+    async def start(self) -> None:
+        """Inicia la tarea de vaciado periódico."""
+        if self._task is None or self._task.done():
+            self._running = True
+            self._batch_ready = asyncio.Event()
+            self._space_available = asyncio.Event()
+            self._task = asyncio.create_task(self._flush_loop())
+            logger.info(f"Escritor de métricas iniciado con intervalo de {self.flush_interval} segundos")
+
+    async def stop(self) -> None:
+        """Detiene la tarea de vaciado y escribe las métricas pendientes."""
+        if self._task and not self._task.done():
+            self._running = False
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._batch_ready = None
+        self._space_available = None
+
+        while self._buffer:
+            await self.flush()
+        logger.info("Escritor de métricas detenido")
+
+    async def _flush_loop(self) -> None:
+        while self._running:
+            try:
+                try:
+                    await asyncio.wait_for(self._batch_ready.wait(), timeout=self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._batch_ready.clear()
+
+                while self._buffer:
+                    await self.flush()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error en el escritor de métricas: {str(e)}")
+                await asyncio.sleep(1)
+
+    async def flush(self) -> int:
+        """
+        Escribe un lote de métricas en la base de datos.
+
+        Returns:
+            int: Número de métricas retiradas de la cola (escritas o descartadas)
+        """
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+
+        async with self._flush_lock:
+            batch: List[Tuple[str, Dict[str, Any]]] = []
+            while self._buffer and len(batch) < self.batch_size:
+                batch.append(self._buffer.popleft())
+            if not batch:
+                return 0
+
+            rows_by_table: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+            for table, row in batch:
+                rows_by_table[table].append(row)
+
+            start = time.monotonic()
+            for table, rows in rows_by_table.items():
+                try:
+                    await execute_query(self.supabase.table(table).insert(rows), in_thread=True)
+                    METRICS_SINK_WRITTEN_TOTAL.labels(table=table).inc(len(rows))
+                except Exception as e:
+                    # Las métricas no son críticas: se descartan para no acumular reintentos
+                    METRICS_SINK_DROPPED_TOTAL.labels(table=table).inc(len(rows))
+                    logger.error(f"Error al escribir {len(rows)} métricas en {table}: {str(e)}")
+            METRICS_SINK_FLUSH_TIME.observe(time.monotonic() - start)
+
+            METRICS_SINK_QUEUE_SIZE.set(len(self._buffer))
+            if self._space_available:
+                self._space_available.set()
+            return len(batch)
+
+
+# Instancia global del escritor de métricas
+metrics_sink = MetricsSink()
@@ -0,0 +1,310 @@
+"""
+Control predictivo del ritmo de marcado.
+
+Con ``SCHEDULER_PACING_MODE=predictive`` el planificador no llena todas las
+plazas del motor de marcado, sino que marca tantas llamadas como se espera que
+puedan atender las conversaciones de IA disponibles.
+
+El controlador recibe del webhook de estado de Twilio cuándo se contesta y cómo
+termina cada llamada, y mantiene por campaña una ventana de los últimos
+resultados (contestada, ocupado, sin respuesta, fallida) y de la duración de las
+conversaciones. Con ellos estima:
+
+- La tasa de respuesta ``p`` de la campaña.
+- Las conversaciones que quedarán libres mientras suenan las nuevas llamadas:
+  las libres ahora más la fracción de las ocupadas que, según la duración media,
+  termina en ``PACING_RING_SECONDS``.
+
+Para ``n`` llamadas sonando, las contestadas siguen una binomial ``B(n, p)``; se
+elige el mayor ``n`` (hasta ``PACING_MAX_RATIO`` veces las conversaciones libres)
+cuya fracción esperada de llamadas contestadas sin conversación disponible no
+supera ``PACING_ABANDON_RATE``. Si el abandono observado supera ese límite, se
+marca sin sobremarcación hasta que vuelva a bajar.
+
+Las conversaciones de IA son comunes a todas las campañas, así que las llamadas
+a marcar forman un único presupuesto por ciclo del planificador
+(``begin_tick``): a ese ``n`` se le restan las llamadas que suenan, las que el
+motor de marcado tiene en cola o iniciándose y las ya concedidas en el ciclo a
+otras campañas o a los reintentos.
+"""
+import logging
+import math
+import time
+from collections import deque
+from typing import Deque, Dict, Optional, Set, Tuple
+
+from app.config.settings import settings
+from app.models.call import CallStatus
+
+logger = logging.getLogger(__name__)
+
+PACING_MODES = {"fixed", "predictive"}
+
+# Resultado de una llamada: (instante, contestada, abandonada)
+_Outcome = Tuple[float, bool, bool]
+
+
+class _CampaignStats:
+    """Ventana de resultados recientes de una campaña."""
+
+    def __init__(self, window: int):
+        self.outcomes: Deque[_Outcome] = deque(maxlen=window)
+        self.durations: Deque[int] = deque(maxlen=window)
+
+    def answer_rate(self) -> Optional[float]:
+        if not self.outcomes:
+            return None
+        return sum(1 for _, answered, _ in self.outcomes if answered) / len(self.outcomes)
+
+    def abandon_rate(self) -> float:
+        answered = sum(1 for _, was_answered, _ in self.outcomes if was_answered)
+        if not answered:
+            return 0.0
+        return sum(1 for _, _, abandoned in self.outcomes if abandoned) / answered
+
+    def avg_handle_time(self) -> Optional[float]:
+        if not self.durations:
+            return None
+        return sum(self.durations) / len(self.durations)
+
+
+class PacingController:
+    """
+    Calcula cuántas llamadas marcar según la tasa de respuesta observada.
+
+    Attributes:
+        mode: ``fixed`` (se llenan todas las plazas) o ``predictive``
+        ai_capacity: Conversaciones de IA simultáneas disponibles
+        abandon_rate: Fracción máxima de llamadas contestadas sin conversación libre
+        max_ratio: Llamadas sonando como máximo por conversación libre
+        min_samples: Resultados necesarios antes de sobremarcar
+        ring_seconds: Tiempo medio que suena una llamada antes de contestarse
+    """
+
+    def __init__(
+        self,
+        mode: str = settings.SCHEDULER_PACING_MODE,
+        ai_capacity: int = settings.PACING_AI_CAPACITY,
+        abandon_rate: float = settings.PACING_ABANDON_RATE,
+        max_ratio: float = settings.PACING_MAX_RATIO,
+        window: int = settings.PACING_WINDOW,
+        min_samples: int = settings.PACING_MIN_SAMPLES,
+        ring_seconds: float = settings.PACING_RING_SECONDS,
+        stale_after: float = settings.SCHEDULER_CALL_SLOT_TIMEOUT
+    ):
+        """
+        Inicializa el controlador.
+
+        Args:
+            mode: ``fixed`` o ``predictive``
+            ai_capacity: Conversaciones de IA simultáneas disponibles
+            abandon_rate: Fracción máxima de llamadas contestadas sin conversación libre
+            max_ratio: Llamadas sonando como máximo por conversación libre
+            window: Resultados recientes que se tienen en cuenta por campaña
+            min_samples: Resultados necesarios antes de sobremarcar
+            ring_seconds: Tiempo medio que suena una llamada antes de contestarse
+            stale_after: Segundos tras los que se olvida una llamada sin estado final
+        """
+        if mode not in PACING_MODES:
+            raise ValueError(f"Modo de marcado no válido: {mode}. Valores permitidos: {', '.join(sorted(PACING_MODES))}")
+        self.mode = mode
+        self.ai_capacity = max(1, ai_capacity)
+        self.abandon_rate = abandon_rate
+        self.max_ratio = max(1.0, max_ratio)
+        self.window = window
+        self.min_samples = min_samples
+        self.ring_seconds = ring_seconds
+        self.stale_after = stale_after
+
+        self._stats: Dict[str, _CampaignStats] = {}
+        self._ringing: Dict[str, float] = {}
+        self._talking: Dict[str, float] = {}
+        self._abandoned: Set[str] = set()
+        self._outstanding: Optional[int] = None
+        self._granted = 0
+
+    @property
+    def enabled(self) -> bool:
+        """Indica si el ritmo de marcado es predictivo."""
+        return self.mode == "predictive"
+
+    def ringing(self) -> int:
+        """Llamadas marcadas que aún no se han contestado."""
+        return len(self._ringing)
+
+    def talking(self) -> int:
+        """Llamadas contestadas que ocupan una conversación."""
+        return len(self._talking)
+
+    def tracks(self, call_id: str) -> bool:
+        """Indica si una llamada marcada por esta instancia sigue sonando o en conversación."""
+        call_id = str(call_id)
+        return call_id in self._ringing or call_id in self._talking
+
+    def _campaign(self, campaign_id: str) -> _CampaignStats:
+        campaign_id = str(campaign_id)
+        if campaign_id not in self._stats:
+            self._stats[campaign_id] = _CampaignStats(self.window)
+        return self._stats[campaign_id]
+
+    def record_dial(self, campaign_id: str, call_id: str) -> None:
+        """
+        Registra una llamada que empieza a sonar.
+
+        Args:
+            campaign_id: ID de la campaña
+            call_id: ID de la llamada
+        """
+        self._campaign(campaign_id)
+        self._ringing[str(call_id)] = time.monotonic()
+
+    def record_answer(self, call_id: str) -> None:
+        """
+        Registra que una llamada se contestó.
+
+        Si no queda ninguna conversación libre, la llamada cuenta como abandonada.
+
+        Args:
+            call_id: ID de la llamada
+        """
+        call_id = str(call_id)
+        if call_id in self._talking:
+            return
+        self._ringing.pop(call_id, None)
+        if len(self._talking) >= self.ai_capacity:
+            self._abandoned.add(call_id)
+            logger.warning(f"Llamada {call_id} contestada sin conversación de IA disponible")
+        self._talking[call_id] = time.monotonic()
+
+    def record_outcome(
+        self,
+        campaign_id: str,
+        call_id: str,
+        status: CallStatus,
+        duration: Optional[int] = None
+    ) -> None:
+        """
+        Registra el resultado final de una llamada.
+
+        Args:
+            campaign_id: ID de la campaña
+            call_id: ID de la llamada
+            status: Estado final
+            duration: Duración de la llamada en segundos (opcional)
+        """
+        call_id = str(call_id)
+        answered = status == CallStatus.COMPLETED or call_id in self._talking
+        self._ringing.pop(call_id, None)
+        self._talking.pop(call_id, None)
+        abandoned = call_id in self._abandoned
+        self._abandoned.discard(call_id)
+
+        stats = self._campaign(campaign_id)
+        stats.outcomes.append((time.time(), answered, abandoned))
+        if answered and duration:
+            stats.durations.append(int(duration))
+
+    def answer_rate(self, campaign_id: str) -> Optional[float]:
+        """Tasa de respuesta reciente de una campaña (None sin resultados)."""
+        return self._campaign(campaign_id).answer_rate()
+
+    def begin_tick(self, pending: int = 0) -> None:
+        """
+        Inicia el presupuesto de llamadas de un ciclo del planificador.
+
+        Args:
+            pending: Llamadas en cola o iniciándose en el motor de marcado, que aún no suenan
+        """
+        self._prune()
+        self._outstanding = self.ringing() + max(0, pending)
+        self._granted = 0
+
+    def return_unused(self, count: int) -> None:
+        """
+        Devuelve al presupuesto del ciclo llamadas concedidas que no se encolaron.
+
+        Args:
+            count: Llamadas concedidas sin usar
+        """
+        if self.enabled and count > 0:
+            self._granted = max(0, self._granted - count)
+
+    def allowance(self, campaign_id: str, capacity: int) -> int:
+        """
+        Número de llamadas nuevas a marcar para una campaña.
+
+        Las llamadas concedidas se descuentan del presupuesto del ciclo; las que
+        no lleguen a encolarse se devuelven con ``return_unused``.
+
+        Args:
+            campaign_id: ID de la campaña
+            capacity: Plazas libres de la campaña en el motor de marcado
+
+        Returns:
+            int: Llamadas a marcar, como mucho ``capacity``
+        """
+        if not self.enabled or capacity <= 0:
+            return capacity
+
+        self._prune()
+        stats = self._campaign(campaign_id)
+        free = self._expected_free(stats)
+        if free <= 0:
+            return 0
+
+        p = stats.answer_rate()
+        if (
+            p is None
+            or len(stats.outcomes) < self.min_samples
+            or stats.abandon_rate() > self.abandon_rate
+        ):
+            # Sin datos suficientes o con demasiado abandono: una llamada por conversación libre
+            target = math.floor(free)
+        else:
+            target = self._optimal_dials(free, max(p, 0.01))
+
+        if self._outstanding is None:
+            # Sin ciclo iniciado no hay presupuesto común: solo se descuentan las llamadas que suenan
+            return max(0, min(capacity, target - self.ringing()))
+        granted = max(0, min(capacity, target - self._outstanding - self._granted))
+        self._granted += granted
+        return granted
+
+    def _prune(self) -> None:
+        # Olvida las llamadas cuyo estado final no llegó a este proceso
+        limit = time.monotonic() - self.stale_after
+        for calls in (self._ringing, self._talking):
+            for call_id in [call_id for call_id, since in calls.items() if since < limit]:
+                del calls[call_id]
+                self._abandoned.discard(call_id)
+
+    def _expected_free(self, stats: _CampaignStats) -> float:
+        free = self.ai_capacity - self.talking()
+        handle_time = stats.avg_handle_time()
+        if handle_time and self._talking:
+            # Conversaciones que se espera que terminen mientras suenan las nuevas llamadas
+            free += self.talking() * min(1.0, self.ring_seconds / handle_time)
+        return free
+
+    def _optimal_dials(self, free: float, p: float) -> int:
+        """Mayor número de llamadas sonando cuyo abandono esperado no supera el límite."""
+        agents = math.floor(free)
+        best = agents
+        for n in range(agents + 1, math.floor(free * self.max_ratio) + 1):
+            if self._expected_abandon(n, p, agents) > self.abandon_rate:
+                break
+            best = n
+        return best
+
+    @staticmethod
+    def _expected_abandon(n: int, p: float, agents: int) -> float:
+        """Fracción esperada de llamadas contestadas sin conversación libre con ``n`` llamadas sonando."""
+        overflow = sum(
+            (k - agents) * math.comb(n, k) * p ** k * (1 - p) ** (n - k)
+            for k in range(agents + 1, n + 1)
+        )
+        return overflow / (n * p)
+
+
+# Instancia global del controlador de ritmo de marcado
+pacing_controller = PacingController()
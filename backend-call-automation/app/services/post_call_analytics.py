@@ -0,0 +1,393 @@
+"""
+Análisis por lotes de llamadas completadas.
+
+En lugar de analizar el sentimiento en cada turno de la llamada, este servicio
+recoge el historial (``call_history``) de las llamadas finalizadas y calcula
+sentimiento, resumen y resultado de varias llamadas en un único prompt. Los
+resultados se guardan en bloque en ``conversation_metrics`` y las llamadas se
+marcan como analizadas con ``analytics_processed_at``.
+
+Las llamadas cuyo lote falla o cuyo resultado omite el modelo suman un intento
+en ``analytics_attempts``; tras ``POST_CALL_MAX_ATTEMPTS`` dejan de buscarse.
+"""
+import asyncio
+import json
+import logging
+import re
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set
+
+from app.config.ai_config import AISettings
+from app.config.supabase import supabase_client
+from app.services.llm_gateway import LLMPriority
+from app.services.llm_router import LLMRouter
+from app.services.prompt_registry import prompt_registry
+from app.utils.supabase_helpers import execute_query
+
+logger = logging.getLogger(__name__)
+settings = AISettings()
+
+CALL_OUTCOMES = [
+    "interested",
+    "not_interested",
+    "callback_requested",
+    "resolved",
+    "unresolved",
+    "no_conversation"
+]
+
+SENTIMENTS = {"positive", "neutral", "negative"}
+
+ANALYTICS_SOURCE = "post_call"
+
+
+class PostCallAnalyticsService:
+    """
+    Servicio que analiza por lotes las llamadas completadas.
+
+    Attributes:
+        supabase: Cliente de Supabase
+        batch_size: Llamadas agrupadas en cada prompt
+        max_calls_per_run: Llamadas procesadas como máximo en cada ciclo
+        max_transcript_chars: Caracteres máximos de transcripción por llamada
+        max_attempts: Intentos fallidos tras los que una llamada deja de analizarse
+        interval: Intervalo en segundos entre ciclos
+    """
+
+    def __init__(
+        self,
+        supabase=None,
+        llm_router: Optional[LLMRouter] = None,
+        batch_size: int = settings.POST_CALL_BATCH_SIZE,
+        max_calls_per_run: int = settings.POST_CALL_MAX_CALLS_PER_RUN,
+        max_transcript_chars: int = settings.POST_CALL_MAX_TRANSCRIPT_CHARS,
+        max_attempts: int = settings.POST_CALL_MAX_ATTEMPTS,
+        interval: int = settings.POST_CALL_ANALYTICS_INTERVAL
+    ):
+        """
+        Inicializa el servicio de análisis posterior.
+
+        Args:
+            supabase: Cliente de Supabase (por defecto, el cliente global)
+            llm_router: Enrutador de LLM (se crea desde la configuración si es None)
+            batch_size: Llamadas agrupadas en cada prompt
+            max_calls_per_run: Llamadas procesadas como máximo en cada ciclo
+            max_transcript_chars: Caracteres máximos de transcripción por llamada
+            max_attempts: Intentos fallidos tras los que una llamada deja de analizarse
+            interval: Intervalo en segundos entre ciclos
+        """
+        self.supabase = supabase or supabase_client
+        self._llm_router = llm_router
+        self.batch_size = max(1, batch_size)
+        self.max_calls_per_run = max_calls_per_run
+        self.max_transcript_chars = max_transcript_chars
+        self.max_attempts = max(1, max_attempts)
+        self.interval = interval
+        self.prompt_registry = prompt_registry
+
+        self._pending: Set[str] = set()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._running = False
+
+    @property
+    def llm_router(self) -> LLMRouter:
+        """Enrutador de LLM, creado al primer uso."""
+        if self._llm_router is None:
+            self._llm_router = LLMRouter.from_settings(settings)
+        return self._llm_router
+
+    def enqueue(self, call_id: str) -> None:
+        """
+        Marca una llamada finalizada para su análisis en el próximo lote.
+
+        No realiza ninguna operación bloqueante, por lo que puede llamarse
+        desde el cierre de la llamada sin añadir latencia.
+
+        Args:
+            call_id: ID de la llamada
+        """
+        self._pending.add(str(call_id))
+        if self._wakeup and len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+
+    async def start(self) -> None:
+        """Inicia el bucle periódico de análisis."""
+        if self._task is None or self._task.done():
+            self._running = True
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._loop())
+            logger.info(f"Análisis posterior de llamadas iniciado con intervalo de {self.interval} segundos")
+
+    async def stop(self) -> None:
+        """Detiene el bucle de análisis."""
+        if self._task and not self._task.done():
+            self._running = False
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            logger.info("Análisis posterior de llamadas detenido")
+
+    async def _loop(self) -> None:
+        while self._running:
+            try:
+                await self.run_once()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error en el análisis posterior de llamadas: {str(e)}")
+                await asyncio.sleep(10)
+
+    async def run_once(self) -> int:
+        """
+        Ejecuta un ciclo de análisis sobre las llamadas pendientes.
+
+        Returns:
+            int: Número de llamadas analizadas
+        """
+        calls = await self._fetch_pending_calls()
+        if not calls:
+            return 0
+
+        histories = await self._fetch_histories([call["id"] for call in calls])
+        for call in calls:
+            if not histories.get(call["id"]) and call.get("interaction_history"):
+                # Llamadas cuyo historial solo se guardó en la propia fila
+                histories[call["id"]] = call["interaction_history"]
+
+        with_history = [call for call in calls if histories.get(call["id"])]
+        batches = [
+            with_history[i:i + self.batch_size]
+            for i in range(0, len(with_history), self.batch_size)
+        ]
+        results = await asyncio.gather(
+            *(self._analyze_batch(batch, histories) for batch in batches),
+            return_exceptions=True
+        )
+
+        analyses: Dict[str, Dict[str, Any]] = {}
+        for batch, result in zip(batches, results):
+            if isinstance(result, Exception):
+                # Las llamadas del lote quedan pendientes para el próximo ciclo
+                logger.error(f"Error al analizar lote de {len(batch)} llamadas: {str(result)}")
+                continue
+            analyses.update(result)
+
+        failed = [call["id"] for call in with_history if call["id"] not in analyses]
+        if failed:
+            await self._record_failures(failed)
+
+        for call in calls:
+            if not histories.get(call["id"]):
+                analyses[call["id"]] = self._default_analysis(outcome="no_conversation")
+
+        rows = [
+            self._build_metrics_row(call, histories.get(call["id"], []), analyses[call["id"]])
+            for call in calls
+            if call["id"] in analyses
+        ]
+        if not rows:
+            return 0
+
+        await self._save_results(rows)
+        self._pending.difference_update(row["call_id"] for row in rows)
+        logger.info(f"Análisis posterior completado para {len(rows)} llamadas")
+        return len(rows)
+
+    async def _fetch_pending_calls(self) -> List[Dict[str, Any]]:
+        """
+        Obtiene las llamadas completadas aún no analizadas.
+
+        Las llamadas encoladas desde ``handle_call_end`` tienen preferencia; el
+        resto se recupera de la base de datos, lo que cubre reinicios del proceso.
+        """
+        calls: Dict[str, Dict[str, Any]] = {}
+
+        if self._pending:
+            queued = list(self._pending)[:self.max_calls_per_run]
+            response = await execute_query(
+                self.supabase.table("calls")
+                .select("id, campaign_id, interaction_history")
+                .in_("id", queued)
+                .eq("status", "completed")
+                .is_("analytics_processed_at", "null")
+                .lt("analytics_attempts", self.max_attempts),
+                in_thread=True
+            )
+            for call in response.data or []:
+                calls[str(call["id"])] = call
+            # Las llamadas ya analizadas o no completadas salen de la cola
+            self._pending.difference_update(set(queued) - set(calls))
+
+        remaining = self.max_calls_per_run - len(calls)
+        if remaining > 0:
+            response = await execute_query(
+                self.supabase.table("calls")
+                .select("id, campaign_id, interaction_history")
+                .eq("status", "completed")
+                .is_("analytics_processed_at", "null")
+                .lt("analytics_attempts", self.max_attempts)
+                .order("updated_at")
+                .limit(remaining),
+                in_thread=True
+            )
+            for call in response.data or []:
+                calls.setdefault(str(call["id"]), call)
+
+        return [{**call, "id": call_id} for call_id, call in calls.items()]
+
+    async def _fetch_histories(self, call_ids: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """Obtiene en una sola consulta el historial de todas las llamadas."""
+        response = await execute_query(
+            self.supabase.table("call_history")
+            .select("call_id, user_message, ai_response, timestamp")
+            .in_("call_id", call_ids)
+            .order("timestamp"),
+            in_thread=True
+        )
+        histories: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for turn in response.data or []:
+            histories[str(turn["call_id"])].append(turn)
+        return histories
+
+    def _format_transcript(self, turns: List[Dict[str, Any]]) -> str:
+        lines = []
+        for turn in turns:
+            if turn.get("user_message"):
+                lines.append(f"Cliente: {turn['user_message']}")
+            if turn.get("ai_response"):
+                lines.append(f"Agente: {turn['ai_response']}")
+        transcript = "\n".join(lines)
+        if len(transcript) > self.max_transcript_chars:
+            # El final de la llamada suele contener el resultado
+            transcript = "..." + transcript[-self.max_transcript_chars:]
+        return transcript
+
+    async def _analyze_batch(
+        self,
+        calls: List[Dict[str, Any]],
+        histories: Dict[str, List[Dict[str, Any]]]
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Analiza un lote de llamadas con un único prompt.
+
+        Returns:
+            Dict[str, Dict[str, Any]]: Análisis por ID de llamada
+        """
+        blocks = [
+            f"### Llamada {call['id']}\n{self._format_transcript(histories[call['id']])}"
+            for call in calls
+        ]
+        prompt = self.prompt_registry.format_post_call_batch("\n\n".join(blocks), CALL_OUTCOMES)
+
+        response = await self.llm_router.invoke(
+            lambda provider: (prompt, {}),
+            priority=LLMPriority.BACKGROUND
+        )
+        items = self._parse_response(response)
+
+        items = [item for item in items if isinstance(item, dict)]
+        by_id = {str(item["call_id"]): item for item in items if item.get("call_id") is not None}
+        # Solo si el modelo no repite ningún ID y devuelve un resultado por
+        # llamada se asocian por posición
+        by_position = not by_id and len(items) == len(calls)
+
+        analyses: Dict[str, Dict[str, Any]] = {}
+        for index, call in enumerate(calls):
+            item = items[index] if by_position else by_id.get(call["id"])
+            if item is None:
+                # Sin resultado fiable, la llamada queda pendiente para el próximo lote
+                continue
+            analyses[call["id"]] = self._normalize_analysis(item)
+        return analyses
+
+    @staticmethod
+    def _parse_response(response: Any) -> List[Any]:
+        text = getattr(response, "content", response)
+        if not isinstance(text, str):
+            text = str(text)
+        match = re.search(r"\[.*\]", text, re.DOTALL)
+        if not match:
+            raise ValueError("La respuesta del modelo no contiene un array JSON")
+        items = json.loads(match.group(0))
+        if not isinstance(items, list):
+            raise ValueError("La respuesta del modelo no es una lista")
+        return items
+
+    @staticmethod
+    def _default_analysis(outcome: str = "unresolved") -> Dict[str, Any]:
+        return {"sentiment": "neutral", "sentiment_score": 0.5, "summary": "", "outcome": outcome}
+
+    def _normalize_analysis(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        analysis = self._default_analysis()
+
+        sentiment = str(item.get("sentiment", "")).lower()
+        if sentiment in SENTIMENTS:
+            analysis["sentiment"] = sentiment
+
+        try:
+            analysis["sentiment_score"] = min(1.0, max(0.0, float(item.get("sentiment_score", 0.5))))
+        except (TypeError, ValueError):
+            pass
+
+        analysis["summary"] = str(item.get("summary") or "")[:1000]
+
+        outcome = str(item.get("outcome", "")).lower()
+        if outcome in CALL_OUTCOMES:
+            analysis["outcome"] = outcome
+        return analysis
+
+    @staticmethod
+    def _build_metrics_row(
+        call: Dict[str, Any],
+        turns: List[Dict[str, Any]],
+        analysis: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        return {
+            "conversation_id": call["id"],
+            "call_id": call["id"],
+            "campaign_id": call.get("campaign_id"),
+            "source": ANALYTICS_SOURCE,
+            "timestamp": datetime.now().isoformat(),
+            "input_sentiment": analysis["sentiment"],
+            "sentiment": analysis["sentiment"],
+            "sentiment_score": analysis["sentiment_score"],
+            "summary": analysis["summary"],
+            "outcome": analysis["outcome"],
+            "turn_count": len(turns)
+        }
+
+    async def _save_results(self, rows: List[Dict[str, Any]]) -> None:
+        """Guarda los resultados en bloque y marca las llamadas como analizadas."""
+        await execute_query(
+            self.supabase.table("conversation_metrics").upsert(rows, on_conflict="call_id,source"),
+            in_thread=True
+        )
+        await execute_query(
+            self.supabase.table("calls")
+            .update({"analytics_processed_at": datetime.now().isoformat()})
+            .in_("id", [row["call_id"] for row in rows]),
+            in_thread=True
+        )
+
+    async def _record_failures(self, call_ids: List[str]) -> None:
+        """Suma un intento fallido a las llamadas que quedaron sin analizar."""
+        try:
+            await execute_query(
+                self.supabase.rpc("record_analytics_failures", {"p_call_ids": call_ids}),
+                in_thread=True
+            )
+        except Exception as e:
+            logger.error(f"Error al registrar el fallo del análisis de {len(call_ids)} llamadas: {str(e)}")
+
+
+# Instancia global del servicio de análisis posterior
+post_call_analytics = PostCallAnalyticsService()
@@ -0,0 +1,369 @@
+"""
+Registro de plantillas de prompts precompiladas.
+
+Este módulo compila una única vez las plantillas de prompts usadas por los
+servicios de IA y pre-renderiza la parte estática de los prompts de campaña
+(empresa, producto, puntos clave...) una vez por campaña, de modo que en cada
+turno de la conversación solo se interpolan las variables que cambian.
+
+El prompt renderizado se divide en un prefijo estático y un sufijo por turno.
+El prefijo se coloca siempre al principio para aprovechar la caché de prompts
+del proveedor cuando está disponible.
+"""
+import hashlib
+import json
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+from langchain_core.output_parsers import JsonOutputParser
+from langchain_core.prompts import PromptTemplate
+
+from app.config.campaign_prompts import (
+    CAMPAIGN_PROMPTS,
+    CONTACT_VARIABLES,
+    CONVERSATION_SECTION_MARKER,
+    REQUIRED_VARIABLES,
+    TURN_VARIABLES,
+)
+
+logger = logging.getLogger(__name__)
+
+SENTIMENT_TEMPLATE = """Analiza el sentimiento del siguiente texto y clasifícalo.
+            Texto: {text}
+            Devuelve un objeto JSON con la emoción primaria (primary_emotion) y su puntuación (score). \n{format_instructions}"""
+
+SUGGEST_ACTIONS_TEMPLATE = """
+                Basándote en la siguiente interacción, sugiere hasta 3 acciones a tomar:
+
+                Mensaje del usuario: {message}
+
+                Respuesta del sistema: {response}
+
+                Análisis de sentimiento: {sentiment}
+
+                Contexto adicional: {context}
+
+                Proporciona hasta 3 acciones recomendadas en formato JSON:
+                [
+                    {{
+                        "action_type": "continue_conversation/offer_callback/escalate/end_conversation/send_information",
+                        "priority": "high/medium/low",
+                        "description": "descripción de la acción",
+                        "reason": "razón para esta acción"
+                    }}
+                ]
+                \n{format_instructions}
+                """
+
+POST_CALL_BATCH_TEMPLATE = """Analiza las siguientes llamadas telefónicas completadas.
+Para cada llamada determina el sentimiento global del cliente, una puntuación de
+sentimiento entre 0 (muy negativo) y 1 (muy positivo), un resumen breve de una o
+dos frases y el resultado de la llamada.
+
+Resultados posibles: {outcomes}
+
+{calls}
+
+Devuelve únicamente un array JSON con un objeto por llamada, en el mismo orden:
+[
+    {{
+        "call_id": "id de la llamada",
+        "sentiment": "positive/neutral/negative",
+        "sentiment_score": 0.5,
+        "summary": "resumen breve",
+        "outcome": "uno de los resultados posibles"
+    }}
+]"""
+
+# Proveedores que requieren marcar explícitamente el bloque a cachear.
+# OpenAI y Google cachean prefijos de forma implícita, por lo que basta con
+# mantener el prefijo estático al principio del prompt.
+EXPLICIT_CACHE_PROVIDERS = {"anthropic"}
+
+# Proveedores que aceptan una clave de caché para enrutar peticiones con el mismo prefijo
+CACHE_KEY_PROVIDERS = {"openai"}
+
+
+@dataclass(frozen=True)
+class RenderedPrompt:
+    """Prompt renderizado dividido en prefijo estático y sufijo por turno."""
+
+    static_prefix: str
+    turn_suffix: str
+    cache_key: str
+
+    @property
+    def text(self) -> str:
+        """Prompt completo como texto plano."""
+        return f"{self.static_prefix}{self.turn_suffix}"
+
+    def to_messages(self, provider: str) -> List[BaseMessage]:
+        """
+        Convierte el prompt en mensajes, marcando el prefijo estático para la caché del proveedor.
+
+        Args:
+            provider: Proveedor de LLM (openai, google, ...)
+
+        Returns:
+            List[BaseMessage]: Mensaje de sistema con el prefijo y mensaje humano con el turno
+        """
+        if provider in EXPLICIT_CACHE_PROVIDERS:
+            system = SystemMessage(content=[{
+                "type": "text",
+                "text": self.static_prefix,
+                "cache_control": {"type": "ephemeral"}
+            }])
+        else:
+            system = SystemMessage(content=self.static_prefix)
+        return [system, HumanMessage(content=self.turn_suffix)]
+
+    def invoke_kwargs(self, provider: str) -> Dict[str, Any]:
+        """
+        Argumentos adicionales de invocación para la caché del proveedor.
+
+        Args:
+            provider: Proveedor de LLM
+
+        Returns:
+            Dict[str, Any]: Argumentos a pasar a ``ainvoke``
+        """
+        if provider in CACHE_KEY_PROVIDERS:
+            return {"prompt_cache_key": self.cache_key}
+        return {}
+
+
+class PromptRegistry:
+    """
+    Registro de plantillas de prompts compiladas una sola vez.
+
+    Attributes:
+        campaign_prompts: Plantillas de texto por tipo de campaña
+        required_variables: Variables requeridas por tipo de campaña
+        max_cached_campaigns: Número máximo de campañas pre-renderizadas en memoria
+    """
+
+    def __init__(
+        self,
+        campaign_prompts: Optional[Dict[str, str]] = None,
+        required_variables: Optional[Dict[str, List[str]]] = None,
+        max_cached_campaigns: int = 256,
+        max_cached_prefixes: int = 4096
+    ):
+        """
+        Inicializa el registro y compila todas las plantillas.
+
+        Args:
+            campaign_prompts: Plantillas por tipo de campaña (por defecto, las de configuración)
+            required_variables: Variables requeridas por tipo de campaña
+            max_cached_campaigns: Número máximo de campañas pre-renderizadas en memoria
+            max_cached_prefixes: Número máximo de prefijos renderizados (por campaña y contacto) en memoria
+        """
+        self.campaign_prompts = campaign_prompts or CAMPAIGN_PROMPTS
+        self.required_variables = required_variables or REQUIRED_VARIABLES
+        self.max_cached_campaigns = max_cached_campaigns
+        self.max_cached_prefixes = max_cached_prefixes
+
+        self._json_parser = JsonOutputParser()
+        self.sentiment_prompt = PromptTemplate(
+            input_variables=["text"],
+            partial_variables={"format_instructions": self._json_parser.get_format_instructions()},
+            template=SENTIMENT_TEMPLATE
+        )
+        self.suggest_actions_prompt = PromptTemplate(
+            input_variables=["message", "response", "sentiment", "context"],
+            partial_variables={"format_instructions": self._json_parser.get_format_instructions()},
+            template=SUGGEST_ACTIONS_TEMPLATE
+        )
+
+        self.post_call_batch_prompt = PromptTemplate(
+            input_variables=["outcomes", "calls"],
+            template=POST_CALL_BATCH_TEMPLATE
+        )
+
+        self.campaign_templates: Dict[str, PromptTemplate] = {}
+        self._prefix_templates: Dict[str, PromptTemplate] = {}
+        self._suffix_templates: Dict[str, PromptTemplate] = {}
+        for campaign_type, template_str in self.campaign_prompts.items():
+            self._compile_campaign_template(campaign_type, template_str)
+
+        self._campaign_prefixes: "OrderedDict[Tuple[str, str], PromptTemplate]" = OrderedDict()
+        self._rendered_prefixes: "OrderedDict[Tuple[str, str, str], Tuple[str, str]]" = OrderedDict()
+
+    def _compile_campaign_template(self, campaign_type: str, template_str: str) -> None:
+        """
+        Compila la plantilla completa y sus partes estática y por turno.
+
+        Args:
+            campaign_type: Tipo de campaña
+            template_str: Texto de la plantilla
+        """
+        self.campaign_templates[campaign_type] = PromptTemplate(
+            input_variables=self.required_variables[campaign_type],
+            template=template_str
+        )
+
+        marker_index = template_str.find(CONVERSATION_SECTION_MARKER)
+        if marker_index < 0:
+            # Sin marcador, todo el prompt se considera por turno
+            prefix_str, suffix_str = "", template_str
+        else:
+            prefix_str, suffix_str = template_str[:marker_index], template_str[marker_index:]
+
+        self._prefix_templates[campaign_type] = PromptTemplate.from_template(prefix_str)
+        self._suffix_templates[campaign_type] = PromptTemplate.from_template(suffix_str)
+
+    def has_campaign_type(self, campaign_type: str) -> bool:
+        """Indica si existe una plantilla para el tipo de campaña."""
+        return campaign_type in self.campaign_templates
+
+    def campaign_variables(self, campaign_type: str) -> List[str]:
+        """
+        Variables estáticas de la campaña (ni del contacto ni del turno).
+
+        Args:
+            campaign_type: Tipo de campaña
+
+        Returns:
+            List[str]: Nombres de las variables estáticas de la campaña
+        """
+        excluded = set(CONTACT_VARIABLES) | set(TURN_VARIABLES)
+        return [var for var in self.required_variables[campaign_type] if var not in excluded]
+
+    @staticmethod
+    def _digest(values: Dict[str, Any]) -> str:
+        return hashlib.sha1(json.dumps(values, sort_keys=True, default=str).encode()).hexdigest()
+
+    def _campaign_prefix(self, campaign_type: str, campaign_key: str, campaign_values: Dict[str, str]) -> PromptTemplate:
+        """
+        Obtiene el prefijo con las variables de la campaña ya interpoladas.
+
+        El resultado se guarda en una caché LRU por campaña, de modo que las
+        variables de la campaña se interpolan una sola vez.
+
+        Args:
+            campaign_type: Tipo de campaña
+            campaign_key: ID de la campaña y huella de sus valores
+            campaign_values: Valores de las variables estáticas de la campaña
+
+        Returns:
+            PromptTemplate: Plantilla parcial que solo espera variables del contacto
+        """
+        key = (campaign_type, campaign_key)
+        prefix = self._campaign_prefixes.get(key)
+        if prefix is not None:
+            self._campaign_prefixes.move_to_end(key)
+            return prefix
+
+        template = self._prefix_templates[campaign_type]
+        bound = {k: v for k, v in campaign_values.items() if k in template.input_variables}
+        prefix = template.partial(**bound)
+
+        self._campaign_prefixes[key] = prefix
+        if len(self._campaign_prefixes) > self.max_cached_campaigns:
+            self._campaign_prefixes.popitem(last=False)
+        return prefix
+
+    def _static_prefix(
+        self,
+        campaign_type: str,
+        variables: Dict[str, Any],
+        campaign_id: Optional[str]
+    ) -> Tuple[str, str]:
+        """
+        Obtiene el prefijo estático renderizado y su clave de caché.
+
+        El texto se guarda en una caché LRU por campaña (ID y huella de sus
+        valores, que cambia con cada versión) y contacto, de modo que en los
+        turnos de una llamada solo se formatea el sufijo.
+
+        Args:
+            campaign_type: Tipo de campaña
+            variables: Variables del prompt
+            campaign_id: ID de la campaña (opcional)
+
+        Returns:
+            Tuple[str, str]: Prefijo renderizado y su clave de caché
+        """
+        campaign_values = {var: variables[var] for var in self.campaign_variables(campaign_type) if var in variables}
+        # Los valores forman parte de la clave para invalidar la entrada si la campaña cambia
+        campaign_key = f"{campaign_id or ''}:{self._digest(campaign_values)}"
+        prefix_variables = self._prefix_templates[campaign_type].input_variables
+        contact_values = {
+            var: variables[var] for var in prefix_variables
+            if var in variables and var not in campaign_values
+        }
+        key = (campaign_type, campaign_key, self._digest(contact_values))
+
+        rendered = self._rendered_prefixes.get(key)
+        if rendered is not None:
+            self._rendered_prefixes.move_to_end(key)
+            return rendered
+
+        prefix_template = self._campaign_prefix(campaign_type, campaign_key, campaign_values)
+        static_prefix = prefix_template.format(
+            **{var: variables[var] for var in prefix_template.input_variables if var in variables}
+        )
+        rendered = (static_prefix, hashlib.sha1(f"{campaign_type}|{static_prefix}".encode()).hexdigest())
+
+        self._rendered_prefixes[key] = rendered
+        if len(self._rendered_prefixes) > self.max_cached_prefixes:
+            self._rendered_prefixes.popitem(last=False)
+        return rendered
+
+    def render_campaign_prompt(
+        self,
+        campaign_type: str,
+        variables: Dict[str, Any],
+        campaign_id: Optional[str] = None
+    ) -> RenderedPrompt:
+        """
+        Renderiza el prompt de una campaña separando prefijo estático y turno.
+
+        Args:
+            campaign_type: Tipo de campaña
+            variables: Variables del prompt (campaña, contacto y turno)
+            campaign_id: ID de la campaña, usado como clave de la caché (opcional)
+
+        Returns:
+            RenderedPrompt: Prompt renderizado
+
+        Raises:
+            KeyError: Si el tipo de campaña no existe
+        """
+        static_prefix, cache_key = self._static_prefix(campaign_type, variables, campaign_id)
+
+        suffix_template = self._suffix_templates[campaign_type]
+        turn_suffix = suffix_template.format(
+            **{var: variables[var] for var in suffix_template.input_variables if var in variables}
+        )
+
+        return RenderedPrompt(static_prefix=static_prefix, turn_suffix=turn_suffix, cache_key=cache_key)
+
+    def format_sentiment(self, text: str) -> str:
+        """Formatea el prompt de análisis de sentimiento."""
+        return self.sentiment_prompt.format(text=text)
+
+    def format_suggest_actions(self, message: str, response: str, sentiment: str, context: str) -> str:
+        """Formatea el prompt de sugerencia de acciones."""
+        return self.suggest_actions_prompt.format(
+            message=message,
+            response=response,
+            sentiment=sentiment,
+            context=context
+        )
+
+    def format_post_call_batch(self, calls: str, outcomes: List[str]) -> str:
+        """Formatea el prompt de análisis por lotes de llamadas completadas."""
+        return self.post_call_batch_prompt.format(calls=calls, outcomes=", ".join(outcomes))
+
+    def clear_campaign_cache(self) -> None:
+        """Elimina todos los prefijos de campaña pre-renderizados."""
+        self._campaign_prefixes.clear()
+        self._rendered_prefixes.clear()
+
+
+# Instancia global del registro
+prompt_registry = PromptRegistry()
@@ -0,0 +1,291 @@
+"""
+Coordinación de varias instancias del planificador de campañas.
+
+Cada instancia (proceso o réplica) se registra en Redis con un latido
+periódico en un conjunto ordenado de miembros; las que dejan de latir durante
+``SCHEDULER_INSTANCE_TTL`` segundos se dan por caídas y se eliminan.
+
+Las campañas se reparten entre los miembros vivos con hashing de rendezvous
+(cada campaña es de la instancia con mayor ``hash(instancia, campaña)``), de
+modo que al entrar o salir una instancia solo cambian de dueño las campañas que
+le corresponden. Además, para procesar una campaña la instancia debe tener su
+concesión en Redis (``SET NX`` con vencimiento, renovada con cada latido): aunque
+dos instancias discrepen un momento sobre los miembros, solo una procesa cada
+campaña. Una instancia suelta las concesiones de las campañas que ya no le
+corresponden en cuanto detecta el cambio, y las de una instancia caída vencen
+en ``SCHEDULER_CAMPAIGN_LEASE_SECONDS``, tras lo cual su nuevo dueño las toma.
+"""
+import asyncio
+import hashlib
+import logging
+import time
+import uuid
+from typing import Dict, Iterable, List, Optional, Set
+
+from app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Toma o renueva la concesión de una campaña; devuelve 0 o los ms que le quedan a la del dueño actual
+_CLAIM = """
+local owner = redis.call('GET', KEYS[1])
+if owner == ARGV[1] then
+    redis.call('PEXPIRE', KEYS[1], ARGV[2])
+    return 0
+end
+if redis.call('SET', KEYS[1], ARGV[1], 'NX', 'PX', ARGV[2]) then
+    return 0
+end
+local ttl = redis.call('PTTL', KEYS[1])
+if ttl < 0 then
+    return tonumber(ARGV[2])
+end
+return ttl
+"""
+
+# Renueva varias concesiones; devuelve 1 por cada una que sigue siendo de esta instancia
+_RENEW = """
+local kept = {}
+for i, key in ipairs(KEYS) do
+    if redis.call('GET', key) == ARGV[1] then
+        redis.call('PEXPIRE', key, ARGV[2])
+        kept[i] = 1
+    else
+        kept[i] = 0
+    end
+end
+return kept
+"""
+
+# Suelta una concesión si pertenece a esta instancia
+_RELEASE = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+def _weight(instance_id: str, campaign_id: str) -> int:
+    digest = hashlib.blake2b(f"{instance_id}:{campaign_id}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+class SchedulerCoordinator:
+    """
+    Reparte las campañas entre las instancias del planificador.
+
+    Attributes:
+        redis: Cliente asíncrono de Redis
+        prefix: Prefijo de las claves de coordinación
+        instance_id: Identificador de esta instancia
+        heartbeat_interval: Segundos entre latidos
+        instance_ttl: Segundos sin latido tras los que una instancia se da por caída
+        lease_seconds: Segundos que dura la concesión de una campaña sin renovar
+    """
+
+    def __init__(
+        self,
+        redis=None,
+        prefix: str = "sched",
+        instance_id: Optional[str] = None,
+        heartbeat_interval: float = settings.SCHEDULER_HEARTBEAT_INTERVAL,
+        instance_ttl: float = settings.SCHEDULER_INSTANCE_TTL,
+        lease_seconds: float = settings.SCHEDULER_CAMPAIGN_LEASE_SECONDS
+    ):
+        """
+        Inicializa el coordinador.
+
+        Args:
+            redis: Cliente asíncrono de Redis (por defecto, uno conectado a ``settings.REDIS_URL``)
+            prefix: Prefijo de las claves de coordinación
+            instance_id: Identificador de esta instancia (por defecto, uno aleatorio)
+            heartbeat_interval: Segundos entre latidos
+            instance_ttl: Segundos sin latido tras los que una instancia se da por caída
+            lease_seconds: Segundos que dura la concesión de una campaña sin renovar
+        """
+        if redis is None:
+            from redis.asyncio import Redis
+
+            redis = Redis.from_url(settings.REDIS_URL)
+        self.redis = redis
+        self.prefix = prefix
+        self.instance_id = instance_id or uuid.uuid4().hex
+        self.heartbeat_interval = heartbeat_interval
+        self.instance_ttl = instance_ttl
+        self.lease_seconds = lease_seconds
+
+        self._members: List[str] = []
+        self._held: Set[str] = set()
+        self._changed = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._retry_handles: Dict[str, asyncio.TimerHandle] = {}
+
+    @property
+    def members(self) -> List[str]:
+        """Instancias vivas según el último latido."""
+        return list(self._members)
+
+    @property
+    def held(self) -> Set[str]:
+        """Campañas cuya concesión tiene esta instancia."""
+        return set(self._held)
+
+    def _members_key(self) -> str:
+        return f"{self.prefix}:members"
+
+    def _lease_key(self, campaign_id: str) -> str:
+        return f"{self.prefix}:lease:{campaign_id}"
+
+    def owner(self, campaign_id: str) -> Optional[str]:
+        """
+        Instancia a la que corresponde una campaña según los miembros conocidos.
+
+        Args:
+            campaign_id: ID de la campaña
+
+        Returns:
+            Optional[str]: ID de la instancia, o None si no hay miembros
+        """
+        if not self._members:
+            return None
+        return max(self._members, key=lambda member: _weight(member, str(campaign_id)))
+
+    async def start(self) -> None:
+        """Registra la instancia e inicia los latidos."""
+        if self._task and not self._task.done():
+            return
+        await self.heartbeat()
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"Instancia de planificador {self.instance_id} registrada ({len(self._members)} activas)")
+
+    async def stop(self) -> None:
+        """Detiene los latidos, suelta las concesiones y da de baja la instancia."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for handle in self._retry_handles.values():
+            handle.cancel()
+        self._retry_handles.clear()
+        try:
+            for campaign_id in list(self._held):
+                await self.release(campaign_id)
+            await self.redis.zrem(self._members_key(), self.instance_id)
+        except Exception as e:
+            logger.error(f"Error al dar de baja la instancia de planificador {self.instance_id}: {str(e)}")
+        logger.info(f"Instancia de planificador {self.instance_id} dada de baja")
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                await self.heartbeat()
+            except Exception as e:
+                logger.error(f"Error en el latido del planificador {self.instance_id}: {str(e)}")
+
+    async def heartbeat(self) -> None:
+        """
+        Registra un latido, actualiza los miembros vivos y renueva las concesiones.
+
+        Suelta las concesiones de las campañas que ya no corresponden a esta
+        instancia y avisa (``wait_for_change``) si cambiaron los miembros.
+        """
+        now = time.time()
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.zadd(self._members_key(), {self.instance_id: now})
+            pipe.zremrangebyscore(self._members_key(), "-inf", now - self.instance_ttl)
+            pipe.zrange(self._members_key(), 0, -1)
+            *_, members = await pipe.execute()
+
+        members = sorted(m.decode() if isinstance(m, bytes) else m for m in members)
+        if members != self._members:
+            logger.info(f"Instancias de planificador activas: {len(members)}")
+            self._members = members
+            self._changed.set()
+
+        if self._held:
+            held = sorted(self._held)
+            kept = await self.redis.eval(
+                _RENEW, len(held), *[self._lease_key(c) for c in held],
+                self.instance_id, int(self.lease_seconds * 1000)
+            )
+            for campaign_id, still_held in zip(held, kept):
+                if not int(still_held):
+                    self._held.discard(campaign_id)
+            for campaign_id in [c for c in self._held if self.owner(c) != self.instance_id]:
+                await self.release(campaign_id)
+
+    async def assign(self, campaign_ids: Iterable[str]) -> Set[str]:
+        """
+        Campañas que esta instancia debe procesar ahora.
+
+        Son las que le corresponden por hashing y cuya concesión consigue. Si otra
+        instancia aún tiene la concesión de una de ellas, se avisa
+        (``wait_for_change``) cuando venza.
+
+        Args:
+            campaign_ids: IDs de las campañas activas
+
+        Returns:
+            Set[str]: IDs de las campañas asignadas a esta instancia
+        """
+        if not self._members:
+            await self.heartbeat()
+
+        assigned: Set[str] = set()
+        for campaign_id in map(str, campaign_ids):
+            if self.owner(campaign_id) != self.instance_id:
+                continue
+            remaining = int(await self.redis.eval(
+                _CLAIM, 1, self._lease_key(campaign_id),
+                self.instance_id, int(self.lease_seconds * 1000)
+            ))
+            if remaining == 0:
+                self._held.add(campaign_id)
+                assigned.add(campaign_id)
+            else:
+                self._notify_after(campaign_id, remaining / 1000)
+        return assigned
+
+    async def release(self, campaign_id: str) -> None:
+        """
+        Suelta la concesión de una campaña.
+
+        Args:
+            campaign_id: ID de la campaña
+        """
+        campaign_id = str(campaign_id)
+        self._held.discard(campaign_id)
+        await self.redis.eval(_RELEASE, 1, self._lease_key(campaign_id), self.instance_id)
+
+    def _notify_after(self, campaign_id: str, delay: float) -> None:
+        if campaign_id in self._retry_handles:
+            return
+
+        def notify() -> None:
+            self._retry_handles.pop(campaign_id, None)
+            self._changed.set()
+
+        self._retry_handles[campaign_id] = asyncio.get_running_loop().call_later(delay, notify)
+
+    async def wait_for_change(self, timeout: float) -> bool:
+        """
+        Espera a que cambien los miembros o venza una concesión pendiente.
+
+        Args:
+            timeout: Segundos máximos de espera
+
+        Returns:
+            bool: True si hubo un cambio
+        """
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self._changed.clear()
@@ -1,20 +1,76 @@
 """
 Servicio para la integración con Twilio.
+
+Las peticiones a Twilio se hacen con su cliente HTTP asíncrono
+(``AsyncTwilioHttpClient``, sobre aiohttp con conexiones reutilizadas), de modo
+que marcar una llamada no bloquea el bucle de eventos. El cliente, el límite de
+peticiones simultáneas (``TWILIO_MAX_CONCURRENT_REQUESTS``) y el de llamadas por
+segundo (``TWILIO_CALLS_PER_SECOND``, el CPS de la cuenta) se comparten entre
+todas las instancias del servicio del proceso. Si Twilio responde con un 429 se
+pausan todas las llamadas y se reintenta.
 """
-from typing import Dict, Any, Optional
+import asyncio
+from typing import Dict, Any, List, Optional
 import logging
 from twilio.rest import Client
 from twilio.base.exceptions import TwilioRestException
+from twilio.http.async_http_client import AsyncTwilioHttpClient
 from app.config.settings import Settings  # Importar Settings
+from app.utils.rate_limiter import RateLimiter
 
 logger = logging.getLogger(__name__)
 settings = Settings() # Instanciar Settings
 
+# Código de error de Twilio por exceso de peticiones
+TWILIO_RATE_LIMIT_CODE = 20429
+
+# Recursos compartidos por todas las instancias del servicio (se crean al usarse)
+_async_client: Optional[Client] = None
+_request_semaphore: Optional[asyncio.Semaphore] = None
+_calls_rate_limiter: Optional[RateLimiter] = None
+
+
+def _get_request_semaphore() -> asyncio.Semaphore:
+    """Devuelve el límite de peticiones simultáneas a Twilio del proceso."""
+    global _request_semaphore
+    if _request_semaphore is None:
+        _request_semaphore = asyncio.Semaphore(settings.TWILIO_MAX_CONCURRENT_REQUESTS)
+    return _request_semaphore
+
+
+def _get_calls_rate_limiter() -> RateLimiter:
+    """Devuelve el limitador de llamadas por segundo del proceso."""
+    global _calls_rate_limiter
+    if _calls_rate_limiter is None:
+        _calls_rate_limiter = RateLimiter(settings.TWILIO_CALLS_PER_SECOND, burst=settings.TWILIO_CALLS_BURST)
+    return _calls_rate_limiter
+
+
+def _get_async_client(account_sid: str, auth_token: str) -> Client:
+    """Devuelve el cliente asíncrono de Twilio del proceso, creándolo si hace falta."""
+    global _async_client
+    if _async_client is None:
+        _async_client = Client(account_sid, auth_token, http_client=AsyncTwilioHttpClient())
+    return _async_client
+
+
+async def close_async_client() -> None:
+    """Cierra las conexiones del cliente asíncrono de Twilio."""
+    global _async_client
+    if _async_client is not None:
+        await _async_client.http_client.close()
+        _async_client = None
+
+
+def _is_rate_limited(error: TwilioRestException) -> bool:
+    return error.status == 429 or error.code == TWILIO_RATE_LIMIT_CODE
+
+
 class TwilioService:
     """
     Servicio para la integración con Twilio.
     """
-    
+
     def __init__(self):
         """
         Inicializa el servicio de Twilio.
@@ -23,50 +79,116 @@ class TwilioService:
         self.auth_token = settings.TWILIO_AUTH_TOKEN # Usar settings
         self.client = Client(self.account_sid, self.auth_token) if self.account_sid and self.auth_token else None
 
+    @property
+    def rate_limiter(self) -> RateLimiter:
+        """Limitador de llamadas por segundo compartido."""
+        return _get_calls_rate_limiter()
+
+    @property
+    def async_client(self) -> Client:
+        """Cliente de Twilio con transporte asíncrono."""
+        if not self.client:
+            raise ValueError("Twilio client not initialized. Check TWILIO_ACCOUNT_SID and TWILIO_AUTH_TOKEN environment variables.")
+        return _get_async_client(self.account_sid, self.auth_token)
+
     async def make_call(self, to: str, from_: str, url: str, status_callback: Optional[str] = None, timeout: int = 30) -> Dict[str, Any]:
         """
         Realiza una llamada usando Twilio.
-        
+
+        Respeta el límite de llamadas por segundo de la cuenta y, si Twilio
+        responde con un 429, espera y reintenta hasta ``TWILIO_RATE_LIMIT_RETRIES`` veces.
+
         Args:
             to: Número de teléfono al que se realizará la llamada
             from_: Número de teléfono desde el que se realizará la llamada
             url: URL del webhook para manejar la llamada
             status_callback: URL para recibir actualizaciones del estado de la llamada
             timeout: Tiempo máximo de espera para la llamada en segundos
-            
+
         Returns:
             Dict[str, Any]: Información de la llamada creada
-            
+
         Raises:
             Exception: Si hay un error al realizar la llamada
         """
+        client = self.async_client
+        params = {'to': to, 'from_': from_, 'url': url, 'timeout': timeout}
+        if status_callback:
+            params['status_callback'] = status_callback
+
+        attempt = 0
+        while True:
+            try:
+                await self.rate_limiter.acquire()
+                logger.debug(f"Realizando llamada a {to} desde {from_}")
+                async with _get_request_semaphore():
+                    call = await client.calls.create_async(**params)
+                break
+
+            except TwilioRestException as e:
+                if _is_rate_limited(e) and attempt < settings.TWILIO_RATE_LIMIT_RETRIES:
+                    attempt += 1
+                    delay = settings.TWILIO_RATE_LIMIT_BACKOFF * 2 ** (attempt - 1)
+                    logger.warning(f"Límite de peticiones de Twilio alcanzado; reintento {attempt} en {delay}s")
+                    self.rate_limiter.pause(delay)
+                    continue
+                logger.error(f"Error de Twilio al realizar la llamada: {str(e)}")
+                raise Exception(f"Twilio error: {str(e)}")
+
+            except Exception as e:
+                logger.error(f"Error al realizar la llamada: {str(e)}")
+                raise
+
+        logger.debug(f"Llamada creada con SID: {call.sid}")
+        return {
+            'sid': call.sid,
+            'status': call.status,
+            'direction': call.direction,
+            'from': call.from_,
+            'to': call.to,
+            'duration': call.duration
+        }
+
+    async def make_calls(self, calls: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Realiza varias llamadas de forma concurrente.
+
+        Las llamadas se inician en paralelo dentro de los límites de peticiones
+        simultáneas y de llamadas por segundo. El error de una llamada no
+        interrumpe las demás.
+
+        Args:
+            calls: Argumentos de ``make_call`` de cada llamada (``to``, ``from_``,
+                ``url`` y, opcionalmente, ``status_callback`` y ``timeout``)
+
+        Returns:
+            List[Dict[str, Any]]: Por cada llamada, en el mismo orden, la información
+            de la llamada creada o ``{'error': mensaje}``
+        """
+        results = await asyncio.gather(
+            *(self.make_call(**call) for call in calls),
+            return_exceptions=True
+        )
+        return [
+            {'error': str(result)} if isinstance(result, BaseException) else result
+            for result in results
+        ]
+
+    async def cancel_call(self, sid: str) -> None:
+        """
+        Cancela una llamada en curso o en cola.
+
+        Args:
+            sid: SID de la llamada en Twilio
+
+        Raises:
+            Exception: Si hay un error al cancelar la llamada
+        """
         try:
-            if not self.client:
-                raise ValueError("Twilio client not initialized. Check TWILIO_ACCOUNT_SID and TWILIO_AUTH_TOKEN environment variables.")
-            
-            logger.debug(f"Realizando llamada a {to} desde {from_}")
-            call = self.client.calls.create(
-                to=to,
-                from_=from_,
-                url=url,
-                status_callback=status_callback,
-                timeout=timeout
-            )
-            
-            logger.debug(f"Llamada creada con SID: {call.sid}")
-            return {
-                'sid': call.sid,
-                'status': call.status,
-                'direction': call.direction,
-                'from': call.from_,
-                'to': call.to,
-                'duration': call.duration
-            }
-            
+            async with _get_request_semaphore():
+                await self.async_client.calls(sid).update_async(status='canceled')
+            logger.debug(f"Llamada {sid} cancelada")
+
         except TwilioRestException as e:
-            logger.error(f"Error de Twilio al realizar la llamada: {str(e)}")
+            logger.error(f"Error de Twilio al cancelar la llamada {sid}: {str(e)}")
             raise Exception(f"Twilio error: {str(e)}")
-            
-        except Exception as e:
-            logger.error(f"Error al realizar la llamada: {str(e)}")
-            raise
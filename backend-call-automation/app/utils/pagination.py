@@ -0,0 +1,159 @@
+"""
+Paginación por clave (keyset) sobre consultas de Supabase.
+
+Las páginas se ordenan por ``(created_at, id)`` y cada página continúa a partir
+de la última fila de la anterior, de modo que el coste de cada página no crece
+con la profundidad como ocurre con ``range(offset, offset + limit)``.
+
+Los endpoints exponen la posición como un token opaco (``cursor``) que codifica
+el ``(created_at, id)`` de la última fila devuelta.
+"""
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+from fastapi import HTTPException
+
+from app.utils.supabase_helpers import execute_query
+
+Cursor = Tuple[str, str]
+
+
+def encode_cursor(cursor: Cursor) -> str:
+    """
+    Codifica un cursor como token opaco.
+
+    Args:
+        cursor: ``(created_at, id)`` de la última fila devuelta
+
+    Returns:
+        str: Token en base64 apto para URLs
+    """
+    payload = json.dumps([str(cursor[0]), str(cursor[1])], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str) -> Cursor:
+    """
+    Decodifica un token de cursor.
+
+    Args:
+        token: Token generado por ``encode_cursor``
+
+    Returns:
+        Cursor: ``(created_at, id)``
+
+    Raises:
+        HTTPException: Si el token no es válido
+    """
+    try:
+        payload = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        created_at, row_id = json.loads(payload)
+        # Se validan los valores porque se interpolan en el filtro de PostgREST
+        datetime.fromisoformat(created_at)
+        return created_at, str(UUID(row_id))
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError, AttributeError):
+        raise HTTPException(status_code=400, detail="Cursor de paginación no válido")
+
+
+def next_cursor(items: Sequence[Any], limit: int) -> Optional[str]:
+    """
+    Obtiene el token de la página siguiente.
+
+    Args:
+        items: Elementos devueltos (modelos o filas con ``created_at`` e ``id``)
+        limit: Tamaño de página solicitado
+
+    Returns:
+        Optional[str]: Token de la página siguiente, o None si no hay más elementos
+    """
+    if not items or len(items) < limit:
+        return None
+    last = items[-1]
+    if isinstance(last, dict):
+        return encode_cursor(row_cursor(last))
+    created_at = last.created_at
+    return encode_cursor((created_at.isoformat() if hasattr(created_at, "isoformat") else str(created_at), str(last.id)))
+
+
+def keyset_filter(cursor: Cursor, descending: bool = True) -> str:
+    """
+    Construye el filtro PostgREST que continúa tras una fila.
+
+    Args:
+        cursor: ``(created_at, id)`` de la última fila leída
+        descending: Si el orden es descendente
+
+    Returns:
+        str: Filtro para ``or_``
+    """
+    created_at, row_id = cursor
+    op = "lt" if descending else "gt"
+    return f'created_at.{op}."{created_at}",and(created_at.eq."{created_at}",id.{op}.{row_id})'
+
+
+def apply_keyset(query: Any, cursor: Optional[Cursor], limit: int, descending: bool = True) -> Any:
+    """
+    Aplica el orden, el filtro de continuación y el límite a una consulta.
+
+    Args:
+        query: Consulta de Supabase ya filtrada
+        cursor: ``(created_at, id)`` de la última fila leída (None para la primera página)
+        limit: Número máximo de filas
+        descending: Si el orden es descendente
+
+    Returns:
+        Any: Consulta paginada
+    """
+    query = query.order("created_at", desc=descending).order("id", desc=descending)
+    if cursor:
+        query = query.or_(keyset_filter(cursor, descending))
+    return query.limit(limit)
+
+
+def row_cursor(row: Dict[str, Any]) -> Cursor:
+    """
+    Obtiene el cursor de una fila.
+
+    Args:
+        row: Fila con ``created_at`` e ``id``
+
+    Returns:
+        Cursor: ``(created_at, id)``
+    """
+    return str(row["created_at"]), str(row["id"])
+
+
+async def iter_keyset_pages(
+    build_query: Callable[[], Any],
+    page_size: int = 1000,
+    descending: bool = True,
+    in_thread: bool = False
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Recorre una consulta página a página.
+
+    Args:
+        build_query: Función que devuelve la consulta filtrada (una nueva en cada llamada)
+        page_size: Filas por página
+        descending: Si el orden es descendente
+        in_thread: Ejecuta las consultas en un hilo (cliente síncrono)
+
+    Yields:
+        List[Dict[str, Any]]: Filas de cada página
+    """
+    cursor: Optional[Cursor] = None
+    while True:
+        result = await execute_query(
+            apply_keyset(build_query(), cursor, page_size, descending),
+            in_thread=in_thread
+        )
+        rows = result.data or []
+        if rows:
+            yield rows
+        if len(rows) < page_size:
+            return
+        cursor = row_cursor(rows[-1])
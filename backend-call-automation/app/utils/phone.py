@@ -0,0 +1,45 @@
+"""
+Normalización de números de teléfono.
+
+Los números se guardan en formato E.164 (``+`` seguido de 8 a 15 dígitos) para
+que coincidan con la columna ``phone_digits`` usada en las búsquedas por
+prefijo y con el formato que espera Twilio.
+"""
+import re
+
+_NON_DIGITS = re.compile(r"\D")
+
+
+def phone_digits(value: str) -> str:
+    """
+    Obtiene los dígitos de un número sin el prefijo internacional.
+
+    Args:
+        value: Número tal como lo introdujo el usuario (p. ej. ``+54 9 11 1234-5678`` o ``0054...``)
+
+    Returns:
+        str: Solo los dígitos, sin ``+`` ni ``00`` inicial
+    """
+    value = (value or "").strip()
+    if value.startswith("00"):
+        value = value[2:]
+    return _NON_DIGITS.sub("", value)
+
+
+def normalize_phone(value: str) -> str:
+    """
+    Normaliza un número de teléfono a formato E.164.
+
+    Args:
+        value: Número de teléfono
+
+    Returns:
+        str: Número en formato ``+<dígitos>``
+
+    Raises:
+        ValueError: Si el número no tiene entre 8 y 15 dígitos
+    """
+    digits = phone_digits(value)
+    if not 8 <= len(digits) <= 15:
+        raise ValueError(f"Número de teléfono no válido: {value}")
+    return f"+{digits}"
@@ -0,0 +1,73 @@
+"""
+Limitador de ritmo asíncrono (token bucket).
+
+Permite hasta ``burst`` operaciones seguidas y, después, ``rate`` operaciones
+por segundo. Los que esperan se atienden por orden de llegada. ``pause`` detiene
+a todos durante un tiempo, por ejemplo al recibir un 429 del proveedor.
+"""
+import asyncio
+import time
+
+
+class RateLimiter:
+    """
+    Limita el número de operaciones por segundo.
+
+    Attributes:
+        rate: Operaciones por segundo
+        burst: Operaciones que pueden hacerse seguidas
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        """
+        Inicializa el limitador.
+
+        Args:
+            rate: Operaciones por segundo
+            burst: Operaciones que pueden hacerse seguidas
+        """
+        if rate <= 0:
+            raise ValueError("El ritmo debe ser mayor que cero")
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        """Espera hasta poder realizar una operación."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def pause(self, seconds: float) -> None:
+        """
+        Detiene todas las operaciones durante un tiempo.
+
+        Args:
+            seconds: Segundos de pausa
+        """
+        now = time.monotonic()
+        self._paused_until = max(self._paused_until, now + seconds)
+        self._tokens = 0.0
+        self._updated = max(now, self._paused_until)
+
+    async def __aenter__(self) -> "RateLimiter":
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        return None
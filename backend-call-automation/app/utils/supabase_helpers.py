@@ -0,0 +1,27 @@
+"""
+Utilidades para ejecutar consultas de Supabase.
+"""
+import asyncio
+import inspect
+from typing import Any
+
+
+async def execute_query(query: Any, in_thread: bool = False) -> Any:
+    """
+    Ejecuta una consulta de Supabase con cliente síncrono o asíncrono.
+
+    Args:
+        query: Constructor de consulta de Supabase (table().select()...)
+        in_thread: Ejecuta la consulta en un hilo para no bloquear el bucle de eventos
+            cuando el cliente es síncrono
+
+    Returns:
+        Any: Respuesta de la consulta
+    """
+    if in_thread:
+        result = await asyncio.to_thread(query.execute)
+    else:
+        result = query.execute()
+    if inspect.isawaitable(result):
+        result = await result
+    return result
@@ -0,0 +1,93 @@
+"""
+Caché en memoria acotada con expiración por TTL.
+"""
+import time
+from collections import OrderedDict
+from typing import Callable, Generic, Iterator, Optional, Tuple, TypeVar
+
+K = TypeVar("K")
+V = TypeVar("V")
+
+
+class TTLCache(Generic[K, V]):
+    """
+    Diccionario en memoria con tamaño máximo y expiración de entradas.
+
+    Las entradas expiradas se eliminan al acceder a ellas y en cada escritura.
+    Si se supera el tamaño máximo se descarta la entrada más antigua.
+
+    Attributes:
+        ttl: Segundos de vida de cada entrada
+        maxsize: Número máximo de entradas
+    """
+
+    def __init__(self, ttl: float, maxsize: int = 10000, clock: Callable[[], float] = time.monotonic):
+        """
+        Inicializa la caché.
+
+        Args:
+            ttl: Segundos de vida de cada entrada
+            maxsize: Número máximo de entradas
+            clock: Función que devuelve el tiempo actual en segundos
+        """
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._clock = clock
+        self._data: "OrderedDict[K, Tuple[float, V]]" = OrderedDict()
+
+    def _evict_expired(self) -> None:
+        now = self._clock()
+        while self._data:
+            key, (expires_at, _) = next(iter(self._data.items()))
+            if expires_at > now:
+                break
+            del self._data[key]
+
+    def __setitem__(self, key: K, value: V) -> None:
+        self._data.pop(key, None)
+        self._data[key] = (self._clock() + self.ttl, value)
+        self._evict_expired()
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def __getitem__(self, key: K) -> V:
+        expires_at, value = self._data[key]
+        if expires_at <= self._clock():
+            del self._data[key]
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key: object) -> bool:
+        try:
+            self[key]
+        except KeyError:
+            return False
+        return True
+
+    def __delitem__(self, key: K) -> None:
+        del self._data[key]
+
+    def __len__(self) -> int:
+        self._evict_expired()
+        return len(self._data)
+
+    def __iter__(self) -> Iterator[K]:
+        self._evict_expired()
+        return iter(list(self._data))
+
+    def get(self, key: K, default: Optional[V] = None) -> Optional[V]:
+        """Devuelve el valor de la clave o ``default`` si no existe o expiró."""
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def pop(self, key: K, default: Optional[V] = None) -> Optional[V]:
+        """Elimina y devuelve el valor de la clave."""
+        value = self.get(key, default)
+        self._data.pop(key, None)
+        return value
+
+    def clear(self) -> None:
+        """Elimina todas las entradas."""
+        self._data.clear()
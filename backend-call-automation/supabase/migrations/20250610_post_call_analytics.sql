@@ -0,0 +1,50 @@
+-- Historial de turnos de cada llamada
+create table if not exists call_history (
+    id uuid primary key default uuid_generate_v4(),
+    call_id uuid references calls(id) on delete cascade,
+    user_message text,
+    ai_response text,
+    timestamp timestamp with time zone default now()
+);
+
+create index if not exists idx_call_history_call_id on call_history(call_id, timestamp);
+
+-- Métricas de conversación (por turno y resultados del análisis posterior)
+create table if not exists conversation_metrics (
+    id uuid primary key default uuid_generate_v4(),
+    conversation_id text,
+    timestamp timestamp with time zone default now(),
+    input_sentiment text,
+    response_sentiment text,
+    response_time double precision default 0,
+    tokens_used integer default 0
+);
+
+alter table conversation_metrics
+    add column if not exists call_id uuid references calls(id) on delete cascade,
+    add column if not exists campaign_id uuid references campaigns(id) on delete cascade,
+    add column if not exists source text not null default 'live',
+    add column if not exists sentiment text,
+    add column if not exists sentiment_score double precision,
+    add column if not exists summary text,
+    add column if not exists outcome text,
+    add column if not exists turn_count integer;
+
+-- Un único resultado de análisis posterior por llamada
+create unique index if not exists idx_conversation_metrics_call_source
+    on conversation_metrics(call_id, source);
+
+create index if not exists idx_conversation_metrics_campaign
+    on conversation_metrics(campaign_id, timestamp);
+
+-- Marca de llamadas ya analizadas
+alter table calls
+    add column if not exists analytics_processed_at timestamp with time zone;
+
+create index if not exists idx_calls_pending_analytics
+    on calls(updated_at)
+    where status = 'completed' and analytics_processed_at is null;
+
+-- Historial de interacciones guardado en la propia llamada
+alter table calls
+    add column if not exists interaction_history jsonb;
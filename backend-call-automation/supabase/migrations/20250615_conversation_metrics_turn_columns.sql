@@ -0,0 +1,10 @@
+-- Columnas de las métricas por turno escritas por lotes
+alter table conversation_metrics
+    add column if not exists message_length integer,
+    add column if not exists response_length integer,
+    add column if not exists input_sentiment_score double precision,
+    add column if not exists response_sentiment_score double precision,
+    add column if not exists campaign_type text;
+
+create index if not exists idx_conversation_metrics_conversation
+    on conversation_metrics(conversation_id, timestamp);
@@ -0,0 +1,37 @@
+-- Agregados de métricas de llamadas calculados en la base de datos
+
+alter table calls
+    add column if not exists duration integer;
+
+create index if not exists idx_calls_campaign_created
+    on calls(campaign_id, created_at);
+
+create index if not exists idx_calls_created_status
+    on calls(created_at, status);
+
+-- Número de llamadas y duración por estado
+create or replace function call_metrics_summary(
+    p_campaign_id uuid default null,
+    p_start timestamp with time zone default null,
+    p_end timestamp with time zone default null
+)
+returns table (
+    status text,
+    call_count bigint,
+    duration_count bigint,
+    total_duration bigint
+)
+language sql
+stable
+as $$
+    select
+        c.status::text,
+        count(*) as call_count,
+        count(coalesce(c.duration, c.duration_seconds)) as duration_count,
+        coalesce(sum(coalesce(c.duration, c.duration_seconds)), 0)::bigint as total_duration
+    from calls c
+    where (p_campaign_id is null or c.campaign_id = p_campaign_id)
+      and (p_start is null or c.created_at >= p_start)
+      and (p_end is null or c.created_at <= p_end)
+    group by c.status;
+$$;
@@ -0,0 +1,156 @@
+-- Contadores de campaña mantenidos de forma incremental
+
+-- Categoría de contador de un estado de llamada. pending_calls cuenta las
+-- llamadas creadas que aún no terminaron; las que terminaron sin éxito cuentan
+-- como fallidas.
+create or replace function call_counter_bucket(p_status text)
+returns text
+language sql
+immutable
+as $$
+    select case
+        when p_status = 'completed' then 'successful'
+        when p_status in ('failed', 'error', 'no_answer', 'busy', 'cancelled') then 'failed'
+        else 'pending'
+    end;
+$$;
+
+-- Aplica en bloque las diferencias de cada sentencia sobre calls
+create or replace function apply_campaign_counter_deltas()
+returns trigger
+language plpgsql
+as $$
+begin
+    if tg_op = 'INSERT' then
+        with deltas as (
+            select campaign_id,
+                   count(*) as total,
+                   count(*) filter (where call_counter_bucket(status::text) = 'successful') as successful,
+                   count(*) filter (where call_counter_bucket(status::text) = 'failed') as failed,
+                   count(*) filter (where call_counter_bucket(status::text) = 'pending') as pending
+            from new_rows
+            where campaign_id is not null
+            group by campaign_id
+        )
+        update campaigns c set
+            total_calls = coalesce(c.total_calls, 0) + d.total,
+            successful_calls = coalesce(c.successful_calls, 0) + d.successful,
+            failed_calls = coalesce(c.failed_calls, 0) + d.failed,
+            pending_calls = coalesce(c.pending_calls, 0) + d.pending
+        from deltas d
+        where c.id = d.campaign_id;
+
+    elsif tg_op = 'DELETE' then
+        with deltas as (
+            select campaign_id,
+                   count(*) as total,
+                   count(*) filter (where call_counter_bucket(status::text) = 'successful') as successful,
+                   count(*) filter (where call_counter_bucket(status::text) = 'failed') as failed,
+                   count(*) filter (where call_counter_bucket(status::text) = 'pending') as pending
+            from old_rows
+            where campaign_id is not null
+            group by campaign_id
+        )
+        update campaigns c set
+            total_calls = greatest(coalesce(c.total_calls, 0) - d.total, 0),
+            successful_calls = greatest(coalesce(c.successful_calls, 0) - d.successful, 0),
+            failed_calls = greatest(coalesce(c.failed_calls, 0) - d.failed, 0),
+            pending_calls = greatest(coalesce(c.pending_calls, 0) - d.pending, 0)
+        from deltas d
+        where c.id = d.campaign_id;
+
+    else
+        -- UPDATE: solo cuentan los cambios de categoría o de campaña
+        with changes as (
+            select n.campaign_id, 1 as sign, call_counter_bucket(n.status::text) as bucket
+            from new_rows n
+            join old_rows o on o.id = n.id
+            where o.campaign_id is distinct from n.campaign_id
+               or call_counter_bucket(o.status::text) <> call_counter_bucket(n.status::text)
+            union all
+            select o.campaign_id, -1 as sign, call_counter_bucket(o.status::text) as bucket
+            from old_rows o
+            join new_rows n on n.id = o.id
+            where o.campaign_id is distinct from n.campaign_id
+               or call_counter_bucket(o.status::text) <> call_counter_bucket(n.status::text)
+        ),
+        deltas as (
+            select campaign_id,
+                   sum(sign) as total,
+                   coalesce(sum(sign) filter (where bucket = 'successful'), 0) as successful,
+                   coalesce(sum(sign) filter (where bucket = 'failed'), 0) as failed,
+                   coalesce(sum(sign) filter (where bucket = 'pending'), 0) as pending
+            from changes
+            where campaign_id is not null
+            group by campaign_id
+        )
+        update campaigns c set
+            total_calls = greatest(coalesce(c.total_calls, 0) + d.total, 0),
+            successful_calls = greatest(coalesce(c.successful_calls, 0) + d.successful, 0),
+            failed_calls = greatest(coalesce(c.failed_calls, 0) + d.failed, 0),
+            pending_calls = greatest(coalesce(c.pending_calls, 0) + d.pending, 0)
+        from deltas d
+        where c.id = d.campaign_id;
+    end if;
+
+    return null;
+end;
+$$;
+
+drop trigger if exists trg_calls_counters_insert on calls;
+create trigger trg_calls_counters_insert
+    after insert on calls
+    referencing new table as new_rows
+    for each statement execute function apply_campaign_counter_deltas();
+
+drop trigger if exists trg_calls_counters_update on calls;
+create trigger trg_calls_counters_update
+    after update on calls
+    referencing old table as old_rows new table as new_rows
+    for each statement execute function apply_campaign_counter_deltas();
+
+drop trigger if exists trg_calls_counters_delete on calls;
+create trigger trg_calls_counters_delete
+    after delete on calls
+    referencing old table as old_rows
+    for each statement execute function apply_campaign_counter_deltas();
+
+-- Recalcula los contadores desde calls y corrige las campañas con desviaciones.
+-- Devuelve el número de campañas corregidas.
+create or replace function reconcile_campaign_counters(p_campaign_id uuid default null)
+returns integer
+language plpgsql
+as $$
+declare
+    v_fixed integer;
+begin
+    with actual as (
+        select c.id as campaign_id,
+               count(k.id) as total,
+               count(k.id) filter (where call_counter_bucket(k.status::text) = 'successful') as successful,
+               count(k.id) filter (where call_counter_bucket(k.status::text) = 'failed') as failed,
+               count(k.id) filter (where call_counter_bucket(k.status::text) = 'pending') as pending
+        from campaigns c
+        left join calls k on k.campaign_id = c.id
+        where p_campaign_id is null or c.id = p_campaign_id
+        group by c.id
+    )
+    update campaigns c set
+        total_calls = a.total,
+        successful_calls = a.successful,
+        failed_calls = a.failed,
+        pending_calls = a.pending
+    from actual a
+    where c.id = a.campaign_id
+      and (c.total_calls is distinct from a.total
+           or c.successful_calls is distinct from a.successful
+           or c.failed_calls is distinct from a.failed
+           or c.pending_calls is distinct from a.pending);
+
+    get diagnostics v_fixed = row_count;
+    return v_fixed;
+end;
+$$;
+
+-- Inicializar los contadores existentes
+select reconcile_campaign_counters();
@@ -0,0 +1,248 @@
+-- Rollups por campaña, hora y día de los resultados de las llamadas
+
+create table if not exists call_rollups (
+    campaign_id uuid not null references campaigns(id) on delete cascade,
+    granularity text not null check (granularity in ('hour', 'day')),
+    bucket_start timestamp with time zone not null,
+    status text not null,
+    call_count bigint not null default 0,
+    duration_count bigint not null default 0,
+    total_duration bigint not null default 0,
+    sentiment_count bigint not null default 0,
+    sentiment_sum double precision not null default 0,
+    updated_at timestamp with time zone default now(),
+    primary key (campaign_id, granularity, bucket_start, status)
+);
+
+create index if not exists idx_call_rollups_range
+    on call_rollups(granularity, bucket_start);
+
+-- Estados finales que se acumulan en los rollups
+create or replace function call_is_terminal(p_status text)
+returns boolean
+language sql
+immutable
+as $$
+    select p_status in ('completed', 'failed', 'error', 'busy', 'no_answer', 'cancelled');
+$$;
+
+-- Suma (o resta) contribuciones a los buckets horario y diario
+create or replace function apply_call_rollup_deltas(p_deltas jsonb)
+returns void
+language sql
+as $$
+    with deltas as (
+        select (d->>'campaign_id')::uuid as campaign_id,
+               (d->>'created_at')::timestamptz as created_at,
+               d->>'status' as status,
+               (d->>'calls')::bigint as calls,
+               (d->>'duration_count')::bigint as duration_count,
+               (d->>'total_duration')::bigint as total_duration,
+               (d->>'sentiment_count')::bigint as sentiment_count,
+               (d->>'sentiment_sum')::double precision as sentiment_sum
+        from jsonb_array_elements(p_deltas) d
+    ),
+    expanded as (
+        select campaign_id, g.granularity, date_trunc(g.granularity, created_at) as bucket_start, status,
+               sum(calls) as calls, sum(duration_count) as duration_count, sum(total_duration) as total_duration,
+               sum(sentiment_count) as sentiment_count, sum(sentiment_sum) as sentiment_sum
+        from deltas
+        cross join (values ('hour'), ('day')) as g(granularity)
+        where campaign_id is not null
+        group by 1, 2, 3, 4
+    )
+    insert into call_rollups as r (
+        campaign_id, granularity, bucket_start, status,
+        call_count, duration_count, total_duration, sentiment_count, sentiment_sum
+    )
+    select campaign_id, granularity, bucket_start, status,
+           calls, duration_count, total_duration, sentiment_count, sentiment_sum
+    from expanded
+    on conflict (campaign_id, granularity, bucket_start, status) do update set
+        call_count = r.call_count + excluded.call_count,
+        duration_count = r.duration_count + excluded.duration_count,
+        total_duration = r.total_duration + excluded.total_duration,
+        sentiment_count = r.sentiment_count + excluded.sentiment_count,
+        sentiment_sum = r.sentiment_sum + excluded.sentiment_sum,
+        updated_at = now();
+$$;
+
+-- Contribución de un conjunto de llamadas en estado final
+create or replace function call_rollup_contributions(p_rows jsonb, p_sign integer)
+returns jsonb
+language sql
+stable
+as $$
+    select coalesce(jsonb_agg(jsonb_build_object(
+        'campaign_id', r->>'campaign_id',
+        'created_at', r->>'created_at',
+        'status', r->>'status',
+        'calls', p_sign,
+        'duration_count', case when coalesce(r->>'duration', r->>'duration_seconds') is not null then p_sign else 0 end,
+        'total_duration', p_sign * coalesce((r->>'duration')::bigint, (r->>'duration_seconds')::bigint, 0),
+        'sentiment_count', 0,
+        'sentiment_sum', 0
+    )), '[]'::jsonb)
+    from jsonb_array_elements(p_rows) r
+    where call_is_terminal(r->>'status');
+$$;
+
+-- Mantiene los rollups al terminar, cambiar o borrar llamadas
+create or replace function maintain_call_rollups()
+returns trigger
+language plpgsql
+as $$
+declare
+    v_added jsonb := '[]'::jsonb;
+    v_removed jsonb := '[]'::jsonb;
+begin
+    if tg_op = 'INSERT' then
+        select call_rollup_contributions(coalesce(jsonb_agg(to_jsonb(n)), '[]'::jsonb), 1)
+        into v_added from new_rows n;
+    elsif tg_op = 'DELETE' then
+        select call_rollup_contributions(coalesce(jsonb_agg(to_jsonb(o)), '[]'::jsonb), -1)
+        into v_removed from old_rows o;
+    else
+        -- Solo las filas cuyo estado, campaña, fecha o duración cambian
+        select call_rollup_contributions(coalesce(jsonb_agg(to_jsonb(n)), '[]'::jsonb), 1)
+        into v_added
+        from new_rows n join old_rows o on o.id = n.id
+        where (o.status, o.campaign_id, o.created_at, o.duration)
+              is distinct from (n.status, n.campaign_id, n.created_at, n.duration);
+
+        select call_rollup_contributions(coalesce(jsonb_agg(to_jsonb(o)), '[]'::jsonb), -1)
+        into v_removed
+        from old_rows o join new_rows n on n.id = o.id
+        where (o.status, o.campaign_id, o.created_at, o.duration)
+              is distinct from (n.status, n.campaign_id, n.created_at, n.duration);
+    end if;
+
+    if jsonb_array_length(v_added || v_removed) > 0 then
+        perform apply_call_rollup_deltas(v_added || v_removed);
+    end if;
+    return null;
+end;
+$$;
+
+drop trigger if exists trg_calls_rollups_insert on calls;
+create trigger trg_calls_rollups_insert
+    after insert on calls
+    referencing new table as new_rows
+    for each statement execute function maintain_call_rollups();
+
+drop trigger if exists trg_calls_rollups_update on calls;
+create trigger trg_calls_rollups_update
+    after update on calls
+    referencing old table as old_rows new table as new_rows
+    for each statement execute function maintain_call_rollups();
+
+drop trigger if exists trg_calls_rollups_delete on calls;
+create trigger trg_calls_rollups_delete
+    after delete on calls
+    referencing old table as old_rows
+    for each statement execute function maintain_call_rollups();
+
+-- Añade el sentimiento del análisis posterior al bucket de la llamada
+create or replace function maintain_call_rollup_sentiment()
+returns trigger
+language plpgsql
+as $$
+declare
+    v_deltas jsonb;
+begin
+    select coalesce(jsonb_agg(jsonb_build_object(
+        'campaign_id', k.campaign_id,
+        'created_at', k.created_at,
+        'status', k.status::text,
+        'calls', 0,
+        'duration_count', 0,
+        'total_duration', 0,
+        'sentiment_count', 1,
+        'sentiment_sum', m.sentiment_score
+    )), '[]'::jsonb)
+    into v_deltas
+    from new_rows m
+    join calls k on k.id = m.call_id
+    where m.source = 'post_call'
+      and m.sentiment_score is not null
+      and call_is_terminal(k.status::text);
+
+    if jsonb_array_length(v_deltas) > 0 then
+        perform apply_call_rollup_deltas(v_deltas);
+    end if;
+    return null;
+end;
+$$;
+
+drop trigger if exists trg_conversation_metrics_rollups on conversation_metrics;
+create trigger trg_conversation_metrics_rollups
+    after insert on conversation_metrics
+    referencing new table as new_rows
+    for each statement execute function maintain_call_rollup_sentiment();
+
+-- Reconstruye los rollups desde calls y conversation_metrics
+create or replace function rebuild_call_rollups(p_campaign_id uuid default null)
+returns void
+language plpgsql
+as $$
+begin
+    delete from call_rollups where p_campaign_id is null or campaign_id = p_campaign_id;
+
+    insert into call_rollups (
+        campaign_id, granularity, bucket_start, status,
+        call_count, duration_count, total_duration, sentiment_count, sentiment_sum
+    )
+    select k.campaign_id, g.granularity, date_trunc(g.granularity, k.created_at), k.status::text,
+           count(*),
+           count(coalesce(k.duration, k.duration_seconds)),
+           coalesce(sum(coalesce(k.duration, k.duration_seconds)), 0),
+           count(m.sentiment_score),
+           coalesce(sum(m.sentiment_score), 0)
+    from calls k
+    cross join (values ('hour'), ('day')) as g(granularity)
+    left join conversation_metrics m on m.call_id = k.id and m.source = 'post_call'
+    where call_is_terminal(k.status::text)
+      and k.campaign_id is not null
+      and (p_campaign_id is null or k.campaign_id = p_campaign_id)
+    group by 1, 2, 3, 4;
+end;
+$$;
+
+-- Consulta por rango sobre los rollups (hour, day, week, month)
+create or replace function call_rollup_timeline(
+    p_campaign_id uuid default null,
+    p_start timestamp with time zone default null,
+    p_end timestamp with time zone default null,
+    p_bucket text default 'day'
+)
+returns table (
+    bucket timestamp with time zone,
+    status text,
+    call_count bigint,
+    duration_count bigint,
+    total_duration bigint,
+    sentiment_count bigint,
+    sentiment_sum double precision
+)
+language sql
+stable
+as $$
+    select
+        date_trunc(p_bucket, r.bucket_start) as bucket,
+        r.status,
+        sum(r.call_count)::bigint,
+        sum(r.duration_count)::bigint,
+        sum(r.total_duration)::bigint,
+        sum(r.sentiment_count)::bigint,
+        sum(r.sentiment_sum)
+    from call_rollups r
+    where r.granularity = case when p_bucket = 'hour' then 'hour' else 'day' end
+      and (p_campaign_id is null or r.campaign_id = p_campaign_id)
+      and (p_start is null or r.bucket_start >= date_trunc(case when p_bucket = 'hour' then 'hour' else 'day' end, p_start))
+      and (p_end is null or r.bucket_start <= p_end)
+    group by 1, 2
+    order by 1, 2;
+$$;
+
+-- Inicializar los rollups con las llamadas existentes
+select rebuild_call_rollups();
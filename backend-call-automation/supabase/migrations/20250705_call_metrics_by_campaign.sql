@@ -0,0 +1,30 @@
+-- Métricas de llamadas de varias campañas en una sola consulta
+
+-- Número de llamadas y duración por campaña y estado
+create or replace function call_metrics_summary_by_campaign(
+    p_campaign_ids uuid[],
+    p_start timestamp with time zone default null,
+    p_end timestamp with time zone default null
+)
+returns table (
+    campaign_id uuid,
+    status text,
+    call_count bigint,
+    duration_count bigint,
+    total_duration bigint
+)
+language sql
+stable
+as $$
+    select
+        c.campaign_id,
+        c.status::text,
+        count(*) as call_count,
+        count(coalesce(c.duration, c.duration_seconds)) as duration_count,
+        coalesce(sum(coalesce(c.duration, c.duration_seconds)), 0)::bigint as total_duration
+    from calls c
+    where c.campaign_id = any(p_campaign_ids)
+      and (p_start is null or c.created_at >= p_start)
+      and (p_end is null or c.created_at <= p_end)
+    group by c.campaign_id, c.status;
+$$;
@@ -0,0 +1,7 @@
+-- Índices para la paginación por clave (created_at, id) de las llamadas
+
+create index if not exists idx_calls_created_id
+    on calls(created_at desc, id desc);
+
+create index if not exists idx_calls_campaign_created_id
+    on calls(campaign_id, created_at desc, id desc);
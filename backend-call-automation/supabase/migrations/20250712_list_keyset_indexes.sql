@@ -0,0 +1,7 @@
+-- Índices para la paginación por clave (created_at, id) de contactos y campañas
+
+create index if not exists idx_contacts_created_id
+    on contacts(created_at desc, id desc);
+
+create index if not exists idx_campaigns_created_id
+    on campaigns(created_at desc, id desc);
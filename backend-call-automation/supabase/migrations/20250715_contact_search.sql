@@ -0,0 +1,80 @@
+-- Búsqueda indexada de contactos: texto completo, trigramas y prefijo de teléfono
+
+create extension if not exists pg_trgm;
+
+alter table contacts
+    add column if not exists notes text,
+    add column if not exists tags text[] default '{}';
+
+-- Dígitos del teléfono en formato E.164 (sin '+' ni prefijo internacional '00')
+alter table contacts
+    add column if not exists phone_digits text
+        generated always as (
+            regexp_replace(regexp_replace(phone_number, '^\s*00', ''), '\D', '', 'g')
+        ) stored;
+
+alter table contacts
+    add column if not exists search_vector tsvector
+        generated always as (
+            setweight(to_tsvector('simple', coalesce(name, '')), 'A') ||
+            setweight(to_tsvector('simple', coalesce(email, '')), 'B') ||
+            setweight(to_tsvector('simple', coalesce(notes, '')), 'C')
+        ) stored;
+
+create index if not exists idx_contacts_search_vector
+    on contacts using gin (search_vector);
+
+create index if not exists idx_contacts_name_trgm
+    on contacts using gin (name gin_trgm_ops);
+
+create index if not exists idx_contacts_email_trgm
+    on contacts using gin (email gin_trgm_ops);
+
+-- Búsqueda por prefijo del teléfono
+create index if not exists idx_contacts_phone_digits_prefix
+    on contacts (phone_digits text_pattern_ops);
+
+create index if not exists idx_contacts_tags
+    on contacts using gin (tags);
+
+-- Búsqueda ordenada por relevancia. Coincide por texto completo, por
+-- subcadena o similitud en nombre y email, y por prefijo del teléfono.
+create or replace function search_contacts(
+    p_query text,
+    p_tags text[] default null
+)
+returns setof contacts
+language sql
+stable
+as $$
+    with q as (
+        select
+            websearch_to_tsquery('simple', p_query) as ts,
+            -- Los comodines de LIKE del texto buscado se buscan literalmente
+            '%' || replace(replace(replace(p_query, '\', '\\'), '%', '\%'), '_', '\_') || '%' as pattern,
+            regexp_replace(regexp_replace(p_query, '^\s*(\+|00)', ''), '\D', '', 'g') as digits
+    )
+    select c.*
+    from contacts c, q
+    where (
+            c.search_vector @@ q.ts
+            or c.name ilike q.pattern
+            or c.email ilike q.pattern
+            or c.name % p_query
+            or (
+                length(q.digits) >= 3
+                and c.phone_digits ~>=~ q.digits
+                and c.phone_digits ~<~ (q.digits || ':')
+            )
+          )
+      and (p_tags is null or c.tags @> p_tags)
+    order by
+        greatest(
+            ts_rank(c.search_vector, q.ts),
+            similarity(coalesce(c.name, ''), p_query),
+            similarity(coalesce(c.email, ''), p_query),
+            case when length(q.digits) >= 3 and c.phone_digits like q.digits || '%' then 1 else 0 end
+        ) desc,
+        c.created_at desc,
+        c.id desc;
+$$;
@@ -0,0 +1,85 @@
+-- Selección por lotes de los contactos a llamar en cada campaña
+
+-- Estado de marcado de cada contacto en cada campaña
+create table if not exists campaign_contacts (
+    id uuid primary key default uuid_generate_v4(),
+    campaign_id uuid not null references campaigns(id) on delete cascade,
+    contact_id uuid not null references contacts(id) on delete cascade,
+    called_at timestamp with time zone,
+    call_status varchar(20),
+    retry_count integer not null default 0,
+    created_at timestamp with time zone default now(),
+    unique (campaign_id, contact_id)
+);
+
+-- Contactos ya marcados de una campaña, por estado e intentos
+create index if not exists idx_campaign_contacts_campaign_status
+    on campaign_contacts (campaign_id, call_status, retry_count);
+
+create index if not exists idx_contact_list_contacts_contact
+    on contact_list_contacts (contact_id, contact_list_id);
+
+-- Siguientes contactos a llamar de una campaña.
+-- Excluye los contactos con la llamada completada, con una llamada en curso,
+-- con la llamada fallida (se reintenta según calls.next_retry_at) o que
+-- alcanzaron el máximo de intentos. Primero los que nunca se llamaron y
+-- después los que llevan más tiempo sin llamarse.
+create or replace function next_dialable_contacts(
+    p_campaign_id uuid,
+    p_max_retries integer,
+    p_limit integer
+)
+returns table (
+    contact_id uuid,
+    name varchar,
+    phone_number varchar,
+    retry_count integer
+)
+language sql
+stable
+as $$
+    select
+        c.id as contact_id,
+        c.name,
+        c.phone_number,
+        coalesce(cc.retry_count, 0) as retry_count
+    from contacts c
+    join (
+        select distinct clc.contact_id
+        from campaign_contact_lists ccl
+        join contact_list_contacts clc on clc.contact_list_id = ccl.contact_list_id
+        where ccl.campaign_id = p_campaign_id
+    ) members on members.contact_id = c.id
+    left join campaign_contacts cc
+        on cc.campaign_id = p_campaign_id and cc.contact_id = c.id
+    where cc.id is null
+       or (
+           coalesce(cc.call_status, '') not in ('completed', 'pending', 'scheduled', 'in_progress', 'failed', 'error')
+           and cc.retry_count < p_max_retries
+       )
+    order by cc.called_at asc nulls first, c.id
+    limit p_limit;
+$$;
+
+-- Mantener el estado de campaign_contacts al cambiar el de la llamada, para
+-- que los contactos con llamadas terminadas vuelvan a ser elegibles
+create or replace function sync_campaign_contact_status()
+returns trigger
+language plpgsql
+as $$
+begin
+    update campaign_contacts
+    set call_status = new.status::text
+    where campaign_id = new.campaign_id
+      and contact_id = new.contact_id
+      and call_status is distinct from new.status::text;
+    return null;
+end;
+$$;
+
+drop trigger if exists trg_calls_sync_campaign_contacts on calls;
+create trigger trg_calls_sync_campaign_contacts
+    after update of status on calls
+    for each row
+    when (old.status is distinct from new.status and new.contact_id is not null)
+    execute function sync_campaign_contact_status();
@@ -0,0 +1,47 @@
+-- Prioridad de los contactos en la cola de marcado
+
+alter table contacts add column if not exists priority integer not null default 0;
+
+-- Se recrea la función porque cambia el tipo de resultado
+drop function if exists next_dialable_contacts(uuid, integer, integer);
+
+-- Siguientes contactos a llamar de una campaña (ver 20250720_campaign_dial_planner.sql),
+-- ahora con su prioridad y ordenados primero por ella
+create or replace function next_dialable_contacts(
+    p_campaign_id uuid,
+    p_max_retries integer,
+    p_limit integer
+)
+returns table (
+    contact_id uuid,
+    name varchar,
+    phone_number varchar,
+    retry_count integer,
+    priority integer
+)
+language sql
+stable
+as $$
+    select
+        c.id as contact_id,
+        c.name,
+        c.phone_number,
+        coalesce(cc.retry_count, 0) as retry_count,
+        c.priority
+    from contacts c
+    join (
+        select distinct clc.contact_id
+        from campaign_contact_lists ccl
+        join contact_list_contacts clc on clc.contact_list_id = ccl.contact_list_id
+        where ccl.campaign_id = p_campaign_id
+    ) members on members.contact_id = c.id
+    left join campaign_contacts cc
+        on cc.campaign_id = p_campaign_id and cc.contact_id = c.id
+    where cc.id is null
+       or (
+           coalesce(cc.call_status, '') not in ('completed', 'pending', 'scheduled', 'in_progress', 'failed', 'error')
+           and cc.retry_count < p_max_retries
+       )
+    order by c.priority desc, cc.called_at asc nulls first, c.id
+    limit p_limit;
+$$;
@@ -0,0 +1,55 @@
+-- Reintentos programados de llamadas fallidas
+
+-- retry_attempts y max_retries los usa la aplicación; se crean si faltan
+alter table calls
+    add column if not exists retry_attempts integer not null default 0,
+    add column if not exists max_retries integer not null default 3,
+    add column if not exists next_retry_at timestamp with time zone;
+
+-- Reintentos vencidos: solo se indexan las llamadas que pueden reintentarse
+create index if not exists idx_calls_next_retry_at
+    on calls (next_retry_at)
+    where next_retry_at is not null;
+
+-- Calcula el próximo reintento al fallar una llamada: el retraso de la campaña
+-- se duplica en cada intento, con un máximo de 24 horas, y se le aplica un
+-- ±20 % aleatorio para que los reintentos de un mismo lote no coincidan.
+-- Se borra cuando la llamada cambia a otro estado o agota sus intentos.
+create or replace function set_call_next_retry_at()
+returns trigger
+language plpgsql
+as $$
+declare
+    v_delay_minutes numeric;
+begin
+    if new.status::text in ('failed', 'error')
+       and coalesce(new.retry_attempts, 0) < coalesce(new.max_retries, 3) then
+        if tg_op = 'INSERT' or old.status is distinct from new.status or old.retry_attempts is distinct from new.retry_attempts then
+            select coalesce(c.retry_delay_minutes, 60) into v_delay_minutes
+            from campaigns c
+            where c.id = new.campaign_id;
+
+            v_delay_minutes := least(
+                coalesce(v_delay_minutes, 60) * power(2, coalesce(new.retry_attempts, 0)),
+                24 * 60
+            ) * (0.8 + random() * 0.4);
+            new.next_retry_at := now() + make_interval(secs => v_delay_minutes * 60);
+        end if;
+    else
+        new.next_retry_at := null;
+    end if;
+    return new;
+end;
+$$;
+
+drop trigger if exists trg_calls_next_retry_at on calls;
+create trigger trg_calls_next_retry_at
+    before insert or update of status, retry_attempts on calls
+    for each row
+    execute function set_call_next_retry_at();
+
+-- Programar las llamadas que ya estaban fallidas
+update calls
+set status = status
+where status::text in ('failed', 'error')
+  and next_retry_at is null;
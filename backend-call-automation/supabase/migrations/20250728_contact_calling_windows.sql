@@ -0,0 +1,189 @@
+-- Ventanas de llamada por contacto según su zona horaria
+
+alter table contacts add column if not exists timezone text;
+
+alter table campaigns
+    add column if not exists calling_hours_start text not null default '09:00',
+    add column if not exists calling_hours_end text not null default '21:00';
+
+alter table campaign_contacts
+    add column if not exists eligible_from timestamp with time zone,
+    add column if not exists eligible_until timestamp with time zone;
+
+-- Contactos de una campaña que pueden llamarse en un instante dado
+create index if not exists idx_campaign_contacts_window
+    on campaign_contacts (campaign_id, eligible_from, eligible_until);
+
+-- Zona horaria por prefijo telefónico (se usa el prefijo más largo que coincida).
+-- Para países con varias zonas se indica la principal y, cuando importa, algunos
+-- prefijos de área más específicos.
+create table if not exists phone_prefix_timezones (
+    prefix text primary key,
+    timezone text not null
+);
+
+insert into phone_prefix_timezones (prefix, timezone) values
+    ('1', 'America/New_York'),
+    ('1206', 'America/Los_Angeles'),
+    ('1213', 'America/Los_Angeles'),
+    ('1310', 'America/Los_Angeles'),
+    ('1415', 'America/Los_Angeles'),
+    ('1303', 'America/Denver'),
+    ('1602', 'America/Phoenix'),
+    ('1312', 'America/Chicago'),
+    ('1713', 'America/Chicago'),
+    ('1214', 'America/Chicago'),
+    ('33', 'Europe/Paris'),
+    ('34', 'Europe/Madrid'),
+    ('351', 'Europe/Lisbon'),
+    ('39', 'Europe/Rome'),
+    ('44', 'Europe/London'),
+    ('49', 'Europe/Berlin'),
+    ('502', 'America/Guatemala'),
+    ('503', 'America/El_Salvador'),
+    ('504', 'America/Tegucigalpa'),
+    ('505', 'America/Managua'),
+    ('506', 'America/Costa_Rica'),
+    ('507', 'America/Panama'),
+    ('51', 'America/Lima'),
+    ('52', 'America/Mexico_City'),
+    ('53', 'America/Havana'),
+    ('54', 'America/Argentina/Buenos_Aires'),
+    ('55', 'America/Sao_Paulo'),
+    ('56', 'America/Santiago'),
+    ('57', 'America/Bogota'),
+    ('58', 'America/Caracas'),
+    ('591', 'America/La_Paz'),
+    ('593', 'America/Guayaquil'),
+    ('595', 'America/Asuncion'),
+    ('598', 'America/Montevideo')
+on conflict (prefix) do nothing;
+
+-- Siguiente ventana [inicio, fin) de llamada en una zona horaria a partir de un
+-- instante. Si el fin no es posterior al inicio (p. ej. 22:00-06:00), la ventana
+-- termina al día siguiente; por eso se mira también la que empezó el día anterior.
+create or replace function next_calling_window(
+    p_timezone text,
+    p_start text,
+    p_end text,
+    p_at timestamp with time zone default now()
+)
+returns tstzrange
+language plpgsql
+stable
+as $$
+declare
+    v_local_date date := (p_at at time zone p_timezone)::date;
+    v_end_offset integer := case when p_end::time <= p_start::time then 1 else 0 end;
+    v_from timestamp with time zone;
+    v_until timestamp with time zone;
+begin
+    for v_day in -1..1 loop
+        v_from := ((v_local_date + v_day) + p_start::time) at time zone p_timezone;
+        v_until := ((v_local_date + v_day + v_end_offset) + p_end::time) at time zone p_timezone;
+        if v_until > p_at then
+            return tstzrange(v_from, v_until);
+        end if;
+    end loop;
+    return tstzrange(v_from, v_until);
+end;
+$$;
+
+-- Calcula la ventana de llamada de los contactos de una campaña que no tienen
+-- una vigente. La zona horaria es la del contacto, la de su prefijo telefónico
+-- o, en su defecto, p_default_timezone. Devuelve los contactos actualizados.
+create or replace function refresh_calling_windows(
+    p_campaign_id uuid,
+    p_default_timezone text default 'UTC'
+)
+returns integer
+language plpgsql
+as $$
+declare
+    v_count integer;
+begin
+    insert into campaign_contacts (campaign_id, contact_id, eligible_from, eligible_until)
+    select
+        cp.id,
+        c.id,
+        lower(w.calling_window),
+        least(upper(w.calling_window), coalesce(cp.schedule_end, upper(w.calling_window)))
+    from campaigns cp
+    join (
+        select distinct ccl.campaign_id, clc.contact_id
+        from campaign_contact_lists ccl
+        join contact_list_contacts clc on clc.contact_list_id = ccl.contact_list_id
+        where ccl.campaign_id = p_campaign_id
+    ) members on members.campaign_id = cp.id
+    join contacts c on c.id = members.contact_id
+    left join campaign_contacts cc
+        on cc.campaign_id = cp.id and cc.contact_id = c.id
+    cross join lateral (
+        select coalesce(
+            c.timezone,
+            (
+                select p.timezone
+                from phone_prefix_timezones p
+                where c.phone_digits like p.prefix || '%'
+                order by length(p.prefix) desc
+                limit 1
+            ),
+            p_default_timezone
+        ) as timezone
+    ) tz
+    cross join lateral (
+        select next_calling_window(tz.timezone, cp.calling_hours_start, cp.calling_hours_end) as calling_window
+    ) w
+    where cp.id = p_campaign_id
+      and (cc.id is null or cc.eligible_until is null or cc.eligible_until <= now())
+    on conflict (campaign_id, contact_id) do update
+        set eligible_from = excluded.eligible_from,
+            eligible_until = excluded.eligible_until
+        where campaign_contacts.eligible_until is null
+           or campaign_contacts.eligible_until <= now();
+
+    get diagnostics v_count = row_count;
+    return v_count;
+end;
+$$;
+
+-- Se recrea la función para leer solo los contactos dentro de su ventana
+drop function if exists next_dialable_contacts(uuid, integer, integer);
+
+-- Siguientes contactos a llamar de una campaña entre los que están ahora dentro
+-- de su ventana de llamada (ver refresh_calling_windows). Excluye los contactos
+-- con la llamada completada, con una llamada en curso, con la llamada fallida
+-- (se reintenta según calls.next_retry_at) o que alcanzaron el máximo de intentos.
+create or replace function next_dialable_contacts(
+    p_campaign_id uuid,
+    p_max_retries integer,
+    p_limit integer
+)
+returns table (
+    contact_id uuid,
+    name varchar,
+    phone_number varchar,
+    retry_count integer,
+    priority integer,
+    eligible_until timestamp with time zone
+)
+language sql
+stable
+as $$
+    select
+        c.id as contact_id,
+        c.name,
+        c.phone_number,
+        cc.retry_count,
+        c.priority,
+        cc.eligible_until
+    from campaign_contacts cc
+    join contacts c on c.id = cc.contact_id
+    where cc.campaign_id = p_campaign_id
+      and cc.eligible_from <= now()
+      and cc.eligible_until > now()
+      and coalesce(cc.call_status, '') not in ('completed', 'pending', 'scheduled', 'in_progress', 'failed', 'error')
+      and cc.retry_count < p_max_retries
+    order by c.priority desc, cc.called_at asc nulls first, c.id
+    limit p_limit;
+$$;
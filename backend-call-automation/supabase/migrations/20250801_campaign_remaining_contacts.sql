@@ -0,0 +1,39 @@
+-- Indica si a una campaña le quedan contactos por llamar: contactos de sus
+-- listas que aún no se han llamado, con una llamada en curso, con un reintento
+-- programado (next_retry_at) o que pueden volver a llamarse. Sustituye a
+-- pending_calls para decidir cuándo se completa una campaña, ya que las
+-- llamadas se crean al marcar y pending_calls solo cuenta las ya creadas.
+create or replace function campaign_has_remaining_contacts(
+    p_campaign_id uuid,
+    p_max_retries integer
+)
+returns boolean
+language sql
+stable
+as $$
+    select exists (
+        select 1
+        from campaign_contact_lists ccl
+        join contact_list_contacts clc on clc.contact_list_id = ccl.contact_list_id
+        left join campaign_contacts cc
+            on cc.campaign_id = p_campaign_id and cc.contact_id = clc.contact_id
+        where ccl.campaign_id = p_campaign_id
+          and (
+              cc.id is null
+              or coalesce(cc.call_status, '') in ('pending', 'scheduled', 'in_progress')
+              or (
+                  cc.call_status in ('failed', 'error')
+                  and exists (
+                      select 1 from calls k
+                      where k.campaign_id = p_campaign_id
+                        and k.contact_id = clc.contact_id
+                        and k.next_retry_at is not null
+                  )
+              )
+              or (
+                  coalesce(cc.call_status, '') not in ('completed', 'failed', 'error')
+                  and cc.retry_count < p_max_retries
+              )
+          )
+    );
+$$;
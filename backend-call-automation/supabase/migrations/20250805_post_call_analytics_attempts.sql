@@ -0,0 +1,16 @@
+-- Intentos fallidos de análisis posterior de cada llamada. Las llamadas cuyo
+-- lote falla o cuyo resultado omite el modelo dejan de buscarse al alcanzar
+-- POST_CALL_MAX_ATTEMPTS, para que no se recuperen en cada ciclo por delante
+-- de las llamadas más recientes.
+alter table calls
+    add column if not exists analytics_attempts integer not null default 0;
+
+-- Suma un intento fallido a varias llamadas en una sola sentencia
+create or replace function record_analytics_failures(p_call_ids uuid[])
+returns void
+language sql
+as $$
+    update calls
+    set analytics_attempts = analytics_attempts + 1
+    where id = any(p_call_ids);
+$$;
@@ -0,0 +1,22 @@
+-- Un único contacto por teléfono normalizado. La importación masiva y el alta
+-- de contactos insertan con "on conflict (phone_digits)", de modo que dos
+-- escrituras simultáneas del mismo número no pueden crear duplicados.
+do $$
+declare
+    v_duplicates integer;
+begin
+    select count(*) into v_duplicates
+    from (
+        select phone_digits
+        from contacts
+        group by phone_digits
+        having count(*) > 1
+    ) d;
+    if v_duplicates > 0 then
+        raise exception 'Hay % teléfonos con contactos duplicados; fusiónelos antes de aplicar esta migración', v_duplicates;
+    end if;
+end;
+$$;
+
+create unique index if not exists idx_contacts_phone_digits_unique
+    on contacts (phone_digits);
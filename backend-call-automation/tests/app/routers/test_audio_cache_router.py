@@ -0,0 +1,41 @@
+import os
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.middleware import setup_auth_middleware
+from app.routers import audio_cache_router
+from app.services.audio_cache_service import audio_cache_service
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(audio_cache_router.router)
+    setup_auth_middleware(app)
+    return TestClient(app)
+
+@pytest.fixture
+def cached_file():
+    path = os.path.join(audio_cache_service.cache_dir, "0" * 32 + ".mp3")
+    with open(path, "wb") as f:
+        f.write(b"audio")
+    yield path
+    os.remove(path)
+
+def test_signed_audio_url_is_public(client, cached_file):
+    url = audio_cache_service.file_url(cached_file)
+    path = url[url.index("/api/audio-cache/files/"):]
+
+    response = client.get(path)
+
+    assert response.status_code == 200
+    assert response.content == b"audio"
+
+def test_unsigned_or_expired_audio_url_is_rejected(client, cached_file):
+    file_name = os.path.basename(cached_file)
+    expired = audio_cache_service.file_url(cached_file, ttl=-1)
+
+    assert client.get(f"/api/audio-cache/files/{file_name}").status_code == 403
+    assert client.get(expired[expired.index("/api/"):]).status_code == 403
+
+def test_other_audio_cache_endpoints_require_auth(client):
+    assert client.get("/api/audio-cache/stats").status_code == 401
@@ -0,0 +1,76 @@
+import asyncio
+import pytest
+from app.services.audio_render import AudioRenderStage
+
+class FakeTTS:
+    def __init__(self, cache):
+        self.cache = cache
+        self.calls = []
+
+    async def generate_stream(self, text, voice_id, language="es"):
+        self.calls.append(text)
+        await asyncio.sleep(0.01)
+        self.cache.files[(text, voice_id)] = f"/cache/{len(self.cache.files)}.mp3"
+        yield b"audio"
+
+class FakeCache:
+    def __init__(self):
+        self.files = {}
+
+    async def get_from_cache(self, text, voice_id, language="es"):
+        return self.files.get((text, voice_id))
+
+@pytest.fixture
+def stage():
+    cache = FakeCache()
+    return AudioRenderStage(tts=FakeTTS(cache), cache=cache, voice_id="Bella")
+
+def test_key_ignores_variables_not_in_template(stage):
+    assert stage.render_key("Hola, le llamamos", variables={"name": "Ana"}) == \
+        stage.render_key("Hola, le llamamos", variables={"name": "Luis"})
+    assert stage.render_key("Hola {name}", variables={"name": "Ana"}) != \
+        stage.render_key("Hola {name}", variables={"name": "Luis"})
+    assert stage.render_key("Hola {name}", voice_id="Adam") != stage.render_key("Hola {name}")
+
+def test_render_text_keeps_unknown_placeholders(stage):
+    assert stage.render_text("Hola {name}, {offer}", {"name": "Ana"}) == "Hola Ana, {offer}"
+
+@pytest.mark.asyncio
+async def test_concurrent_renders_share_one_synthesis(stage):
+    paths = await asyncio.gather(*(stage.render("Hola, le llamamos") for _ in range(5)))
+
+    assert len(set(paths)) == 1 and paths[0]
+    assert stage.tts.calls == ["Hola, le llamamos"]
+
+@pytest.mark.asyncio
+async def test_prefetch_deduplicates_contacts(stage):
+    started = stage.prefetch("Hola {name}", [{"name": "Ana"}, {"name": "Ana"}, {"name": "Luis"}])
+    await asyncio.sleep(0.05)
+
+    assert started == 2
+    assert sorted(stage.tts.calls) == ["Hola Ana", "Hola Luis"]
+    assert stage.prefetch("Hola {name}", [{"name": "Ana"}]) == 0
+
+@pytest.mark.asyncio
+async def test_render_uses_existing_cache_entry(stage):
+    stage.cache.files[("Hola", "Bella")] = "/cache/hola.mp3"
+
+    assert await stage.render("Hola") == "/cache/hola.mp3"
+    assert stage.tts.calls == []
+
+@pytest.mark.asyncio
+async def test_render_after_prefetch_reuses_audio(stage):
+    stage.prefetch("Hola {name}", [{"name": "Ana", "phone_number": "+5491112345678"}])
+
+    path = await stage.render("Hola {name}", voice_id="Bella", variables={"name": "Ana", "phone_number": "+5491112345678"})
+
+    assert path
+    assert stage.tts.calls == ["Hola Ana"]
+
+@pytest.mark.asyncio
+async def test_render_timeout_keeps_synthesis_running(stage):
+    assert await stage.render("Hola", timeout=0.001) is None
+
+    await asyncio.sleep(0.05)
+    assert await stage.render("Hola", timeout=0.001)
+    assert stage.tts.calls == ["Hola"]
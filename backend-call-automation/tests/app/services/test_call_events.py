@@ -0,0 +1,56 @@
+import asyncio
+import pytest
+import fakeredis
+from unittest.mock import MagicMock
+from app.models.call import CallStatus
+from app.services.call_events import CallEventBus
+from app.services.pacing_controller import PacingController
+
+@pytest.fixture
+def redis():
+    return fakeredis.FakeAsyncRedis(decode_responses=True)
+
+def bus(redis, calls=(), shared=True):
+    engine = MagicMock()
+    engine.tracks.side_effect = lambda call_id: call_id in calls
+    pacing = PacingController(mode="predictive")
+    for call_id in calls:
+        pacing.record_dial("campaign-1", call_id)
+    return CallEventBus(redis, engine=engine, pacing=pacing, shared=shared)
+
+async def wait_until(condition):
+    for _ in range(100):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+
+@pytest.mark.asyncio
+async def test_events_reach_the_instance_that_dialed(redis):
+    dialer = bus(redis, calls={"call-1"})
+    other = bus(redis)
+    await dialer.start()
+    await other.start()
+    try:
+        # El webhook llega a la otra instancia
+        await other.answered("call-1")
+        await wait_until(lambda: dialer.pacing.talking() == 1)
+        await other.finished("campaign-1", "call-1", CallStatus.COMPLETED, 42)
+        await wait_until(lambda: dialer.engine.release.called)
+    finally:
+        await dialer.stop()
+        await other.stop()
+
+    dialer.engine.release.assert_called_once_with("call-1")
+    assert dialer.pacing.talking() == 0
+    assert dialer.pacing.answer_rate("campaign-1") == 1.0
+    other.engine.release.assert_not_called()
+    assert other.pacing.talking() == 0
+    assert other.pacing.answer_rate("campaign-1") is None
+
+@pytest.mark.asyncio
+async def test_events_apply_locally_without_redis():
+    local = bus(None, shared=False)
+
+    await local.released("call-1")
+
+    local.engine.release.assert_called_once_with("call-1")
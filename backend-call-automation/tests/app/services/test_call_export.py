@@ -0,0 +1,77 @@
+import csv
+import io
+import pytest
+from datetime import datetime
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+from fastapi import HTTPException
+from app.services.call_export import CallExportService, EXPORT_COLUMNS
+
+ROWS = [
+    {"id": "c3", "campaign_id": "camp-1", "status": "completed", "duration": 60, "retry_attempts": 0,
+     "created_at": "2025-07-03T10:00:00+00:00", "updated_at": "2025-07-03T10:01:00+00:00"},
+    {"id": "c2", "campaign_id": "camp-1", "status": "failed", "duration": None, "retry_attempts": 1,
+     "created_at": "2025-07-02T10:00:00+00:00", "updated_at": "2025-07-02T10:01:00+00:00"},
+    {"id": "c1", "campaign_id": "camp-1", "status": "no_answer", "duration": None, "retry_attempts": 2,
+     "created_at": "2025-07-01T10:00:00+00:00", "updated_at": "2025-07-01T10:01:00+00:00"}
+]
+
+@pytest.fixture
+def supabase():
+    query = MagicMock()
+    for method in ("select", "eq", "gte", "lte", "order", "or_", "limit"):
+        getattr(query, method).return_value = query
+    query.execute.side_effect = [SimpleNamespace(data=ROWS[:2]), SimpleNamespace(data=ROWS[2:])]
+    client = MagicMock()
+    client.table.return_value = query
+    return client
+
+async def collect(stream):
+    return b"".join([chunk async for chunk in stream])
+
+@pytest.mark.asyncio
+async def test_csv_streamed_page_by_page(supabase):
+    service = CallExportService(supabase, page_size=2)
+
+    chunks = [chunk async for chunk in service.stream("csv", campaign_id="camp-1", campaign_name="Verano")]
+
+    assert len(chunks) == 3
+    rows = list(csv.DictReader(io.StringIO(b"".join(chunks).decode("utf-8"))))
+    assert [row["id"] for row in rows] == ["c3", "c2", "c1"]
+    assert rows[0]["campaign_name"] == "Verano"
+    assert rows[1]["duration"] == ""
+    query = supabase.table.return_value
+    query.select.assert_called_with(",".join(EXPORT_COLUMNS))
+    query.eq.assert_called_with("campaign_id", "camp-1")
+
+@pytest.mark.asyncio
+async def test_excel_export(supabase):
+    openpyxl = pytest.importorskip("openpyxl")
+    service = CallExportService(supabase, page_size=2)
+
+    content = await collect(service.stream("excel", start_date=datetime(2025, 7, 1)))
+
+    sheet = openpyxl.load_workbook(io.BytesIO(content)).active
+    values = list(sheet.values)
+    assert list(values[0]) == EXPORT_COLUMNS
+    assert [row[0] for row in values[1:]] == ["c3", "c2", "c1"]
+
+@pytest.mark.asyncio
+async def test_parquet_export(supabase):
+    pq = pytest.importorskip("pyarrow.parquet")
+    service = CallExportService(supabase, page_size=2)
+
+    content = await collect(service.stream("parquet"))
+
+    table = pq.read_table(io.BytesIO(content))
+    assert table.num_rows == 3
+    assert table.column("retry_attempts").to_pylist() == [0, 1, 2]
+    assert table.column("created_at").type.tz == "UTC"
+
+def test_unknown_format_rejected(supabase):
+    service = CallExportService(supabase)
+
+    with pytest.raises(HTTPException) as exc_info:
+        service.stream("pdf")
+
+    assert exc_info.value.status_code == 400
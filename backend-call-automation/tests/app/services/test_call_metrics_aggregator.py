@@ -0,0 +1,104 @@
+import pytest
+from datetime import datetime
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+from fastapi import HTTPException
+from app.services.call_metrics_aggregator import CallMetricsAggregator
+
+def rpc_client(responses):
+    client = MagicMock()
+
+    def rpc(name, params):
+        query = MagicMock()
+        query.execute.return_value = SimpleNamespace(data=responses[name])
+        return query
+
+    client.rpc.side_effect = rpc
+    return client
+
+@pytest.fixture
+def supabase():
+    return rpc_client({
+        "call_metrics_summary": [
+            {"status": "completed", "call_count": 8, "duration_count": 8, "total_duration": 800},
+            {"status": "failed", "call_count": 1, "duration_count": 0, "total_duration": 0},
+            {"status": "error", "call_count": 1, "duration_count": 2, "total_duration": 400},
+            {"status": "no_answer", "call_count": 3, "duration_count": 0, "total_duration": 0}
+        ],
+        "call_rollup_timeline": [
+            {"bucket": "2025-06-02T00:00:00+00:00", "status": "completed", "call_count": 2, "duration_count": 2, "total_duration": 100},
+            {"bucket": "2025-06-01T00:00:00+00:00", "status": "completed", "call_count": 6, "duration_count": 6, "total_duration": 700},
+            {"bucket": "2025-06-01T00:00:00+00:00", "status": "failed", "call_count": 1, "duration_count": 0, "total_duration": 0}
+        ]
+    })
+
+@pytest.mark.asyncio
+async def test_summary_built_from_aggregated_rows(supabase):
+    aggregator = CallMetricsAggregator(supabase)
+
+    metrics = await aggregator.get_metrics(campaign_id="camp-1", start_date=datetime(2025, 6, 1))
+
+    assert metrics.total_calls == 13
+    assert metrics.completed_calls == 8
+    assert metrics.failed_calls == 2
+    assert metrics.no_answer_calls == 3
+    assert metrics.avg_duration == 120.0
+    assert metrics.timeline == []
+
+    name, params = supabase.rpc.call_args.args
+    assert name == "call_metrics_summary"
+    assert params["p_campaign_id"] == "camp-1"
+    assert params["p_start"] == "2025-06-01T00:00:00"
+    assert params["p_end"] is None
+
+@pytest.mark.asyncio
+async def test_timeline_grouped_and_sorted(supabase):
+    aggregator = CallMetricsAggregator(supabase)
+
+    metrics = await aggregator.get_metrics(group_by="day")
+
+    assert [bucket.total_calls for bucket in metrics.timeline] == [7, 2]
+    assert metrics.timeline[0].by_status == {"completed": 6, "failed": 1}
+    assert metrics.timeline[0].avg_duration == pytest.approx(116.67)
+    assert supabase.rpc.call_args.args[1]["p_bucket"] == "day"
+
+@pytest.mark.asyncio
+async def test_invalid_bucket_rejected(supabase):
+    aggregator = CallMetricsAggregator(supabase)
+
+    with pytest.raises(HTTPException) as exc_info:
+        await aggregator.get_timeline(group_by="year")
+
+    assert exc_info.value.status_code == 400
+
+@pytest.mark.asyncio
+async def test_summaries_for_several_campaigns_in_one_query():
+    supabase = rpc_client({
+        "call_metrics_summary_by_campaign": [
+            {"campaign_id": "camp-1", "status": "completed", "call_count": 3, "duration_count": 3, "total_duration": 300},
+            {"campaign_id": "camp-1", "status": "failed", "call_count": 1, "duration_count": 0, "total_duration": 0},
+            {"campaign_id": "camp-2", "status": "busy", "call_count": 2, "duration_count": 0, "total_duration": 0}
+        ]
+    })
+    aggregator = CallMetricsAggregator(supabase)
+
+    summaries = await aggregator.get_summaries(["camp-1", "camp-2", "camp-3"], start_date=datetime(2025, 7, 1))
+
+    assert supabase.rpc.call_count == 1
+    name, params = supabase.rpc.call_args.args
+    assert name == "call_metrics_summary_by_campaign"
+    assert params["p_campaign_ids"] == ["camp-1", "camp-2", "camp-3"]
+    assert params["p_start"] == "2025-07-01T00:00:00"
+    assert summaries["camp-1"].total_calls == 4
+    assert summaries["camp-1"].failed_calls == 1
+    assert summaries["camp-1"].avg_duration == 100.0
+    assert summaries["camp-2"].busy_calls == 2
+    assert summaries["camp-3"].total_calls == 0
+
+@pytest.mark.asyncio
+async def test_summaries_without_campaigns_skip_query():
+    supabase = rpc_client({})
+    aggregator = CallMetricsAggregator(supabase)
+
+    assert await aggregator.get_summaries([]) == {}
+    supabase.rpc.assert_not_called()
@@ -0,0 +1,59 @@
+import pytest
+from datetime import datetime
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+from fastapi import HTTPException
+from app.services.call_rollups import CallRollupService
+
+@pytest.fixture
+def supabase():
+    client = MagicMock()
+    client.rpc.return_value.execute.return_value = SimpleNamespace(data=[
+        {"bucket": "2025-07-01T10:00:00+00:00", "status": "completed", "call_count": 3, "duration_count": 3,
+         "total_duration": 300, "sentiment_count": 2, "sentiment_sum": 1.5},
+        {"bucket": "2025-07-01T09:00:00+00:00", "status": "completed", "call_count": 1, "duration_count": 1,
+         "total_duration": 60, "sentiment_count": 0, "sentiment_sum": 0},
+        {"bucket": "2025-07-01T10:00:00+00:00", "status": "no_answer", "call_count": 2, "duration_count": 0,
+         "total_duration": 0, "sentiment_count": 0, "sentiment_sum": 0}
+    ])
+    return client
+
+@pytest.mark.asyncio
+async def test_timeline_read_from_rollups(supabase):
+    service = CallRollupService(supabase)
+
+    timeline = await service.get_timeline("camp-1", datetime(2025, 7, 1), datetime(2025, 7, 2), group_by="hour")
+
+    assert [bucket.date.hour for bucket in timeline] == [9, 10]
+    assert timeline[0].avg_sentiment is None
+    assert timeline[1].total_calls == 5
+    assert timeline[1].by_status == {"completed": 3, "no_answer": 2}
+    assert timeline[1].avg_duration == 100.0
+    assert timeline[1].avg_sentiment == 0.75
+
+    name, params = supabase.rpc.call_args.args
+    assert name == "call_rollup_timeline"
+    assert params == {
+        "p_campaign_id": "camp-1",
+        "p_start": "2025-07-01T00:00:00",
+        "p_end": "2025-07-02T00:00:00",
+        "p_bucket": "hour"
+    }
+
+@pytest.mark.asyncio
+async def test_invalid_bucket_rejected(supabase):
+    service = CallRollupService(supabase)
+
+    with pytest.raises(HTTPException) as exc_info:
+        await service.get_timeline(group_by="year")
+
+    assert exc_info.value.status_code == 400
+    supabase.rpc.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_rebuild_calls_rpc(supabase):
+    service = CallRollupService(supabase)
+
+    await service.rebuild("camp-1")
+
+    supabase.rpc.assert_called_once_with("rebuild_call_rollups", {"p_campaign_id": "camp-1"})
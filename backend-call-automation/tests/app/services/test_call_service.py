@@ -4,6 +4,7 @@ from enum import Enum
 from unittest.mock import Mock, AsyncMock, MagicMock
 from twilio.rest import Client as TwilioClient
 from fastapi import HTTPException, status
+from postgrest.exceptions import APIError
 from app.models.call import Call, CallCreate, CallStatus, CallUpdate
 from app.models.campaign import Campaign, CampaignBase
 from app.services.call_service import CallService
@@ -855,4 +856,80 @@ class TestCallService:
         test_campaign.status = "inactive"
         with pytest.raises(HTTPException) as exc_info:
             await call_service.create_call(call_data)
-        assert exc_info.value.status_code == status.HTTP_400_BAD_REQUEST
\ No newline at end of file
+        assert exc_info.value.status_code == status.HTTP_400_BAD_REQUEST
+def bulk_call(**overrides):
+    data = {
+        "campaign_id": "campaign-1",
+        "contact_id": "0b6f8f9a-3a5e-4c61-9a8e-2f1d8a0c1b2e",
+        "status": "pending",
+        "script_template": "Hola {name}",
+        "phone_number": "+5491112345678",
+        "from_number": "+15005550006",
+        "webhook_url": "http://example.com/webhook",
+        "status_callback_url": "http://example.com/callback"
+    }
+    data.update(overrides)
+    return data
+
+@pytest.mark.asyncio
+async def test_create_calls_bulk_reports_row_errors(monkeypatch):
+    inserted = []
+
+    async def execute(rows):
+        if any(row["phone_number"] == "+0" for row in rows):
+            raise APIError({"code": "23514", "message": "check constraint calls_phone_number"})
+        inserted.append(len(rows))
+
+    supabase = MagicMock()
+    supabase.table.return_value.upsert.side_effect = lambda rows, **kwargs: Mock(execute=lambda: execute(rows))
+    call_service = CallService.__new__(CallService)
+    call_service.supabase = supabase
+    monkeypatch.setattr("app.services.call_service.settings.CALL_BULK_BATCH_SIZE", 4, raising=False)
+    monkeypatch.setattr("app.services.call_service.settings.CALL_BULK_CONCURRENCY", 2, raising=False)
+
+    calls = [bulk_call() for _ in range(8)]
+    calls[2] = bulk_call(phone_number="+0")
+    calls[5] = bulk_call(contact_id="not-a-uuid")
+
+    result = await call_service.create_calls_bulk(calls)
+
+    assert result.total == 8
+    assert result.created == 6
+    assert [error.index for error in result.errors] == [2, 5]
+    assert result.ids[2] is None and result.ids[5] is None
+    assert len({call_id for call_id in result.ids if call_id}) == 6
+    assert sum(inserted) == 6
+
+@pytest.mark.asyncio
+async def test_create_calls_bulk_retries_batch_on_transport_errors(monkeypatch):
+    attempts = []
+
+    async def execute(rows):
+        attempts.append(len(rows))
+        if len(attempts) == 1:
+            raise ConnectionError("conexión reiniciada")
+
+    supabase = MagicMock()
+    supabase.table.return_value.upsert.side_effect = lambda rows, **kwargs: Mock(execute=lambda: execute(rows))
+    call_service = CallService.__new__(CallService)
+    call_service.supabase = supabase
+    monkeypatch.setattr("app.services.call_service.settings.CALL_BULK_BATCH_SIZE", 4, raising=False)
+    monkeypatch.setattr("app.services.call_service.settings.CALL_BULK_CONCURRENCY", 1, raising=False)
+    monkeypatch.setattr("app.services.call_service.settings.CALL_BULK_RETRIES", 1, raising=False)
+    monkeypatch.setattr("app.services.call_service.settings.CALL_BULK_RETRY_BACKOFF", 0, raising=False)
+
+    result = await call_service.create_calls_bulk([bulk_call() for _ in range(4)])
+
+    # El lote se reintenta entero, sin dividirlo
+    assert attempts == [4, 4]
+    assert result.created == 4
+    assert result.errors == []
+
+    attempts.clear()
+    supabase.table.return_value.upsert.side_effect = lambda rows, **kwargs: Mock(
+        execute=AsyncMock(side_effect=ConnectionError("sin conexión"))
+    )
+    result = await call_service.create_calls_bulk([bulk_call() for _ in range(4)])
+
+    assert result.created == 0
+    assert [error.index for error in result.errors] == [0, 1, 2, 3]
@@ -0,0 +1,35 @@
+import pytest
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+from app.services.campaign_counters import CampaignCountersService
+
+@pytest.fixture
+def supabase():
+    client = MagicMock()
+    client.rpc.return_value.execute.return_value = SimpleNamespace(data=2)
+    return client
+
+@pytest.mark.asyncio
+async def test_reconcile_single_campaign(supabase):
+    service = CampaignCountersService(supabase=supabase)
+
+    assert await service.reconcile("camp-1") == 2
+    supabase.rpc.assert_called_once_with("reconcile_campaign_counters", {"p_campaign_id": "camp-1"})
+    supabase.table.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_reconcile_all_campaigns(supabase):
+    service = CampaignCountersService(supabase=supabase)
+
+    await service.reconcile()
+
+    supabase.rpc.assert_called_once_with("reconcile_campaign_counters", {"p_campaign_id": None})
+
+@pytest.mark.asyncio
+async def test_start_stop(supabase):
+    service = CampaignCountersService(supabase=supabase, interval=3600)
+
+    await service.start()
+    assert service._task is not None
+    await service.stop()
+    assert service._task.done()
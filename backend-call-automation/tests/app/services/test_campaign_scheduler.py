@@ -1,13 +1,38 @@
 import pytest
-from unittest.mock import AsyncMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 from app.services.campaign_scheduler import CampaignScheduler
 from app.models.campaign import Campaign, CampaignStatus
 from app.models.call import Call, CallStatus, CallCreate
 from app.services.campaign_service import CampaignService
 from app.services.call_service import CallService
 from app.services.contact_service import ContactService
+from app.services.pacing_controller import PacingController
 from app.models.contact import Contact, ContactCreate, ContactUpdate
 from datetime import datetime, timedelta
+from uuid import uuid4
+
+
+def make_campaign(**overrides) -> Campaign:
+    now = datetime.now()
+    data = {
+        "id": uuid4(),
+        "name": "Test Campaign",
+        "description": "Test Description",
+        "status": CampaignStatus.ACTIVE,
+        "schedule_start": now - timedelta(hours=1),
+        "schedule_end": now + timedelta(hours=1),
+        "contact_list_ids": [uuid4()],
+        "script_template": "Test script",
+        "calling_hours_start": "09:00",
+        "calling_hours_end": "21:00",
+        "max_retries": 3,
+        "retry_delay_minutes": 15,
+        "pending_calls": 3,
+        "created_at": now,
+        "updated_at": now
+    }
+    data.update(overrides)
+    return Campaign(**data)
 
 @pytest.fixture
 def mock_campaign_service():
@@ -27,7 +52,8 @@ def campaign_scheduler(mock_campaign_service, mock_call_service, mock_contact_se
         campaign_service=mock_campaign_service,
         call_service=mock_call_service,
         contact_service=mock_contact_service,
-        check_interval=1
+        check_interval=1,
+        renderer=MagicMock()
     )
 
 @pytest.mark.asyncio
@@ -40,39 +66,45 @@ async def test_start_stop(campaign_scheduler):
 @pytest.mark.asyncio
 async def test_process_active_campaigns(campaign_scheduler, mock_campaign_service, mock_contact_service):
     now = datetime.now()
-    campaign = Campaign(
-        id=1,
-        name="Test Campaign",
-        description="Test Description",
-        status=CampaignStatus.ACTIVE,
-        schedule_start=now - timedelta(hours=1),
-        schedule_end=now + timedelta(hours=1),
-        contact_list_ids=[1, 2, 3],
-        script_template="Test script",
-        max_retries=3,
-        retry_delay_minutes=15,
-        pending_calls=3
-    )
+    campaign = make_campaign()
     mock_campaign_service.list_campaigns.return_value = [campaign]
-    mock_contact_service.get_campaign_contacts.return_value = []
+    campaign_scheduler.planner = AsyncMock()
+    campaign_scheduler.planner.next_contacts.return_value = [
+        {"contact_id": "c1", "name": "Ana", "phone_number": "+5491112345678", "retry_count": 0}
+    ]
+    campaign_scheduler.engine = MagicMock()
+    campaign_scheduler.engine.capacity.return_value = 5
+    campaign_scheduler.engine.is_pending.return_value = False
 
-    await campaign_scheduler._process_active_campaigns()
+    with patch("app.services.campaign_scheduler.datetime") as mock_datetime:
+        mock_datetime.now.return_value = now
+        await campaign_scheduler._process_active_campaigns()
 
     mock_campaign_service.list_campaigns.assert_called_once_with(
         status=CampaignStatus.ACTIVE,
         start_date=now,
         end_date=now
     )
-    mock_contact_service.get_campaign_contacts.assert_called_once_with(campaign.id)
+    campaign_scheduler.planner.next_contacts.assert_called_once_with(campaign.id, campaign.max_retries, 5)
+    campaign_scheduler.planner.reserve.assert_called_once_with(
+        campaign.id, campaign_scheduler.planner.next_contacts.return_value
+    )
+    campaign_scheduler.renderer.prefetch.assert_called_once_with(
+        "Test script", [{"name": "Ana", "phone_number": "+5491112345678"}]
+    )
+    campaign_scheduler.engine.submit.assert_called_once()
 
 @pytest.mark.asyncio
 async def test_retry_failed_calls(campaign_scheduler, mock_call_service, mock_campaign_service):
     now = datetime.now()
+    campaign = make_campaign()
     call = Call(
-        id=1,
-        campaign_id=1,
+        id=uuid4(),
+        campaign_id=str(campaign.id),
+        contact_id=uuid4(),
         phone_number="+1234567890",
         from_number="+0987654321",
+        script_template="Test script",
         webhook_url="http://example.com/webhook",
         status_callback_url="http://example.com/callback",
         status=CallStatus.FAILED,
@@ -81,50 +113,119 @@ async def test_retry_failed_calls(campaign_scheduler, mock_call_service, mock_ca
         created_at=now - timedelta(hours=1),
         updated_at=now - timedelta(hours=1)
     )
-    campaign = Campaign(
-        id=1,
-        name="Test Campaign",
-        description="Test Description",
-        status=CampaignStatus.ACTIVE,
-        schedule_start=now - timedelta(hours=1),
-        schedule_end=now + timedelta(hours=1),
-        contact_list_ids=[1, 2, 3],
-        script_template="Test script",
-        max_retries=3,
-        retry_delay_minutes=15,
-        pending_calls=3
-    )
-    mock_call_service.list_calls.return_value = [call]
-    mock_call_service.is_retry_allowed.return_value = True
-    mock_campaign_service.get_campaign.return_value = campaign
+    mock_call_service.list_due_retries.return_value = [call]
+    mock_call_service.retry_call.return_value = call.model_copy(update={"status": CallStatus.PENDING})
+    campaign_scheduler._active_campaigns = {str(campaign.id): campaign}
+    campaign_scheduler.engine = MagicMock()
+    campaign_scheduler.engine.capacity.return_value = 5
 
     await campaign_scheduler._retry_failed_calls()
 
-    mock_call_service.list_calls.assert_called_once_with(status=CallStatus.FAILED)
-    mock_call_service.is_retry_allowed.assert_called_once_with(call)
-    mock_campaign_service.get_campaign.assert_called_once_with(call.campaign_id)
-    mock_call_service.retry_call.assert_called_once_with(call.id)
+    mock_call_service.list_due_retries.assert_called_once_with([str(campaign.id)], limit=200)
+    mock_campaign_service.get_campaign.assert_not_called()
+    campaign_scheduler.engine.submit.assert_called_once()
+    retry = campaign_scheduler.engine.submit.call_args.args[1]
+    assert await retry() == str(call.id)
+    mock_call_service.retry_call.assert_called_once_with(str(call.id))
 
 @pytest.mark.asyncio
 async def test_update_campaign_stats(campaign_scheduler, mock_call_service, mock_campaign_service):
-    campaign_id = 1
-    metrics = {
-        "total_calls": 10,
-        "completed_calls": 8,
-        "failed_calls": 2,
-        "pending_calls": 0
-    }
-    mock_call_service.get_call_metrics.return_value = metrics
+    campaign_id = str(uuid4())
 
     await campaign_scheduler.update_campaign_stats(campaign_id)
 
-    mock_call_service.get_call_metrics.assert_called_once_with(campaign_id)
-    mock_campaign_service.update_campaign_stats.assert_called_once_with(
-        campaign_id,
-        {
-            "total_calls": 10,
-            "successful_calls": 8,
-            "failed_calls": 2,
-            "pending_calls": 0
-        }
+    mock_call_service.update_campaign_stats.assert_called_once_with(campaign_id)
+    mock_campaign_service.update_campaign_stats.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_campaign_completes_when_no_contacts_remain(campaign_scheduler, mock_campaign_service):
+    campaign = make_campaign(pending_calls=0)
+    campaign_scheduler.planner = AsyncMock()
+    campaign_scheduler.planner.next_contacts.return_value = []
+    campaign_scheduler.planner.has_remaining.return_value = False
+    campaign_scheduler.engine = MagicMock()
+    campaign_scheduler.engine.capacity.return_value = 5
+    campaign_scheduler.engine.active.return_value = 0
+    campaign_scheduler.engine.queued.return_value = 0
+
+    await campaign_scheduler._process_campaign(campaign)
+
+    campaign_scheduler.planner.has_remaining.assert_awaited_once_with(campaign.id, campaign.max_retries)
+    mock_campaign_service.update_campaign.assert_awaited_once_with(
+        campaign.id, {"status": CampaignStatus.COMPLETED}
     )
+
+@pytest.mark.asyncio
+async def test_campaign_not_completed_while_contacts_remain(campaign_scheduler, mock_campaign_service):
+    campaign = make_campaign(pending_calls=0)
+    campaign_scheduler.planner = AsyncMock()
+    campaign_scheduler.planner.next_contacts.return_value = []
+    campaign_scheduler.planner.has_remaining.return_value = True
+    campaign_scheduler.engine = MagicMock()
+    campaign_scheduler.engine.capacity.return_value = 5
+    campaign_scheduler.engine.active.return_value = 0
+    campaign_scheduler.engine.queued.return_value = 0
+
+    await campaign_scheduler._process_campaign(campaign)
+
+    mock_campaign_service.update_campaign.assert_not_called()
+
+    # Con llamadas en curso no se consulta la base de datos
+    campaign_scheduler.engine.active.return_value = 1
+    campaign_scheduler.planner.has_remaining.reset_mock()
+    await campaign_scheduler._process_campaign(campaign)
+    campaign_scheduler.planner.has_remaining.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_only_assigned_campaigns_are_processed(campaign_scheduler, mock_campaign_service):
+    campaigns = [make_campaign(name=f"Campaign {number}") for number in (1, 2)]
+    campaign_ids = [str(campaign.id) for campaign in campaigns]
+    mock_campaign_service.list_campaigns.return_value = campaigns
+    campaign_scheduler.coordinator = AsyncMock()
+    campaign_scheduler.coordinator.assign.return_value = {campaign_ids[1]}
+    campaign_scheduler._process_campaign = AsyncMock()
+
+    await campaign_scheduler._process_active_campaigns()
+
+    campaign_scheduler.coordinator.assign.assert_awaited_once_with(campaign_ids)
+    campaign_scheduler._process_campaign.assert_awaited_once_with(campaigns[1])
+    assert list(campaign_scheduler._active_campaigns) == [campaign_ids[1]]
+
+@pytest.mark.asyncio
+async def test_predictive_pacing_budget_is_shared_by_campaigns(campaign_scheduler, mock_campaign_service):
+    campaigns = [make_campaign(name=f"Campaign {number}") for number in (1, 2, 3)]
+    mock_campaign_service.list_campaigns.return_value = campaigns
+    campaign_scheduler.pacing = PacingController(mode="predictive", ai_capacity=4)
+    campaign_scheduler.planner = AsyncMock()
+    campaign_scheduler.planner.next_contacts.side_effect = lambda campaign_id, max_retries, limit: [
+        {"contact_id": f"{campaign_id}-{i}", "name": "Ana", "phone_number": "+5491112345678"}
+        for i in range(limit)
+    ]
+    campaign_scheduler.engine = MagicMock()
+    campaign_scheduler.engine.capacity.return_value = 20
+    campaign_scheduler.engine.is_pending.return_value = False
+    campaign_scheduler.engine.queued.return_value = 1
+    campaign_scheduler.engine.dialing.return_value = 0
+
+    campaign_scheduler.pacing.begin_tick(campaign_scheduler.engine.queued() + campaign_scheduler.engine.dialing())
+    await campaign_scheduler._process_active_campaigns()
+
+    # Cuatro conversaciones libres y una llamada ya en cola: tres llamadas entre todas las campañas
+    assert campaign_scheduler.engine.submit.call_count == 3
+
+@pytest.mark.asyncio
+async def test_queued_contacts_outside_window_are_released(campaign_scheduler):
+    campaign = make_campaign()
+    ready = {"contact_id": "c1", "name": "Ana", "phone_number": "+5491112345678"}
+    closed = {"contact_id": "c2", "name": "Luis", "phone_number": "+5491187654321", "retry_count": 1}
+    campaign_scheduler.queue = AsyncMock()
+    campaign_scheduler.queue.size.return_value = 10
+    campaign_scheduler.queue.claim.return_value = ([ready], [closed])
+    campaign_scheduler.planner = AsyncMock()
+    campaign_scheduler.engine = MagicMock()
+    campaign_scheduler.engine.capacity.return_value = 5
+
+    await campaign_scheduler._process_campaign(campaign)
+
+    campaign_scheduler.planner.release.assert_awaited_once_with(campaign.id, [closed])
+    campaign_scheduler.engine.submit.assert_called_once()
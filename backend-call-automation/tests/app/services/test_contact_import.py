@@ -0,0 +1,92 @@
+import io
+import pytest
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+from fastapi import HTTPException
+from app.models.contact import ContactImportStatus
+from app.services.contact_import import ContactImportService
+from app.utils.phone import phone_digits
+
+CSV = (
+    "name,phone_number,email,tags\n"
+    "Ana,+54 9 11 1234-5678,ana@example.com,\"vip,norte\"\n"
+    "Ana Duplicada,0054 9 11 1234 5678,,\n"
+    "Luis,+34 612 345 678,,\n"
+    "Sin teléfono,,,\n"
+    "Marta,+1 415 555 0100,,\n"
+)
+
+@pytest.fixture
+def supabase():
+    client = MagicMock()
+    client.existing = {"14155550100"}
+
+    def upsert(rows, on_conflict, ignore_duplicates=False):
+        assert on_conflict == "phone_digits"
+        query = MagicMock()
+        if ignore_duplicates:
+            new_rows = [row for row in rows if phone_digits(row["phone_number"]) not in client.existing]
+            client.inserted.extend(new_rows)
+            client.existing.update(phone_digits(row["phone_number"]) for row in new_rows)
+            query.execute.return_value = SimpleNamespace(data=new_rows)
+        else:
+            client.upserted.extend(rows)
+            query.execute.return_value = SimpleNamespace(data=rows)
+        return query
+
+    client.inserted = []
+    client.upserted = []
+    client.table.return_value.upsert.side_effect = upsert
+    return client
+
+def upload(content):
+    return SimpleNamespace(file=io.BytesIO(content.encode("utf-8")), filename="contacts.csv")
+
+@pytest.mark.asyncio
+async def test_import_dedupes_and_upserts(supabase):
+    importer = ContactImportService(supabase, batch_size=10, concurrency=1, parse_rows=2)
+
+    job = await importer.import_file(upload(CSV))
+
+    assert job.status == ContactImportStatus.COMPLETED
+    assert (job.total, job.imported, job.updated, job.duplicates, job.errors) == (5, 2, 1, 1, 1)
+    phones = {row["phone_number"]: row for row in supabase.inserted}
+    assert set(phones) == {"+5491112345678", "+34612345678"}
+    assert phones["+5491112345678"]["name"] == "Ana Duplicada"
+    assert [row["phone_number"] for row in supabase.upserted] == ["+14155550100"]
+    assert importer.get_job(job.id) is job
+
+@pytest.mark.asyncio
+async def test_same_phone_always_goes_to_same_writer(supabase):
+    importer = ContactImportService(supabase, batch_size=1, concurrency=4, parse_rows=100)
+
+    job = await importer.import_file(upload(CSV))
+
+    assert job.imported + job.updated == 4
+    # El teléfono repetido se actualiza en lugar de insertarse dos veces
+    assert len(supabase.inserted) == 2
+    assert job.duplicates == 0
+
+@pytest.mark.asyncio
+async def test_failed_batch_counted_as_errors(supabase):
+    supabase.table.return_value.upsert.side_effect = RuntimeError("db caída")
+    importer = ContactImportService(supabase, batch_size=10, concurrency=2)
+
+    job = await importer.import_file(upload(CSV))
+
+    assert job.status == ContactImportStatus.COMPLETED
+    assert job.errors == 4
+    assert job.imported == 0
+
+@pytest.mark.asyncio
+async def test_background_import_reports_progress(supabase):
+    importer = ContactImportService(supabase)
+
+    job = await importer.start_import(upload(CSV))
+    for task in list(importer._tasks):
+        await task
+
+    assert importer.get_job(job.id).status == ContactImportStatus.COMPLETED
+    with pytest.raises(HTTPException) as exc_info:
+        importer.get_job("desconocido")
+    assert exc_info.value.status_code == 404
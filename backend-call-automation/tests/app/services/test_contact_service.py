@@ -0,0 +1,192 @@
+import pytest
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+from uuid import uuid4
+from fastapi import HTTPException
+from postgrest.exceptions import APIError
+from app.services.contact_service import ContactService, contact_count_cache
+
+def contact_row():
+    return {
+        "id": str(uuid4()),
+        "name": "Ana",
+        "phone_number": "+5491112345678",
+        "created_at": "2025-07-01T10:00:00+00:00",
+        "updated_at": "2025-07-01T10:00:00+00:00"
+    }
+
+@pytest.fixture
+def supabase():
+    query = MagicMock()
+    for method in ("select", "or_", "contains", "order", "limit", "range", "insert"):
+        getattr(query, method).return_value = query
+    query.execute.return_value = SimpleNamespace(data=[contact_row()], count=42)
+    client = MagicMock()
+    client.table.return_value = query
+    return client
+
+@pytest.fixture(autouse=True)
+def clear_count_cache():
+    contact_count_cache.clear()
+    yield
+    contact_count_cache.clear()
+
+@pytest.mark.asyncio
+async def test_page_and_estimated_total_in_one_query(supabase):
+    service = ContactService(supabase)
+
+    contacts, total = await service.list_contacts(skip=0, limit=10, tags=["vip"])
+
+    query = supabase.table.return_value
+    assert len(contacts) == 1
+    assert total == 42
+    assert query.execute.call_count == 1
+    query.select.assert_called_once_with('*', count='estimated')
+    query.range.assert_called_once_with(0, 9)
+
+@pytest.mark.asyncio
+async def test_exact_count_opt_in(supabase):
+    service = ContactService(supabase)
+
+    await service.list_contacts(exact_count=True)
+
+    supabase.table.return_value.select.assert_called_once_with('*', count='exact')
+
+@pytest.mark.asyncio
+async def test_total_cached_per_filter_combination(supabase):
+    service = ContactService(supabase)
+    query = supabase.table.return_value
+
+    await service.list_contacts(tags=["vip", "norte"])
+    _, total = await service.list_contacts(skip=10, tags=["norte", "vip"])
+    await service.list_contacts(tags=["vip"])
+
+    assert total == 42
+    assert [c.kwargs["count"] for c in query.select.call_args_list] == ['estimated', None, 'estimated']
+
+@pytest.mark.asyncio
+async def test_cached_totals_cleared_on_create(supabase):
+    service = ContactService(supabase)
+    await service.list_contacts()
+    assert len(contact_count_cache) == 1
+
+    await service.create_contact(MagicMock(model_dump=MagicMock(return_value={"phone_number": "+5491112345678"})))
+
+    assert len(contact_count_cache) == 0
+
+@pytest.mark.asyncio
+async def test_search_uses_ranked_rpc(supabase):
+    service = ContactService(supabase)
+    supabase.rpc.return_value.limit.return_value.execute.return_value = SimpleNamespace(data=[contact_row()])
+
+    contacts = await service.search_contacts("ana", limit=5)
+
+    assert len(contacts) == 1
+    supabase.rpc.assert_called_once_with('search_contacts', {'p_query': 'ana'})
+    supabase.rpc.return_value.limit.assert_called_once_with(5)
+
+@pytest.mark.asyncio
+async def test_list_with_search_pages_rpc_results(supabase):
+    service = ContactService(supabase)
+    supabase.rpc.return_value.range.return_value.execute.return_value = SimpleNamespace(data=[contact_row()], count=1)
+
+    contacts, total = await service.list_contacts(skip=10, limit=10, search="ana", tags=["vip"])
+
+    assert total == 1
+    supabase.rpc.assert_called_once_with(
+        'search_contacts', {'p_query': 'ana', 'p_tags': ['vip']}, count='estimated'
+    )
+    supabase.rpc.return_value.range.assert_called_once_with(10, 19)
+    supabase.table.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_phone_normalized_on_create(supabase):
+    service = ContactService(supabase)
+    contact = MagicMock(model_dump=MagicMock(return_value={"name": "Ana", "phone_number": "0054 9 11 1234-5678"}))
+
+    await service.create_contact(contact)
+
+    inserted = supabase.table.return_value.insert.call_args.args[0]
+    assert inserted["phone_number"] == "+5491112345678"
+
+@pytest.mark.asyncio
+async def test_duplicate_phone_on_create_is_conflict(supabase):
+    supabase.table.return_value.execute.side_effect = APIError({"code": "23505", "message": "duplicate key"})
+    service = ContactService(supabase)
+    contact = MagicMock(model_dump=MagicMock(return_value={"name": "Ana", "phone_number": "+5491112345678"}))
+
+    with pytest.raises(HTTPException) as exc_info:
+        await service.create_contact(contact)
+
+    assert exc_info.value.status_code == 409
+
+def paged_client(pages):
+    query = MagicMock()
+    for method in ("select", "eq", "order", "or_", "limit"):
+        getattr(query, method).return_value = query
+    query.execute.side_effect = [SimpleNamespace(data=page) for page in pages]
+    client = MagicMock()
+    client.table.return_value = query
+    return client
+
+@pytest.mark.asyncio
+async def test_export_streams_pages(monkeypatch):
+    monkeypatch.setattr("app.services.contact_service.CONTACT_EXPORT_PAGE_SIZE", 1)
+    first = dict(contact_row(), tags=["vip", "norte"], contact_list_contacts=[{"contact_list_id": "lista-1"}])
+    client = paged_client([[first], []])
+    service = ContactService(client)
+
+    chunks = [chunk async for chunk in await service.export_contacts_to_csv(list_id="lista-1")]
+
+    lines = b"".join(chunks).decode("utf-8").splitlines()
+    assert len(chunks) == 1
+    assert lines[0] == "id,name,phone_number,email,notes,tags,created_at,updated_at"
+    assert '"vip,norte"' in lines[1]
+    query = client.table.return_value
+    query.eq.assert_called_with('contact_list_contacts.contact_list_id', 'lista-1')
+    assert query.execute.call_count == 2
+    assert "contact_list_contacts!inner" in query.select.call_args.args[0]
+
+@pytest.mark.asyncio
+async def test_export_gzip():
+    import gzip
+    client = paged_client([[contact_row()]])
+    service = ContactService(client)
+
+    content = b"".join([chunk async for chunk in await service.export_contacts_to_csv(compress=True)])
+
+    lines = gzip.decompress(content).decode("utf-8").splitlines()
+    assert len(lines) == 2
+    assert lines[1].split(",")[1] == "Ana"
+
+@pytest.mark.asyncio
+async def test_export_first_page_error_raises_before_streaming():
+    client = paged_client([])
+    client.table.return_value.execute.side_effect = RuntimeError("sin conexión")
+    service = ContactService(client)
+
+    with pytest.raises(HTTPException) as exc_info:
+        await service.export_contacts_to_csv()
+
+    assert exc_info.value.status_code == 500
+
+@pytest.mark.asyncio
+async def test_export_later_page_error_aborts_stream(monkeypatch):
+    monkeypatch.setattr("app.services.contact_service.CONTACT_EXPORT_PAGE_SIZE", 1)
+    client = paged_client([[contact_row()]])
+    client.table.return_value.execute.side_effect = [SimpleNamespace(data=[contact_row()]), RuntimeError("sin conexión")]
+    stream = await ContactService(client).export_contacts_to_csv()
+
+    with pytest.raises(RuntimeError):
+        [chunk async for chunk in stream]
+
+@pytest.mark.asyncio
+async def test_update_clears_count_cache(supabase):
+    contact_count_cache["filtro"] = 42
+    query = supabase.table.return_value
+    query.update.return_value.eq.return_value.execute.return_value = SimpleNamespace(data=[contact_row()])
+    contact = MagicMock(model_dump=MagicMock(return_value={"tags": ["vip"]}))
+
+    await ContactService(supabase).update_contact("c1", contact)
+
+    assert "filtro" not in contact_count_cache
@@ -0,0 +1,88 @@
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+from app.services.dial_planner import DialPlanner
+
+@pytest.fixture
+def supabase():
+    client = MagicMock()
+    client.rpc.return_value.execute = AsyncMock(return_value=SimpleNamespace(data=[
+        {"contact_id": "c1", "name": "Ana", "phone_number": "+5491112345678", "retry_count": 0},
+        {"contact_id": "c2", "name": "Luis", "phone_number": "+34612345678", "retry_count": 2}
+    ]))
+    client.table.return_value.upsert.return_value.execute = AsyncMock(return_value=SimpleNamespace(data=[]))
+    return client
+
+@pytest.mark.asyncio
+async def test_next_contacts_uses_single_rpc(supabase):
+    planner = DialPlanner(supabase)
+
+    contacts = await planner.next_contacts("campaign-1", max_retries=3, limit=2)
+
+    assert [contact["contact_id"] for contact in contacts] == ["c1", "c2"]
+    supabase.rpc.assert_called_once_with("next_dialable_contacts", {
+        "p_campaign_id": "campaign-1",
+        "p_max_retries": 3,
+        "p_limit": 2
+    })
+
+@pytest.mark.asyncio
+async def test_next_contacts_without_capacity(supabase):
+    assert await DialPlanner(supabase).next_contacts("campaign-1", max_retries=3, limit=0) == []
+    supabase.rpc.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_reserve_writes_batch_in_one_upsert(supabase):
+    planner = DialPlanner(supabase)
+    contacts = await planner.next_contacts("campaign-1", max_retries=3, limit=2)
+
+    await planner.reserve("campaign-1", contacts)
+
+    supabase.table.assert_called_once_with("campaign_contacts")
+    rows = supabase.table.return_value.upsert.call_args.args[0]
+    assert supabase.table.return_value.upsert.call_args.kwargs == {"on_conflict": "campaign_id,contact_id"}
+    assert [(row["contact_id"], row["retry_count"], row["call_status"]) for row in rows] == [
+        ("c1", 1, "pending"),
+        ("c2", 3, "pending")
+    ]
+
+@pytest.mark.asyncio
+async def test_refresh_windows(supabase):
+    supabase.rpc.return_value.execute = AsyncMock(return_value=SimpleNamespace(data=42))
+
+    assert await DialPlanner(supabase).refresh_windows("campaign-1") == 42
+    supabase.rpc.assert_called_once_with("refresh_calling_windows", {
+        "p_campaign_id": "campaign-1",
+        "p_default_timezone": "UTC"
+    })
+
+@pytest.mark.asyncio
+async def test_has_remaining(supabase):
+    supabase.rpc.return_value.execute = AsyncMock(return_value=SimpleNamespace(data=False))
+
+    assert await DialPlanner(supabase).has_remaining("campaign-1", max_retries=3) is False
+    supabase.rpc.assert_called_once_with("campaign_has_remaining_contacts", {
+        "p_campaign_id": "campaign-1",
+        "p_max_retries": 3
+    })
+
+@pytest.mark.asyncio
+async def test_mark_failed_makes_contact_dialable_again(supabase):
+    update = supabase.table.return_value.update
+    update.return_value.eq.return_value.eq.return_value.execute = AsyncMock(return_value=SimpleNamespace(data=[]))
+
+    await DialPlanner(supabase).mark_failed("campaign-1", "c1")
+
+    update.assert_called_once_with({"call_status": None})
+    update.return_value.eq.assert_called_once_with("campaign_id", "campaign-1")
+    update.return_value.eq.return_value.eq.assert_called_once_with("contact_id", "c1")
+
+@pytest.mark.asyncio
+async def test_release_restores_attempts(supabase):
+    planner = DialPlanner(supabase)
+    contacts = await planner.next_contacts("campaign-1", max_retries=3, limit=2)
+
+    await planner.release("campaign-1", contacts)
+
+    rows = supabase.table.return_value.upsert.call_args.args[0]
+    assert [(row["call_status"], row["retry_count"]) for row in rows] == [(None, 0), (None, 2)]
@@ -0,0 +1,85 @@
+import time
+import pytest
+import fakeredis
+from app.services.dial_queue import DialQueue
+
+@pytest.fixture
+def redis():
+    return fakeredis.FakeAsyncRedis(decode_responses=True)
+
+def _contacts(*ids, **extra):
+    return [{"contact_id": contact_id, "phone_number": "+5491112345678", **extra} for contact_id in ids]
+
+@pytest.mark.asyncio
+async def test_claim_orders_by_priority_and_skips_future(redis):
+    queue = DialQueue(redis, lease_seconds=60, priority_step=300)
+    await queue.enqueue("a", _contacts("c1", "c2"))
+    await queue.enqueue("a", [{"contact_id": "vip", "priority": 2}])
+    await queue.enqueue("a", [{"contact_id": "later", "eligible_at": time.time() + 3600}])
+
+    claimed, _ = await queue.claim("a", 10)
+
+    assert [contact["contact_id"] for contact in claimed] == ["vip", "c1", "c2"]
+    assert await queue.size("a") == 1
+    assert await queue.next_due() > time.time()
+
+@pytest.mark.asyncio
+async def test_workers_never_claim_the_same_contact(redis):
+    first = DialQueue(redis, worker_id="w1")
+    second = DialQueue(redis, worker_id="w2")
+    await first.enqueue("a", _contacts("c1", "c2", "c3"))
+
+    claimed = (await first.claim("a", 2))[0] + (await second.claim("a", 2))[0]
+
+    assert sorted(contact["contact_id"] for contact in claimed) == ["c1", "c2", "c3"]
+    # Un contacto reservado no vuelve a encolarse
+    assert await first.enqueue("a", _contacts("c1")) == 0
+
+@pytest.mark.asyncio
+async def test_ack_only_by_owner(redis):
+    first = DialQueue(redis, worker_id="w1")
+    second = DialQueue(redis, worker_id="w2")
+    await first.enqueue("a", _contacts("c1"))
+    await first.claim("a", 1)
+
+    assert not await second.ack("a", "c1")
+    assert await first.ack("a", "c1")
+    assert await first.requeue_expired() == 0
+
+@pytest.mark.asyncio
+async def test_expired_lease_returns_to_queue(redis):
+    crashed = DialQueue(redis, lease_seconds=-1, worker_id="w1")
+    survivor = DialQueue(redis, worker_id="w2")
+    await crashed.enqueue("a", _contacts("c1"))
+    await crashed.claim("a", 1)
+    assert await survivor.claim("a", 1) == ([], [])
+
+    assert await survivor.requeue_expired() == 1
+    claimed, _ = await survivor.claim("a", 1)
+
+    assert [contact["contact_id"] for contact in claimed] == ["c1"]
+    assert not await crashed.ack("a", "c1")
+
+@pytest.mark.asyncio
+async def test_claim_drops_contacts_outside_their_window(redis):
+    queue = DialQueue(redis)
+    await queue.enqueue("a", _contacts("closed", eligible_until="2020-01-01T18:00:00+00:00", retry_count=1))
+    await queue.enqueue("a", _contacts("c1", "c2", eligible_until=time.time() + 3600))
+
+    claimed, expired = await queue.claim("a", 2)
+
+    assert [contact["contact_id"] for contact in claimed] == ["c1", "c2"]
+    assert [contact["contact_id"] for contact in expired] == ["closed"]
+    assert expired[0]["retry_count"] == 1
+    assert await queue.size("a") == 0
+    assert await queue.enqueue("a", _contacts("closed")) == 1
+
+@pytest.mark.asyncio
+async def test_expired_lease_keeps_original_score(redis):
+    crashed = DialQueue(redis, lease_seconds=-1, priority_step=300, worker_id="w1")
+    await crashed.enqueue("a", [{"contact_id": "vip", "priority": 2}])
+    score = await redis.zscore("dialq:q:a", "vip")
+    await crashed.claim("a", 1)
+
+    assert await crashed.requeue_expired() == 1
+    assert await redis.zscore("dialq:q:a", "vip") == score
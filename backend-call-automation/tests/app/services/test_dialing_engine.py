@@ -0,0 +1,80 @@
+import asyncio
+import pytest
+from app.services.dialing_engine import DialingEngine
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+@pytest.fixture
+async def engine():
+    engine = DialingEngine(max_concurrent_calls=3, max_calls_per_campaign=2, slot_timeout=60)
+    await engine.start()
+    yield engine
+    await engine.stop()
+
+def _dialer(dialed, call_id):
+    async def dial():
+        dialed.append(call_id)
+        return call_id
+    return dial
+
+@pytest.mark.asyncio
+async def test_respects_global_and_campaign_limits(engine):
+    dialed = []
+    for i in range(3):
+        engine.submit("a", _dialer(dialed, f"a{i}"))
+    for i in range(2):
+        engine.submit("b", _dialer(dialed, f"b{i}"))
+    await _settle()
+
+    assert engine.active() == 3
+    assert engine.active("a") == 2
+    assert sorted(dialed) == ["a0", "a1", "b0"]
+
+    # Al terminar una llamada se marca la siguiente en turno
+    engine.release("a0")
+    await _settle()
+    assert dialed[-1] == "b1"
+    assert engine.active() == 3
+
+@pytest.mark.asyncio
+async def test_failed_dial_frees_slot(engine):
+    async def failing():
+        raise RuntimeError("Twilio no disponible")
+
+    dialed = []
+    engine.submit("a", failing, key="a:1")
+    engine.submit("a", _dialer(dialed, "a2"))
+    await _settle()
+
+    assert dialed == ["a2"]
+    assert engine.active() == 1
+    assert not engine.is_pending("a:1")
+
+@pytest.mark.asyncio
+async def test_duplicate_keys_and_capacity(engine):
+    dialed = []
+    assert engine.submit("a", _dialer(dialed, "a1"), key="a:1")
+    assert not engine.submit("a", _dialer(dialed, "a1"), key="a:1")
+    assert engine.capacity("a") == 1
+    await _settle()
+    assert engine.capacity("a") == 1
+    assert engine.capacity("b") == 2
+
+@pytest.mark.asyncio
+async def test_expired_slot_is_reclaimed():
+    engine = DialingEngine(max_concurrent_calls=1, max_calls_per_campaign=1, slot_timeout=0.05)
+    await engine.start()
+    try:
+        dialed = []
+        engine.submit("a", _dialer(dialed, "a1"))
+        engine.submit("a", _dialer(dialed, "a2"))
+        await _settle()
+        assert dialed == ["a1"]
+
+        await engine.wait_for_capacity(1)
+        await _settle()
+        assert dialed == ["a1", "a2"]
+    finally:
+        await engine.stop()
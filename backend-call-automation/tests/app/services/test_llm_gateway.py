@@ -0,0 +1,94 @@
+import asyncio
+import pytest
+from app.services.llm_gateway import LLMGateway, LLMPriority, is_rate_limit_error
+
+class RateLimitError(Exception):
+    status_code = 429
+
+@pytest.fixture
+def gateway():
+    return LLMGateway(initial_limit=1, min_limit=1, max_limit=4, target_latency=1.0, decrease_cooldown=0.0)
+
+@pytest.mark.asyncio
+async def test_live_calls_served_before_background(gateway):
+    order = []
+    release = asyncio.Event()
+
+    async def blocker():
+        await release.wait()
+
+    async def task(name):
+        order.append(name)
+
+    first = asyncio.create_task(gateway.run(blocker, priority=LLMPriority.BACKGROUND))
+    await asyncio.sleep(0)
+
+    background = asyncio.create_task(gateway.run(task, "background", priority=LLMPriority.BACKGROUND))
+    live = asyncio.create_task(gateway.run(task, "live", priority=LLMPriority.LIVE_CALL))
+    await asyncio.sleep(0)
+
+    assert gateway.queue_depth() == 2
+    assert gateway.queue_depth(LLMPriority.LIVE_CALL) == 1
+
+    release.set()
+    await asyncio.gather(first, background, live)
+
+    assert order == ["live", "background"]
+    assert gateway.queue_depth() == 0
+    assert gateway.in_flight == 0
+
+@pytest.mark.asyncio
+async def test_additive_increase_on_fast_responses(gateway):
+    async def fast():
+        return "ok"
+
+    for _ in range(5):
+        assert await gateway.run(fast) == "ok"
+
+    assert gateway.limit > 1
+
+@pytest.mark.asyncio
+async def test_multiplicative_decrease_on_rate_limit():
+    gateway = LLMGateway(initial_limit=8, min_limit=1, max_limit=8, decrease_cooldown=0.0)
+
+    async def limited():
+        raise RateLimitError("Too Many Requests")
+
+    with pytest.raises(RateLimitError):
+        await gateway.run(limited)
+
+    assert gateway.limit == 4
+    assert gateway.in_flight == 0
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_leaves_queue(gateway):
+    release = asyncio.Event()
+
+    async def blocker():
+        await release.wait()
+
+    first = asyncio.create_task(gateway.run(blocker))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(gateway.acquire(LLMPriority.BACKGROUND))
+    await asyncio.sleep(0)
+    assert gateway.queue_depth() == 1
+
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    assert gateway.queue_depth() == 0
+
+    release.set()
+    await first
+    assert gateway.in_flight == 0
+
+def test_is_rate_limit_error():
+    assert is_rate_limit_error(RateLimitError())
+    assert not is_rate_limit_error(ValueError("bad input"))
+
+    # El texto solo cuenta en excepciones de los clientes de los proveedores
+    ProviderError = type("ChatGoogleGenerativeAIError", (Exception,), {"__module__": "langchain_google_genai.chat_models"})
+    assert is_rate_limit_error(ProviderError("429 Resource has been exhausted (e.g. check quota)."))
+    assert not is_rate_limit_error(ProviderError("Invalid argument: max_tokens 4290"))
+    assert not is_rate_limit_error(Exception("429 Resource has been exhausted"))
+    assert not is_rate_limit_error(RuntimeError("request req_429abc used 1429 tokens"))
@@ -0,0 +1,119 @@
+import asyncio
+import pytest
+from app.services.llm_gateway import LLMGateway
+from app.services.llm_router import LLMRouter, ProviderStats
+
+class FakeLLM:
+    def __init__(self, name, delay=0.0, error=None):
+        self.name = name
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+        self.cancelled = False
+
+    async def ainvoke(self, prompt, **kwargs):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if self.error:
+            raise self.error
+        return f"{self.name}:{prompt}"
+
+def make_router(providers, **kwargs):
+    gateway = LLMGateway(initial_limit=10, max_limit=10)
+    return LLMRouter(providers, gateway=gateway, **kwargs)
+
+def build(provider):
+    return "hola", {}
+
+def test_provider_stats_percentiles():
+    stats = ProviderStats(window=50)
+    for i in range(1, 21):
+        stats.record(i / 10, success=True)
+    stats.record(None, success=False)
+
+    assert stats.p50 == 1.0
+    assert stats.p95 == 1.9
+    assert stats.error_rate == pytest.approx(1 / 21)
+
+@pytest.mark.asyncio
+async def test_hedged_request_uses_faster_provider_and_cancels_loser():
+    slow = FakeLLM("slow", delay=1.0)
+    fast = FakeLLM("fast", delay=0.01)
+    router = make_router({"slow": slow, "fast": fast}, hedge_default_delay=0.05)
+
+    result = await router.invoke(build, hedge=True)
+    await asyncio.sleep(0)
+
+    assert result == "fast:hola"
+    assert slow.cancelled
+    assert router.gateway.in_flight == 0
+
+@pytest.mark.asyncio
+async def test_no_hedge_when_primary_is_fast():
+    primary = FakeLLM("primary")
+    secondary = FakeLLM("secondary")
+    router = make_router({"primary": primary, "secondary": secondary}, hedge_default_delay=0.5)
+
+    assert await router.invoke(build, hedge=True) == "primary:hola"
+    assert secondary.calls == 0
+
+@pytest.mark.asyncio
+async def test_failover_to_next_provider():
+    broken = FakeLLM("broken", error=RuntimeError("caído"))
+    healthy = FakeLLM("healthy")
+    router = make_router({"broken": broken, "healthy": healthy})
+
+    assert await router.invoke(build) == "healthy:hola"
+    assert router.stats["broken"].error_rate == 1.0
+    assert router.ranked_providers()[0] == "healthy"
+
+@pytest.mark.asyncio
+async def test_hedged_request_retries_secondary_when_primary_fails_fast():
+    broken = FakeLLM("broken", error=RuntimeError("caído"))
+    healthy = FakeLLM("healthy")
+    router = make_router({"broken": broken, "healthy": healthy}, hedge_default_delay=5.0)
+
+    assert await router.invoke(build, hedge=True) == "healthy:hola"
+
+@pytest.mark.asyncio
+async def test_all_providers_failing_raises():
+    router = make_router({"a": FakeLLM("a", error=RuntimeError("a")), "b": FakeLLM("b", error=RuntimeError("b"))})
+
+    with pytest.raises(RuntimeError):
+        await router.invoke(build)
+
+def test_unsampled_provider_does_not_outrank_fast_measured_one():
+    router = make_router({"new": FakeLLM("new"), "measured": FakeLLM("measured")}, hedge_default_delay=1.5)
+    for _ in range(20):
+        router.stats["measured"].record(0.3, success=True)
+
+    assert router.ranked_providers() == ["measured", "new"]
+
+    for _ in range(20):
+        router.stats["measured"].record(3.0, success=True)
+    assert router.ranked_providers() == ["new", "measured"]
+
+@pytest.mark.asyncio
+async def test_cancelled_loser_is_recorded_with_winner_latency():
+    slow = FakeLLM("slow", delay=1.0)
+    fast = FakeLLM("fast", delay=0.01)
+    router = make_router({"slow": slow, "fast": fast}, hedge_default_delay=0.05)
+
+    await router.invoke(build, hedge=True)
+
+    assert len(router.stats["slow"].latencies) == 1
+    assert router.stats["slow"].latencies[0] >= router.stats["fast"].latencies[0]
+    assert router.stats["slow"].error_rate == 0.0
+
+@pytest.mark.asyncio
+async def test_latency_excludes_gateway_queue_wait():
+    gateway = LLMGateway(initial_limit=1, max_limit=1)
+    router = LLMRouter({"a": FakeLLM("a", delay=0.05)}, gateway=gateway)
+
+    await asyncio.gather(router.invoke(build), router.invoke(build))
+
+    assert max(router.stats["a"].latencies) < 0.09
@@ -0,0 +1,72 @@
+import asyncio
+import pytest
+from unittest.mock import MagicMock
+from app.services.metrics_sink import MetricsSink
+
+@pytest.fixture
+def supabase():
+    client = MagicMock()
+    client.table.return_value.insert.return_value.execute.return_value = MagicMock(data=[])
+    return client
+
+def inserted_batches(supabase):
+    return [call.args[0] for call in supabase.table.return_value.insert.call_args_list]
+
+@pytest.mark.asyncio
+async def test_submit_never_blocks_and_drops_when_full(supabase):
+    sink = MetricsSink(supabase=supabase, max_queue_size=2, batch_size=10)
+
+    assert sink.submit("conversation_metrics", {"n": 1})
+    assert sink.submit("conversation_metrics", {"n": 2})
+    assert not sink.submit("conversation_metrics", {"n": 3})
+    assert sink.queue_size == 2
+    supabase.table.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_flush_inserts_in_bulk_by_table(supabase):
+    sink = MetricsSink(supabase=supabase, batch_size=10)
+    for n in range(3):
+        sink.submit("conversation_metrics", {"n": n})
+    sink.submit("ai_metrics", {"n": 99})
+
+    assert await sink.flush() == 4
+
+    batches = inserted_batches(supabase)
+    assert [{"n": 0}, {"n": 1}, {"n": 2}] in batches
+    assert [{"n": 99}] in batches
+    assert sink.queue_size == 0
+
+@pytest.mark.asyncio
+async def test_size_triggered_flush(supabase):
+    sink = MetricsSink(supabase=supabase, batch_size=2, flush_interval=60)
+    await sink.start()
+    try:
+        sink.submit("conversation_metrics", {"n": 1})
+        sink.submit("conversation_metrics", {"n": 2})
+        for _ in range(50):
+            if sink.queue_size == 0:
+                break
+            await asyncio.sleep(0.01)
+        assert sink.queue_size == 0
+    finally:
+        await sink.stop()
+
+@pytest.mark.asyncio
+async def test_stop_flushes_pending_metrics(supabase):
+    sink = MetricsSink(supabase=supabase, batch_size=100, flush_interval=60)
+    await sink.start()
+    sink.submit("conversation_metrics", {"n": 1})
+
+    await sink.stop()
+
+    assert inserted_batches(supabase) == [[{"n": 1}]]
+
+@pytest.mark.asyncio
+async def test_put_waits_for_space(supabase):
+    sink = MetricsSink(supabase=supabase, max_queue_size=1, batch_size=1)
+    sink.submit("conversation_metrics", {"n": 1})
+
+    await sink.put("conversation_metrics", {"n": 2})
+
+    assert sink.queue_size == 1
+    assert inserted_batches(supabase) == [[{"n": 1}]]
@@ -0,0 +1,87 @@
+import pytest
+from app.models.call import CallStatus
+from app.services.pacing_controller import PacingController
+
+def _controller(**kwargs):
+    options = dict(mode="predictive", ai_capacity=10, abandon_rate=0.03, max_ratio=3.0, window=100, min_samples=20)
+    options.update(kwargs)
+    return PacingController(**options)
+
+def _observe(controller, campaign_id, answered, total):
+    for i in range(total):
+        status = CallStatus.COMPLETED if i < answered else CallStatus.NO_ANSWER
+        controller.record_outcome(campaign_id, f"{campaign_id}-{i}", status, 60)
+
+def test_fixed_mode_uses_engine_capacity():
+    controller = _controller(mode="fixed")
+    assert controller.allowance("a", 7) == 7
+
+def test_invalid_mode():
+    with pytest.raises(ValueError):
+        _controller(mode="aggressive")
+
+def test_without_samples_dials_one_per_free_conversation():
+    controller = _controller()
+    assert controller.allowance("a", 50) == 10
+
+def test_low_answer_rate_overdials_within_ceiling():
+    controller = _controller()
+    _observe(controller, "a", answered=30, total=100)
+
+    allowance = controller.allowance("a", 50)
+
+    assert 10 < allowance <= 30
+    assert controller._expected_abandon(allowance, 0.3, 10) <= 0.03
+
+def test_ringing_and_talking_calls_reduce_allowance():
+    controller = _controller()
+    _observe(controller, "a", answered=30, total=100)
+    baseline = controller.allowance("a", 50)
+
+    for i in range(5):
+        controller.record_dial("a", f"call-{i}")
+    controller.record_answer("call-0")
+
+    assert controller.ringing() == 4
+    assert controller.talking() == 1
+    assert controller.allowance("a", 50) < baseline - 4
+
+def test_observed_abandonment_disables_overdialing():
+    controller = _controller(ai_capacity=1)
+    _observe(controller, "a", answered=30, total=100)
+    controller.record_dial("a", "first")
+    controller.record_dial("a", "second")
+    controller.record_answer("first")
+    controller.record_answer("second")
+    controller.record_outcome("a", "first", CallStatus.COMPLETED, 30)
+    controller.record_outcome("a", "second", CallStatus.COMPLETED, 5)
+
+    assert controller._campaign("a").abandon_rate() > 0.03
+    assert controller.allowance("a", 50) == 1
+
+def test_campaigns_share_one_budget_per_tick():
+    controller = _controller()
+    for campaign_id in ("a", "b", "c"):
+        _observe(controller, campaign_id, answered=30, total=100)
+    single = controller.allowance("a", 50)
+
+    controller.begin_tick()
+    granted = [controller.allowance(campaign_id, 50) for campaign_id in ("a", "b", "c")]
+
+    assert sum(granted) == single
+    assert granted[1:] == [0, 0]
+
+def test_queued_dials_and_unused_grants_in_tick_budget():
+    controller = _controller()
+    _observe(controller, "a", answered=30, total=100)
+    _observe(controller, "b", answered=30, total=100)
+    single = controller.allowance("a", 50)
+    controller.record_dial("a", "ringing")
+
+    controller.begin_tick(pending=3)
+    first = controller.allowance("a", 5)
+    controller.return_unused(2)
+    second = controller.allowance("b", 50)
+
+    assert first == 5
+    assert first - 2 + second == single - 4
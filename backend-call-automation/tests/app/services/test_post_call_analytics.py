@@ -0,0 +1,148 @@
+import json
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+from app.services.post_call_analytics import PostCallAnalyticsService
+
+class FakeQuery:
+    """Consulta encadenable que registra las operaciones realizadas."""
+
+    def __init__(self, table, log, data):
+        self.table = table
+        self.log = log
+        self.data = data
+        self.ops = []
+
+    def __getattr__(self, name):
+        def method(*args, **kwargs):
+            self.ops.append((name, args, kwargs))
+            return self
+        return method
+
+    def execute(self):
+        self.log.append((self.table, self.ops))
+        return SimpleNamespace(data=self.data(self.table, self.ops))
+
+class FakeSupabase:
+    def __init__(self, calls, history):
+        self.calls = calls
+        self.history = history
+        self.log = []
+
+    def _data(self, table, ops):
+        names = [op[0] for op in ops]
+        if table == "calls" and "select" in names:
+            return self.calls
+        if table == "call_history":
+            return self.history
+        return []
+
+    def table(self, name):
+        return FakeQuery(name, self.log, self._data)
+
+    def rpc(self, name, params):
+        query = FakeQuery(f"rpc:{name}", self.log, self._data)
+        query.ops.append(("params", (params,), {}))
+        return query
+
+@pytest.fixture
+def supabase():
+    return FakeSupabase(
+        calls=[
+            {"id": "c1", "campaign_id": "camp"},
+            {"id": "c2", "campaign_id": "camp"},
+            {"id": "c3", "campaign_id": "camp"}
+        ],
+        history=[
+            {"call_id": "c1", "user_message": "Me interesa", "ai_response": "Genial"},
+            {"call_id": "c2", "user_message": "No gracias", "ai_response": "Entendido"}
+        ]
+    )
+
+@pytest.fixture
+def router():
+    router = MagicMock()
+    router.invoke = AsyncMock(return_value=SimpleNamespace(content="```json\n" + json.dumps([
+        {"call_id": "c1", "sentiment": "positive", "sentiment_score": 0.9, "summary": "Interesado", "outcome": "interested"},
+        {"call_id": "c2", "sentiment": "NEGATIVE", "sentiment_score": 3, "summary": "Rechaza", "outcome": "otro"}
+    ]) + "\n```"))
+    return router
+
+@pytest.mark.asyncio
+async def test_run_once_analyzes_calls_in_one_batch(supabase, router):
+    service = PostCallAnalyticsService(supabase=supabase, llm_router=router, batch_size=10)
+
+    assert await service.run_once() == 3
+    assert router.invoke.await_count == 1
+
+    upserts = [ops for table, ops in supabase.log if table == "conversation_metrics"]
+    assert len(upserts) == 1
+    rows = upserts[0][0][1][0]
+    by_call = {row["call_id"]: row for row in rows}
+
+    assert by_call["c1"]["outcome"] == "interested"
+    assert by_call["c2"]["sentiment"] == "negative"
+    assert by_call["c2"]["sentiment_score"] == 1.0
+    assert by_call["c2"]["outcome"] == "unresolved"
+    assert by_call["c3"]["outcome"] == "no_conversation"
+
+    updates = [ops for table, ops in supabase.log if table == "calls" and ops[0][0] == "update"]
+    assert len(updates) == 1
+
+@pytest.mark.asyncio
+async def test_batches_split_by_size(supabase, router):
+    service = PostCallAnalyticsService(supabase=supabase, llm_router=router, batch_size=1)
+
+    await service.run_once()
+
+    assert router.invoke.await_count == 2
+
+@pytest.mark.asyncio
+async def test_failed_batch_leaves_calls_pending(supabase):
+    router = MagicMock()
+    router.invoke = AsyncMock(side_effect=RuntimeError("proveedor caído"))
+    service = PostCallAnalyticsService(supabase=supabase, llm_router=router, batch_size=10)
+
+    assert await service.run_once() == 1
+
+    rows = [ops for table, ops in supabase.log if table == "conversation_metrics"][0][0][1][0]
+    assert [row["call_id"] for row in rows] == ["c3"]
+
+    failures = [ops for table, ops in supabase.log if table == "rpc:record_analytics_failures"]
+    assert failures == [[("params", ({"p_call_ids": ["c1", "c2"]},), {})]]
+
+@pytest.mark.asyncio
+async def test_pending_query_skips_calls_out_of_attempts(supabase, router):
+    service = PostCallAnalyticsService(supabase=supabase, llm_router=router, max_attempts=3)
+
+    await service.run_once()
+
+    pending = [ops for table, ops in supabase.log if table == "calls" and ops[0][0] == "select"][0]
+    assert ("lt", ("analytics_attempts", 3), {}) in pending
+    assert not [table for table, _ in supabase.log if table.startswith("rpc:")]
+
+@pytest.mark.asyncio
+async def test_results_without_ids_match_by_position_only_when_complete(supabase):
+    router = MagicMock()
+    router.invoke = AsyncMock(return_value=SimpleNamespace(content=json.dumps([
+        {"sentiment": "positive", "sentiment_score": 0.9, "summary": "Interesado", "outcome": "interested"}
+    ])))
+    service = PostCallAnalyticsService(supabase=supabase, llm_router=router, batch_size=10)
+
+    # Un resultado sin ID para dos llamadas: ninguna se asocia por posición
+    assert await service.run_once() == 1
+    rows = [ops for table, ops in supabase.log if table == "conversation_metrics"][0][0][1][0]
+    assert [row["call_id"] for row in rows] == ["c3"]
+
+    supabase.log.clear()
+    service = PostCallAnalyticsService(supabase=supabase, llm_router=router, batch_size=1)
+
+    # Un resultado por llamada: se asocia por posición
+    assert await service.run_once() == 3
+
+
+def test_enqueue_is_non_blocking():
+    service = PostCallAnalyticsService(supabase=MagicMock(), llm_router=MagicMock())
+    service.enqueue("c1")
+    service.enqueue("c1")
+    assert service._pending == {"c1"}
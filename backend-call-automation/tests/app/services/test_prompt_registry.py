@@ -0,0 +1,104 @@
+import pytest
+from langchain_core.messages import HumanMessage, SystemMessage
+from app.services.prompt_registry import PromptRegistry
+from app.config.campaign_prompts import CAMPAIGN_PROMPTS, REQUIRED_VARIABLES
+
+@pytest.fixture
+def registry():
+    return PromptRegistry()
+
+@pytest.fixture
+def sales_variables():
+    return {
+        "company_name": "ACME",
+        "product": "Seguros",
+        "objective": "Vender",
+        "key_points": "- Precio\n- Cobertura",
+        "contact_name": "Ana",
+        "contact_history": "Sin historial",
+        "history": "",
+        "input": "Hola"
+    }
+
+def test_render_matches_full_template(registry, sales_variables):
+    """El prompt dividido debe ser idéntico al prompt completo original."""
+    rendered = registry.render_campaign_prompt("sales", sales_variables, campaign_id="c1")
+    expected = registry.campaign_templates["sales"].format(**sales_variables)
+
+    assert rendered.text == expected
+    assert "ACME" in rendered.static_prefix
+    assert "Ana" in rendered.static_prefix
+    assert rendered.turn_suffix.startswith("Historial de la conversación:")
+    assert "Hola" in rendered.turn_suffix
+
+def test_campaign_prefix_rendered_once_per_campaign(registry, sales_variables):
+    """El prefijo de campaña se reutiliza entre turnos y contactos."""
+    registry.render_campaign_prompt("sales", sales_variables, campaign_id="c1")
+    registry.render_campaign_prompt("sales", {**sales_variables, "input": "Otra"}, campaign_id="c1")
+    registry.render_campaign_prompt("sales", {**sales_variables, "contact_name": "Luis"}, campaign_id="c1")
+
+    assert len(registry._campaign_prefixes) == 1
+
+    registry.render_campaign_prompt("sales", {**sales_variables, "product": "Hogar"}, campaign_id="c1")
+    assert len(registry._campaign_prefixes) == 2
+
+def test_static_prefix_stable_across_turns(registry, sales_variables):
+    first = registry.render_campaign_prompt("sales", sales_variables, campaign_id="c1")
+    second = registry.render_campaign_prompt(
+        "sales", {**sales_variables, "history": "Humano: Hola", "input": "¿Precio?"}, campaign_id="c1"
+    )
+
+    assert first.static_prefix == second.static_prefix
+    assert first.cache_key == second.cache_key
+    assert first.turn_suffix != second.turn_suffix
+
+def test_turn_reuses_rendered_prefix(registry, sales_variables, monkeypatch):
+    """En los turnos de una llamada solo se formatea el sufijo."""
+    first = registry.render_campaign_prompt("sales", sales_variables, campaign_id="c1")
+
+    def fail(*args, **kwargs):
+        raise AssertionError("El prefijo no debe volver a renderizarse")
+
+    monkeypatch.setattr(registry, "_campaign_prefix", fail)
+    second = registry.render_campaign_prompt("sales", {**sales_variables, "input": "¿Precio?"}, campaign_id="c1")
+
+    assert second.static_prefix == first.static_prefix
+    assert "¿Precio?" in second.turn_suffix
+    assert len(registry._rendered_prefixes) == 1
+
+    monkeypatch.undo()
+    changed = registry.render_campaign_prompt("sales", {**sales_variables, "product": "Hogar"}, campaign_id="c1")
+    assert "Hogar" in changed.static_prefix
+    assert len(registry._rendered_prefixes) == 2
+
+def test_campaign_cache_is_bounded(sales_variables):
+    registry = PromptRegistry(max_cached_campaigns=2)
+    for campaign_id in ["c1", "c2", "c3"]:
+        registry.render_campaign_prompt("sales", sales_variables, campaign_id=campaign_id)
+
+    assert len(registry._campaign_prefixes) == 2
+
+def test_all_campaign_types_compiled(registry):
+    for campaign_type in CAMPAIGN_PROMPTS:
+        assert registry.has_campaign_type(campaign_type)
+        variables = {var: var.upper() for var in REQUIRED_VARIABLES[campaign_type]}
+        rendered = registry.render_campaign_prompt(campaign_type, variables)
+        assert rendered.text == registry.campaign_templates[campaign_type].format(**variables)
+
+def test_to_messages_marks_prefix_for_explicit_cache(registry, sales_variables):
+    rendered = registry.render_campaign_prompt("sales", sales_variables)
+
+    messages = rendered.to_messages("anthropic")
+    assert isinstance(messages[0], SystemMessage)
+    assert messages[0].content[0]["cache_control"] == {"type": "ephemeral"}
+    assert isinstance(messages[1], HumanMessage)
+
+    messages = rendered.to_messages("google")
+    assert messages[0].content == rendered.static_prefix
+    assert rendered.invoke_kwargs("google") == {}
+    assert rendered.invoke_kwargs("openai") == {"prompt_cache_key": rendered.cache_key}
+
+def test_sentiment_prompt_formats(registry):
+    prompt = registry.format_sentiment("Estoy contento")
+    assert "Estoy contento" in prompt
+    assert "primary_emotion" in prompt
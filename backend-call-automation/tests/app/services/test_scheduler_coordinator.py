@@ -0,0 +1,76 @@
+import asyncio
+import pytest
+import fakeredis
+from app.services.scheduler_coordinator import SchedulerCoordinator
+
+CAMPAIGNS = [f"campaign-{n}" for n in range(40)]
+
+@pytest.fixture
+def redis():
+    return fakeredis.FakeAsyncRedis(decode_responses=True)
+
+def coordinator(redis, instance_id, **kwargs):
+    options = {"heartbeat_interval": 0.05, "instance_ttl": 0.3, "lease_seconds": 0.5}
+    options.update(kwargs)
+    return SchedulerCoordinator(redis, instance_id=instance_id, **options)
+
+@pytest.mark.asyncio
+async def test_campaigns_are_split_without_overlap(redis):
+    instances = [coordinator(redis, f"i{n}") for n in range(3)]
+    for _ in range(2):
+        for instance in instances:
+            await instance.heartbeat()
+
+    assigned = [await instance.assign(CAMPAIGNS) for instance in instances]
+
+    assert set().union(*assigned) == set(CAMPAIGNS)
+    assert sum(len(campaigns) for campaigns in assigned) == len(CAMPAIGNS)
+    assert all(campaigns for campaigns in assigned)
+
+@pytest.mark.asyncio
+async def test_lease_blocks_new_owner_until_released(redis):
+    first = coordinator(redis, "a")
+    await first.heartbeat()
+    assert await first.assign(CAMPAIGNS) == set(CAMPAIGNS)
+
+    second = coordinator(redis, "b")
+    await second.heartbeat()
+    # "a" todavía tiene las concesiones de las campañas que ahora son de "b"
+    assert await second.assign(CAMPAIGNS) == set()
+
+    await first.heartbeat()
+    moved = {campaign for campaign in CAMPAIGNS if second.owner(campaign) == "b"}
+    assert moved and first.held == set(CAMPAIGNS) - moved
+    assert await second.assign(CAMPAIGNS) == moved
+
+@pytest.mark.asyncio
+async def test_failed_instance_campaigns_are_taken_over(redis):
+    survivor = coordinator(redis, "a")
+    failed = coordinator(redis, "b")
+    await survivor.start()
+    await failed.heartbeat()
+    await survivor.heartbeat()
+    await failed.assign(CAMPAIGNS)
+    orphaned = failed.held
+    assert orphaned
+
+    # "b" deja de latir: se da por caída y sus concesiones vencen
+    assert await survivor.wait_for_change(2)
+    await asyncio.sleep(0.6)
+    try:
+        assert await survivor.assign(CAMPAIGNS) == set(CAMPAIGNS)
+        assert survivor.members == ["a"]
+    finally:
+        await survivor.stop()
+
+@pytest.mark.asyncio
+async def test_stop_releases_campaigns(redis):
+    first = coordinator(redis, "a", lease_seconds=30)
+    second = coordinator(redis, "b", lease_seconds=30)
+    await first.start()
+    await first.assign(CAMPAIGNS)
+
+    await first.stop()
+    await second.heartbeat()
+
+    assert await second.assign(CAMPAIGNS) == set(CAMPAIGNS)
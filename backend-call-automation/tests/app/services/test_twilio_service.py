@@ -0,0 +1,58 @@
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+from twilio.base.exceptions import TwilioRestException
+from app.services import twilio_service as module
+from app.services.twilio_service import TwilioService
+
+def twilio_call(sid):
+    return SimpleNamespace(sid=sid, status="queued", direction="outbound-api",
+                           from_="+10000000000", to="+5491112345678", duration=None)
+
+@pytest.fixture
+def async_client():
+    client = MagicMock()
+    client.calls.create_async = AsyncMock(return_value=twilio_call("CA1"))
+    with patch.object(module, "_get_async_client", return_value=client), \
+         patch.object(module, "_calls_rate_limiter", module.RateLimiter(rate=1000, burst=10)), \
+         patch.object(module, "_request_semaphore", None), \
+         patch.object(module.settings, "TWILIO_MAX_CONCURRENT_REQUESTS", 5, create=True), \
+         patch.object(module.settings, "TWILIO_RATE_LIMIT_RETRIES", 2, create=True), \
+         patch.object(module.settings, "TWILIO_RATE_LIMIT_BACKOFF", 0.01, create=True):
+        yield client
+
+@pytest.mark.asyncio
+async def test_make_call_uses_async_client(async_client):
+    result = await TwilioService().make_call("+5491112345678", "+10000000000", "https://example.com/voice")
+
+    assert result["sid"] == "CA1"
+    async_client.calls.create_async.assert_awaited_once_with(
+        to="+5491112345678", from_="+10000000000", url="https://example.com/voice", timeout=30
+    )
+
+@pytest.mark.asyncio
+async def test_make_call_retries_on_rate_limit(async_client):
+    async_client.calls.create_async.side_effect = [
+        TwilioRestException(429, "https://api.twilio.com", "Too Many Requests", code=20429),
+        twilio_call("CA2")
+    ]
+
+    result = await TwilioService().make_call("+5491112345678", "+10000000000", "https://example.com/voice")
+
+    assert result["sid"] == "CA2"
+    assert async_client.calls.create_async.await_count == 2
+
+@pytest.mark.asyncio
+async def test_make_calls_reports_errors_per_call(async_client):
+    async_client.calls.create_async.side_effect = [
+        twilio_call("CA1"),
+        TwilioRestException(400, "https://api.twilio.com", "Invalid 'To' Phone Number", code=21211)
+    ]
+
+    results = await TwilioService().make_calls([
+        {"to": "+5491112345678", "from_": "+10000000000", "url": "https://example.com/voice"},
+        {"to": "123", "from_": "+10000000000", "url": "https://example.com/voice"}
+    ])
+
+    assert results[0]["sid"] == "CA1"
+    assert "Invalid 'To' Phone Number" in results[1]["error"]
@@ -0,0 +1,74 @@
+import pytest
+from types import SimpleNamespace
+from datetime import datetime, timezone
+from unittest.mock import MagicMock
+from fastapi import HTTPException
+from app.utils.pagination import (
+    apply_keyset, decode_cursor, encode_cursor, iter_keyset_pages, keyset_filter, next_cursor
+)
+
+ROW_ID = "0b6d5f2e-8a3c-4f1e-9d2b-7c4a1e5f3b60"
+
+def paged_query(pages):
+    query = MagicMock()
+    for method in ("order", "or_", "limit"):
+        getattr(query, method).return_value = query
+    query.execute.side_effect = [SimpleNamespace(data=page) for page in pages]
+    return query
+
+def test_keyset_filter_continues_after_cursor():
+    assert keyset_filter(("2025-07-01T10:00:00+00:00", "abc")) == (
+        'created_at.lt."2025-07-01T10:00:00+00:00",'
+        'and(created_at.eq."2025-07-01T10:00:00+00:00",id.lt.abc)'
+    )
+    assert keyset_filter(("2025-07-01", "abc"), descending=False).startswith('created_at.gt."2025-07-01"')
+
+def test_first_page_has_no_cursor_filter():
+    query = paged_query([])
+
+    apply_keyset(query, None, 50)
+
+    query.order.assert_any_call("created_at", desc=True)
+    query.order.assert_any_call("id", desc=True)
+    query.or_.assert_not_called()
+    query.limit.assert_called_once_with(50)
+
+@pytest.mark.asyncio
+async def test_pages_follow_last_row():
+    query = paged_query([
+        [{"id": "c", "created_at": "2025-07-03"}, {"id": "b", "created_at": "2025-07-02"}],
+        [{"id": "a", "created_at": "2025-07-01"}]
+    ])
+
+    pages = [page async for page in iter_keyset_pages(lambda: query, page_size=2)]
+
+    assert [[row["id"] for row in page] for page in pages] == [["c", "b"], ["a"]]
+    query.or_.assert_called_once_with(keyset_filter(("2025-07-02", "b")))
+    assert query.execute.call_count == 2
+
+@pytest.mark.asyncio
+async def test_full_last_page_triggers_empty_read():
+    query = paged_query([[{"id": "a", "created_at": "2025-07-01"}], []])
+
+    pages = [page async for page in iter_keyset_pages(lambda: query, page_size=1)]
+
+    assert len(pages) == 1
+    assert query.execute.call_count == 2
+
+def test_cursor_round_trip():
+    token = encode_cursor(("2025-07-01T10:00:00.123456+00:00", ROW_ID))
+
+    assert decode_cursor(token) == ("2025-07-01T10:00:00.123456+00:00", ROW_ID)
+
+@pytest.mark.parametrize("token", ["no-es-base64!", encode_cursor(("ayer", ROW_ID)), encode_cursor(("2025-07-01", 'x",id.gt.0'))])
+def test_invalid_cursor_rejected(token):
+    with pytest.raises(HTTPException) as exc_info:
+        decode_cursor(token)
+
+    assert exc_info.value.status_code == 400
+
+def test_next_cursor_only_for_full_pages():
+    item = SimpleNamespace(id=ROW_ID, created_at=datetime(2025, 7, 1, 10, tzinfo=timezone.utc))
+
+    assert next_cursor([item], limit=2) is None
+    assert decode_cursor(next_cursor([item], limit=1)) == ("2025-07-01T10:00:00+00:00", ROW_ID)
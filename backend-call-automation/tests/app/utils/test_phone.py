@@ -0,0 +1,19 @@
+import pytest
+from app.utils.phone import normalize_phone, phone_digits
+
+@pytest.mark.parametrize("value, expected", [
+    ("+54 9 11 1234-5678", "5491112345678"),
+    ("0054 9 11 1234 5678", "5491112345678"),
+    ("(11) 1234-5678", "1112345678"),
+    ("", "")
+])
+def test_phone_digits(value, expected):
+    assert phone_digits(value) == expected
+
+def test_normalize_phone_to_e164():
+    assert normalize_phone(" 0034 612 345 678 ") == "+34612345678"
+
+@pytest.mark.parametrize("value", ["1234", "+1 234 567 890 123 456 7"])
+def test_invalid_length_rejected(value):
+    with pytest.raises(ValueError):
+        normalize_phone(value)
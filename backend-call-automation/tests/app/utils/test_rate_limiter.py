@@ -0,0 +1,44 @@
+import asyncio
+import time
+
+import pytest
+
+from app.utils.rate_limiter import RateLimiter
+
+@pytest.mark.asyncio
+async def test_burst_is_immediate_then_paced():
+    limiter = RateLimiter(rate=20, burst=2)
+    start = time.monotonic()
+
+    for _ in range(4):
+        await limiter.acquire()
+
+    # Dos inmediatas y dos a 20 por segundo
+    assert time.monotonic() - start >= 0.09
+
+@pytest.mark.asyncio
+async def test_pause_delays_waiters():
+    limiter = RateLimiter(rate=1000, burst=5)
+    limiter.pause(0.1)
+    start = time.monotonic()
+
+    await limiter.acquire()
+
+    assert time.monotonic() - start >= 0.09
+
+@pytest.mark.asyncio
+async def test_waiters_are_served_in_order():
+    limiter = RateLimiter(rate=100, burst=1)
+    served = []
+
+    async def worker(n):
+        await limiter.acquire()
+        served.append(n)
+
+    await asyncio.gather(*(worker(n) for n in range(5)))
+
+    assert served == [0, 1, 2, 3, 4]
+
+def test_rate_must_be_positive():
+    with pytest.raises(ValueError):
+        RateLimiter(rate=0)
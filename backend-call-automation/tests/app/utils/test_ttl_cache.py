@@ -0,0 +1,40 @@
+from app.utils.ttl_cache import TTLCache
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = TTLCache(ttl=10, clock=clock)
+    cache["a"] = 1
+
+    clock.now = 5
+    assert cache.get("a") == 1
+
+    clock.now = 11
+    assert "a" not in cache
+    assert len(cache) == 0
+
+def test_oldest_entry_evicted_when_full():
+    cache = TTLCache(ttl=60, maxsize=2)
+    cache["a"] = 1
+    cache["b"] = 2
+    cache["c"] = 3
+
+    assert "a" not in cache
+    assert cache.get("b") == 2
+    assert len(cache) == 2
+
+def test_overwrite_refreshes_ttl():
+    clock = FakeClock()
+    cache = TTLCache(ttl=10, clock=clock)
+    cache["a"] = 1
+    clock.now = 8
+    cache["a"] = 2
+    clock.now = 15
+
+    assert cache.get("a") == 2